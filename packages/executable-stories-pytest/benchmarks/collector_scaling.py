@@ -0,0 +1,66 @@
+"""Collector throughput by thread count: locked vs per-thread buffers.
+
+Usage::
+
+    python benchmarks/collector_scaling.py [cases-per-thread]
+
+Each thread records its cases (every tenth one twice, as a rerun), then
+the run is drained with ``get_all()``. On a free-threaded build
+(``python3.13t``) the buffered collector is expected to scale with
+threads while the locked one flattens out; with the GIL both are bound
+by it. That expectation is unverified: the only numbers taken so far
+were with the GIL on one CPU.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+
+from executable_stories._collector import _BufferedCollector, _Collector, _gil_enabled
+
+
+def run(collector_cls: type, threads: int, per_thread: int) -> tuple[float, float]:
+    collector = collector_cls()
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(t: int) -> None:
+        barrier.wait()
+        for i in range(per_thread):
+            collector.record({"status": "fail", "externalId": f"t{t}::{i}", "durationMs": 1.0})
+            if i % 10 == 0:
+                collector.record({"status": "pass", "externalId": f"t{t}::{i}", "durationMs": 1.0})
+
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    record_s = time.perf_counter() - start
+    start = time.perf_counter()
+    cases = collector.get_all()
+    drain_s = time.perf_counter() - start
+    assert len(cases) == threads * per_thread
+    return record_s, drain_s
+
+
+def main() -> None:
+    per_thread = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if _gil_enabled() else 'disabled'}")
+    print(f"{'threads':>7}  {'collector':<10} {'records/s':>12} {'record':>9} {'drain':>9}")
+    for threads in (1, 2, 4, 8):
+        for cls in (_Collector, _BufferedCollector):
+            record_s, drain_s = run(cls, threads, per_thread)
+            total = threads * per_thread * 1.1
+            name = "locked" if cls is _Collector else "buffered"
+            print(
+                f"{threads:>7}  {name:<10} {total / record_s:>12,.0f} "
+                f"{record_s * 1e3:>7.0f}ms {drain_s * 1e3:>7.0f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""What the plugin costs a pytest run that does not use stories.
+
+Usage::
+
+    python benchmarks/plugin_startup.py [tests] [repeats]
+
+Reports the import time of ``executable_stories._plugin`` (pytest already
+imported, as it is when the entry point loads), then the wall time of a
+pytest session over a generated project of plain tests — each using a
+fixture — with the plugin disabled and enabled, and of the same project
+where every test calls ``story.init()``. Every figure is the best of
+*repeats* fresh subprocesses.
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+_IMPORT = (
+    "import time, pytest; t = time.perf_counter(); import executable_stories._plugin; "
+    "print(time.perf_counter() - t)"
+)
+
+_PLAIN = """
+import pytest
+
+@pytest.fixture
+def value():
+    return 1
+
+"""
+
+_STORY = """
+import pytest
+from executable_stories import story
+
+@pytest.fixture
+def value():
+    return 1
+
+"""
+
+
+def _write_project(root: str, header: str, body: str, tests: int) -> None:
+    per_module = 500
+    for m in range(0, tests, per_module):
+        lines = [header]
+        for i in range(m, min(m + per_module, tests)):
+            lines.append(f"def test_{i}(value):\n{body}    assert value == 1\n")
+        with open(os.path.join(root, f"test_m{m // per_module}.py"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+
+
+def _run(command: list[str], cwd: str) -> float:
+    start = time.perf_counter()
+    subprocess.run(command, cwd=cwd, check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def _best(runs: dict[str, tuple[list[str], str]], repeats: int) -> dict[str, float]:
+    """Best wall time per configuration; configurations take turns to share any drift."""
+    for command, cwd in runs.values():
+        _run(command, cwd)  # warm-up: bytecode and assertion-rewrite caches
+    best = {name: float("inf") for name in runs}
+    for _ in range(repeats):
+        for name, (command, cwd) in runs.items():
+            best[name] = min(best[name], _run(command, cwd))
+    return best
+
+
+def _import_time(repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", _IMPORT], check=True, capture_output=True, text=True)
+        times.append(float(out.stdout))
+    return min(times)
+
+
+def main() -> None:
+    tests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    pytest_cmd = [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider"]
+
+    print(f"plugin import: {_import_time(repeats) * 1e3:.1f} ms")
+    with tempfile.TemporaryDirectory() as plain, tempfile.TemporaryDirectory() as stories:
+        _write_project(plain, _PLAIN, "", tests)
+        _write_project(stories, _STORY, '    story.init("A story")\n', tests)
+        best = _best({
+            "disabled": ([*pytest_cmd, "-p", "no:executable_stories"], plain),
+            "enabled": (pytest_cmd, plain),
+            "stories": (pytest_cmd, stories),
+        }, repeats)
+        disabled, enabled, with_stories = best["disabled"], best["enabled"], best["stories"]
+        written = os.path.exists(os.path.join(plain, ".executable-stories"))
+
+    print(f"{tests} plain tests, plugin disabled: {disabled * 1e3:8.0f} ms")
+    overhead = (enabled - disabled) * 1e6 / tests
+    print(f"{tests} plain tests, plugin enabled:  {enabled * 1e3:8.0f} ms  ({overhead:+.1f} us/test)")
+    print(f"{tests} story tests:                  {with_stories * 1e3:8.0f} ms")
+    print(f"raw-run written for plain tests: {'yes' if written else 'no'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Memory held by one data-driven story: thousands of steps and kv docs.
+
+Usage::
+
+    python benchmarks/story_memory.py [steps] [docs-per-step]
+
+Reports the bytes allocated (tracemalloc) by the story context once the
+test has logged everything and after it has been handed to the collector,
+plus the time logging, the handoff and serialization take.
+"""
+
+from __future__ import annotations
+
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from executable_stories._lazy import json_default
+from executable_stories._story_api import Story
+
+
+def main() -> None:
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    docs_per_step = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    story = Story()
+
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    story.init("Data-driven import")
+    for i in range(steps):
+        story.given(f"row {i} is imported")
+        for j in range(docs_per_step):
+            story.kv(f"field{j}", i * j)
+        token = story.start_timer()
+        story.end_timer(token)
+    log_s = time.perf_counter() - start
+    logged = tracemalloc.get_traced_memory()[0] - base
+
+    start = time.perf_counter()
+    meta = story._get_meta(resolve=False)
+    story._clear()
+    handoff_s = time.perf_counter() - start
+    held = tracemalloc.get_traced_memory()[0] - base
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    size = len(json.dumps(meta, default=json_default))
+    dump_s = time.perf_counter() - start
+
+    print(f"{steps} steps x {docs_per_step} kv docs")
+    print(f"  logged in context:   {logged / 1e6:8.2f} MB in {log_s * 1e3:.0f} ms (traced)")
+    print(f"  held after handoff:  {held / 1e6:8.2f} MB (peak {peak / 1e6:.2f} MB)")
+    print(f"  handoff:             {handoff_s * 1e3:8.2f} ms")
+    print(f"  serialize:           {dump_s * 1e3:8.2f} ms ({size / 1e6:.2f} MB JSON)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,21 @@
 """pytest plugin for executable-stories BDD documentation."""
 
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
 from executable_stories._story_api import story
 
-__all__ = ["story"]
+if TYPE_CHECKING:
+    from executable_stories._json_writer import read_raw_run
+
+__all__ = ["read_raw_run", "story"]
+
+
+def __getattr__(name: str) -> Any:
+    # The plugin is loaded into every pytest run; the reader is imported on first use.
+    if name == "read_raw_run":
+        from executable_stories._json_writer import read_raw_run
+
+        return read_raw_run
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
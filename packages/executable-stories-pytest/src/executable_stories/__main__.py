@@ -0,0 +1,7 @@
+"""Entry point for ``python -m executable_stories``."""
+
+import sys
+
+from executable_stories._cli import main
+
+sys.exit(main())
@@ -0,0 +1,138 @@
+"""Shared Background steps recorded once per fixture instance.
+
+``story.background()`` is meant to be called from a fixture. The plugin
+tells the story API which fixture is being set up, so each Background is
+tied to that fixture instance; every test using the fixture refers to the
+Background by id instead of repeating its steps, and the fixture's setup
+time is attributed to the Background.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from executable_stories._budget import _DocBudget
+
+
+class _Background:
+    """Steps and docs of one Background, built by the fixture that owns it."""
+
+    __slots__ = (
+        "id", "name", "fixture", "scope", "steps", "duration_ms", "_seen_primary_keywords", "_budget", "_doc_bytes"
+    )
+
+    def __init__(
+        self,
+        bg_id: str,
+        name: str,
+        *,
+        fixture: str | None,
+        scope: str | None,
+        budget: _DocBudget | None = None,
+    ) -> None:
+        self.id = bg_id
+        self.name = name
+        self.fixture = fixture
+        self.scope = scope
+        self.steps: list[dict[str, Any]] = []
+        self.duration_ms: float | None = None
+        self._seen_primary_keywords: set[str] = set()
+        # Step docs are charged like a test's docs; the Background is the "test".
+        self._budget = budget
+        self._doc_bytes = 0
+
+    def __enter__(self) -> _Background:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+    def _add_step(self, keyword: str, text: str, docs: list[dict[str, Any]] | None) -> _Background:
+        # Auto-And, as in Story._add_step
+        if keyword in ("Given", "When", "Then"):
+            if keyword in self._seen_primary_keywords:
+                keyword = "And"
+            else:
+                self._seen_primary_keywords.add(keyword)
+        step: dict[str, Any] = {"keyword": keyword, "text": text, "id": f"{self.id}-step-{len(self.steps)}"}
+        if docs:
+            step["docs"] = [self._fit_doc(doc) for doc in docs]
+        self.steps.append(step)
+        return self
+
+    def _fit_doc(self, entry: dict[str, Any]) -> dict[str, Any]:
+        if self._budget is None:
+            return entry
+        fitted, charged, _ = self._budget.apply(entry, self._doc_bytes)
+        self._doc_bytes += charged
+        return fitted  # type: ignore[return-value]
+
+    def given(self, text: str, *, docs: list[dict[str, Any]] | None = None) -> _Background:
+        return self._add_step("Given", text, docs)
+
+    def when(self, text: str, *, docs: list[dict[str, Any]] | None = None) -> _Background:
+        return self._add_step("When", text, docs)
+
+    def then(self, text: str, *, docs: list[dict[str, Any]] | None = None) -> _Background:
+        return self._add_step("Then", text, docs)
+
+    def and_(self, text: str, *, docs: list[dict[str, Any]] | None = None) -> _Background:
+        return self._add_step("And", text, docs)
+
+    def but(self, text: str, *, docs: list[dict[str, Any]] | None = None) -> _Background:
+        return self._add_step("But", text, docs)
+
+    def to_dict(self) -> dict[str, Any]:
+        result: dict[str, Any] = {"id": self.id, "name": self.name, "steps": list(self.steps)}
+        if self.fixture is not None:
+            result["fixture"] = self.fixture
+        if self.scope is not None:
+            result["scope"] = self.scope
+        if self.duration_ms is not None:
+            result["durationMs"] = round(self.duration_ms, 2)
+        return result
+
+
+class _BackgroundRegistry:
+    """Thread-safe store of Backgrounds, indexed by the fixture that made them."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._backgrounds: list[_Background] = []
+        self._by_fixture: dict[Any, list[_Background]] = {}
+
+    def create(
+        self,
+        name: str,
+        *,
+        fixture_key: Any = None,
+        fixture: str | None = None,
+        scope: str | None = None,
+        budget: _DocBudget | None = None,
+    ) -> _Background:
+        with self._lock:
+            bg = _Background(f"bg-{len(self._backgrounds)}", name, fixture=fixture, scope=scope, budget=budget)
+            self._backgrounds.append(bg)
+            if fixture_key is not None:
+                self._by_fixture.setdefault(fixture_key, []).append(bg)
+            return bg
+
+    def reset_fixture(self, fixture_key: Any) -> None:
+        """Forget the Backgrounds of a fixture about to be set up again."""
+        with self._lock:
+            self._by_fixture.pop(fixture_key, None)
+
+    def for_fixture(self, fixture_key: Any) -> list[_Background]:
+        with self._lock:
+            return list(self._by_fixture.get(fixture_key, ()))
+
+    def summary(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [bg.to_dict() for bg in self._backgrounds]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._backgrounds.clear()
+            self._by_fixture.clear()
@@ -0,0 +1,172 @@
+"""Byte budgets for story doc entries.
+
+Caps how much doc content a single entry, a single test and the whole
+run may hold, so one oversized ``story.json()`` or ``story.code()`` call
+cannot inflate the collector or the raw-run file. Oversized content is
+truncated in place; structured kv and custom values, which cannot be
+cut, are replaced by an explicit placeholder. DocEntry allows no extra properties, so the cut is
+reported outside the entry: per test as ``meta.droppedDocBytes`` and
+per run in ``meta.docBudget``.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from typing import Any
+
+from executable_stories._lazy import _LazyDoc
+from executable_stories._records import _Doc
+
+# Defaults; a limit of 0 disables that budget.
+DEFAULT_MAX_ENTRY_BYTES = 1024 * 1024
+DEFAULT_MAX_TEST_BYTES = 4 * 1024 * 1024
+DEFAULT_MAX_RUN_BYTES = 256 * 1024 * 1024
+
+# The field holding the bulk of each doc kind's content. Kinds not listed
+# here (tag, link, screenshot) only carry short labels and are never cut.
+_CONTENT_FIELDS = {
+    "note": "text",
+    "kv": "value",
+    "code": "content",
+    "table": "rows",
+    "section": "markdown",
+    "mermaid": "code",
+    "custom": "data",
+}
+
+
+def _utf8_len(text: str) -> int:
+    """Return the UTF-8 size of *text*, skipping the encode for ASCII."""
+    if text.isascii():
+        return len(text)
+    return len(text.encode("utf-8"))
+
+
+def _json_len(value: Any) -> int:
+    if type(value) is int:
+        return len(str(value))
+    return len(json.dumps(value, default=str).encode("utf-8"))
+
+
+def _truncate_utf8(text: str, max_bytes: int) -> str:
+    """Cut *text* to at most *max_bytes* UTF-8 bytes on a character boundary."""
+    if max_bytes <= 0:
+        return ""
+    return text.encode("utf-8")[:max_bytes].decode("utf-8", "ignore")
+
+
+def omitted_placeholder(size: int) -> str:
+    """The value left in place of a structured value over the budget."""
+    return f"[{size} bytes omitted: over the doc budget]"
+
+
+class _DocBudget:
+    """Per-entry, per-test and per-run byte limits for doc entries.
+
+    The run-level counters are shared by every test thread in the process,
+    so they are guarded by a lock. Per-test usage lives on the story
+    context and is passed in by the caller.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entry_bytes: int = DEFAULT_MAX_ENTRY_BYTES,
+        max_test_bytes: int = DEFAULT_MAX_TEST_BYTES,
+        max_run_bytes: int = DEFAULT_MAX_RUN_BYTES,
+    ) -> None:
+        self.max_entry_bytes = max_entry_bytes
+        self.max_test_bytes = max_test_bytes
+        self.max_run_bytes = max_run_bytes
+        self._lock = threading.Lock()
+        self.run_bytes = 0
+        self.truncated_entries = 0
+        self.dropped_bytes = 0
+
+    def _allowed(self, test_bytes: int) -> int | None:
+        """Return the bytes still available for one entry, or None if unlimited."""
+        limits: list[int] = []
+        if self.max_entry_bytes > 0:
+            limits.append(self.max_entry_bytes)
+        if self.max_test_bytes > 0:
+            limits.append(max(self.max_test_bytes - test_bytes, 0))
+        if self.max_run_bytes > 0:
+            limits.append(max(self.max_run_bytes - self.run_bytes, 0))
+        return min(limits) if limits else None
+
+    def _try_charge(self, size: int, test_bytes: int) -> bool:
+        """Charge *size* bytes if they fit in every budget."""
+        with self._lock:
+            allowed = self._allowed(test_bytes)
+            if allowed is None or size <= allowed:
+                self.run_bytes += size
+                return True
+            return False
+
+    def apply(
+        self, entry: dict[str, Any] | _Doc | _LazyDoc, test_bytes: int
+    ) -> tuple[dict[str, Any] | _Doc | _LazyDoc, int, int]:
+        """Fit *entry* into the remaining budget.
+
+        Returns ``(entry, charged, dropped)``: the (possibly truncated) entry,
+        the bytes it now occupies and the bytes that were cut from it.
+        Lazy entries are charged by their snapshot size and only formatted
+        here when they have to be truncated; doc records that must be cut
+        come back as dicts.
+        """
+        if isinstance(entry, _LazyDoc):
+            if self._try_charge(entry.size, test_bytes):
+                return entry, entry.size, 0
+            entry = entry.resolve()
+
+        field = _CONTENT_FIELDS.get(entry.get("kind", ""))
+        if field is None or field not in entry:
+            return entry, 0, 0
+
+        value = entry[field]
+        size = _utf8_len(value) if isinstance(value, str) else _json_len(value)
+        if self._try_charge(size, test_bytes):
+            return entry, size, 0
+
+        with self._lock:
+            allowed = self._allowed(test_bytes) or 0
+            truncated = dict(entry)
+            if isinstance(value, str):
+                truncated[field] = _truncate_utf8(value, allowed)
+                kept = _utf8_len(truncated[field])
+            elif field == "rows":
+                rows: list[Any] = []
+                kept = 2
+                for row in value:
+                    row_size = _json_len(row) + 1
+                    if kept + row_size > allowed:
+                        break
+                    rows.append(row)
+                    kept += row_size
+                truncated[field] = rows
+            else:
+                # A cut structured kv / custom value would change type (or no
+                # longer parse), so it is replaced as a whole.
+                truncated[field] = omitted_placeholder(size)
+                kept = 0
+
+            dropped = size - kept
+            self.run_bytes += kept
+            self.truncated_entries += 1
+            self.dropped_bytes += dropped
+            return truncated, kept, dropped
+
+    def summary(self) -> dict[str, Any] | None:
+        """Return the run-level truncation report, or None if nothing was cut."""
+        with self._lock:
+            if not self.truncated_entries:
+                return None
+            return {
+                "maxEntryBytes": self.max_entry_bytes,
+                "maxTestBytes": self.max_test_bytes,
+                "maxRunBytes": self.max_run_bytes,
+                "keptBytes": self.run_bytes,
+                "truncatedEntries": self.truncated_entries,
+                "droppedBytes": self.dropped_bytes,
+            }
@@ -0,0 +1,97 @@
+"""Raw-to-canonical helpers shared by the Python report renderers.
+
+Mirrors the parts of the formatters package's ACL (status mapping, story
+synthesis, title paths) and of JavaScript value formatting that the
+Markdown and JUnit renderers need to produce the same text as their
+TypeScript counterparts.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from datetime import UTC, datetime
+from typing import Any
+
+STATUS_MAP = {
+    "pass": "passed",
+    "fail": "failed",
+    "skip": "skipped",
+    "pending": "pending",
+    "todo": "pending",
+    "timeout": "failed",
+    "interrupted": "failed",
+    "unknown": "skipped",
+}
+
+_KEYWORDS = {"given": "Given", "when": "When", "then": "Then", "and": "And", "but": "But"}
+
+
+# ── JavaScript-compatible value formatting ─────────────────────────
+
+
+def _js_number(value: float) -> Any:
+    if math.isfinite(value) and value == int(value):
+        return int(value)
+    return value
+
+
+def _js_value(value: Any) -> Any:
+    """Convert floats the way ``JSON.stringify`` prints them (``1.0`` -> ``1``)."""
+    if isinstance(value, float):
+        return _js_number(value)
+    if isinstance(value, dict):
+        return {k: _js_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_js_value(v) for v in value]
+    return value
+
+
+def js_json(value: Any, indent: int | None = None) -> str:
+    if indent is None:
+        return json.dumps(_js_value(value), ensure_ascii=False, separators=(",", ":"), default=str)
+    return json.dumps(_js_value(value), ensure_ascii=False, indent=indent, default=str)
+
+
+def js_str(value: Any) -> str:
+    """Render a value the way a JavaScript template literal or ``join`` would."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        return str(_js_number(value))
+    if isinstance(value, (dict, list)):
+        return js_json(value)
+    return str(value)
+
+
+def iso_timestamp(ms: float) -> str:
+    """Format epoch milliseconds like ``Date.prototype.toISOString``."""
+    whole = int(ms)
+    dt = datetime.fromtimestamp(whole // 1000, UTC)
+    return f"{dt.strftime('%Y-%m-%dT%H:%M:%S')}.{whole % 1000:03d}Z"
+
+
+# ── Canonicalization (the subset the renderers need) ──────────────
+
+
+def synthesize_story(test_case: dict[str, Any]) -> dict[str, Any]:
+    """Fill in missing story metadata, as the formatter CLI does by default."""
+    story = test_case.get("story")
+    if story is None:
+        path = test_case.get("titlePath") or []
+        scenario = test_case.get("title") or (path[-1] if path else "Untitled")
+        return {"scenario": scenario, "steps": [{"keyword": "Then", "text": scenario}]}
+    steps = story.get("steps")
+    if not steps:
+        return {**story, "steps": [{"keyword": "Then", "text": story["scenario"]}]}
+    return {**story, "steps": [{**s, "keyword": _KEYWORDS.get(s["keyword"].lower(), s["keyword"])} for s in steps]}
+
+
+def title_path(test_case: dict[str, Any], story: dict[str, Any]) -> list[str]:
+    """Prefer the story's suitePath, else the raw titlePath without the test name."""
+    if story.get("suitePath"):
+        return list(story["suitePath"])
+    path = test_case.get("titlePath") or []
+    return list(path[:-1])
@@ -0,0 +1,228 @@
+"""Command line interface: ``python -m executable_stories <subcommand>``.
+
+Mirrors the subcommands and exit codes of the formatters package's
+``executable-stories`` CLI for the parts implemented in Python.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections.abc import Iterator
+from typing import Any
+
+from executable_stories._compact import decode_run, is_compact
+from executable_stories._diff import diff_runs, render_text
+from executable_stories._json_writer import read_raw_run, read_raw_run_ndjson
+from executable_stories._junit import _JUnitWriter
+from executable_stories._markdown import OUTPUT_MODES, SORT_ORDERS, STEP_STYLES, _MarkdownWriter
+from executable_stories._merge import merge_runs, merge_to_file
+
+EXIT_SUCCESS = 0
+EXIT_SCHEMA_VALIDATION = 1
+EXIT_GENERATION = 3
+EXIT_USAGE = 4
+
+FORMATS = ("markdown", "junit")
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m executable_stories",
+        description="Generate reports from executable-stories raw runs.",
+    )
+    subparsers = parser.add_subparsers(dest="subcommand", required=True)
+
+    fmt = subparsers.add_parser("format", help="Read a raw run and generate reports.")
+    fmt.add_argument("input", nargs="?", help="raw-run.json (plain or compact) or raw-run.ndjson")
+    fmt.add_argument("--stdin", action="store_true", help="Read the run from stdin instead of a file.")
+    fmt.add_argument("--format", default="markdown", help="Comma-separated formats (default: markdown).")
+    fmt.add_argument(
+        "--input-type",
+        choices=("raw", "ndjson"),
+        default=None,
+        help="Input type (default: ndjson for *.ndjson files, otherwise raw).",
+    )
+    fmt.add_argument("--output-dir", default="reports", help="Output directory (default: reports).")
+    fmt.add_argument("--output-name", default="test-results", help="Base filename (default: test-results).")
+    fmt.add_argument(
+        "--output-mode",
+        choices=OUTPUT_MODES,
+        default="colocated",
+        help="Markdown: one file per feature (colocated, default) or a single file (aggregated).",
+    )
+    fmt.add_argument(
+        "--no-synthesize-stories",
+        dest="synthesize_stories",
+        action="store_false",
+        help="Skip test cases without story metadata instead of synthesizing one.",
+    )
+    fmt.add_argument("--markdown-title", default="User Stories", help="Report title (default: User Stories).")
+    fmt.add_argument("--markdown-step-style", choices=STEP_STYLES, default="bullets")
+    fmt.add_argument("--markdown-sort", choices=SORT_ORDERS, default="source")
+    fmt.add_argument("--markdown-permalink-base-url", default=None)
+    fmt.add_argument("--markdown-ticket-url-template", default=None)
+    fmt.add_argument("--markdown-trace-url-template", default=None)
+    fmt.add_argument("--junit-suite-name", default="Test Suite", help="JUnit testsuites name (default: Test Suite).")
+
+    merge = subparsers.add_parser("merge", help="Merge raw-run shards into one run.")
+    merge.add_argument("inputs", nargs="+", help="Shard files (raw-run JSON, compact or NDJSON).")
+    merge.add_argument("-o", "--output", default=None, help="Merged raw-run path (default: stdout).")
+
+    diff = subparsers.add_parser("diff", help="Compare two raw runs.")
+    diff.add_argument("old", help="Baseline raw run.")
+    diff.add_argument("new", help="Raw run to compare against the baseline.")
+    diff.add_argument("--format", choices=("text", "json"), default="text", help="Report format (default: text).")
+    diff.add_argument("-o", "--output", default=None, help="Write the report to a file instead of stdout.")
+    diff.add_argument(
+        "--top", type=int, default=20, help="Largest duration changes to list per category (0 = all, default: 20)."
+    )
+    diff.add_argument(
+        "--min-delta-ms", type=float, default=0.0, help="Ignore duration changes smaller than this (default: 0)."
+    )
+    return parser
+
+
+def _read_input(args: argparse.Namespace) -> tuple[dict[str, Any], Iterator[dict[str, Any]]]:
+    """Return the run header and an iterator over its test cases."""
+    input_type = args.input_type
+    if input_type is None:
+        input_type = "ndjson" if args.input and args.input.endswith(".ndjson") else "raw"
+
+    if input_type == "ndjson":
+        stream = sys.stdin if args.stdin else open(args.input, encoding="utf-8")
+        return read_raw_run_ndjson(stream)
+
+    if args.stdin:
+        data = json.load(sys.stdin)
+        raw_run = decode_run(data) if is_compact(data) else data
+    else:
+        raw_run = read_raw_run(args.input)
+    test_cases = raw_run.pop("testCases", [])
+    return raw_run, iter(test_cases)
+
+
+def _format(args: argparse.Namespace) -> int:
+    formats = [f.strip() for f in args.format.split(",") if f.strip()]
+    unsupported = [f for f in formats if f not in FORMATS]
+    if unsupported:
+        print(f"Unsupported format(s): {', '.join(unsupported)}. Available: {', '.join(FORMATS)}", file=sys.stderr)
+        return EXIT_USAGE
+    if not args.stdin and not args.input:
+        print("Error: no input file given (or use --stdin).", file=sys.stderr)
+        return EXIT_USAGE
+
+    try:
+        header, test_cases = _read_input(args)
+    except (OSError, ValueError) as err:
+        print(f"Error: could not read input — {err}", file=sys.stderr)
+        return EXIT_SCHEMA_VALIDATION
+
+    markdown: _MarkdownWriter | None = None
+    junit: _JUnitWriter | None = None
+    if "markdown" in formats:
+        markdown = _MarkdownWriter(
+            args.output_dir,
+            output_name=args.output_name,
+            mode=args.output_mode,
+            title=args.markdown_title,
+            step_style=args.markdown_step_style,
+            sort_scenarios=args.markdown_sort,
+            permalink_base_url=args.markdown_permalink_base_url,
+            ticket_url_template=args.markdown_ticket_url_template,
+            trace_url_template=args.markdown_trace_url_template,
+            synthesize_stories=args.synthesize_stories,
+        )
+    if "junit" in formats:
+        junit = _JUnitWriter(
+            os.path.join(args.output_dir, f"{args.output_name}.junit.xml"),
+            suite_name=args.junit_suite_name,
+            synthesize_stories=args.synthesize_stories,
+        )
+
+    # Stacks kept only once per fingerprint, for runs with --stories-shared-stacks.
+    stacks = {g["fingerprint"]: g.get("stack") for g in (header.get("meta") or {}).get("failures") or []}
+
+    # Both writers consume the same single pass over the test cases.
+    written: list[str] = []
+    try:
+        if markdown is not None:
+            markdown.start(header)
+        for test_case in test_cases:
+            if markdown is not None:
+                markdown.add(test_case)
+            if junit is not None:
+                fp = (test_case.get("meta") or {}).get("errorFingerprint")
+                junit.add(test_case, stack=stacks.get(fp) if fp else None)
+        if markdown is not None:
+            written.extend(markdown.close())
+        if junit is not None:
+            now_ms = time.time() * 1000
+            written.append(junit.close(header.get("startedAtMs", now_ms), header.get("finishedAtMs", now_ms)))
+    except (OSError, ValueError, KeyError, TypeError) as err:
+        print(f"Generation failed: {err}", file=sys.stderr)
+        return EXIT_GENERATION
+
+    for path in written:
+        print(path)
+    return EXIT_SUCCESS
+
+
+def _merge(args: argparse.Namespace) -> int:
+    missing = [path for path in args.inputs if not os.path.isfile(path)]
+    if missing:
+        print(f"Error: input not found: {', '.join(missing)}", file=sys.stderr)
+        return EXIT_USAGE
+    try:
+        if args.output is None:
+            summary = merge_runs(args.inputs, sys.stdout)
+        else:
+            summary = merge_to_file(args.inputs, args.output)
+    except (OSError, ValueError) as err:
+        print(f"Error: could not merge shards — {err}", file=sys.stderr)
+        return EXIT_SCHEMA_VALIDATION
+
+    if args.output is not None:
+        print(
+            f"{args.output}: {summary['testCases']} test cases from {len(summary['shards'])} shards "
+            f"({summary['duplicates']} duplicates merged)"
+        )
+    return EXIT_SUCCESS
+
+
+def _diff(args: argparse.Namespace) -> int:
+    missing = [path for path in (args.old, args.new) if not os.path.isfile(path)]
+    if missing:
+        print(f"Error: input not found: {', '.join(missing)}", file=sys.stderr)
+        return EXIT_USAGE
+    try:
+        report = diff_runs(args.old, args.new, top=args.top, min_delta_ms=args.min_delta_ms)
+    except (OSError, ValueError) as err:
+        print(f"Error: could not read input — {err}", file=sys.stderr)
+        return EXIT_SCHEMA_VALIDATION
+
+    text = json.dumps(report, indent=2) + "\n" if args.format == "json" else render_text(report)
+    if args.output is None:
+        sys.stdout.write(text)
+    else:
+        parent = os.path.dirname(args.output)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(args.output)
+    return EXIT_SUCCESS
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _build_parser().parse_args(argv)
+    if args.subcommand == "format":
+        return _format(args)
+    if args.subcommand == "merge":
+        return _merge(args)
+    if args.subcommand == "diff":
+        return _diff(args)
+    return EXIT_USAGE
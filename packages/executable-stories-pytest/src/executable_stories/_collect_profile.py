@@ -0,0 +1,162 @@
+"""Collection profiling: where the time before the first test goes.
+
+Each test module's (and class's) ``pytest_make_collect_report`` is
+timed; for a module that is its import plus building its items. Time
+spent collecting directories and loading ``conftest.py`` files is
+reported as ``otherMs``.
+
+With import attribution, ``builtins.__import__`` is wrapped for the
+length of the collection, much like ``python -X importtime``: every
+``import`` statement is timed, its *self* time (minus nested imports) is
+added to its top-level package, and the first import of each module is
+kept with its cumulative time and the test module being collected.
+Imports made through ``importlib.import_module`` are not seen.
+
+The summary goes to the raw-run under ``meta.collectionProfile``::
+
+    {"totalMs": 912.4, "otherMs": 40.1, "moduleCount": 120,
+     "modules": [{"path": "tests/test_api.py", "durationMs": 610.2, "items": 14}, ...],
+     "imports": {"packages": [{"name": "pandas", "selfMs": 402.7}, ...],
+                 "slowest": [{"module": "pandas", "cumulativeMs": 455.0,
+                              "collectedBy": "tests/test_api.py"}, ...]}}
+"""
+
+from __future__ import annotations
+
+import builtins
+import os
+import sys
+import time
+from typing import Any
+
+# Entries kept per list in the summary.
+DEFAULT_TOP = 25
+
+
+class _ModuleTiming:
+    __slots__ = ("duration_ns", "items")
+
+    def __init__(self) -> None:
+        self.duration_ns = 0
+        self.items = 0
+
+
+class _CollectionProfiler:
+    """Times module collection and, optionally, the imports it triggers."""
+
+    def __init__(self, root: str, *, imports: bool = False, top: int = DEFAULT_TOP) -> None:
+        self.root = root
+        self.imports = imports
+        self.top = top
+        self.modules: dict[str, _ModuleTiming] = {}
+        self.total_ns = 0
+        self.package_ns: dict[str, int] = {}
+        # Module name -> (cumulative ns, test module being collected).
+        self.first_imports: dict[str, tuple[int, str | None]] = {}
+        self._started = 0
+        self._current: str | None = None
+        self._stack: list[list[int]] = []
+        self._original_import: Any = None
+
+    # ── Collection window ──────────────────────────────────────────
+
+    def start(self) -> None:
+        self._started = time.perf_counter_ns()
+        if self.imports and self._original_import is None:
+            self._original_import = builtins.__import__
+            builtins.__import__ = self._import
+
+    def stop(self) -> None:
+        self.total_ns += time.perf_counter_ns() - self._started
+        if self._original_import is not None:
+            # Leave a wrapper installed after ours in place.
+            if builtins.__import__ == self._import:
+                builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def begin_module(self, path: str) -> int:
+        self._current = self._relative(path)
+        return time.perf_counter_ns()
+
+    def end_module(self, started: int, items: int) -> None:
+        path = self._current
+        self._current = None
+        if path is None:
+            return
+        timing = self.modules.get(path)
+        if timing is None:
+            timing = self.modules[path] = _ModuleTiming()
+        timing.duration_ns += time.perf_counter_ns() - started
+        timing.items += items
+
+    def _relative(self, path: str) -> str:
+        try:
+            return os.path.relpath(path, self.root)
+        except ValueError:
+            return path
+
+    # ── Import attribution ─────────────────────────────────────────
+
+    def _import(
+        self,
+        name: str,
+        globals: dict[str, Any] | None = None,
+        locals: Any = None,
+        fromlist: Any = (),
+        level: int = 0,
+    ) -> Any:
+        if level:
+            package = (globals or {}).get("__package__") or ""
+            top = package.partition(".")[0]
+            fresh = False
+        else:
+            top = name.partition(".")[0]
+            fresh = name not in sys.modules
+        frame = [0]
+        stack = self._stack
+        stack.append(frame)
+        started = time.perf_counter_ns()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter_ns() - started
+            stack.pop()
+            if stack:
+                stack[-1][0] += elapsed
+            self.package_ns[top] = self.package_ns.get(top, 0) + elapsed - frame[0]
+            if fresh and name not in self.first_imports:
+                self.first_imports[name] = (elapsed, self._current)
+
+    # ── Summary ────────────────────────────────────────────────────
+
+    def summary(self) -> dict[str, Any]:
+        modules = sorted(self.modules.items(), key=lambda kv: kv[1].duration_ns, reverse=True)
+        module_ns = sum(t.duration_ns for t in self.modules.values())
+        result: dict[str, Any] = {
+            "totalMs": _ms(self.total_ns),
+            "otherMs": _ms(max(self.total_ns - module_ns, 0)),
+            "moduleCount": len(modules),
+            "modules": [
+                {"path": path, "durationMs": _ms(t.duration_ns), "items": t.items}
+                for path, t in modules[: self.top]
+            ],
+        }
+        if self.imports:
+            packages = sorted(self.package_ns.items(), key=lambda kv: kv[1], reverse=True)
+            slowest = sorted(self.first_imports.items(), key=lambda kv: kv[1][0], reverse=True)
+            result["imports"] = {
+                "packages": [{"name": name, "selfMs": _ms(ns)} for name, ns in packages[: self.top] if name],
+                "slowest": [_first_import(name, ns, by) for name, (ns, by) in slowest[: self.top]],
+            }
+        return result
+
+
+def _first_import(name: str, ns: int, collected_by: str | None) -> dict[str, Any]:
+    entry: dict[str, Any] = {"module": name, "cumulativeMs": _ms(ns)}
+    if collected_by is not None:
+        entry["collectedBy"] = collected_by
+    return entry
+
+
+def _ms(ns: int) -> float:
+    return round(ns / 1e6, 2)
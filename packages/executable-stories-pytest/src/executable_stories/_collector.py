@@ -1,37 +1,214 @@
 """Thread-safe test case collector.
 
 Accumulates RawTestCase dicts as tests complete, then hands them off
-to the JSON writer at session end.
+to the JSON writer at session end. Repeated attempts of the same test
+(pytest-rerunfailures) are collapsed into one case with an attempt
+history under ``meta.attempts`` (RawTestCase allows no extra fields),
+and parametrized rows can be folded into Scenario Outlines.
+
+``_Collector`` does that work under one lock as each case arrives. On
+free-threaded builds, where that lock serializes every test thread,
+``_BufferedCollector`` is used instead: each thread appends to its own
+buffer without locking, and the buffers are merged in arrival order and
+replayed through a ``_Collector`` when the run is drained. Reruns are
+still merged as they are recorded, so the case the plugin publishes
+(JUnit, pipe) carries the same attempt history with either collector.
 """
 
 from __future__ import annotations
 
+import sys
 import threading
+import time
 from typing import Any
 
+from executable_stories._outline import _Outline
+
+
+def _attempt_summary(test_case: dict[str, Any], attempt: int) -> dict[str, Any]:
+    """Reduce a full test case to the compact per-attempt record."""
+    summary: dict[str, Any] = {
+        "attempt": attempt,
+        "status": test_case["status"],
+        "durationMs": test_case.get("durationMs", 0.0),
+    }
+    error = test_case.get("error")
+    if error and "message" in error:
+        summary["errorMessage"] = error["message"]
+    return summary
+
+
+def _attempts_of(test_case: dict[str, Any]) -> list[dict[str, Any]] | None:
+    """Return the attempt history recorded on a case, if any."""
+    meta = test_case.get("meta")
+    return meta.get("attempts") if meta else None
+
+
+def _merge_attempt(previous: dict[str, Any], current: dict[str, Any]) -> dict[str, Any]:
+    """Merge a rerun into the case recorded for an earlier attempt.
+
+    The latest attempt wins: its status, story and attachments become the
+    case body, and earlier attempts survive only as compact summaries.
+    """
+    attempts = _attempts_of(previous) or [_attempt_summary(previous, 0)]
+    attempts.append(_attempt_summary(current, len(attempts)))
+    current.setdefault("meta", {})["attempts"] = attempts
+    current["retry"] = len(attempts) - 1
+    current["retries"] = max(previous.get("retries", 0), current.get("retries", 0), current["retry"])
+    return current
+
 
 class _Collector:
     """Thread-safe registry for completed test case results."""
 
     def __init__(self) -> None:
         self._lock = threading.Lock()
-        self._cases: list[dict[str, Any]] = []
+        self._cases: list[dict[str, Any] | _Outline] = []
+        self._index: dict[str, int] = {}
 
     def record(self, test_case: dict[str, Any]) -> None:
-        """Append a completed RawTestCase dict."""
+        """Append a completed RawTestCase dict, merging reruns by externalId."""
         with self._lock:
-            self._cases.append(test_case)
+            self._add(test_case)
+
+    def _add(self, test_case: dict[str, Any], *, merged: bool = False) -> None:
+        external_id = test_case.get("externalId")
+        if external_id is not None:
+            pos = self._index.get(external_id)
+            if pos is not None:
+                previous = self._cases[pos]
+                assert isinstance(previous, dict)
+                # A rerun that already carries the attempt history replaces the case.
+                self._cases[pos] = test_case if merged else _merge_attempt(previous, test_case)
+                return
+            self._index[external_id] = len(self._cases)
+        self._cases.append(test_case)
+
+    def record_example(
+        self,
+        outline_id: str,
+        title: str,
+        test_case: dict[str, Any],
+        example_id: str,
+        params: dict[str, Any],
+    ) -> None:
+        """Fold a parametrized row with a story into its Scenario Outline.
+
+        Rows whose steps do not fit the outline's template are recorded
+        as ordinary cases.
+        """
+        with self._lock:
+            pos = self._index.get(outline_id)
+            if pos is None:
+                self._index[outline_id] = len(self._cases)
+                self._cases.append(_Outline.start(outline_id, title, test_case, example_id, params))
+                return
+            outline = self._cases[pos]
+            if isinstance(outline, _Outline) and outline.matches(test_case, params):
+                outline.add(test_case, example_id, params)
+            else:
+                self._add(test_case)
 
     def get_all(self) -> list[dict[str, Any]]:
         """Return all collected test cases."""
         with self._lock:
-            return list(self._cases)
+            cases = list(self._cases)
+        return [c.to_case() if isinstance(c, _Outline) else c for c in cases]
 
     def clear(self) -> None:
         """Reset the collector."""
         with self._lock:
             self._cases.clear()
+            self._index.clear()
+
+
+class _BufferedCollector:
+    """Collector with one lock-free buffer per recording thread.
+
+    Entries are stamped with a monotonic clock so that merging the
+    buffers reproduces the order in which cases arrived; reruns and
+    outline rows are then folded exactly as ``_Collector`` folds them.
+    The registry lock is taken once per thread, not once per case.
+
+    pytest-rerunfailures reruns a test straight away on the same thread,
+    so a case that repeats the thread's previous one is merged with it as
+    it is recorded, without locking. Reruns that land on another thread
+    are merged only at drain time.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._registry_lock = threading.Lock()
+        self._buffers: list[list[tuple[Any, ...]]] = []
+        # Cases drained so far, folded by the locking collector.
+        self._merged = _Collector()
+        # Bumped by clear() so no thread merges with a case from before it.
+        self._epoch = 0
+
+    def _buffer(self) -> list[tuple[Any, ...]]:
+        buffer: list[tuple[Any, ...]] | None = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = self._local.buffer = []
+            with self._registry_lock:
+                self._buffers.append(buffer)
+        return buffer
+
+    def record(self, test_case: dict[str, Any]) -> None:
+        """Buffer a completed RawTestCase dict on the calling thread, merging a rerun."""
+        local = self._local
+        epoch, previous = getattr(local, "last", (None, None))
+        external_id = test_case.get("externalId")
+        merged = epoch == self._epoch and external_id is not None and previous.get("externalId") == external_id
+        if merged:
+            _merge_attempt(previous, test_case)
+        local.last = (self._epoch, test_case)
+        self._buffer().append((time.perf_counter_ns(), test_case, merged))
+
+    def record_example(
+        self,
+        outline_id: str,
+        title: str,
+        test_case: dict[str, Any],
+        example_id: str,
+        params: dict[str, Any],
+    ) -> None:
+        """Buffer a parametrized row; it is folded into its outline at drain time."""
+        self._buffer().append((time.perf_counter_ns(), test_case, outline_id, title, example_id, params))
+
+    def get_all(self) -> list[dict[str, Any]]:
+        """Drain every thread's buffer in arrival order and return the folded cases."""
+        with self._registry_lock:
+            entries: list[tuple[Any, ...]] = []
+            for i, buffer in enumerate(self._buffers):
+                # Entries appended while draining stay for the next call.
+                taken = buffer[:]
+                del buffer[: len(taken)]
+                entries.extend((entry[0], i, j, entry) for j, entry in enumerate(taken))
+            # (timestamp, buffer, position) is unique, so the entries are never compared.
+            entries.sort()
+            merged = self._merged
+            for _, _, _, entry in entries:
+                if len(entry) == 3:
+                    # Only drains touch the merged collector, under the registry lock.
+                    merged._add(entry[1], merged=entry[2])
+                else:
+                    _, test_case, outline_id, title, example_id, params = entry
+                    merged.record_example(outline_id, title, test_case, example_id, params)
+        return self._merged.get_all()
+
+    def clear(self) -> None:
+        """Reset the collector; threads keep (now empty) buffers."""
+        with self._registry_lock:
+            for buffer in self._buffers:
+                buffer.clear()
+            self._merged.clear()
+            self._epoch += 1
+
+
+def _gil_enabled() -> bool:
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return True if is_gil_enabled is None else is_gil_enabled()
 
 
 # Module-level singleton
-_collector = _Collector()
+_collector: _Collector | _BufferedCollector = _Collector() if _gil_enabled() else _BufferedCollector()
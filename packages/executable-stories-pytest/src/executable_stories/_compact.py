@@ -0,0 +1,105 @@
+"""Compact raw-run encoding with a shared string table.
+
+Step texts, tags, source paths and doc labels repeat thousands of times
+across a large suite. The compact encoding stores each distinct string
+once in ``strings`` and replaces it with its index wherever the RawRun
+schema guarantees a string, so the reader can expand ints back without
+ambiguity. User-supplied payloads (``meta``, kv ``value``, custom
+``data``, table rows) are left untouched.
+
+Envelope::
+
+    {"encoding": "string-table", "version": 1, "strings": [...], "run": {...}}
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from executable_stories._lazy import resolve_doc
+
+ENCODING = "string-table"
+VERSION = 1
+
+# Fields that are always strings in the schema.
+_STRING_FIELDS = frozenset({
+    "status", "title", "sourceFile", "projectName", "scenario", "keyword",
+    "text", "mode", "id", "kind", "phase", "label", "lang", "name",
+    "mediaType", "type", "message", "stack",
+})
+# Fields that are always lists of strings.
+_STRING_LIST_FIELDS = frozenset({"titlePath", "tags", "tickets", "suitePath", "names"})
+# Schema objects / object lists to descend into.
+_CHILD_OBJECTS = frozenset({"story", "error"})
+_CHILD_LISTS = frozenset({"steps", "docs", "attachments", "stepEvents"})
+
+
+class _StringTable:
+    __slots__ = ("strings", "_index")
+
+    def __init__(self) -> None:
+        self.strings: list[str] = []
+        self._index: dict[str, int] = {}
+
+    def intern(self, value: str) -> int:
+        idx = self._index.get(value)
+        if idx is None:
+            idx = len(self.strings)
+            self._index[value] = idx
+            self.strings.append(value)
+        return idx
+
+
+def _encode_node(node: dict[str, Any], table: _StringTable) -> dict[str, Any]:
+    out: dict[str, Any] = {}
+    for key, value in node.items():
+        if key in _STRING_FIELDS and isinstance(value, str):
+            out[key] = table.intern(value)
+        elif key in _STRING_LIST_FIELDS and isinstance(value, list):
+            out[key] = [table.intern(v) if isinstance(v, str) else v for v in value]
+        elif key in _CHILD_OBJECTS and isinstance(value, dict):
+            out[key] = _encode_node(value, table)
+        elif key in _CHILD_LISTS and isinstance(value, list):
+            out[key] = [_encode_node(resolve_doc(v), table) for v in value]
+        else:
+            out[key] = value
+    return out
+
+
+def _decode_node(node: dict[str, Any], strings: list[str]) -> dict[str, Any]:
+    out: dict[str, Any] = {}
+    for key, value in node.items():
+        if key in _STRING_FIELDS and type(value) is int:
+            out[key] = strings[value]
+        elif key in _STRING_LIST_FIELDS and isinstance(value, list):
+            out[key] = [strings[v] if type(v) is int else v for v in value]
+        elif key in _CHILD_OBJECTS and isinstance(value, dict):
+            out[key] = _decode_node(value, strings)
+        elif key in _CHILD_LISTS and isinstance(value, list):
+            out[key] = [_decode_node(v, strings) for v in value]
+        else:
+            out[key] = value
+    return out
+
+
+def encode_run(raw_run: dict[str, Any]) -> dict[str, Any]:
+    """Encode a RawRun dict into the compact string-table envelope."""
+    table = _StringTable()
+    run = dict(raw_run)
+    run["testCases"] = [_encode_node(tc, table) for tc in raw_run.get("testCases", [])]
+    return {"encoding": ENCODING, "version": VERSION, "strings": table.strings, "run": run}
+
+
+def is_compact(data: Any) -> bool:
+    """Return True if *data* is a compact envelope rather than a plain RawRun."""
+    return isinstance(data, dict) and data.get("encoding") == ENCODING
+
+
+def decode_run(data: dict[str, Any]) -> dict[str, Any]:
+    """Expand a compact envelope back into a plain RawRun dict."""
+    if data.get("version") != VERSION:
+        raise ValueError(f"Unsupported compact encoding version {data.get('version')!r}. Supported: {VERSION}.")
+    strings = data["strings"]
+    run = dict(data["run"])
+    run["testCases"] = [_decode_node(tc, strings) for tc in run.get("testCases", [])]
+    return run
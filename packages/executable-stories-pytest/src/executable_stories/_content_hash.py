@@ -0,0 +1,131 @@
+"""Deterministic content hashes for stories and steps.
+
+A step hash covers everything a report renders for the step — keyword,
+text, mode, docs — but not its timing. A story hash covers the scenario,
+tags, tickets, suite path, meta and docs plus the hashes of its steps in
+order, but not ``sourceOrder`` or timings. Values that differ on every
+run are left out too: OpenTelemetry trace ids (``meta.otel`` and the
+"Trace ID" / "View Trace" docs), span summary and metric docs, and the
+per-run status and duration of outline examples. Equal hashes across two
+runs therefore mean a report generator can reuse what it rendered last
+time.
+
+Hashes are BLAKE2b over canonical JSON (sorted keys, no whitespace), so
+they are identical on every platform, worker and Python version, and can
+be recomputed from any raw-run file.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import Any
+
+from executable_stories._lazy import resolve_meta
+
+MANIFEST_VERSION = 1
+MANIFEST_NAME = "story-manifest.json"
+
+# Step fields that change from run to run without a content change.
+_STEP_TIMING_FIELDS = frozenset({"durationMs"})
+# Story fields that are not content.
+_STORY_EXCLUDED_FIELDS = frozenset({"steps", "sourceOrder"})
+# Meta keys that hold per-run values.
+_META_RUN_FIELDS = frozenset({"otel"})
+# Custom doc types that carry per-run measurements.
+_RUN_DOC_TYPES = frozenset({"otel-spans", "metric"})
+# Docs (kind, label) whose value is the run's trace id.
+_TRACE_DOCS = frozenset({("kv", "Trace ID"), ("link", "View Trace")})
+# Columns of the outline Examples table filled in by the run.
+_EXAMPLE_RUN_COLUMNS = frozenset({"status", "durationMs"})
+
+
+def _digest(value: Any) -> str:
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _stable_doc(doc: dict[str, Any]) -> dict[str, Any] | None:
+    kind = doc.get("kind")
+    if kind == "custom" and doc.get("type") in _RUN_DOC_TYPES:
+        return None
+    if (kind, doc.get("label")) in _TRACE_DOCS:
+        return None
+    if kind == "table" and doc.get("label") == "Examples":
+        columns = doc.get("columns") or []
+        keep = [i for i, column in enumerate(columns) if column not in _EXAMPLE_RUN_COLUMNS]
+        if len(keep) < len(columns):
+            doc = dict(doc)
+            doc["columns"] = [columns[i] for i in keep]
+            doc["rows"] = [[row[i] for i in keep if i < len(row)] for row in doc.get("rows") or []]
+    return doc
+
+
+def _stable_docs(docs: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    return [stable for doc in docs if (stable := _stable_doc(doc)) is not None]
+
+
+def _stable_meta(meta: dict[str, Any]) -> dict[str, Any]:
+    meta = {k: v for k, v in meta.items() if k not in _META_RUN_FIELDS}
+    outline = meta.get("outline")
+    if isinstance(outline, dict) and "examples" in outline:
+        examples = [{k: v for k, v in example.items() if k != "durationMs"} for example in outline["examples"]]
+        meta["outline"] = {**outline, "examples": examples}
+    return meta
+
+
+def step_hash(step: dict[str, Any]) -> str:
+    content = {k: v for k, v in step.items() if k not in _STEP_TIMING_FIELDS}
+    if "docs" in content:
+        content["docs"] = _stable_docs(content["docs"])
+    return _digest(content)
+
+
+def story_hashes(story: dict[str, Any]) -> tuple[str, list[str]]:
+    """Return ``(story hash, step hashes)`` for a StoryMeta dict (lazy docs allowed)."""
+    story = resolve_meta(story)
+    steps = [step_hash(step) for step in story.get("steps") or []]
+    content = {k: v for k, v in story.items() if k not in _STORY_EXCLUDED_FIELDS}
+    if "docs" in content:
+        content["docs"] = _stable_docs(content["docs"])
+    if "meta" in content:
+        content["meta"] = _stable_meta(content["meta"])
+    content["steps"] = steps
+    return _digest(content), steps
+
+
+def build_manifest(test_cases: list[dict[str, Any]]) -> dict[str, Any]:
+    """Hash every story and return the manifest, keyed by ``externalId``.
+
+    Entries are ordered by ``sourceOrder`` so the file is the same whichever
+    worker or completion order produced the run.
+    """
+    entries: list[tuple[float, str, dict[str, Any]]] = []
+    for test_case in test_cases:
+        story = test_case.get("story")
+        external_id = test_case.get("externalId")
+        if story is None or external_id is None:
+            continue
+        digest, steps = story_hashes(story)
+        entry: dict[str, Any] = {"hash": digest, "steps": steps}
+        order = story.get("sourceOrder")
+        if order is not None:
+            entry["sourceOrder"] = order
+        entries.append((order if order is not None else float("inf"), external_id, entry))
+    entries.sort(key=lambda e: (e[0], e[1]))
+    return {
+        "version": MANIFEST_VERSION,
+        "algorithm": "blake2b-128",
+        "stories": {external_id: entry for _, external_id, entry in entries},
+    }
+
+
+def write_manifest(manifest: dict[str, Any], output_path: str) -> None:
+    parent = os.path.dirname(output_path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+
@@ -0,0 +1,298 @@
+"""Run-to-run diff: what changed between two raw runs.
+
+``diff_runs`` indexes the *old* run by ``externalId`` — status, duration,
+and per step only a key, a short hash of the step text and the step
+duration — and then streams the *new* run against that index, so neither
+run is ever fully loaded. Step text is compared by hash; the old text of
+the few steps that actually changed is fetched with a second streaming
+pass over the old run.
+
+Steps are matched by their ``id`` (``step-N``), falling back to their
+position. Statuses are compared after canonicalization (``pass`` and
+``passed`` are the same), and the largest duration changes are kept in
+bounded heaps.
+"""
+
+from __future__ import annotations
+
+import heapq
+from typing import Any
+
+from executable_stories._canonical import STATUS_MAP
+from executable_stories._stream import iter_raw_run
+
+# Status transitions ordered by impact.
+_TRANSITION_KINDS = ("regressed", "fixed", "changed")
+
+
+class _Entry:
+    """What the index keeps of one old test case."""
+
+    __slots__ = ("title", "status", "duration_ms", "steps")
+
+    def __init__(
+        self,
+        title: str,
+        status: str,
+        duration_ms: float | None,
+        steps: dict[str, tuple[int, int, float | None]],
+    ) -> None:
+        self.title = title
+        self.status = status
+        self.duration_ms = duration_ms
+        self.steps = steps
+
+
+_CANONICAL_STATUSES = frozenset(STATUS_MAP.values())
+
+
+def _status(test_case: dict[str, Any]) -> str:
+    status = test_case.get("status", "unknown")
+    return status if status in _CANONICAL_STATUSES else STATUS_MAP.get(status, "skipped")
+
+
+def _steps(test_case: dict[str, Any]) -> list[dict[str, Any]]:
+    story = test_case.get("story")
+    return (story.get("steps") or []) if story else []
+
+
+def _step_key(step: dict[str, Any], index: int) -> str:
+    return step.get("id") or f"#{index}"
+
+
+def _step_text(step: dict[str, Any]) -> str:
+    return f"{step.get('keyword', '')} {step.get('text', '')}".strip()
+
+
+def _text_hash(step: dict[str, Any]) -> int:
+    # Both runs are hashed in this process, so the built-in hash is stable enough.
+    return hash((step.get("keyword"), step.get("text")))
+
+
+def _index(path: str) -> tuple[dict[str, _Entry], int]:
+    index: dict[str, _Entry] = {}
+    count = 0
+    for event, test_case in iter_raw_run(path):
+        if event != "case":
+            continue
+        count += 1
+        external_id = test_case.get("externalId")
+        if external_id is None:
+            continue
+        steps = {
+            _step_key(step, i): (i, _text_hash(step), step.get("durationMs"))
+            for i, step in enumerate(_steps(test_case))
+        }
+        index[external_id] = _Entry(
+            test_case.get("title", external_id), _status(test_case), test_case.get("durationMs"), steps
+        )
+    return index, count
+
+
+def _transition_kind(old: str, new: str) -> str:
+    if new == "failed":
+        return "regressed"
+    if old == "failed" and new == "passed":
+        return "fixed"
+    return "changed"
+
+
+def _qualifies(heap: list[tuple[float, int, dict[str, Any]]], delta: float, top: int) -> bool:
+    """Whether a change of *delta* ms would make it into the top-*top* heap."""
+    return top <= 0 or len(heap) < top or abs(delta) > heap[0][0]
+
+
+def _push(heap: list[tuple[float, int, dict[str, Any]]], item: dict[str, Any], top: int, seq: int) -> None:
+    entry = (abs(item["deltaMs"]), seq, item)
+    if top <= 0 or len(heap) < top:
+        heapq.heappush(heap, entry)
+    else:
+        heapq.heapreplace(heap, entry)
+
+
+def _by_impact(heap: list[tuple[float, int, dict[str, Any]]]) -> list[dict[str, Any]]:
+    return [item for _, _, item in sorted(heap, key=lambda e: (-e[0], e[1]))]
+
+
+def diff_runs(old_path: str, new_path: str, *, top: int = 20, min_delta_ms: float = 0.0) -> dict[str, Any]:
+    """Compare two raw runs and return the report as a JSON-ready dict.
+
+    ``top`` caps the case and step duration lists (0 keeps all);
+    ``min_delta_ms`` ignores smaller duration changes.
+    """
+    index, old_count = _index(old_path)
+    new_count = 0
+    status_changes: list[dict[str, Any]] = []
+    added: list[dict[str, Any]] = []
+    step_changes: list[dict[str, Any]] = []
+    durations: list[tuple[float, int, dict[str, Any]]] = []
+    step_durations: list[tuple[float, int, dict[str, Any]]] = []
+    seq = 0
+
+    for event, test_case in iter_raw_run(new_path):
+        if event != "case":
+            continue
+        new_count += 1
+        external_id = test_case.get("externalId")
+        if external_id is None:
+            continue
+        title = test_case.get("title", external_id)
+        status = _status(test_case)
+        old = index.pop(external_id, None)
+        if old is None:
+            added.append({"externalId": external_id, "title": title, "status": status})
+            continue
+
+        if old.status != status:
+            status_changes.append({
+                "externalId": external_id,
+                "title": title,
+                "from": old.status,
+                "to": status,
+                "kind": _transition_kind(old.status, status),
+            })
+
+        duration_ms = test_case.get("durationMs")
+        if old.duration_ms is not None and duration_ms is not None:
+            delta = duration_ms - old.duration_ms
+            if delta and abs(delta) >= min_delta_ms and _qualifies(durations, delta, top):
+                seq += 1
+                _push(durations, {
+                    "externalId": external_id,
+                    "title": title,
+                    "oldMs": old.duration_ms,
+                    "newMs": duration_ms,
+                    "deltaMs": delta,
+                }, top, seq)
+
+        seen: set[str] = set()
+        for i, step in enumerate(_steps(test_case)):
+            key = _step_key(step, i)
+            seen.add(key)
+            previous = old.steps.get(key)
+            if previous is None:
+                step_changes.append({
+                    "externalId": external_id, "stepId": key, "change": "added", "to": _step_text(step)
+                })
+                continue
+            _, text_hash, old_step_ms = previous
+            if text_hash != _text_hash(step):
+                step_changes.append({
+                    "externalId": external_id, "stepId": key, "change": "changed", "to": _step_text(step)
+                })
+            step_ms = step.get("durationMs")
+            if old_step_ms is not None and step_ms is not None:
+                delta = step_ms - old_step_ms
+                if delta and abs(delta) >= min_delta_ms and _qualifies(step_durations, delta, top):
+                    seq += 1
+                    _push(step_durations, {
+                        "externalId": external_id,
+                        "stepId": key,
+                        "text": _step_text(step),
+                        "oldMs": old_step_ms,
+                        "newMs": step_ms,
+                        "deltaMs": delta,
+                    }, top, seq)
+        for key in sorted(old.steps, key=lambda k: old.steps[k][0]):
+            if key not in seen:
+                step_changes.append({"externalId": external_id, "stepId": key, "change": "removed"})
+
+    removed = [
+        {"externalId": external_id, "title": entry.title, "status": entry.status}
+        for external_id, entry in index.items()
+    ]
+    index.clear()
+    _fill_old_text(old_path, step_changes)
+
+    kind_rank = {kind: i for i, kind in enumerate(_TRANSITION_KINDS)}
+    status_changes.sort(key=lambda c: (kind_rank[c["kind"]], c["externalId"]))
+    added.sort(key=lambda c: c["externalId"])
+    removed.sort(key=lambda c: c["externalId"])
+    return {
+        "summary": {
+            "old": old_count,
+            "new": new_count,
+            "statusChanges": len(status_changes),
+            "regressed": sum(1 for c in status_changes if c["kind"] == "regressed"),
+            "fixed": sum(1 for c in status_changes if c["kind"] == "fixed"),
+            "added": len(added),
+            "removed": len(removed),
+            "stepChanges": len(step_changes),
+        },
+        "statusChanges": status_changes,
+        "added": added,
+        "removed": removed,
+        "stepChanges": step_changes,
+        "durations": _by_impact(durations),
+        "stepDurations": _by_impact(step_durations),
+    }
+
+
+def _fill_old_text(old_path: str, step_changes: list[dict[str, Any]]) -> None:
+    """Add the old step text to changed and removed steps with one more pass over the old run."""
+    wanted: dict[str, dict[str, dict[str, Any]]] = {}
+    for change in step_changes:
+        if change["change"] != "added":
+            wanted.setdefault(change["externalId"], {})[change["stepId"]] = change
+    if not wanted:
+        return
+    for event, test_case in iter_raw_run(old_path):
+        if event != "case":
+            continue
+        changes = wanted.pop(test_case.get("externalId"), None)
+        if changes is None:
+            continue
+        for i, step in enumerate(_steps(test_case)):
+            change = changes.get(_step_key(step, i))
+            if change is not None:
+                change["from"] = _step_text(step)
+        if not wanted:
+            return
+
+
+def _ms(value: float) -> str:
+    return f"{value:.1f} ms"
+
+
+def render_text(report: dict[str, Any]) -> str:
+    """Render a diff report for the terminal."""
+    summary = report["summary"]
+    lines = [
+        f"Compared {summary['old']} -> {summary['new']} test cases: "
+        f"{summary['regressed']} regressed, {summary['fixed']} fixed, "
+        f"{summary['added']} added, {summary['removed']} removed, "
+        f"{summary['stepChanges']} step changes"
+    ]
+    if report["statusChanges"]:
+        lines.extend(["", f"Status changes ({len(report['statusChanges'])}):"])
+        lines.extend(
+            f"  {c['kind']:<9}  {c['externalId']}  {c['from']} -> {c['to']}" for c in report["statusChanges"]
+        )
+    if report["added"]:
+        lines.extend(["", f"Added ({len(report['added'])}):"])
+        lines.extend(f"  + {c['externalId']}  ({c['status']})" for c in report["added"])
+    if report["removed"]:
+        lines.extend(["", f"Removed ({len(report['removed'])}):"])
+        lines.extend(f"  - {c['externalId']}  ({c['status']})" for c in report["removed"])
+    if report["stepChanges"]:
+        lines.extend(["", f"Step changes ({len(report['stepChanges'])}):"])
+        for c in report["stepChanges"]:
+            lines.append(f"  ~ {c['externalId']} [{c['stepId']}] {c['change']}")
+            if "from" in c:
+                lines.append(f"      - {c['from']}")
+            if "to" in c:
+                lines.append(f"      + {c['to']}")
+    if report["durations"]:
+        lines.extend(["", "Duration changes:"])
+        lines.extend(
+            f"  {c['deltaMs']:+.1f} ms  {c['externalId']}  ({_ms(c['oldMs'])} -> {_ms(c['newMs'])})"
+            for c in report["durations"]
+        )
+    if report["stepDurations"]:
+        lines.extend(["", "Step duration changes:"])
+        lines.extend(
+            f"  {c['deltaMs']:+.1f} ms  {c['externalId']} [{c['stepId']}] {c['text']}  "
+            f"({_ms(c['oldMs'])} -> {_ms(c['newMs'])})"
+            for c in report["stepDurations"]
+        )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,143 @@
+"""Bounded, deduplicated failure capture.
+
+Each failure is reduced to a short crash message plus a fingerprint of
+its exception type, crash location and normalized first message line.
+The (length-capped) stack stays on the test case and is also stored
+once per fingerprint in a run-level failure index; with
+``--stories-shared-stacks`` test cases drop it and refer to the index by
+fingerprint only. The index doubles as a grouped failure summary for
+triaging large runs. Only a test's final attempt is recorded in it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+from typing import Any
+
+DEFAULT_MAX_ERROR_BYTES = 16 * 1024
+
+# Traceback styles accepted by ExceptionInfo.getrepr(); "auto" keeps the
+# report pytest already rendered (honouring --tb).
+TB_STYLES = ("auto", "long", "short", "line", "native")
+
+# Cases listed per group in the run summary.
+_MAX_GROUP_IDS = 20
+
+_HEX_RE = re.compile(r"0x[0-9a-fA-F]+")
+_NUM_RE = re.compile(r"\d+")
+_WS_RE = re.compile(r"\s+")
+
+
+def bound_text(text: str, max_bytes: int) -> str:
+    """Cap *text* at roughly *max_bytes*, keeping its head and (larger) tail.
+
+    The tail of a traceback holds the crash site, so it gets three quarters
+    of the budget. ``0`` disables the cap.
+    """
+    if max_bytes <= 0 or len(text) <= max_bytes:
+        return text
+    data = text.encode("utf-8")
+    if len(data) <= max_bytes:
+        return text
+    head = max_bytes // 4
+    tail = max_bytes - head
+    dropped = len(data) - head - tail
+    return (
+        data[:head].decode("utf-8", "ignore")
+        + f"\n... [{dropped} bytes truncated] ...\n"
+        + data[-tail:].decode("utf-8", "ignore")
+    )
+
+
+def normalize_message(message: str) -> str:
+    """Strip the parts of a message that vary between equivalent failures."""
+    first_line = message.strip().split("\n", 1)[0]
+    text = _HEX_RE.sub("<addr>", first_line)
+    text = _NUM_RE.sub("N", text)
+    return _WS_RE.sub(" ", text)
+
+
+def fingerprint(exception_type: str, location: str, message: str) -> str:
+    """Return a short stable hash identifying the failure's cause."""
+    key = f"{exception_type}|{location}|{normalize_message(message)}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+class _FailureIndex:
+    """Thread-safe store of distinct failure stacks keyed by fingerprint."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._groups: dict[str, dict[str, Any]] = {}
+        # Every external id counted per fingerprint, beyond the listed ones.
+        self._ids: dict[str, set[str]] = {}
+
+    def record(
+        self,
+        fp: str,
+        external_id: str,
+        *,
+        exception_type: str,
+        location: str,
+        message: str,
+        stack: str,
+    ) -> None:
+        """Count a failed test once, keeping the stack of its first occurrence only."""
+        with self._lock:
+            ids = self._ids.setdefault(fp, set())
+            if external_id in ids:
+                return
+            ids.add(external_id)
+            group = self._groups.get(fp)
+            if group is None:
+                self._groups[fp] = {
+                    "fingerprint": fp,
+                    "count": 1,
+                    "exceptionType": exception_type,
+                    "location": location,
+                    "message": message,
+                    "stack": stack,
+                    "externalIds": [external_id],
+                }
+                return
+            group["count"] += 1
+            if len(group["externalIds"]) < _MAX_GROUP_IDS:
+                group["externalIds"].append(external_id)
+
+    def merge_summary(self, groups: list[dict[str, Any]]) -> None:
+        """Fold in ``meta.failures`` of another run (e.g. a shard being merged).
+
+        Counts add up, minus the listed external ids both runs already counted.
+        """
+        with self._lock:
+            for incoming in groups:
+                fp = incoming["fingerprint"]
+                ids = self._ids.setdefault(fp, set())
+                listed = incoming.get("externalIds") or []
+                new_ids = [external_id for external_id in listed if external_id not in ids]
+                ids.update(new_ids)
+                group = self._groups.get(fp)
+                if group is None:
+                    self._groups[fp] = dict(incoming, externalIds=new_ids[:_MAX_GROUP_IDS])
+                    continue
+                group["count"] += incoming.get("count", len(listed)) - (len(listed) - len(new_ids))
+                room = _MAX_GROUP_IDS - len(group["externalIds"])
+                group["externalIds"].extend(new_ids[: max(room, 0)])
+
+    def summary(self) -> list[dict[str, Any]]:
+        """Return failure groups, most frequent first."""
+        with self._lock:
+            groups = [dict(g, externalIds=list(g["externalIds"])) for g in self._groups.values()]
+        groups.sort(key=lambda g: (-g["count"], g["fingerprint"]))
+        return groups
+
+    def clear(self) -> None:
+        with self._lock:
+            self._groups.clear()
+            self._ids.clear()
+
+
+# Module-level singleton
+_failures = _FailureIndex()
@@ -0,0 +1,121 @@
+"""Read the current git SHA without running ``git``.
+
+HEAD is resolved from the files in the git directory: ``HEAD``, loose
+refs and ``packed-refs``. In a linked worktree (or a submodule) ``.git``
+is a file pointing at the real git directory; a worktree keeps its own
+``HEAD`` there and shares branches through the ``commondir`` it names.
+"""
+
+from __future__ import annotations
+
+import os
+
+# CI variables that already hold the commit under test.
+_ENV_SHA = ("GITHUB_SHA", "GIT_COMMIT", "CI_COMMIT_SHA")
+
+# Symbolic refs pointing at symbolic refs; git itself gives up after 5 levels.
+_MAX_REF_DEPTH = 5
+
+
+def read_git_sha(start: str) -> str | None:
+    """Return the commit checked out at *start*, or None outside a git repo.
+
+    CI environment variables win over the working copy, as in the
+    JavaScript reporters.
+    """
+    for name in _ENV_SHA:
+        sha = os.environ.get(name)
+        if sha:
+            return sha
+    git_dir = find_git_dir(start)
+    if git_dir is None:
+        return None
+    try:
+        return _resolve_head(git_dir)
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def find_git_dir(start: str) -> str | None:
+    """Return the git directory for *start*, following ``gitdir:`` files."""
+    current = os.path.abspath(start)
+    while True:
+        candidate = os.path.join(current, ".git")
+        if os.path.isdir(candidate):
+            return candidate
+        if os.path.isfile(candidate):
+            try:
+                with open(candidate, encoding="utf-8") as f:
+                    content = f.read().strip()
+            except OSError:
+                return None
+            if content.startswith("gitdir:"):
+                return os.path.normpath(os.path.join(current, content[len("gitdir:"):].strip()))
+            return None
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+def find_work_tree(start: str) -> str | None:
+    """Return the top of the working tree holding *start* (``git rev-parse --show-toplevel``)."""
+    current = os.path.abspath(start)
+    while True:
+        if os.path.exists(os.path.join(current, ".git")):
+            return current
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+def _common_dir(git_dir: str) -> str:
+    """Return the directory holding shared refs (the main repo's, for a worktree)."""
+    try:
+        with open(os.path.join(git_dir, "commondir"), encoding="utf-8") as f:
+            return os.path.normpath(os.path.join(git_dir, f.read().strip()))
+    except OSError:
+        return git_dir
+
+
+def _read_first_line(path: str) -> str | None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.readline().strip()
+    except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+        return None
+
+
+def _packed_ref(common_dir: str, ref: str) -> str | None:
+    try:
+        with open(os.path.join(common_dir, "packed-refs"), encoding="utf-8") as f:
+            for line in f:
+                # Header and peeled-tag lines.
+                if line.startswith(("#", "^")):
+                    continue
+                sha, _, name = line.rstrip("\n").partition(" ")
+                if name == ref:
+                    return sha
+    except FileNotFoundError:
+        pass
+    return None
+
+
+def _resolve_head(git_dir: str) -> str | None:
+    common_dir = _common_dir(git_dir)
+    value = _read_first_line(os.path.join(git_dir, "HEAD"))
+    for _ in range(_MAX_REF_DEPTH):
+        if not value:
+            return None
+        if not value.startswith("ref:"):
+            return value  # detached HEAD, or a resolved ref
+        ref = value[len("ref:"):].strip()
+        # Per-worktree refs (HEAD, refs/bisect, refs/worktree) live in the
+        # worktree's git dir; branches and tags in the common dir.
+        value = _read_first_line(os.path.join(git_dir, ref))
+        if value is None and common_dir != git_dir:
+            value = _read_first_line(os.path.join(common_dir, ref))
+        if value is None:
+            value = _packed_ref(common_dir, ref)
+    return None
@@ -0,0 +1,214 @@
+"""Change-impact test selection from per-test function coverage.
+
+While recording, a ``sys.monitoring`` ``PY_START`` callback notes every
+code object entered during a test and immediately returns ``DISABLE``,
+so each function costs one callback per test; events are re-armed with
+``restart_events()`` when the next test begins. That call re-arms the
+events every tool disabled, not just ours, so recording refuses to start
+while another ``sys.monitoring`` tool (a debugger, coverage.py's sysmon
+core, a profiler) holds a tool id. Code under the project
+root (excluding virtualenvs and site-packages) is reduced to files and
+``file::qualname`` functions and written as a compact map next to the
+raw-run::
+
+    {"version": 1, "tests": [externalId, ...],
+     "files": {"src/app.py": [0, 3]}, "functions": {"src/app.py::f": [0]}}
+
+Under pytest-xdist each worker hands its entries to the controller,
+which is the only process that updates the map.
+
+With a list of changed files, only tests touching one of them are
+selected. The list uses git's paths, relative to the top of the working
+tree (absolute paths work too); they are rebased onto the project root
+the map is keyed by. Tests missing from the map are always selected,
+and a changed ``conftest.py`` selects everything below its directory.
+Only Python sources are tracked; other changed files do not select
+anything.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+from typing import Any
+
+from executable_stories._git_info import find_work_tree
+
+MAP_VERSION = 1
+TOOL_NAME = "executable-stories"
+
+# sys.monitoring ids 0-2 and 5 are reserved for debuggers, coverage,
+# profilers and optimizers; try the unassigned ones first.
+_TOOL_IDS = (4, 3, 2)
+_ALL_TOOL_IDS = range(6)
+
+_EXCLUDED_DIRS = (
+    "site-packages",
+    "dist-packages",
+    f"{os.sep}.venv{os.sep}",
+    f"{os.sep}venv{os.sep}",
+    f"{os.sep}.tox{os.sep}",
+)
+_OWN_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class _ImpactTracer:
+    """Records which project files and functions each test enters."""
+
+    def __init__(self, root: str) -> None:
+        self.root = os.path.abspath(root)
+        self.tool_id: int | None = None
+        self._touched: set[Any] = set()
+        self._lock = threading.Lock()
+        self.tests: dict[str, tuple[set[str], set[str]]] = {}
+
+    def start(self) -> bool:
+        """Claim a monitoring tool id; returns False if none is free.
+
+        Raises RuntimeError if another tool uses ``sys.monitoring``, whose
+        disabled events ``begin_test`` would keep re-arming.
+        """
+        mon = sys.monitoring
+        others = [name for name in map(mon.get_tool, _ALL_TOOL_IDS) if name is not None]
+        if others:
+            raise RuntimeError(f"sys.monitoring is already used by {', '.join(others)}")
+        for tool_id in _TOOL_IDS:
+            if mon.get_tool(tool_id) is None:
+                mon.use_tool_id(tool_id, TOOL_NAME)
+                self.tool_id = tool_id
+                break
+        else:
+            return False
+
+        disable = mon.DISABLE
+        tracer = self
+
+        def on_py_start(code: Any, offset: int) -> Any:
+            tracer._touched.add(code)
+            return disable
+
+        mon.register_callback(self.tool_id, mon.events.PY_START, on_py_start)
+        mon.set_events(self.tool_id, mon.events.PY_START)
+        return True
+
+    def stop(self) -> None:
+        if self.tool_id is None:
+            return
+        mon = sys.monitoring
+        mon.set_events(self.tool_id, mon.events.NO_EVENTS)
+        mon.register_callback(self.tool_id, mon.events.PY_START, None)
+        mon.free_tool_id(self.tool_id)
+        self.tool_id = None
+
+    def begin_test(self) -> None:
+        self._touched = set()
+        sys.monitoring.restart_events()
+
+    def end_test(self, external_id: str) -> None:
+        touched, self._touched = self._touched, set()
+        files: set[str] = set()
+        functions: set[str] = set()
+        for code in touched:
+            rel = self._relative(code.co_filename)
+            if rel is not None:
+                files.add(rel)
+                functions.add(f"{rel}::{code.co_qualname}")
+        with self._lock:
+            self.tests[external_id] = (files, functions)
+
+    def _relative(self, filename: str) -> str | None:
+        if not filename.startswith(self.root) or filename.startswith(_OWN_DIR):
+            return None
+        if any(part in filename for part in _EXCLUDED_DIRS):
+            return None
+        return os.path.relpath(filename, self.root).replace(os.sep, "/")
+
+
+def load_map(path: str) -> dict[str, tuple[set[str], set[str]]]:
+    """Read an impact map into externalId -> (files, functions)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != MAP_VERSION:
+        return {}
+    tests: list[str] = data.get("tests", [])
+    result: dict[str, tuple[set[str], set[str]]] = {t: (set(), set()) for t in tests}
+    for file, indexes in data.get("files", {}).items():
+        for i in indexes:
+            result[tests[i]][0].add(file)
+    for function, indexes in data.get("functions", {}).items():
+        for i in indexes:
+            result[tests[i]][1].add(function)
+    return result
+
+
+def write_map(path: str, tests: dict[str, tuple[set[str], set[str]]]) -> None:
+    """Write externalId -> (files, functions) as the compact inverted map."""
+    ids = sorted(tests)
+    files: dict[str, list[int]] = {}
+    functions: dict[str, list[int]] = {}
+    for i, external_id in enumerate(ids):
+        test_files, test_functions = tests[external_id]
+        for file in test_files:
+            files.setdefault(file, []).append(i)
+        for function in test_functions:
+            functions.setdefault(function, []).append(i)
+    data = {
+        "version": MAP_VERSION,
+        "tests": ids,
+        "files": dict(sorted(files.items())),
+        "functions": dict(sorted(functions.items())),
+    }
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+        f.write("\n")
+
+
+def read_changed_files(path: str, root: str) -> set[str]:
+    """Read a ``git diff --name-only`` style list of changed files, relative to *root*.
+
+    Relative entries are resolved from the top of the git working tree
+    holding *root* (or *root* itself outside a repository). Files outside
+    *root* are dropped: the map records nothing there.
+    """
+    root = os.path.abspath(root)
+    base = find_work_tree(root) or root
+    changed: set[str] = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            name = line.strip()
+            if not name:
+                continue
+            try:
+                rel = os.path.relpath(os.path.join(base, name), root)
+            except ValueError:  # another drive on Windows
+                continue
+            if rel == os.pardir or rel.startswith(os.pardir + os.sep):
+                continue
+            changed.add(rel.replace(os.sep, "/"))
+    return changed
+
+
+def is_affected(external_id: str, impact: dict[str, tuple[set[str], set[str]]], changed: set[str]) -> bool:
+    """Return True if the test must run for this set of changed files."""
+    entry = impact.get(external_id)
+    if entry is None:
+        return True
+    test_file = external_id.split("::", 1)[0]
+    for path in changed:
+        if not path.endswith(".py"):
+            continue
+        if path == test_file or path in entry[0]:
+            return True
+        if os.path.basename(path) == "conftest.py":
+            scope = os.path.dirname(path)
+            if not scope or test_file.startswith(scope + "/"):
+                return True
+    return False
@@ -1,21 +1,85 @@
-"""Simple JSON serialization for RawRun output."""
+"""Simple JSON serialization for RawRun output.
+
+Besides the single JSON document, a run can be written as NDJSON: the
+first line holds the run fields without ``testCases``, and every further
+line is one RawTestCase, so readers can stream cases one at a time. A
+stream whose final fields are only known at the end (pipe mode) closes
+with a ``{"runFinished": {...}}`` line carrying them.
+"""
 
 from __future__ import annotations
 
 import json
 import os
-from typing import Any
+from collections.abc import Iterator
+from typing import Any, TextIO
+
+from executable_stories._compact import decode_run, encode_run, is_compact
+from executable_stories._lazy import json_default
 
 
-def write_raw_run(raw_run: dict[str, Any], output_path: str) -> None:
+def write_raw_run(raw_run: dict[str, Any], output_path: str, *, compact: bool = False) -> None:
     """Write a RawRun dict to a JSON file.
 
-    Creates parent directories if they don't exist.
+    Creates parent directories if they don't exist. Lazy doc entries
+    are formatted here, as they are encountered. With ``compact=True``
+    the run is written as a string-table envelope without indentation.
     """
     parent = os.path.dirname(output_path)
     if parent:
         os.makedirs(parent, exist_ok=True)
 
     with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(raw_run, f, indent=2)
+        if compact:
+            json.dump(encode_run(raw_run), f, separators=(",", ":"), default=json_default)
+        else:
+            json.dump(raw_run, f, indent=2, default=json_default)
+        f.write("\n")
+
+
+def read_raw_run(input_path: str) -> dict[str, Any]:
+    """Read a RawRun JSON file, expanding the compact encoding if present."""
+    with open(input_path, encoding="utf-8") as f:
+        data = json.load(f)
+    if is_compact(data):
+        return decode_run(data)
+    return data
+
+
+def write_raw_run_ndjson(raw_run: dict[str, Any], output_path: str) -> None:
+    """Write a RawRun dict as NDJSON (run header line, then one line per test case)."""
+    parent = os.path.dirname(output_path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+
+    header = {k: v for k, v in raw_run.items() if k != "testCases"}
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(header, separators=(",", ":"), default=json_default))
         f.write("\n")
+        for test_case in raw_run["testCases"]:
+            f.write(json.dumps(test_case, separators=(",", ":"), default=json_default))
+            f.write("\n")
+
+
+def read_raw_run_ndjson(stream: TextIO) -> tuple[dict[str, Any], Iterator[dict[str, Any]]]:
+    """Return ``(header, test cases)`` from an NDJSON run; cases are parsed lazily.
+
+    Fields of a ``runFinished`` line are merged into *header* once the
+    iterator reaches it.
+    """
+    header: dict[str, Any] = {}
+    for line in stream:
+        if line.strip():
+            header = json.loads(line)
+            break
+
+    def cases() -> Iterator[dict[str, Any]]:
+        for line in stream:
+            if line.strip():
+                record = json.loads(line)
+                if "runFinished" in record:
+                    header.update(record["runFinished"])
+                else:
+                    yield record
+
+    return header, cases()
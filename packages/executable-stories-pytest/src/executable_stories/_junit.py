@@ -0,0 +1,348 @@
+"""Incremental JUnit XML writer for RawRun test cases.
+
+A Python port of the formatters package's ``junit-xml.ts``: one
+``<testsuite>`` per source file, story steps and docs as plain text in
+``<system-out>``. Story tags and tickets are additionally written as
+``<properties>``, which the TypeScript formatter does not emit.
+
+``<testcase>`` elements are serialized as soon as they are added and
+appended to a spool file next to the output; only per-file counters stay
+in memory. The totals on ``<testsuites>``/``<testsuite>`` are known only
+at the end, so ``close()`` writes the final document from the spool.
+Consecutive cases from the same file form one ``<testsuite>``; a file
+that comes back later gets another one.
+
+Under pytest-xdist each worker writes only its ``<testsuite>`` elements,
+to ``PATH.<worker id>.part`` (``close_part()``), and the controller
+concatenates them into ``PATH`` with the summed totals
+(``combine_parts()``).
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+import re
+import threading
+from typing import Any, BinaryIO
+
+from executable_stories._canonical import STATUS_MAP, js_json, js_str, synthesize_story, title_path
+from executable_stories._lazy import resolve_meta
+
+# Characters that are not allowed in XML 1.0 documents.
+_ILLEGAL_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+_INDENT = "  "
+
+# Bytes copied from the spool per read.
+_COPY_CHUNK = 1 << 20
+
+PART_SUFFIX = ".part"
+
+# Counters of a <testsuite> line as _copy_suite writes it.
+_SUITE_LINE = re.compile(rb'^  <testsuite name="[^"]*" tests="(\d+)" failures="(\d+)" errors="0" skipped="(\d+)"')
+
+
+def escape_xml(text: str) -> str:
+    text = _ILLEGAL_XML.sub("", text)
+    return (
+        text.replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+        .replace('"', "&quot;")
+        .replace("'", "&apos;")
+    )
+
+
+def _render_doc(entry: dict[str, Any], indent: str = "") -> str:
+    """Render a doc entry as plain text, as ``junit-xml.ts`` does."""
+    kind = entry.get("kind")
+    if kind == "note":
+        return f"{indent}> {entry['text']}"
+    if kind == "tag":
+        return f"{indent}Tags: {', '.join(entry['names'])}"
+    if kind == "kv":
+        value = entry.get("value")
+        return f"{indent}{entry['label']}: {value if isinstance(value, str) else js_json(value)}"
+    if kind == "code":
+        lang = f" ({entry['lang']})" if entry.get("lang") else ""
+        header = f"{indent}{entry['label']}{lang}:\n" if entry.get("label") else ""
+        return header + "\n".join(f"{indent}  {line}" for line in entry["content"].split("\n"))
+    if kind == "table":
+        lines: list[str] = []
+        if entry.get("label"):
+            lines.append(f"{indent}{entry['label']}:")
+        columns = entry["columns"]
+        lines.append(f"{indent}| {' | '.join(js_str(c) for c in columns)} |")
+        lines.append(f"{indent}| {' | '.join('---' for _ in columns)} |")
+        lines.extend(f"{indent}| {' | '.join(js_str(c) for c in row)} |" for row in entry["rows"])
+        return "\n".join(lines)
+    if kind == "link":
+        return f"{indent}{entry['label']}: {entry['url']}"
+    if kind == "section":
+        return "\n".join([f"{indent}{entry['title']}:", *(f"{indent}  {line}" for line in entry["markdown"].split("\n"))])
+    if kind == "mermaid":
+        lines = [f"{indent}{entry['title']}:"] if entry.get("title") else []
+        lines.extend(f"{indent}  {line}" for line in entry["code"].split("\n"))
+        return "\n".join(lines)
+    if kind == "screenshot":
+        alt = entry.get("alt")
+        return f"{indent}Screenshot: {alt if alt is not None else entry['path']}"
+    if kind == "custom":
+        data = js_json(entry.get("data"), indent=2)
+        return "\n".join([f"{indent}[{entry['type']}]:", *(f"{indent}  {line}" for line in data.split("\n"))])
+    return ""
+
+
+def _system_out(story: dict[str, Any]) -> str:
+    lines: list[str] = []
+    docs = story.get("docs") or []
+    if docs:
+        lines.extend(_render_doc(doc) for doc in docs)
+        lines.append("")
+    for step in story.get("steps") or []:
+        step_lines = [f"{step['keyword']} {step['text']}"]
+        for doc in step.get("docs") or []:
+            rendered = _render_doc(doc, "  ")
+            if rendered:
+                step_lines.append(rendered)
+        lines.append("\n".join(step_lines))
+    return "\n".join(lines).strip()
+
+
+class _Suite:
+    """Counters of the ``<testsuite>`` currently being spooled."""
+
+    __slots__ = ("source_file", "start", "end", "tests", "failures", "skipped", "duration_ms")
+
+    def __init__(self, source_file: str, start: int) -> None:
+        self.source_file = source_file
+        self.start = start
+        self.end = start
+        self.tests = 0
+        self.failures = 0
+        self.skipped = 0
+        self.duration_ms = 0.0
+
+
+class _JUnitWriter:
+    """Streams ``<testcase>`` elements to disk as test cases are added."""
+
+    def __init__(
+        self,
+        output_path: str,
+        *,
+        suite_name: str = "Test Suite",
+        include_output: bool = True,
+        synthesize_stories: bool = True,
+    ) -> None:
+        self.output_path = output_path
+        self.suite_name = suite_name
+        self.include_output = include_output
+        self.synthesize_stories = synthesize_stories
+        self._spool_path = output_path + ".part"
+        self._spool: BinaryIO | None = None
+        self._suites: list[_Suite] = []
+        self._lock = threading.Lock()
+
+    def add(self, test_case: dict[str, Any], *, stack: str | None = None) -> None:
+        """Serialize one RawTestCase and append it to the spool.
+
+        *stack* is used for the failure body when the case carries no
+        ``error.stack`` (a run with ``--stories-shared-stacks``).
+        """
+        if test_case.get("story") is None:
+            if not self.synthesize_stories:
+                return
+        else:
+            test_case = {**test_case, "story": resolve_meta(test_case["story"])}
+        story = synthesize_story(test_case) if self.synthesize_stories else test_case["story"]
+        source_file = test_case.get("sourceFile") or "unknown"
+        status = STATUS_MAP.get(test_case.get("status", "unknown"), "skipped")
+        duration_ms = test_case.get("durationMs") or 0.0
+
+        element = self._testcase(test_case, story, status, duration_ms, stack).encode("utf-8")
+
+        with self._lock:
+            if self._spool is None:
+                parent = os.path.dirname(self.output_path)
+                if parent:
+                    os.makedirs(parent, exist_ok=True)
+                self._spool = open(self._spool_path, "wb")
+            suite = self._suites[-1] if self._suites else None
+            if suite is None or suite.source_file != source_file:
+                suite = _Suite(source_file, self._spool.tell())
+                self._suites.append(suite)
+
+            self._spool.write(element)
+            suite.end = self._spool.tell()
+            suite.tests += 1
+            suite.duration_ms += duration_ms
+            if status == "failed":
+                suite.failures += 1
+            elif status in ("skipped", "pending"):
+                suite.skipped += 1
+
+    def close(self, started_at_ms: float, finished_at_ms: float) -> str:
+        """Write the final document and return its path."""
+        tests = sum(s.tests for s in self._suites)
+        failures = sum(s.failures for s in self._suites)
+        skipped = sum(s.skipped for s in self._suites)
+        with _open_output(self.output_path) as out:
+            _write_head(out, self.suite_name, (tests, failures, skipped), started_at_ms, finished_at_ms)
+            self._write_suites(out)
+            out.write(b"</testsuites>")
+        return self.output_path
+
+    def close_part(self) -> str:
+        """Write only the ``<testsuite>`` elements, for ``combine_parts()``."""
+        with _open_output(self.output_path) as out:
+            self._write_suites(out)
+        return self.output_path
+
+    def _write_suites(self, out: BinaryIO) -> None:
+        if self._spool is not None:
+            self._spool.close()
+            with open(self._spool_path, "rb") as spool:
+                for suite in self._suites:
+                    self._copy_suite(out, spool, suite)
+            os.remove(self._spool_path)
+            self._spool = None
+        self._suites = []
+
+    def _copy_suite(self, out: BinaryIO, spool: BinaryIO, suite: _Suite) -> None:
+        name = escape_xml(suite.source_file.replace("\\", "/"))
+        out.write((
+            f'{_INDENT}<testsuite name="{name}" tests="{suite.tests}" failures="{suite.failures}" '
+            f'errors="0" skipped="{suite.skipped}" time="{suite.duration_ms / 1000:.3f}">\n'
+        ).encode("utf-8"))
+        spool.seek(suite.start)
+        remaining = suite.end - suite.start
+        while remaining > 0:
+            chunk = spool.read(min(remaining, _COPY_CHUNK))
+            if not chunk:
+                break
+            out.write(chunk)
+            remaining -= len(chunk)
+        out.write(f"{_INDENT}</testsuite>\n".encode("utf-8"))
+
+    def _testcase(
+        self,
+        test_case: dict[str, Any],
+        story: dict[str, Any],
+        status: str,
+        duration_ms: float,
+        shared_stack: str | None,
+    ) -> str:
+        indent = _INDENT * 2
+        inner = indent * 2
+        path = title_path(test_case, story)
+        if path:
+            classname = ".".join(path)
+        else:
+            classname = re.sub(r"\.[^.]+$", "", re.sub(r"[\\/]+", ".", test_case.get("sourceFile") or "unknown"))
+        attrs = (
+            f'classname="{escape_xml(classname)}" name="{escape_xml(story["scenario"])}" '
+            f'time="{duration_ms / 1000:.3f}"'
+        )
+
+        properties = [("tag", t) for t in sorted(set(story.get("tags") or []))]
+        properties.extend(("ticket", t) for t in story.get("tickets") or [])
+        failed = status == "failed"
+        skipped = status in ("skipped", "pending")
+        has_output = self.include_output and bool(story.get("steps"))
+        if not (failed or skipped or has_output or properties):
+            return f"{indent}<testcase {attrs}/>\n"
+
+        lines = [f"{indent}<testcase {attrs}>"]
+        if properties:
+            lines.append(f"{inner}<properties>")
+            lines.extend(
+                f'{inner}{_INDENT}<property name="{name}" value="{escape_xml(value)}"/>' for name, value in properties
+            )
+            lines.append(f"{inner}</properties>")
+        if failed:
+            error = test_case.get("error") or {}
+            message = error.get("message")
+            summary = escape_xml(message.split("\n")[0]) if message else "Test failed"
+            lines.append(f'{inner}<failure message="{summary}">')
+            if message:
+                lines.append(escape_xml(message))
+            stack = error.get("stack") or shared_stack
+            if stack:
+                lines.extend(["", escape_xml(stack)])
+            lines.append(f"{inner}</failure>")
+        elif skipped:
+            lines.append(f'{inner}<skipped message="{"Test pending" if status == "pending" else "Test skipped"}"/>')
+        if has_output:
+            lines.append(f"{inner}<system-out>{escape_xml(_system_out(story))}</system-out>")
+        lines.append(f"{indent}</testcase>")
+        return "\n".join(lines) + "\n"
+
+
+def _open_output(path: str) -> BinaryIO:
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    return open(path, "wb")
+
+
+def _write_head(
+    out: BinaryIO, suite_name: str, totals: tuple[int, int, int], started_at_ms: float, finished_at_ms: float
+) -> None:
+    tests, failures, skipped = totals
+    time_s = (finished_at_ms - started_at_ms) / 1000
+    out.write(b'<?xml version="1.0" encoding="UTF-8"?>\n')
+    out.write((
+        f'<testsuites name="{escape_xml(suite_name)}" tests="{tests}" failures="{failures}" '
+        f'errors="0" skipped="{skipped}" time="{time_s:.3f}">\n'
+    ).encode("utf-8"))
+
+
+# ── pytest-xdist parts ─────────────────────────────────────────────
+
+
+def part_path(path: str, worker_id: str) -> str:
+    """The file a pytest-xdist worker writes its suites to."""
+    return f"{path}.{worker_id}{PART_SUFFIX}"
+
+
+def _parts(path: str) -> list[str]:
+    # A worker's own spool is its part path plus PART_SUFFIX.
+    candidates = glob.glob(glob.escape(path) + ".*" + PART_SUFFIX)
+    return sorted(p for p in candidates if not p.endswith(PART_SUFFIX * 2))
+
+
+def clear_parts(path: str) -> None:
+    """Remove part files left behind by an interrupted run."""
+    for part in _parts(path):
+        os.remove(part)
+
+
+def combine_parts(
+    path: str, started_at_ms: float, finished_at_ms: float, *, suite_name: str = "Test Suite"
+) -> int:
+    """Write the document at *path* from the workers' parts and remove them.
+
+    The totals are summed from the parts' ``<testsuite>`` lines, so the
+    parts are read twice but never held in memory. Returns the number of
+    parts combined.
+    """
+    parts = _parts(path)
+    totals = [0, 0, 0]
+    for part in parts:
+        with open(part, "rb") as f:
+            for line in f:
+                match = _SUITE_LINE.match(line)
+                if match is not None:
+                    for i in range(3):
+                        totals[i] += int(match.group(i + 1))
+    with _open_output(path) as out:
+        _write_head(out, suite_name, (totals[0], totals[1], totals[2]), started_at_ms, finished_at_ms)
+        for part in parts:
+            with open(part, "rb") as f:
+                while chunk := f.read(_COPY_CHUNK):
+                    out.write(chunk)
+            os.remove(part)
+        out.write(b"</testsuites>")
+    return len(parts)
@@ -0,0 +1,114 @@
+"""Lazily formatted doc entries.
+
+``story.json()`` and container values passed to ``story.kv()`` /
+``story.custom()`` are snapshotted on the test thread with the C JSON
+encoder (compact, no indent), which is both the cheapest detached copy
+and an exact size for the doc budget. Pretty-printing and decoding the
+snapshot back into plain values is deferred until the run is written,
+and never happens for entries that are dropped before then.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from executable_stories._records import _Doc, _Step
+
+# Values that are immutable and need no snapshot.
+_SCALARS = (str, int, float, bool, type(None))
+
+
+class _LazyDoc:
+    """A doc entry whose content field is held as a compact JSON snapshot.
+
+    *entry* carries every other field, with a placeholder in *field* so the
+    resolved dict keeps the usual key order.
+    """
+
+    __slots__ = ("entry", "field", "snapshot", "pretty")
+
+    def __init__(self, entry: dict[str, Any], field: str, snapshot: str, *, pretty: bool) -> None:
+        self.entry = entry
+        self.field = field
+        self.snapshot = snapshot
+        self.pretty = pretty
+
+    @property
+    def kind(self) -> str:
+        return self.entry["kind"]
+
+    @property
+    def size(self) -> int:
+        """Bytes of the compact snapshot (ASCII, since ``ensure_ascii`` is on)."""
+        return len(self.snapshot)
+
+    def resolve(self) -> dict[str, Any]:
+        """Build the final doc entry dict."""
+        value = json.loads(self.snapshot)
+        entry = dict(self.entry)
+        entry[self.field] = json.dumps(value, indent=2) if self.pretty else value
+        return entry
+
+
+def lazy_json(entry: dict[str, Any], field: str, value: Any) -> _LazyDoc:
+    """Snapshot *value* for a pretty-printed JSON field.
+
+    Raises ``TypeError`` on values JSON cannot encode, as an eager
+    ``json.dumps`` would, so the error still points at the test line.
+    """
+    return _LazyDoc(entry, field, json.dumps(value), pretty=True)
+
+
+def snapshot_value(entry: dict[str, Any], field: str, value: Any) -> dict[str, Any] | _LazyDoc:
+    """Detach *value* from the caller; scalars are stored as-is.
+
+    Objects JSON cannot encode are stored by their ``str()``.
+    """
+    if isinstance(value, _SCALARS):
+        entry[field] = value
+        return entry
+    return _LazyDoc(entry, field, json.dumps(value, default=str), pretty=False)
+
+
+def resolve_doc(entry: Any) -> dict[str, Any]:
+    """Return *entry* as a plain dict, formatting it if it is lazy or a record."""
+    if isinstance(entry, dict):
+        return entry
+    return entry.resolve()
+
+
+def resolve_docs(docs: list[Any]) -> list[dict[str, Any]]:
+    """Resolve every lazy entry in a doc list."""
+    return [resolve_doc(d) for d in docs]
+
+
+def resolve_meta(meta: dict[str, Any]) -> dict[str, Any]:
+    """Return a StoryMeta dict with all story- and step-level docs resolved.
+
+    Step records become dicts; step dicts are copied only when they hold a
+    lazy entry.
+    """
+    result = dict(meta)
+    if "docs" in result:
+        result["docs"] = resolve_docs(result["docs"])
+    if "steps" in result:
+        steps: list[dict[str, Any]] = []
+        for step in result["steps"]:
+            if not isinstance(step, dict):
+                steps.append(step.resolve())
+                continue
+            docs = step.get("docs")
+            if docs and not all(isinstance(d, dict) for d in docs):
+                step = dict(step)
+                step["docs"] = resolve_docs(docs)
+            steps.append(step)
+        result["steps"] = steps
+    return result
+
+
+def json_default(obj: Any) -> Any:
+    """``json.dump`` hook that formats lazy entries and records at write time."""
+    if isinstance(obj, (_LazyDoc, _Doc, _Step)):
+        return obj.resolve()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
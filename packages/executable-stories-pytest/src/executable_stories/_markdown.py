@@ -0,0 +1,372 @@
+"""Streaming Markdown renderer for RawRun test cases.
+
+A Python port of the formatters package's ``markdown.ts`` (with the CLI's
+default story synthesis), so Markdown can be produced without Node. Test
+cases are rendered to text as they arrive and buffered only for the
+feature (source file) currently being written; when a case from another
+file arrives, the finished feature is written out. Memory is therefore
+bounded by the largest feature, not the run.
+
+``colocated`` mode writes one document per feature, mirrored under the
+output directory as ``<dir>/<basename>.<output-name>.md``; ``aggregated``
+mode streams every feature into ``<output-name>.md``. Output matches the
+TypeScript formatter as long as each feature's cases arrive together,
+which holds for raw-runs written by the plugin. Cases of a feature that
+was already written are appended after it.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from typing import Any, TextIO
+
+from executable_stories._canonical import STATUS_MAP, iso_timestamp, js_json, js_str, synthesize_story, title_path
+from executable_stories._lazy import resolve_meta
+
+OUTPUT_MODES = ("colocated", "aggregated")
+STEP_STYLES = ("bullets", "gherkin")
+SORT_ORDERS = ("source", "alpha", "none")
+
+_STATUS_ICONS = {
+    "passed": "✅",
+    "failed": "❌",
+    "skipped": "⏩",
+    "pending": "📝",
+}
+
+_MODE_INDICATORS = {
+    "skip": " _(skipped)_",
+    "todo": " _(todo)_",
+    "fails": " _(expected to fail)_",
+}
+
+
+# ── Renderer ───────────────────────────────────────────────────────
+
+
+class _Feature:
+    """Rendered scenarios of one source file, grouped by suite path."""
+
+    __slots__ = ("source_file", "suites")
+
+    def __init__(self, source_file: str) -> None:
+        self.source_file = source_file
+        # suite path -> [(sourceOrder, scenario, rendered lines)]
+        self.suites: dict[str, list[tuple[Any, str, list[str]]]] = {}
+
+
+class _StreamFile:
+    """Text file writer that drops trailing whitespace at close (``trimEnd``).
+
+    In append mode the new text is separated from the existing content by
+    a blank line.
+    """
+
+    def __init__(self, path: str, *, append: bool = False) -> None:
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._f: TextIO = open(path, "a" if append else "w", encoding="utf-8")
+        self._pending = "\n\n" if append else ""
+
+    def write(self, text: str) -> None:
+        stripped = text.rstrip()
+        if stripped:
+            self._f.write(self._pending)
+            self._f.write(stripped)
+            self._pending = text[len(stripped):]
+        else:
+            self._pending += text
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class _MarkdownWriter:
+    """Renders test cases to Markdown feature by feature."""
+
+    def __init__(
+        self,
+        output_dir: str,
+        *,
+        output_name: str = "test-results",
+        mode: str = "colocated",
+        project_root: str | None = None,
+        title: str = "User Stories",
+        include_status_icons: bool = True,
+        include_metadata: bool = True,
+        include_errors: bool = True,
+        scenario_heading_level: int = 3,
+        step_style: str = "bullets",
+        sort_scenarios: str = "source",
+        suite_separator: str = " - ",
+        permalink_base_url: str | None = None,
+        ticket_url_template: str | None = None,
+        trace_url_template: str | None = None,
+        include_source_links: bool = True,
+        synthesize_stories: bool = True,
+    ) -> None:
+        if mode not in OUTPUT_MODES:
+            raise ValueError(f"Unknown output mode: {mode!r}")
+        self.output_dir = output_dir
+        self.output_name = output_name
+        self.mode = mode
+        self.project_root = project_root
+        self.title = title
+        self.include_status_icons = include_status_icons
+        self.include_metadata = include_metadata
+        self.include_errors = include_errors
+        self.scenario_heading_level = scenario_heading_level
+        self.step_style = step_style
+        self.sort_scenarios = sort_scenarios
+        self.suite_separator = suite_separator
+        self.permalink_base_url = permalink_base_url
+        self.ticket_url_template = ticket_url_template
+        self.trace_url_template = trace_url_template
+        self.include_source_links = include_source_links
+        self.synthesize_stories = synthesize_stories
+
+        self._header: list[str] = []
+        self._feature: _Feature | None = None
+        self._done: set[str] = set()
+        self._aggregated: _StreamFile | None = None
+        self._appended: dict[str, _StreamFile] = {}
+        self.written: list[str] = []
+        self.scenarios = 0
+
+    # ── Streaming API ──────────────────────────────────────────────
+
+    def start(self, run: dict[str, Any]) -> None:
+        """Begin a run; *run* is a RawRun without (or ignoring) testCases."""
+        if self.project_root is None:
+            self.project_root = run.get("projectRoot")
+        lines = [f"# {self.title}", ""]
+        if self.include_metadata:
+            lines.append("| Key | Value |")
+            lines.append("| --- | --- |")
+            started_at = run.get("startedAtMs")
+            if started_at is None:
+                started_at = datetime.now(UTC).timestamp() * 1000
+            lines.append(f"| Date | {iso_timestamp(started_at)} |")
+            if run.get("packageVersion"):
+                lines.append(f"| Version | {run['packageVersion']} |")
+            git_sha = run.get("gitSha")
+            if git_sha:
+                lines.append(f"| Git SHA | {git_sha[:7]} |")
+            lines.append("")
+        self._header = lines
+
+    def add(self, test_case: dict[str, Any]) -> None:
+        """Render one RawTestCase into its feature."""
+        if test_case.get("story") is None:
+            if not self.synthesize_stories:
+                return
+        else:
+            test_case = {**test_case, "story": resolve_meta(test_case["story"])}
+        story = synthesize_story(test_case) if self.synthesize_stories else test_case["story"]
+        source_file = test_case.get("sourceFile") or "unknown"
+
+        feature = self._feature
+        if feature is None or feature.source_file != source_file:
+            if feature is not None:
+                self._flush(feature)
+            feature = self._feature = _Feature(source_file)
+
+        suite = self.suite_separator.join(title_path(test_case, story))
+        feature.suites.setdefault(suite, []).append(
+            (story.get("sourceOrder"), story["scenario"], self._render_scenario(test_case, story))
+        )
+        self.scenarios += 1
+
+    def close(self) -> list[str]:
+        """Write the last feature and return the paths written."""
+        if self._feature is not None:
+            self._flush(self._feature)
+            self._feature = None
+        if self._aggregated is None and self.mode == "aggregated":
+            # An empty run still gets a (header-only) report.
+            self._aggregated = self._open(self._aggregated_path())
+            self._aggregated.write("\n".join(self._header))
+        if self._aggregated is not None:
+            self._aggregated.close()
+        for f in self._appended.values():
+            f.close()
+        return self.written
+
+    def render(self, run: dict[str, Any], test_cases: Iterable[dict[str, Any]]) -> list[str]:
+        """Render a whole run: ``start``, ``add`` for each case, then ``close``."""
+        self.start(run)
+        for test_case in test_cases:
+            self.add(test_case)
+        return self.close()
+
+    # ── Output routing ─────────────────────────────────────────────
+
+    def _aggregated_path(self) -> str:
+        return os.path.join(self.output_dir, f"{self.output_name}.md")
+
+    def _feature_path(self, source_file: str) -> str:
+        if source_file == "unknown":
+            return self._aggregated_path()
+        path = source_file
+        if self.project_root and os.path.isabs(path):
+            try:
+                path = os.path.relpath(path, self.project_root)
+            except ValueError:
+                pass
+        path = path.replace("\\", "/")
+        directory, base = os.path.dirname(path).lstrip("/"), os.path.basename(path)
+        return os.path.join(self.output_dir, directory, f"{base}.{self.output_name}.md")
+
+    def _open(self, path: str) -> _StreamFile:
+        self.written.append(path)
+        return _StreamFile(path)
+
+    def _flush(self, feature: _Feature) -> None:
+        body = self._render_feature(feature)
+        source_file = feature.source_file
+        if self.mode == "aggregated":
+            if self._aggregated is None:
+                self._aggregated = self._open(self._aggregated_path())
+                self._aggregated.write("\n".join(self._header) + "\n")
+            self._aggregated.write("\n".join(body) + "\n")
+            return
+
+        path = self._feature_path(source_file)
+        appended = self._appended.get(path)
+        if appended is not None:
+            appended.write("\n".join(body) + "\n")
+        elif source_file in self._done:
+            # The feature came back after it was written: continue that file.
+            appended = self._appended[path] = _StreamFile(path, append=True)
+            appended.write("\n".join(body) + "\n")
+        else:
+            out = self._open(path)
+            out.write("\n".join([*self._header, *body]) + "\n")
+            out.close()
+        self._done.add(source_file)
+
+    # ── Rendering ──────────────────────────────────────────────────
+
+    def _render_feature(self, feature: _Feature) -> list[str]:
+        lines = [f"## {feature.source_file}", ""]
+        suites = list(feature.suites.items())
+        # Python's sorts are stable, like Array.prototype.sort.
+        if self.sort_scenarios == "alpha":
+            suites.sort(key=lambda item: item[0].casefold())
+        elif self.sort_scenarios == "source":
+            suites.sort(key=lambda item: min(math.inf if o is None else o for o, _, _ in item[1]))
+        for suite, rows in suites:
+            if suite:
+                lines.append(f"### {suite}")
+                lines.append("")
+            if self.sort_scenarios == "alpha":
+                rows = sorted(rows, key=lambda r: r[1].casefold())
+            elif self.sort_scenarios == "source":
+                rows = sorted(rows, key=lambda r: r[0] or 0)
+            for _, _, scenario_lines in rows:
+                lines.extend(scenario_lines)
+        return lines
+
+    def _render_scenario(self, test_case: dict[str, Any], story: dict[str, Any]) -> list[str]:
+        lines: list[str] = []
+        status = STATUS_MAP.get(test_case.get("status", "unknown"), "skipped")
+        icon = f"{_STATUS_ICONS.get(status, '⚠️')} " if self.include_status_icons else ""
+        lines.append(f"{'#' * self.scenario_heading_level} {icon}{story['scenario']}")
+
+        source_file = test_case.get("sourceFile") or "unknown"
+        if self.include_source_links and self.permalink_base_url and source_file != "unknown":
+            line = test_case.get("sourceLine", 1)
+            anchor = f"#L{line}" if line > 0 else ""
+            lines.append(f"Source: [{source_file}]({self.permalink_base_url.rstrip('/')}/{source_file}{anchor})")
+
+        meta: list[str] = []
+        tags = sorted(set(story.get("tags") or []))
+        if tags:
+            meta.append("Tags: " + ", ".join(f"`{t}`" for t in tags))
+        tickets = story.get("tickets") or []
+        if tickets:
+            if self.ticket_url_template:
+                links = ", ".join(f"[{t}]({self.ticket_url_template.replace('{ticket}', t, 1)})" for t in tickets)
+                meta.append(f"Tickets: {links}")
+            else:
+                meta.append("Tickets: " + ", ".join(f"`{t}`" for t in tickets))
+        otel = (story.get("meta") or {}).get("otel")
+        trace_id = otel.get("traceId") if isinstance(otel, dict) else None
+        if trace_id:
+            if self.trace_url_template:
+                url = self.trace_url_template.replace("{traceId}", trace_id)
+                meta.append(f"Trace: [{trace_id[:16]}…]({url})")
+            else:
+                meta.append(f"Trace: `{trace_id}`")
+        if meta:
+            lines.append(" | ".join(meta))
+        lines.append("")
+
+        for doc in story.get("docs") or []:
+            self._render_doc(lines, doc)
+        indent = "" if self.step_style == "gherkin" else "    "
+        bullet = "" if self.step_style == "gherkin" else "- "
+        for step in story.get("steps") or []:
+            mode = _MODE_INDICATORS.get(step.get("mode", ""), "")
+            lines.append(f"{bullet}**{step['keyword']}** {step['text']}{mode}")
+            for doc in step.get("docs") or []:
+                self._render_doc(lines, doc, indent)
+
+        error = test_case.get("error") or {}
+        message = error.get("message")
+        if status == "failed" and message and self.include_errors:
+            lines.extend(["**Failure**", "", "```text", message])
+            if error.get("stack"):
+                lines.extend(["", error["stack"]])
+            lines.extend(["```", ""])
+        lines.append("")
+        return lines
+
+    def _render_doc(self, lines: list[str], entry: dict[str, Any], indent: str = "") -> None:
+        kind = entry.get("kind")
+        if kind == "note":
+            lines.append(f"{indent}> {entry['text']}")
+        elif kind == "tag":
+            lines.append(indent + " ".join(f"`{n}`" for n in entry["names"]))
+        elif kind == "kv":
+            value = entry.get("value")
+            text = value if isinstance(value, str) else js_json(value)
+            lines.append(f"{indent}- **{entry['label']}:** {text}")
+        elif kind == "code":
+            if entry.get("label"):
+                lines.extend([f"{indent}**{entry['label']}**", indent])
+            lines.append(f"{indent}```{entry.get('lang') or ''}")
+            lines.extend(f"{indent}{line}" for line in (entry.get("content") or "").split("\n"))
+            lines.extend([f"{indent}```", indent])
+        elif kind == "table":
+            if entry.get("label"):
+                lines.extend([f"{indent}**{entry['label']}**", indent])
+            columns = entry["columns"]
+            lines.append(f"{indent}| {' | '.join(js_str(c) for c in columns)} |")
+            lines.append(f"{indent}| {' | '.join('---' for _ in columns)} |")
+            for row in entry["rows"]:
+                lines.append(f"{indent}| {' | '.join(js_str(c) for c in row)} |")
+            lines.append(indent)
+        elif kind == "link":
+            lines.append(f"{indent}[{entry['label']}]({entry['url']})")
+        elif kind == "section":
+            lines.extend([f"{indent}**{entry['title']}**", indent])
+            lines.extend(f"{indent}{line}" for line in (entry.get("markdown") or "").split("\n"))
+            lines.append(indent)
+        elif kind == "mermaid":
+            if entry.get("title"):
+                lines.append(f"{indent}**{entry['title']}**")
+            lines.append(f"{indent}```mermaid")
+            lines.extend(f"{indent}{line}" for line in (entry.get("code") or "").split("\n"))
+            lines.append(f"{indent}```")
+        elif kind == "screenshot":
+            alt = entry.get("alt")
+            lines.append(f"{indent}![{alt if alt is not None else 'Screenshot'}]({entry['path']})")
+        elif kind == "custom":
+            lines.extend([f"{indent}**[{entry['type']}]**", indent, f"{indent}```json"])
+            lines.extend(f"{indent}{line}" for line in js_json(entry.get("data"), indent=2).split("\n"))
+            lines.extend([f"{indent}```", indent])
@@ -0,0 +1,259 @@
+"""Merge raw-run shards (pytest-xdist groups, CI matrix jobs) into one run.
+
+``merge_runs`` reads every shard twice with the incremental reader from
+``_stream`` and never holds a whole shard in memory:
+
+1. The first pass records, per ``externalId``, which shard position holds
+   the winning copy plus the compact attempt summaries of every copy, and
+   folds the run fields (session bounds, CI info) together.
+2. The second pass streams the winning copies to the output in shard
+   order, attaching the merged attempt history to duplicated cases.
+
+Memory therefore grows with the number of distinct tests, not with the
+number or size of the shards.
+
+Precedence between copies of the same test is retry-aware: a real result
+beats a ``pending``/``unknown`` placeholder (e.g. a collect-only shard),
+then the later attempt wins — the shard that started later, then the
+higher ``retry``. Earlier copies survive in ``meta.attempts``, exactly as
+reruns within one session do.
+
+The shards' run-level ``meta`` is folded together too: ``story.metric()``
+aggregates (``meta.metrics``) through their quantile sketches, failure
+groups (``meta.failures``) by fingerprint, and Backgrounds
+(``meta.backgrounds``) re-keyed by content — ``bg-0`` means a different
+Background in every shard, so ids become a hash of the Background and the
+references in ``meta.backgrounds`` of the cases are rewritten to match.
+Any other ``meta`` key is kept per shard under ``meta.merge.shards``.
+
+``packageVersion`` and ``gitSha`` are kept only when the shards agree;
+shards checked out in different places get their common ``projectRoot``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import IO, Any
+
+from executable_stories._collector import _attempt_summary, _attempts_of
+from executable_stories._content_hash import _digest
+from executable_stories._failures import _FailureIndex
+from executable_stories._lazy import json_default
+from executable_stories._metrics import _MetricAggregator
+from executable_stories._stream import iter_raw_run
+
+# Run fields that are kept only when every shard that sets them agrees
+# (projectRoot falls back to the shards' common path).
+_SHARED_FIELDS = ("projectRoot", "packageVersion", "gitSha")
+
+_PLACEHOLDER_STATUSES = frozenset({"pending", "unknown", "todo"})
+
+# Run-level meta folded across shards; the rest is kept per shard.
+_MERGED_META = frozenset({"metrics", "failures", "backgrounds", "merge"})
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), default=json_default)
+
+
+class _Copy:
+    """One sighting of a test case in a shard, reduced to what precedence needs."""
+
+    __slots__ = ("shard", "index", "rank", "attempts")
+
+    def __init__(self, shard: int, index: int, rank: tuple[Any, ...], attempts: list[dict[str, Any]]) -> None:
+        self.shard = shard
+        self.index = index
+        self.rank = rank
+        self.attempts = attempts
+
+
+def _merge_ci(current: dict[str, Any] | None, ci: dict[str, Any]) -> dict[str, Any]:
+    """Keep only the CI fields on which all shards agree."""
+    if current is None:
+        return dict(ci)
+    return {k: v for k, v in current.items() if ci.get(k) == v}
+
+
+def _common_root(roots: list[str]) -> str:
+    try:
+        return os.path.commonpath(roots)
+    except ValueError:  # mixed absolute/relative paths or drives
+        return roots[0]
+
+
+def _background_id(background: dict[str, Any]) -> str:
+    content = {k: v for k, v in background.items() if k not in ("id", "durationMs")}
+    return "bg-" + _digest(content)[:12]
+
+
+class _ShardScan:
+    """Accumulates the first pass over all shards."""
+
+    def __init__(self) -> None:
+        self.fields: dict[str, Any] = {}
+        self.conflicts: set[str] = set()
+        self.started_at_ms: float | None = None
+        self.finished_at_ms: float | None = None
+        self.ci: dict[str, Any] | None = None
+        self.shards: list[dict[str, Any]] = []
+        self.copies: dict[str, list[_Copy]] = {}
+        self.duplicates = 0
+        self.metrics = _MetricAggregator()
+        self.failures = _FailureIndex()
+        self.project_roots: list[str] = []
+        # Background id in each shard -> merged id.
+        self.background_ids: list[dict[str, str]] = []
+        self.backgrounds: dict[str, dict[str, Any]] = {}
+
+    def scan(self, shard: int, path: str) -> None:
+        fields: dict[str, Any] = {}
+        pending: list[tuple[str, int, int, list[dict[str, Any]], bool]] = []
+        count = 0
+        for event, payload in iter_raw_run(path):
+            if event == "field":
+                name, value = payload
+                fields[name] = value
+                continue
+            external_id = payload.get("externalId")
+            if external_id is not None:
+                attempts = _attempts_of(payload) or [_attempt_summary(payload, 0)]
+                placeholder = payload.get("status", "unknown") in _PLACEHOLDER_STATUSES
+                pending.append((external_id, count, payload.get("retry", 0), attempts, placeholder))
+            count += 1
+
+        # Shard start time orders copies across shards; it is only known once
+        # the shard has been read, since fields may follow the test cases.
+        started = fields.get("startedAtMs")
+        for external_id, index, retry, attempts, placeholder in pending:
+            rank = (not placeholder, started if started is not None else float("-inf"), retry, shard, index)
+            copies = self.copies.setdefault(external_id, [])
+            if copies:
+                self.duplicates += 1
+            copies.append(_Copy(shard, index, rank, attempts))
+
+        if started is not None:
+            self.started_at_ms = started if self.started_at_ms is None else min(self.started_at_ms, started)
+        finished = fields.get("finishedAtMs")
+        if finished is not None:
+            self.finished_at_ms = finished if self.finished_at_ms is None else max(self.finished_at_ms, finished)
+        if fields.get("ci"):
+            self.ci = _merge_ci(self.ci, fields["ci"])
+        meta = fields.get("meta") or {}
+        if meta.get("metrics"):
+            self.metrics.merge_summary(meta["metrics"])
+        if meta.get("failures"):
+            self.failures.merge_summary(meta["failures"])
+        ids: dict[str, str] = {}
+        for background in meta.get("backgrounds") or []:
+            merged_id = ids[background["id"]] = _background_id(background)
+            self.backgrounds.setdefault(merged_id, {**background, "id": merged_id})
+        self.background_ids.append(ids)
+        if fields.get("projectRoot"):
+            self.project_roots.append(fields["projectRoot"])
+        for name in _SHARED_FIELDS:
+            if name not in fields:
+                continue
+            if name in self.fields and self.fields[name] != fields[name]:
+                self.conflicts.add(name)
+            self.fields.setdefault(name, fields[name])
+        entry: dict[str, Any] = {
+            "path": path,
+            "testCases": count,
+            "startedAtMs": started,
+            "finishedAtMs": finished,
+        }
+        rest = {k: v for k, v in meta.items() if k not in _MERGED_META}
+        if rest:
+            entry["meta"] = rest
+        self.shards.append(entry)
+
+    def winners(self) -> dict[tuple[int, int], list[dict[str, Any]] | None]:
+        """Map ``(shard, index)`` of each winning copy to its merged attempt history.
+
+        The history is ``None`` for tests seen only once.
+        """
+        result: dict[tuple[int, int], list[dict[str, Any]] | None] = {}
+        for copies in self.copies.values():
+            best = max(copies, key=lambda c: c.rank)
+            if len(copies) == 1:
+                result[(best.shard, best.index)] = None
+                continue
+            # Placeholders are not attempts once a real result exists.
+            earlier = sorted(
+                (c for c in copies if c is not best and (c.rank[0] or not best.rank[0])),
+                key=lambda c: c.rank[1:],
+            )
+            attempts = [a for c in earlier for a in c.attempts] + best.attempts
+            result[(best.shard, best.index)] = [{**a, "attempt": i} for i, a in enumerate(attempts)]
+        return result
+
+
+def merge_runs(paths: list[str], output: IO[str]) -> dict[str, Any]:
+    """Merge the raw runs at *paths* into *output* and return a summary."""
+    scan = _ShardScan()
+    for shard, path in enumerate(paths):
+        scan.scan(shard, path)
+    winners = scan.winners()
+    scan.copies.clear()
+
+    header: dict[str, Any] = {"schemaVersion": 1}
+    for name in _SHARED_FIELDS:
+        if name in scan.fields and name not in scan.conflicts:
+            header[name] = scan.fields[name]
+    if "projectRoot" in scan.conflicts:
+        header["projectRoot"] = _common_root(scan.project_roots)
+    if scan.started_at_ms is not None:
+        header["startedAtMs"] = scan.started_at_ms
+    if scan.finished_at_ms is not None:
+        header["finishedAtMs"] = scan.finished_at_ms
+    if scan.ci:
+        header["ci"] = scan.ci
+
+    output.write("{" + "".join(f"{_dumps(k)}:{_dumps(v)}," for k, v in header.items()) + '"testCases":[')
+    written = 0
+    for shard, path in enumerate(paths):
+        background_ids = scan.background_ids[shard]
+        index = 0
+        for event, payload in iter_raw_run(path):
+            if event != "case":
+                continue
+            position = index
+            index += 1
+            if payload.get("externalId") is not None:
+                if (shard, position) not in winners:
+                    continue
+                attempts = winners[(shard, position)]
+                if attempts is not None:
+                    payload.setdefault("meta", {})["attempts"] = attempts
+                    payload["retry"] = len(attempts) - 1
+                    payload["retries"] = max(payload.get("retries", 0), payload["retry"])
+            case_backgrounds = (payload.get("meta") or {}).get("backgrounds")
+            if case_backgrounds:
+                payload["meta"]["backgrounds"] = [
+                    background_ids.get(bg_id, f"s{shard}-{bg_id}") for bg_id in case_backgrounds
+                ]
+            output.write(("\n" if written == 0 else ",\n") + _dumps(payload))
+            written += 1
+
+    summary = {"shards": scan.shards, "testCases": written, "duplicates": scan.duplicates}
+    meta: dict[str, Any] = {"merge": summary}
+    failures = scan.failures.summary()
+    if failures:
+        meta["failures"] = failures
+    if scan.backgrounds:
+        meta["backgrounds"] = list(scan.backgrounds.values())
+    metrics = scan.metrics.summary()
+    if metrics:
+        meta["metrics"] = metrics
+    output.write("\n]," + _dumps("meta") + ":" + _dumps(meta) + "}\n")
+    return summary
+
+
+def merge_to_file(paths: list[str], output_path: str) -> dict[str, Any]:
+    parent = os.path.dirname(output_path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        return merge_runs(paths, f)
@@ -0,0 +1,62 @@
+"""Version and commit of the project under test, for the RawRun header.
+
+The plugin calls ``project_fields`` once per session. Under pytest-xdist
+the controller calls it and hands the result to its workers through
+``workerinput``, so a run with many workers reads ``.git`` and the
+package metadata once.
+"""
+
+from __future__ import annotations
+
+import os
+import tomllib
+from importlib import metadata
+
+from executable_stories._git_info import read_git_sha
+
+
+def read_package_version(start: str) -> str | None:
+    """Return the version of the project whose pyproject.toml is closest to *start*.
+
+    The installed distribution's version (``importlib.metadata``) is
+    preferred, so dynamic versions (setuptools-scm and the like) resolve;
+    a static ``[project] version`` is the fallback for projects that are
+    not installed.
+    """
+    current = os.path.abspath(start)
+    while True:
+        pyproject = os.path.join(current, "pyproject.toml")
+        if os.path.isfile(pyproject):
+            return _version_from_pyproject(pyproject)
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+def _version_from_pyproject(path: str) -> str | None:
+    try:
+        with open(path, "rb") as f:
+            project = tomllib.load(f).get("project", {})
+    except (OSError, tomllib.TOMLDecodeError):
+        return None
+    name = project.get("name")
+    if isinstance(name, str) and name:
+        try:
+            return metadata.version(name)
+        except metadata.PackageNotFoundError:
+            pass
+    version = project.get("version")
+    return version if isinstance(version, str) else None
+
+
+def project_fields(root: str) -> dict[str, str]:
+    """Return the ``packageVersion`` and ``gitSha`` RawRun fields that could be resolved."""
+    fields: dict[str, str] = {}
+    version = read_package_version(root)
+    if version:
+        fields["packageVersion"] = version
+    sha = read_git_sha(root)
+    if sha:
+        fields["gitSha"] = sha
+    return fields
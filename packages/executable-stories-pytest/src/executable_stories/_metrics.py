@@ -0,0 +1,328 @@
+"""Numeric measurements recorded with ``story.metric()`` and their session aggregates.
+
+Each call adds a ``custom`` doc of type ``metric`` to the current step::
+
+    {"kind": "custom", "type": "metric", "phase": "runtime",
+     "data": {"name": "latency_ms", "value": 12.3, "unit": "ms", "labels": {"route": "/pay"}}}
+
+and, once the test's final attempt is known (pytest-rerunfailures can
+run it several times), feeds one series of the session aggregate, keyed
+by name, unit and labels. A series keeps count, sum, min and max exactly; percentiles come
+from a ``_Sketch`` — a DDSketch-style histogram with logarithmic buckets,
+so every quantile is within ``RELATIVE_ACCURACY`` of the true value and
+memory grows with the spread of the values, never with their number.
+Sketches merge losslessly, which lets ``merge`` combine the metrics of
+pytest-xdist or CI shards.
+
+The aggregates go to the raw-run under ``meta.metrics``::
+
+    [{"name": "latency_ms", "unit": "ms", "labels": {"route": "/pay"},
+      "count": 120, "sum": 1830.2, "min": 8.1, "max": 61.0, "mean": 15.25,
+      "p50": 13.9, "p90": 24.3, "p95": 31.0, "p99": 55.2,
+      "sketch": {"zero": 0, "positive": [[k, n], ...], "negative": []}}]
+
+and to an OpenMetrics text file (``metrics.prom`` next to the raw-run),
+one ``summary`` family per metric name and unit plus ``_min``/``_max``
+gauges. The unit is the family name's suffix (``latency`` in ``ms``
+becomes ``latency_ms``), so one name recorded in two units gives two
+families rather than clashing series.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import re
+import threading
+from typing import Any
+
+RELATIVE_ACCURACY = 0.01
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+OPENMETRICS_NAME = "metrics.prom"
+METRIC_DOC_TYPE = "metric"
+
+# Buckets kept per sign; beyond it the lowest buckets are folded together.
+MAX_BUCKETS = 2048
+
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+
+class _Sketch:
+    """Relative-error quantile sketch over logarithmically sized buckets."""
+
+    __slots__ = ("zero", "positive", "negative")
+
+    def __init__(self) -> None:
+        self.zero = 0
+        self.positive: dict[int, int] = {}
+        self.negative: dict[int, int] = {}
+
+    def add(self, value: float, count: int = 1) -> None:
+        if value > 0:
+            _bump(self.positive, math.ceil(math.log(value) / _LOG_GAMMA), count)
+        elif value < 0:
+            _bump(self.negative, math.ceil(math.log(-value) / _LOG_GAMMA), count)
+        else:
+            self.zero += count
+
+    def merge(self, other: _Sketch) -> None:
+        self.zero += other.zero
+        for key, count in other.positive.items():
+            _bump(self.positive, key, count)
+        for key, count in other.negative.items():
+            _bump(self.negative, key, count)
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate the *q*-quantile (0..1); None for an empty sketch."""
+        total = self.zero + sum(self.positive.values()) + sum(self.negative.values())
+        if total == 0:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        # Most negative first: larger keys hold larger magnitudes.
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -_bucket_value(key)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return _bucket_value(key)
+        return _bucket_value(max(self.positive))
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "zero": self.zero,
+            "positive": sorted([k, n] for k, n in self.positive.items()),
+            "negative": sorted([k, n] for k, n in self.negative.items()),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> _Sketch:
+        sketch = cls()
+        sketch.zero = int(data.get("zero", 0))
+        for key, count in data.get("positive", ()):
+            _bump(sketch.positive, int(key), int(count))
+        for key, count in data.get("negative", ()):
+            _bump(sketch.negative, int(key), int(count))
+        return sketch
+
+
+def _bump(buckets: dict[int, int], key: int, count: int) -> None:
+    buckets[key] = buckets.get(key, 0) + count
+    if len(buckets) > MAX_BUCKETS:
+        # Fold the lowest bucket into the next one; only the smallest
+        # magnitudes lose accuracy.
+        lowest, second = sorted(buckets)[:2]
+        buckets[second] += buckets.pop(lowest)
+
+
+def _bucket_value(key: int) -> float:
+    return 2 * _GAMMA**key / (_GAMMA + 1)
+
+
+class _Series:
+    """Exact count/sum/min/max plus a sketch for one name, unit and label set."""
+
+    __slots__ = ("name", "unit", "labels", "count", "sum", "min", "max", "sketch")
+
+    def __init__(self, name: str, unit: str | None, labels: dict[str, str]) -> None:
+        self.name = name
+        self.unit = unit
+        self.labels = labels
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sketch = _Sketch()
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.sketch.add(value)
+
+    def merge(self, other: _Series) -> None:
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    def quantile(self, q: float) -> float:
+        estimate = self.sketch.quantile(q)
+        # Bucket midpoints can fall just outside the observed range.
+        return min(max(estimate if estimate is not None else self.min, self.min), self.max)
+
+    def summary(self) -> dict[str, Any]:
+        result: dict[str, Any] = {"name": self.name}
+        if self.unit:
+            result["unit"] = self.unit
+        if self.labels:
+            result["labels"] = dict(self.labels)
+        result.update({
+            "count": self.count,
+            "sum": _round(self.sum),
+            "min": _round(self.min),
+            "max": _round(self.max),
+            "mean": _round(self.sum / self.count),
+        })
+        for q in QUANTILES:
+            result[_quantile_key(q)] = _round(self.quantile(q))
+        result["sketch"] = self.sketch.to_dict()
+        return result
+
+    @classmethod
+    def from_summary(cls, data: dict[str, Any]) -> _Series:
+        series = cls(data["name"], data.get("unit"), dict(data.get("labels") or {}))
+        series.count = int(data["count"])
+        series.sum = float(data["sum"])
+        series.min = float(data["min"])
+        series.max = float(data["max"])
+        series.sketch = _Sketch.from_dict(data.get("sketch") or {})
+        return series
+
+
+def _quantile_key(q: float) -> str:
+    return f"p{q * 100:g}"
+
+
+def _round(value: float) -> float:
+    return round(value, 6)
+
+
+def _series_key(name: str, unit: str | None, labels: dict[str, str]) -> tuple[Any, ...]:
+    return (name, unit or "", tuple(sorted(labels.items())))
+
+
+class _MetricAggregator:
+    """Thread-safe session aggregate of every ``story.metric()`` call."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._series: dict[tuple[Any, ...], _Series] = {}
+
+    def add(self, name: str, value: float, unit: str | None, labels: dict[str, str]) -> None:
+        key = _series_key(name, unit, labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(name, unit, labels)
+            series.add(value)
+
+    def add_all(self, samples: list[tuple[str, float, str | None, dict[str, str]]]) -> None:
+        """Add the ``(name, value, unit, labels)`` samples of one test."""
+        for sample in samples:
+            self.add(*sample)
+
+    def merge_summary(self, summaries: list[dict[str, Any]]) -> None:
+        """Fold in ``meta.metrics`` of another run (e.g. a shard being merged)."""
+        with self._lock:
+            for data in summaries:
+                incoming = _Series.from_summary(data)
+                if incoming.count == 0:
+                    continue
+                key = _series_key(incoming.name, incoming.unit, incoming.labels)
+                series = self._series.get(key)
+                if series is None:
+                    self._series[key] = incoming
+                else:
+                    series.merge(incoming)
+
+    def summary(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [self._series[key].summary() for key in sorted(self._series)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+# ── OpenMetrics ────────────────────────────────────────────────────
+
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_:]")
+_INVALID_LABEL_CHARS = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def _metric_name(name: str) -> str:
+    cleaned = _INVALID_NAME_CHARS.sub("_", name)
+    return cleaned if cleaned and not cleaned[0].isdigit() else "_" + cleaned
+
+
+def _family_name(name: str, unit: str | None) -> str:
+    """Return the metric's family name, ending in its unit as OpenMetrics requires."""
+    family = _metric_name(name)
+    if unit:
+        suffix = "_" + _metric_name(unit)
+        if not family.endswith(suffix):
+            family += suffix
+    return family
+
+
+def _label_name(name: str) -> str:
+    cleaned = _INVALID_LABEL_CHARS.sub("_", name)
+    if not cleaned or cleaned[0].isdigit() or cleaned == "quantile":
+        cleaned = "_" + cleaned
+    return cleaned
+
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: dict[str, str], extra: tuple[str, str] | None = None) -> str:
+    pairs = [(_label_name(k), v) for k, v in sorted(labels.items())]
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_label_value(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value))
+
+
+def render_openmetrics(summaries: list[dict[str, Any]]) -> str:
+    """Render ``meta.metrics`` entries as an OpenMetrics text exposition."""
+    families: dict[str, list[dict[str, Any]]] = {}
+    for entry in summaries:
+        families.setdefault(_family_name(entry["name"], entry.get("unit")), []).append(entry)
+
+    lines: list[str] = []
+    for name in sorted(families):
+        entries = families[name]
+        units = {entry.get("unit") for entry in entries}
+        # Unitless series can share a family with ones whose name carries the unit.
+        unit = units.pop() if len(units) == 1 else None
+        lines.append(f"# TYPE {name} summary")
+        if unit:
+            lines.append(f"# UNIT {name} {_metric_name(unit)}")
+        for entry in entries:
+            labels = entry.get("labels") or {}
+            for q in QUANTILES:
+                quantile = _labels(labels, ("quantile", f"{q:g}"))
+                lines.append(f"{name}{quantile} {_number(entry[_quantile_key(q)])}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(entry['sum'])}")
+            lines.append(f"{name}_count{_labels(labels)} {entry['count']}")
+        for suffix in ("min", "max"):
+            lines.append(f"# TYPE {name}_{suffix} gauge")
+            for entry in entries:
+                lines.append(f"{name}_{suffix}{_labels(entry.get('labels') or {})} {_number(entry[suffix])}")
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def write_openmetrics(summaries: list[dict[str, Any]], path: str) -> None:
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(render_openmetrics(summaries))
@@ -0,0 +1,121 @@
+"""OpenTelemetry bridge: the cached API import and per-step spans.
+
+``opentelemetry`` is optional. ``trace_api()`` imports it on first use
+and remembers the result, so ``story.init()`` does not retry a failing
+import for every test.
+
+With ``--stories-otel-steps`` every story gets a scenario span (a child
+of whatever span is current when ``story.init()`` runs) and each
+``fn``/``expect`` step and each ``start_timer``/``end_timer`` pair gets a
+child span of it, carrying the step's keyword, text and status. While
+an ``fn`` body runs its span is the current one, so spans the code under
+test opens nest below the step. Spans go to the exporter through the
+SDK's ``BatchSpanProcessor`` on a tracer provider of our own; its tracer
+is looked up once per session.
+"""
+
+from __future__ import annotations
+
+import contextlib
+from collections.abc import Iterator
+from typing import Any
+
+TRACER_NAME = "executable-stories"
+EXPORTERS = ("otlp", "console")
+
+# Span names longer than this are cut; the full text stays in story.step.text.
+_MAX_NAME_LENGTH = 120
+
+_UNRESOLVED: Any = object()
+_trace_api: Any = _UNRESOLVED
+
+
+def trace_api() -> Any:
+    """Return ``opentelemetry.trace``, or None when it is not installed."""
+    global _trace_api
+    if _trace_api is _UNRESOLVED:
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            trace = None
+        _trace_api = trace
+    return _trace_api
+
+
+def _span_name(text: str) -> str:
+    return text if len(text) <= _MAX_NAME_LENGTH else text[: _MAX_NAME_LENGTH - 1] + "…"
+
+
+class _StepSpans:
+    """Opens scenario and step spans on one tracer and batches their export."""
+
+    def __init__(self, exporter: Any) -> None:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        trace = trace_api()
+        self._trace = trace
+        self._status = trace.Status
+        self._error = trace.StatusCode.ERROR
+        self.provider = TracerProvider(resource=Resource.create({"service.name": TRACER_NAME}))
+        self.provider.add_span_processor(BatchSpanProcessor(exporter))
+        self.tracer = self.provider.get_tracer(TRACER_NAME)
+
+    def start_scenario(self, scenario: str, tags: list[str], tickets: list[str]) -> Any:
+        """Open the story's span as a child of the current context."""
+        attributes: dict[str, Any] = {"story.scenario": scenario}
+        if tags:
+            attributes["story.tags"] = tags
+        if tickets:
+            attributes["story.tickets"] = tickets
+        return self.tracer.start_span(_span_name(scenario), attributes=attributes)
+
+    def start_step(self, scenario_span: Any, keyword: str, text: str, index: int, *, wrapped: bool) -> Any:
+        context = self._trace.set_span_in_context(scenario_span)
+        return self.tracer.start_span(
+            _span_name(f"{keyword} {text}"),
+            context=context,
+            attributes={
+                "story.step.keyword": keyword,
+                "story.step.text": text,
+                "story.step.index": index,
+                "story.step.wrapped": wrapped,
+            },
+        )
+
+    @contextlib.contextmanager
+    def current(self, span: Any) -> Iterator[None]:
+        """Make *span* the current span while the step body runs."""
+        with self._trace.use_span(span, end_on_exit=False, record_exception=False, set_status_on_exception=False):
+            yield
+
+    def end(self, span: Any, status: str, error: BaseException | None = None, *, prefix: str = "story.step") -> None:
+        span.set_attribute(f"{prefix}.status", status)
+        if error is not None:
+            span.record_exception(error)
+            span.set_status(self._status(self._error, f"{type(error).__name__}: {error}"))
+        elif status == "failed":
+            span.set_status(self._status(self._error))
+        span.end()
+
+    def shutdown(self) -> None:
+        """Flush the batch and stop the export thread."""
+        self.provider.shutdown()
+
+
+def make_exporter(name: str) -> Any:
+    """Return the span exporter for ``--stories-otel-steps=NAME``.
+
+    Raises ImportError when the SDK (or, for otlp, an OTLP exporter
+    package) is missing.
+    """
+    if name == "console":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+        return ConsoleSpanExporter()
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError:
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+    return OTLPSpanExporter()
@@ -0,0 +1,174 @@
+"""Scenario Outline collapsing for parametrized tests.
+
+Rows of a ``@pytest.mark.parametrize`` test usually record the same
+scenario and steps with only the parameter values changing. Each row's
+story is turned back into a template by replacing parameter values with
+``<name>`` placeholders (explicit ``<name>`` text is kept as written).
+Rows whose template matches the first row's are folded into a single
+case that carries the shared steps plus an Examples table; substitution
+back into step text is left to the renderer. Rows with a different
+template are kept as ordinary cases.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any
+
+_SCALARS = (str, int, float, bool)
+
+
+def display_value(value: Any) -> str:
+    """Render a parameter value the way it appears in the Examples table."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, _SCALARS) or value is None:
+        return str(value)
+    return repr(value)
+
+
+def _placeholder_patterns(params: dict[str, Any]) -> list[tuple[re.Pattern[str], str]]:
+    """Build value -> ``<name>`` substitutions, longest value first."""
+    pairs: list[tuple[str, str]] = []
+    for name, value in params.items():
+        if isinstance(value, _SCALARS) and not isinstance(value, bool):
+            text = str(value)
+            if text:
+                pairs.append((text, f"<{name}>"))
+    pairs.sort(key=lambda p: -len(p[0]))
+    return [(re.compile(rf"(?<!\w){re.escape(text)}(?!\w)"), placeholder) for text, placeholder in pairs]
+
+
+def _templatize(text: str, patterns: list[tuple[re.Pattern[str], str]]) -> str:
+    for pattern, placeholder in patterns:
+        text = pattern.sub(placeholder, text)
+    return text
+
+
+def template_story(story_meta: dict[str, Any], params: dict[str, Any]) -> tuple[dict[str, Any], tuple[Any, ...]]:
+    """Return ``(template, signature)`` for one row's StoryMeta.
+
+    The template keeps scenario, steps (keyword, text, mode), tags, tickets,
+    meta, suitePath and sourceOrder. Row-specific docs are not part of the
+    template.
+    """
+    patterns = _placeholder_patterns(params)
+    scenario = _templatize(story_meta["scenario"], patterns)
+    steps: list[dict[str, Any]] = []
+    for step in story_meta.get("steps", []):
+        templated: dict[str, Any] = {"keyword": step["keyword"], "text": _templatize(step["text"], patterns)}
+        if "id" in step:
+            templated["id"] = step["id"]
+        if "mode" in step:
+            templated["mode"] = step["mode"]
+        steps.append(templated)
+
+    template: dict[str, Any] = {"scenario": scenario}
+    if steps:
+        template["steps"] = steps
+    for key in ("tags", "tickets", "meta", "suitePath", "sourceOrder"):
+        if key in story_meta:
+            template[key] = story_meta[key]
+    signature = (scenario, tuple((s["keyword"], s["text"]) for s in steps))
+    return template, signature
+
+
+def _example_row(test_case: dict[str, Any], example_id: str, params: dict[str, Any]) -> dict[str, Any]:
+    row: dict[str, Any] = {
+        "id": example_id,
+        "params": {name: display_value(value) for name, value in params.items()},
+        "status": test_case["status"],
+        "durationMs": test_case.get("durationMs", 0.0),
+    }
+    error = test_case.get("error")
+    if error and "message" in error:
+        row["errorMessage"] = error["message"]
+    fp = test_case.get("meta", {}).get("errorFingerprint")
+    if fp:
+        row["errorFingerprint"] = fp
+    return row
+
+
+def _outline_status(statuses: list[str]) -> str:
+    if "fail" in statuses:
+        return "fail"
+    if "pass" in statuses:
+        return "pass"
+    return statuses[0] if statuses else "unknown"
+
+
+class _Outline:
+    """Accumulates the rows of one parametrized test that share a template."""
+
+    __slots__ = ("external_id", "base_case", "template", "signature", "param_names", "examples", "_row_index")
+
+    def __init__(
+        self,
+        external_id: str,
+        base_case: dict[str, Any],
+        template: dict[str, Any],
+        signature: tuple[Any, ...],
+        param_names: list[str],
+    ) -> None:
+        self.external_id = external_id
+        self.base_case = base_case
+        self.template = template
+        self.signature = signature
+        self.param_names = param_names
+        self.examples: list[dict[str, Any]] = []
+        self._row_index: dict[str, int] = {}
+
+    @classmethod
+    def start(
+        cls,
+        external_id: str,
+        title: str,
+        test_case: dict[str, Any],
+        example_id: str,
+        params: dict[str, Any],
+    ) -> _Outline:
+        template, signature = template_story(test_case["story"], params)
+        base_case: dict[str, Any] = {"status": test_case["status"], "externalId": external_id, "title": title}
+        for key in ("sourceFile", "sourceLine", "retries"):
+            if key in test_case:
+                base_case[key] = test_case[key]
+        outline = cls(external_id, base_case, template, signature, list(params))
+        outline.add(test_case, example_id, params)
+        return outline
+
+    def matches(self, test_case: dict[str, Any], params: dict[str, Any]) -> bool:
+        """Return True if the row's story produces this outline's template."""
+        return template_story(test_case["story"], params)[1] == self.signature
+
+    def add(self, test_case: dict[str, Any], example_id: str, params: dict[str, Any]) -> None:
+        """Add a row; a rerun of a known row replaces it."""
+        # The outline sorts where its earliest row was declared.
+        order = test_case["story"].get("sourceOrder")
+        if order is not None and order < self.template.get("sourceOrder", order + 1):
+            self.template["sourceOrder"] = order
+        row = _example_row(test_case, example_id, params)
+        pos = self._row_index.get(example_id)
+        if pos is None:
+            self._row_index[example_id] = len(self.examples)
+            self.examples.append(row)
+        else:
+            row["retry"] = self.examples[pos].get("retry", 0) + 1
+            self.examples[pos] = row
+
+    def to_case(self) -> dict[str, Any]:
+        """Build the collapsed RawTestCase with the Examples table."""
+        case = dict(self.base_case)
+        case["status"] = _outline_status([r["status"] for r in self.examples])
+        case["durationMs"] = round(sum(r["durationMs"] for r in self.examples), 2)
+        case["retry"] = max(r.get("retry", 0) for r in self.examples)
+
+        story_meta = dict(self.template)
+        columns = [*self.param_names, "status", "durationMs"]
+        rows = [
+            [*(r["params"].get(name, "") for name in self.param_names), r["status"], str(r["durationMs"])]
+            for r in self.examples
+        ]
+        story_meta["docs"] = [{"kind": "table", "label": "Examples", "columns": columns, "rows": rows, "phase": "runtime"}]
+        case["story"] = story_meta
+        case["meta"] = {"outline": {"parameters": self.param_names, "examples": self.examples}}
+        return case
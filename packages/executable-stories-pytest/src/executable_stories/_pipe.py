@@ -0,0 +1,153 @@
+"""Pipe mode: stream the run into a formatter subprocess while tests run.
+
+The formatter (for example ``executable-stories format --stdin``) is
+started when the session starts, and every finished test case is written
+to its stdin straight away, so report generation overlaps with test
+execution instead of following it. Writes go through a bounded queue to a
+writer thread, so a slow formatter does not stall the tests until the
+queue fills up.
+
+Pipe mode is not supported with pytest-xdist: each process would start
+its own formatter.
+
+Two stream formats are supported:
+
+``json``
+    A single RawRun document, written incrementally: the run fields known
+    at session start, then ``"testCases": [`` with one case at a time, and
+    finally the fields known only at the end (``finishedAtMs``, ``meta``).
+    Any reader of raw-run JSON, including the Node CLI, accepts it.
+``ndjson``
+    The line-delimited form read by ``python -m executable_stories format
+    --input-type ndjson``, terminated by a ``{"runFinished": {...}}`` line.
+"""
+
+from __future__ import annotations
+
+import json
+import queue
+import subprocess
+import tempfile
+import threading
+from typing import IO, Any
+
+from executable_stories._lazy import json_default
+
+PIPE_FORMATS = ("json", "ndjson")
+
+# Chunks buffered for the writer thread before ``send`` blocks.
+QUEUE_SIZE = 1024
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), default=json_default)
+
+
+class _FormatterPipe:
+    """Owns the formatter subprocess and the stream written to its stdin."""
+
+    def __init__(self, command: list[str], *, stream_format: str = "json") -> None:
+        if stream_format not in PIPE_FORMATS:
+            raise ValueError(f"Unknown pipe format: {stream_format!r}")
+        self.command = command
+        self.stream_format = stream_format
+        self.returncode: int | None = None
+        self.output = ""
+        self.error: str | None = None
+        self._proc: subprocess.Popen[bytes] | None = None
+        self._stdout: IO[bytes] | None = None
+        self._lock = threading.Lock()
+        self._sent: set[str] = set()
+        self._count = 0
+        self._queue: queue.Queue[str | None] = queue.Queue(maxsize=QUEUE_SIZE)
+        self._writer: threading.Thread | None = None
+
+    @property
+    def broken(self) -> bool:
+        return self.error is not None
+
+    def start(self, header: dict[str, Any]) -> None:
+        """Launch the formatter and write the run fields known so far."""
+        self._stdout = tempfile.TemporaryFile()
+        try:
+            self._proc = subprocess.Popen(
+                self.command, stdin=subprocess.PIPE, stdout=self._stdout, stderr=subprocess.STDOUT
+            )
+        except OSError as err:
+            self.error = f"could not start {self.command[0]!r}: {err}"
+            return
+        self._writer = threading.Thread(target=self._drain, name="executable-stories-pipe", daemon=True)
+        self._writer.start()
+        if self.stream_format == "ndjson":
+            self._put(_dumps(header) + "\n")
+        else:
+            fields = "".join(f"{_dumps(k)}:{_dumps(v)}," for k, v in header.items())
+            self._put("{" + fields + '"testCases":[')
+
+    def send(self, test_case: dict[str, Any]) -> None:
+        """Stream one finished test case."""
+        with self._lock:
+            if self.broken:
+                return
+            data = _dumps(test_case)
+            if self.stream_format == "ndjson":
+                self._put(data + "\n")
+            else:
+                self._put(data if self._count == 0 else "," + data)
+            self._count += 1
+            external_id = test_case.get("externalId")
+            if external_id is not None:
+                self._sent.add(external_id)
+
+    def was_sent(self, external_id: str | None) -> bool:
+        return external_id is not None and external_id in self._sent
+
+    def finish(self, trailer: dict[str, Any], timeout: float | None = None) -> int | None:
+        """Write the closing fields, close stdin and wait for the formatter."""
+        with self._lock:
+            if not self.broken:
+                if self.stream_format == "ndjson":
+                    self._put(_dumps({"runFinished": trailer}) + "\n")
+                else:
+                    self._put("]" + "".join(f",{_dumps(k)}:{_dumps(v)}" for k, v in trailer.items()) + "}\n")
+        proc = self._proc
+        if proc is None:
+            return None
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join(timeout)
+        try:
+            if proc.stdin is not None:
+                proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.returncode = proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            self.returncode = proc.wait()
+            self.error = f"formatter did not finish within {timeout}s"
+        if self._stdout is not None:
+            self._stdout.seek(0)
+            self.output = self._stdout.read().decode("utf-8", "replace")
+            self._stdout.close()
+        return self.returncode
+
+    def _put(self, text: str) -> None:
+        if self._writer is not None and not self.broken:
+            self._queue.put(text)
+
+    def _drain(self) -> None:
+        # Keeps consuming after a broken pipe so producers never block on a full queue.
+        while (text := self._queue.get()) is not None:
+            self._write(text)
+
+    def _write(self, text: str) -> None:
+        proc = self._proc
+        if proc is None or proc.stdin is None or self.broken:
+            return
+        try:
+            proc.stdin.write(text.encode("utf-8"))
+            proc.stdin.flush()
+        except (BrokenPipeError, ValueError, OSError) as err:
+            self.error = f"formatter stopped reading its input: {err}"
@@ -6,16 +6,242 @@ Registered via the ``pytest11`` entry point in pyproject.toml.
 from __future__ import annotations
 
 import os
+import shlex
 import time
 import traceback
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import pytest
 
-from executable_stories._collector import _collector
-from executable_stories._json_writer import write_raw_run
+from executable_stories._budget import (
+    DEFAULT_MAX_ENTRY_BYTES,
+    DEFAULT_MAX_RUN_BYTES,
+    DEFAULT_MAX_TEST_BYTES,
+    _DocBudget,
+)
+from executable_stories._collector import _Collector, _collector
+from executable_stories._failures import (
+    DEFAULT_MAX_ERROR_BYTES,
+    TB_STYLES,
+    _failures,
+    bound_text,
+    fingerprint,
+)
+from executable_stories._otel import EXPORTERS as OTEL_EXPORTERS
+from executable_stories._pipe import PIPE_FORMATS
 from executable_stories._story_api import story
 
+# The pytest11 entry point loads this module into every pytest run, story
+# tests or not. Modules needed only once a session records stories, or
+# for an opt-in option, are imported where they are used.
+if TYPE_CHECKING:
+    from executable_stories._collect_profile import _CollectionProfiler
+    from executable_stories._impact import _ImpactTracer
+    from executable_stories._junit import _JUnitWriter
+    from executable_stories._otel import _StepSpans
+    from executable_stories._pipe import _FormatterPipe
+    from executable_stories._span_summary import _SpanSummaryProcessor
+    from executable_stories._tag_index import _TagIndex
+    from executable_stories._trace_events import _TraceEventWriter
+
+
+# ── Options ───────────────────────────────────────────────────────
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup("executable-stories")
+    group.addoption(
+        "--stories-max-doc-bytes",
+        type=int,
+        default=None,
+        help="Truncate a single story doc entry above this many bytes (0 = unlimited).",
+    )
+    group.addoption(
+        "--stories-max-test-doc-bytes",
+        type=int,
+        default=None,
+        help="Cap the story doc bytes kept per test (0 = unlimited).",
+    )
+    group.addoption(
+        "--stories-max-run-doc-bytes",
+        type=int,
+        default=None,
+        help="Cap the story doc bytes kept per run (0 = unlimited).",
+    )
+    group.addoption(
+        "--stories-compact",
+        action="store_true",
+        default=False,
+        help="Write raw-run.json with a shared string table (read it back with read_raw_run).",
+    )
+    group.addoption(
+        "--stories-ndjson",
+        action="store_true",
+        default=False,
+        help="Write the run as raw-run.ndjson (header line, then one test case per line).",
+    )
+    group.addoption(
+        "--stories-markdown",
+        default=None,
+        metavar="DIR",
+        help="Also render Markdown reports (one file per test module) into DIR.",
+    )
+    group.addoption(
+        "--stories-junit",
+        default=None,
+        metavar="PATH",
+        help="Write a story-aware JUnit XML report to PATH, one testcase at a time.",
+    )
+    group.addoption(
+        "--stories-pipe",
+        default=None,
+        metavar="COMMAND",
+        help="Start COMMAND (e.g. 'executable-stories format --stdin') at session start "
+        "and stream the run into its stdin as tests finish.",
+    )
+    group.addoption(
+        "--stories-pipe-format",
+        choices=PIPE_FORMATS,
+        default=None,
+        help="Stream format for --stories-pipe: a raw-run JSON document (default) or ndjson.",
+    )
+    group.addoption(
+        "--stories-no-raw-run",
+        action="store_true",
+        default=False,
+        help="Do not write the raw-run file (e.g. when --stories-pipe produces the reports).",
+    )
+    group.addoption(
+        "--stories-tb-style",
+        choices=TB_STYLES,
+        default=None,
+        help="Traceback style for recorded failures (default: auto, i.e. pytest's --tb).",
+    )
+    group.addoption(
+        "--stories-max-error-bytes",
+        type=int,
+        default=None,
+        help="Cap recorded failure messages and stacks at this many bytes (0 = unlimited).",
+    )
+    group.addoption(
+        "--stories-shared-stacks",
+        action="store_true",
+        default=False,
+        help="Drop failure stacks from test cases; keep each only once per fingerprint in meta.failures.",
+    )
+    group.addoption(
+        "--stories-outlines",
+        action="store_true",
+        default=False,
+        help="Collapse parametrized story tests into one Scenario Outline case with an Examples table.",
+    )
+    group.addoption(
+        "--stories-collect-only",
+        action="store_true",
+        default=False,
+        help="Collect only, and write a raw-run with stories extracted statically from test source.",
+    )
+    group.addoption(
+        "--story-tags",
+        default=None,
+        help="Only run story tests carrying any of these comma-separated tags.",
+    )
+    group.addoption(
+        "--story-tickets",
+        default=None,
+        help="Only run story tests referencing any of these comma-separated tickets.",
+    )
+    group.addoption(
+        "--stories-impact-map",
+        action="store_true",
+        default=False,
+        help="Record the project files and functions each test runs into impact-map.json next to the raw-run.",
+    )
+    group.addoption(
+        "--stories-affected-by",
+        default=None,
+        metavar="FILE",
+        help="Only run tests whose recorded impact touches a file listed in FILE (e.g. git diff --name-only).",
+    )
+    group.addoption(
+        "--stories-otel-steps",
+        choices=OTEL_EXPORTERS,
+        default=None,
+        metavar="EXPORTER",
+        help="Open an OpenTelemetry span per story and per fn/expect/timed step, batched to "
+        "an otlp or console exporter (needs opentelemetry-sdk).",
+    )
+    group.addoption(
+        "--stories-span-summary",
+        action="store_true",
+        default=False,
+        help="Summarise the OpenTelemetry spans each step produces (count, time by name, slowest) "
+        "as an otel-spans doc on the step (needs opentelemetry-sdk).",
+    )
+    group.addoption(
+        "--stories-span-summary-top",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Slowest spans listed per step in the span summary (default 5).",
+    )
+    group.addoption(
+        "--stories-openmetrics",
+        default=None,
+        metavar="PATH",
+        help="Where to write the OpenMetrics text of story.metric() aggregates (default: metrics.prom next to the raw-run).",
+    )
+    group.addoption(
+        "--stories-chrome-trace",
+        default=None,
+        metavar="PATH",
+        help="Stream a Trace Event Format timeline of tests, phases and story steps to PATH "
+        "(open it in Perfetto or chrome://tracing).",
+    )
+    group.addoption(
+        "--stories-profile-collection",
+        action="store_true",
+        default=False,
+        help="Time the collection of each test module; reported in meta.collectionProfile and the summary.",
+    )
+    group.addoption(
+        "--stories-profile-imports",
+        action="store_true",
+        default=False,
+        help="With collection profiling, also attribute import time to top-level packages (like -X importtime).",
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    if _flag_option(config, "stories_collect_only", "EXECUTABLE_STORIES_COLLECT_ONLY"):
+        config.option.collectonly = True
+
+
+def _flag_option(config: pytest.Config, name: str, env: str) -> bool:
+    """Read a boolean flag from the command line, then the environment."""
+    if config.getoption(name, False):
+        return True
+    return os.environ.get(env, "").lower() in ("1", "true", "yes")
+
+
+def _str_option(config: pytest.Config, name: str, env: str, default: str) -> str:
+    """Read a string option from the command line, then the environment."""
+    value = config.getoption(name, None)
+    if value is not None:
+        return str(value)
+    return os.environ.get(env) or default
+
+
+def _int_option(config: pytest.Config, name: str, env: str, default: int) -> int:
+    """Read an int option from the command line, then the environment."""
+    value = config.getoption(name, None)
+    if value is not None:
+        return int(value)
+    env_value = os.environ.get(env)
+    if env_value:
+        return int(env_value)
+    return default
+
 
 # ── CI detection ──────────────────────────────────────────────────
 
@@ -77,67 +303,725 @@ def _detect_ci() -> dict[str, Any] | None:
 
 _started_at_ms: float = 0.0
 
+# Failure capture settings, resolved once per session.
+_tb_style: str = "auto"
+_max_error_bytes: int = DEFAULT_MAX_ERROR_BYTES
+_shared_stacks: bool = False
+_outlines: bool = False
+
+# Static extraction counters for --stories-collect-only runs.
+_static_stats: dict[str, int] | None = None
+
+# Tag/ticket index, loaded from the pytest cache when first needed.
+_tag_index: _TagIndex | None = None
+_file_hashes: dict[str, str] = {}
+
+# Position of each item in the collection, before deselection; becomes story.sourceOrder.
+# The items are kept as collected and indexed on the first lookup.
+_collected: list[pytest.Item] = []
+_source_order: dict[str, int] = {}
+
+# Per-test coverage tracer, active only with --stories-impact-map.
+_impact_tracer: _ImpactTracer | None = None
+_IMPACT_HOOKS = "executable-stories-impact"
+# externalId -> (files, functions) handed back by pytest-xdist workers.
+_worker_impact: dict[str, tuple[set[str], set[str]]] = {}
+
+# Node ids recorded by makereport; tests missing here ran before the first story.
+_recorded: set[str] = set()
+# (nodeid, outcome, duration, longrepr, xfail) of the call phases logged
+# before the first story, in the order they finished.
+_plain_results: list[tuple[str, str, float, Any, bool]] = []
+
+# In-memory span processor, active only with --stories-span-summary.
+_span_summary: _SpanSummaryProcessor | None = None
+
+# Collection timings, active only with --stories-profile-collection / --stories-profile-imports.
+_collection_profiler: _CollectionProfiler | None = None
+_COLLECTION_HOOKS = "executable-stories-collection-profile"
+
+# Trace Event Format timeline, active only with --stories-chrome-trace.
+_trace_writer: _TraceEventWriter | None = None
+_TRACE_HOOKS = "executable-stories-chrome-trace"
+
+# Incremental JUnit XML sink, active only with --stories-junit.
+_junit_writer: _JUnitWriter | None = None
+
+# Call-phase outputs that only a test's final attempt may publish, held until
+# pytest-rerunfailures stops rerunning it; see _RerunHooks.
+_pending: dict[str, _Attempt] = {}
+_rerun_hooks: _RerunHooks | None = None
+_RERUN_HOOKS = "executable-stories-reruns"
+
+# Formatter subprocess fed as tests finish, active only with --stories-pipe.
+_formatter_pipe: _FormatterPipe | None = None
+
+# packageVersion / gitSha of the project under test, resolved once per
+# session; pytest-xdist workers get the controller's through workerinput.
+_project: dict[str, str] | None = None
+_WORKER_INPUT_KEY = "executable_stories_project"
+# Tag index entries a pytest-xdist worker hands back through workeroutput.
+_TAG_INDEX_OUTPUT_KEY = "executable_stories_tag_index"
+_IMPACT_OUTPUT_KEY = "executable_stories_impact"
+
 
 def pytest_sessionstart(session: pytest.Session) -> None:
-    global _started_at_ms
+    global _started_at_ms, _tb_style, _max_error_bytes, _shared_stacks, _outlines, _static_stats, _tag_index
+    global _impact_tracer, _junit_writer, _formatter_pipe, _project, _collection_profiler, _span_summary
+    global _trace_writer, _rerun_hooks
     _started_at_ms = time.time() * 1000
     _collector.clear()
+    _failures.clear()
+    story._backgrounds.clear()
+    story._metrics.clear()
+    _pending.clear()
 
+    config = session.config
+    # Per-test recording starts with the first story.init() of the session,
+    # or right away when a report was asked for explicitly.
+    story._active = _reports_requested(config)
+    story._set_budget(_DocBudget(
+        max_entry_bytes=_int_option(
+            config, "stories_max_doc_bytes", "EXECUTABLE_STORIES_MAX_DOC_BYTES", DEFAULT_MAX_ENTRY_BYTES
+        ),
+        max_test_bytes=_int_option(
+            config, "stories_max_test_doc_bytes", "EXECUTABLE_STORIES_MAX_TEST_DOC_BYTES", DEFAULT_MAX_TEST_BYTES
+        ),
+        max_run_bytes=_int_option(
+            config, "stories_max_run_doc_bytes", "EXECUTABLE_STORIES_MAX_RUN_DOC_BYTES", DEFAULT_MAX_RUN_BYTES
+        ),
+    ))
 
-# ── Per-test hooks ─────────────────────────────────────────────────
+    _tb_style = _str_option(config, "stories_tb_style", "EXECUTABLE_STORIES_TB_STYLE", "auto")
+    _max_error_bytes = _int_option(
+        config, "stories_max_error_bytes", "EXECUTABLE_STORIES_MAX_ERROR_BYTES", DEFAULT_MAX_ERROR_BYTES
+    )
+    _shared_stacks = _flag_option(config, "stories_shared_stacks", "EXECUTABLE_STORIES_SHARED_STACKS")
+    _outlines = _flag_option(config, "stories_outlines", "EXECUTABLE_STORIES_OUTLINES")
+    _static_stats = None
+
+    _tag_index = None
+    _file_hashes.clear()
+    _recorded.clear()
+    _plain_results.clear()
+    _project = None
+
+    _impact_tracer = None
+    _worker_impact.clear()
+    # A pytest-xdist controller runs no tests; it only gathers the workers' maps.
+    if not config.pluginmanager.hasplugin("dsession") and _flag_option(
+        config, "stories_impact_map", "EXECUTABLE_STORIES_IMPACT_MAP"
+    ):
+        from executable_stories._impact import _ImpactTracer
+
+        tracer = _ImpactTracer(str(config.rootdir))
+        try:
+            started = tracer.start()
+        except RuntimeError as exc:
+            raise pytest.UsageError(f"--stories-impact-map: {exc}; it cannot record alongside them") from exc
+        if started:
+            _impact_tracer = tracer
+            config.pluginmanager.register(_ImpactHooks(tracer), _IMPACT_HOOKS)
+
+    story._set_spans(None)
+    otel_exporter = _str_option(config, "stories_otel_steps", "EXECUTABLE_STORIES_OTEL_STEPS", "")
+    if otel_exporter:
+        story._set_spans(_step_spans(otel_exporter))
 
-# We store per-test start times keyed by node id.
-_test_start_times: dict[str, float] = {}
+    _span_summary = None
+    if _flag_option(config, "stories_span_summary", "EXECUTABLE_STORIES_SPAN_SUMMARY"):
+        _span_summary = _span_summary_processor(config)
+
+    _collection_profiler = None
+    profile_imports = _flag_option(config, "stories_profile_imports", "EXECUTABLE_STORIES_PROFILE_IMPORTS")
+    if profile_imports or _flag_option(config, "stories_profile_collection", "EXECUTABLE_STORIES_PROFILE_COLLECTION"):
+        from executable_stories._collect_profile import _CollectionProfiler
+
+        _collection_profiler = _CollectionProfiler(str(config.rootdir), imports=profile_imports)
+        config.pluginmanager.register(_CollectionHooks(_collection_profiler), _COLLECTION_HOOKS)
+
+    _rerun_hooks = None
+    if config.pluginmanager.hasplugin("rerunfailures"):
+        _rerun_hooks = _RerunHooks()
+        config.pluginmanager.register(_rerun_hooks, _RERUN_HOOKS)
+
+    _trace_writer = None
+    trace_path = _str_option(config, "stories_chrome_trace", "EXECUTABLE_STORIES_CHROME_TRACE", "")
+    if trace_path:
+        _trace_writer = _start_trace(config, trace_path)
+
+    _junit_writer = None
+    junit_path = _str_option(config, "stories_junit", "EXECUTABLE_STORIES_JUNIT", "")
+    if junit_path:
+        _junit_writer = _start_junit(config, junit_path)
+
+    _formatter_pipe = None
+    pipe_command = _str_option(config, "stories_pipe", "EXECUTABLE_STORIES_PIPE", "")
+    if pipe_command:
+        from executable_stories._pipe import _FormatterPipe
+
+        if config.pluginmanager.hasplugin("dsession") or hasattr(config, "workerinput"):
+            raise pytest.UsageError("--stories-pipe cannot be combined with pytest-xdist (-n)")
+        _formatter_pipe = _FormatterPipe(
+            shlex.split(pipe_command),
+            stream_format=_str_option(config, "stories_pipe_format", "EXECUTABLE_STORIES_PIPE_FORMAT", "json"),
+        )
+        _formatter_pipe.start(_run_header(config))
+
+
+def _step_spans(exporter: str) -> _StepSpans:
+    from executable_stories._otel import _StepSpans, make_exporter, trace_api
+
+    if exporter not in OTEL_EXPORTERS:
+        raise pytest.UsageError(f"--stories-otel-steps: unknown exporter {exporter!r}")
+    if trace_api() is None:
+        raise pytest.UsageError(
+            "--stories-otel-steps needs opentelemetry-api and opentelemetry-sdk"
+            " (pip install executable-stories-pytest[otel-export])"
+        )
+    try:
+        return _StepSpans(make_exporter(exporter))
+    except ImportError as exc:
+        raise pytest.UsageError(f"--stories-otel-steps={exporter}: {exc}") from exc
+
+
+def _start_trace(config: pytest.Config, path: str) -> _TraceEventWriter | None:
+    """Open this process's trace stream; a pytest-xdist controller only combines the workers' parts."""
+    from executable_stories._trace_events import _TraceEventWriter, clear_parts, part_path
+
+    if config.pluginmanager.hasplugin("dsession"):
+        clear_parts(path)
+        return None
+    workerinput = getattr(config, "workerinput", None)
+    if workerinput is not None:
+        worker_id = workerinput.get("workerid", "gw")
+        writer = _TraceEventWriter(part_path(path, worker_id), f"pytest {worker_id}")
+    else:
+        writer = _TraceEventWriter(path, "pytest")
+    config.pluginmanager.register(_TraceHooks(writer), _TRACE_HOOKS)
+    return writer
+
+
+def _start_junit(config: pytest.Config, path: str) -> _JUnitWriter | None:
+    """Open this process's JUnit writer; a pytest-xdist controller only combines the workers' parts."""
+    from executable_stories._junit import _JUnitWriter, clear_parts, part_path
+
+    if config.pluginmanager.hasplugin("dsession"):
+        clear_parts(path)
+        return None
+    workerinput = getattr(config, "workerinput", None)
+    if workerinput is not None:
+        return _JUnitWriter(part_path(path, workerinput.get("workerid", "gw")))
+    return _JUnitWriter(path)
+
+
+def _span_summary_processor(config: pytest.Config) -> _SpanSummaryProcessor:
+    try:
+        from executable_stories._span_summary import DEFAULT_TOP, install
+
+        top = _int_option(config, "stories_span_summary_top", "EXECUTABLE_STORIES_SPAN_SUMMARY_TOP", DEFAULT_TOP)
+        return install(story, top)
+    except ImportError as exc:
+        raise pytest.UsageError(
+            f"--stories-span-summary needs opentelemetry-sdk (pip install executable-stories-pytest[otel-export]): {exc}"
+        ) from exc
+
+
+def _reports_requested(config: pytest.Config) -> bool:
+    """Whether an output was configured, so a run without stories still writes it."""
+    return bool(
+        os.environ.get("EXECUTABLE_STORIES_OUTPUT")
+        or _str_option(config, "stories_junit", "EXECUTABLE_STORIES_JUNIT", "")
+        or _str_option(config, "stories_pipe", "EXECUTABLE_STORIES_PIPE", "")
+        or _str_option(config, "stories_markdown", "EXECUTABLE_STORIES_MARKDOWN", "")
+        or _flag_option(config, "stories_collect_only", "EXECUTABLE_STORIES_COLLECT_ONLY")
+        or _flag_option(config, "stories_ndjson", "EXECUTABLE_STORIES_NDJSON")
+        or _flag_option(config, "stories_compact", "EXECUTABLE_STORIES_COMPACT")
+        or _flag_option(config, "stories_profile_collection", "EXECUTABLE_STORIES_PROFILE_COLLECTION")
+        or _flag_option(config, "stories_profile_imports", "EXECUTABLE_STORIES_PROFILE_IMPORTS")
+    )
+
+
+def _loaded_tag_index(config: pytest.Config) -> _TagIndex:
+    """Return the tag/ticket index, loading it from the pytest cache on first use."""
+    global _tag_index
+    if _tag_index is None:
+        from executable_stories._tag_index import CACHE_KEY, _TagIndex
+
+        cache = getattr(config, "cache", None)
+        _tag_index = _TagIndex(cache.get(CACHE_KEY, None) if cache is not None else None)
+    return _tag_index
+
+
+def _run_header(config: pytest.Config) -> dict[str, Any]:
+    """Return the RawRun fields known at session start."""
+    header: dict[str, Any] = {
+        "schemaVersion": 1,
+        "projectRoot": str(config.rootdir),
+        "startedAtMs": round(_started_at_ms, 2),
+        **_project_fields(config),
+    }
+    ci = _detect_ci()
+    if ci is not None:
+        header["ci"] = ci
+    return header
+
+
+def _project_fields(config: pytest.Config) -> dict[str, str]:
+    """Return the run's packageVersion / gitSha fields, resolving them on first use."""
+    global _project
+    if _project is None:
+        workerinput = getattr(config, "workerinput", None)
+        if workerinput is not None and _WORKER_INPUT_KEY in workerinput:
+            _project = dict(workerinput[_WORKER_INPUT_KEY])
+        else:
+            from executable_stories._metadata import project_fields
+
+            _project = project_fields(str(config.rootdir))
+    return _project
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node: Any) -> None:
+    """Resolve the project fields once on the pytest-xdist controller and hand them to each worker."""
+    node.workerinput[_WORKER_INPUT_KEY] = _project_fields(node.config)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node: Any, error: Any) -> None:
+    """Collect a finished pytest-xdist worker's results on the controller."""
+    workeroutput = getattr(node, "workeroutput", None) or {}
+    tag_updates = workeroutput.get(_TAG_INDEX_OUTPUT_KEY)
+    if tag_updates:
+        _loaded_tag_index(node.config).merge(tag_updates)
+    for external_id, (files, functions) in (workeroutput.get(_IMPACT_OUTPUT_KEY) or {}).items():
+        _worker_impact[external_id] = (set(files), set(functions))
+
+
+def _output_path(config: pytest.Config) -> str:
+    return os.environ.get(
+        "EXECUTABLE_STORIES_OUTPUT",
+        os.path.join(str(config.rootdir), ".executable-stories", "raw-run.json"),
+    )
+
+
+def _impact_map_path(config: pytest.Config) -> str:
+    return os.path.join(os.path.dirname(_output_path(config)), "impact-map.json")
+
+
+def _openmetrics_path(config: pytest.Config) -> str:
+    from executable_stories._metrics import OPENMETRICS_NAME
+
+    default = os.path.join(os.path.dirname(_output_path(config)), OPENMETRICS_NAME)
+    return _str_option(config, "stories_openmetrics", "EXECUTABLE_STORIES_OPENMETRICS", default)
+
+
+def _file_hash(path: str) -> str:
+    """Return the content hash of a test module, computed once per session."""
+    digest = _file_hashes.get(path)
+    if digest is None:
+        from executable_stories._static import source_hash
+
+        try:
+            with open(path, "rb") as f:
+                digest = source_hash(f.read())
+        except OSError:
+            digest = ""
+        _file_hashes[path] = digest
+    return digest
+
+
+# ── Static collection ─────────────────────────────────────────────
+
+
+def _source_order_of(nodeid: str) -> int | None:
+    if not _source_order and _collected:
+        _source_order.update((item.nodeid, i) for i, item in enumerate(_collected))
+        _collected.clear()
+    return _source_order.get(nodeid)
+
+
+def _static_key(item: pytest.Item) -> str:
+    """Return the item's ``Class::func`` path within its module, without params."""
+    parts = item.nodeid.split("::")[1:]
+    if parts:
+        parts[-1] = parts[-1].split("[", 1)[0]
+    return "::".join(parts)
+
+
+class _CollectionHooks:
+    """Times module and class collection for the collection profiler.
+
+    Registered only while profiling, like ``_ImpactHooks``.
+    """
+
+    def __init__(self, profiler: _CollectionProfiler) -> None:
+        self.profiler = profiler
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_collection(self, session: pytest.Session) -> Any:
+        self.profiler.start()
+        try:
+            yield
+        finally:
+            self.profiler.stop()
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_make_collect_report(self, collector: pytest.Collector) -> Any:
+        if not isinstance(collector, (pytest.File, pytest.Class)):
+            yield
+            return
+        started = self.profiler.begin_module(str(collector.path))
+        outcome = yield
+        items = 0
+        if outcome.excinfo is None:
+            items = sum(1 for node in outcome.get_result().result if isinstance(node, pytest.Item))
+        self.profiler.end_module(started, items)
+
+
+def pytest_collection_modifyitems(session: pytest.Session, config: pytest.Config, items: list[pytest.Item]) -> None:
+    """Record collection order, then apply --story-tags / --story-tickets and --stories-affected-by."""
+    _collected[:] = items
+    _source_order.clear()
+    _select_by_story(config, items)
+    _select_affected(config, items)
+
+
+def _select_by_story(config: pytest.Config, items: list[pytest.Item]) -> None:
+    tags = _str_option(config, "story_tags", "EXECUTABLE_STORIES_TAGS", "")
+    tickets = _str_option(config, "story_tickets", "EXECUTABLE_STORIES_TICKETS", "")
+    if not tags and not tickets:
+        return
+    from executable_stories._static import _StaticExtractor
+    from executable_stories._tag_index import matches, parse_filter
+
+    want_tags = parse_filter(tags)
+    want_tickets = parse_filter(tickets)
+    if not want_tags and not want_tickets:
+        return
+
+    tag_index = _loaded_tag_index(config)
+    extractor: _StaticExtractor | None = None
+    selected: list[pytest.Item] = []
+    deselected: list[pytest.Item] = []
+    for item in items:
+        path = str(item.path)
+        file = item.nodeid.split("::", 1)[0]
+        known = tag_index.lookup(file, _file_hash(path), item.nodeid)
+        if known is None:
+            # Not indexed yet (or the file changed): fall back to static extraction.
+            if extractor is None:
+                extractor = _StaticExtractor(getattr(config, "cache", None))
+            story_meta = extractor.stories_for(path).get(_static_key(item), {})
+            known = (story_meta.get("tags", []), story_meta.get("tickets", []))
+        if matches(known[0], known[1], want_tags, want_tickets):
+            selected.append(item)
+        else:
+            deselected.append(item)
+
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+
+
+def _select_affected(config: pytest.Config, items: list[pytest.Item]) -> None:
+    changed_list = _str_option(config, "stories_affected_by", "EXECUTABLE_STORIES_AFFECTED_BY", "")
+    if not changed_list:
+        return
+    from executable_stories._impact import is_affected, load_map, read_changed_files
+
+    changed = read_changed_files(changed_list, str(config.rootdir))
+    impact = load_map(_impact_map_path(config))
+
+    selected: list[pytest.Item] = []
+    deselected: list[pytest.Item] = []
+    for item in items:
+        if is_affected(item.nodeid, impact, changed):
+            selected.append(item)
+        else:
+            deselected.append(item)
+
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+
+
+def pytest_collection_finish(session: pytest.Session) -> None:
+    """In --stories-collect-only mode, record a pending case per collected item."""
+    global _static_stats
+    if not _flag_option(session.config, "stories_collect_only", "EXECUTABLE_STORIES_COLLECT_ONLY"):
+        return
+    from executable_stories._static import _StaticExtractor
+
+    extractor = _StaticExtractor(getattr(session.config, "cache", None))
+    for item in session.items:
+        test_case: dict[str, Any] = {
+            "status": "pending",
+            "externalId": item.nodeid,
+            "title": item.name,
+        }
+        path = str(item.path)
+        test_case["sourceFile"] = path
+        if item.location and item.location[1] is not None:
+            test_case["sourceLine"] = item.location[1] + 1
+        story_meta = extractor.stories_for(path).get(_static_key(item))
+        if story_meta is not None:
+            order = _source_order_of(item.nodeid)
+            test_case["story"] = story_meta if order is None else {**story_meta, "sourceOrder": order}
+        _collector.record(test_case)
+
+    _static_stats = {"modulesParsed": extractor.parsed, "modulesCached": extractor.cached}
+
+
+# ── Fixture hooks ─────────────────────────────────────────────────
 
 
 @pytest.hookimpl(hookwrapper=True)
-def pytest_runtest_call(item: pytest.Item) -> Any:
-    """Wrap test execution to set up / tear down the story context."""
-    _test_start_times[item.nodeid] = time.time() * 1000
-    yield
-    # Story context is cleared after report is built (in makereport)
+def pytest_fixture_setup(fixturedef: pytest.FixtureDef[Any], request: pytest.FixtureRequest) -> Any:
+    """Let story.background() calls know which fixture they belong to.
+
+    Until the session's first story nothing is tracked; a Background
+    declared before then finds its fixture on the call stack, and is timed
+    from its declaration to the end of the fixture's setup.
+    """
+    if not story._active:
+        yield
+        if story._active:
+            story._exit_fixture(fixturedef)
+        return
+    story._enter_fixture(fixturedef, fixturedef.argname, fixturedef.scope)
+    try:
+        yield
+    finally:
+        story._exit_fixture()
+
+
+def _fixture_keys(item: pytest.Item) -> list[Any]:
+    """Return the active FixtureDef for each fixture the item uses."""
+    info = getattr(item, "_fixtureinfo", None)
+    if info is None:
+        return []
+    keys: list[Any] = []
+    for name in getattr(item, "fixturenames", ()):
+        defs = info.name2fixturedefs.get(name)
+        if defs:
+            keys.append(defs[-1])
+    return keys
+
+
+# ── Per-test hooks ─────────────────────────────────────────────────
+
+
+class _ImpactHooks:
+    """Attributes code run during setup, call and teardown to the test's impact entry.
+
+    Registered only while --stories-impact-map traces the session, so other
+    runs do not pay for the wrapper.
+    """
+
+    def __init__(self, tracer: _ImpactTracer) -> None:
+        self.tracer = tracer
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item: pytest.Item, nextitem: pytest.Item | None) -> Any:
+        self.tracer.begin_test()
+        try:
+            yield
+        finally:
+            self.tracer.end_test(item.nodeid)
+
+
+class _TraceHooks:
+    """Streams each setup/call/teardown report to the trace file.
+
+    Registered only with --stories-chrome-trace, like ``_ImpactHooks``.
+    """
+
+    def __init__(self, writer: _TraceEventWriter) -> None:
+        self.writer = writer
+
+    def pytest_runtest_logreport(self, report: pytest.TestReport) -> None:
+        self.writer.phase(report)
+
+
+class _Attempt:
+    """What one call phase produced that only the test's final attempt may publish."""
+
+    __slots__ = ("test_case", "metrics", "failure", "stream")
+
+    def __init__(
+        self,
+        test_case: dict[str, Any],
+        metrics: list[tuple[str, float, str | None, dict[str, str]]],
+        failure: dict[str, Any] | None,
+        stream: bool,
+    ) -> None:
+        self.test_case = test_case
+        self.metrics = metrics
+        self.failure = failure
+        # Outline rows are streamed at session end, once collapsed.
+        self.stream = stream
+
+
+def _publish(attempt: _Attempt) -> None:
+    story._metrics.add_all(attempt.metrics)
+    failure = attempt.failure
+    if failure is not None:
+        _failures.record(**failure)
+    if _junit_writer is not None:
+        _junit_writer.add(attempt.test_case, stack=failure["stack"] if failure is not None else None)
+    if _formatter_pipe is not None and attempt.stream:
+        _formatter_pipe.send(attempt.test_case)
+
+
+class _RerunHooks:
+    """Publishes a test's final attempt once pytest-rerunfailures is done with it.
+
+    Each attempt's call phase replaces the previous one in ``_pending``, so
+    superseded attempts never reach the session aggregates. Registered
+    only when pytest-rerunfailures is loaded; otherwise every call phase is
+    final and makereport publishes it right away.
+    """
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item: pytest.Item, nextitem: pytest.Item | None) -> Any:
+        try:
+            yield
+        finally:
+            attempt = _pending.pop(item.nodeid, None)
+            if attempt is not None:
+                _publish(attempt)
 
 
 _STATUS_MAP = {
     "passed": "pass",
     "failed": "fail",
     "skipped": "skip",
+    "rerun": "fail",
 }
 
 
+def _configured_reruns(item: pytest.Item) -> int:
+    """Return the rerun count from a ``flaky`` marker or ``--reruns``."""
+    marker = item.get_closest_marker("flaky")
+    if marker is not None:
+        reruns = marker.kwargs.get("reruns", marker.args[0] if marker.args else 1)
+        return int(reruns)
+    reruns = getattr(item.session.config.option, "reruns", None)
+    return int(reruns) if reruns else 0
+
+
 @pytest.hookimpl(hookwrapper=True)
 def pytest_runtest_makereport(item: pytest.Item, call: pytest.CallInfo[None]) -> Any:
     """Capture test result on the 'call' phase and record it."""
     outcome = yield
+    # Until the session's first story.init() nothing is recorded; plain
+    # tests that finished before it are filled in at session end.
+    if not story._active:
+        return
     report: pytest.TestReport = outcome.get_result()
-
     if report.when != "call":
         return
+    _recorded.add(item.nodeid)
+
+    # Retry info from pytest-rerunfailures (if available); the collector
+    # merges later attempts into the first one by externalId.
+    rerun = getattr(item, "execution_count", None)
+    retry = (rerun - 1) if rerun is not None and rerun > 0 else 0
+    test_case, failure = _base_case(item, report, call.excinfo, retry)
+
+    if _trace_writer is not None and story._ctx is not None:
+        _trace_writer.steps(item.nodeid, story._ctx.steps)
+
+    if _span_summary is not None:
+        from executable_stories._span_summary import attach_summaries
+
+        attach_summaries(story)
+
+    # Story metadata
+    story_meta = story._get_meta(resolve=False)
+    if story_meta is not None:
+        _loaded_tag_index(item.config).update(
+            item.nodeid.split("::", 1)[0],
+            _file_hash(str(item.path)),
+            item.nodeid,
+            story_meta.get("tags", []),
+            story_meta.get("tickets", []),
+        )
+        order = _source_order_of(item.nodeid)
+        if order is not None:
+            story_meta["sourceOrder"] = order
+        test_case["story"] = story_meta
+        # Build stepEvents from steps with durationMs
+        step_events: list[dict[str, Any]] = []
+        if "steps" in story_meta:
+            for i, step in enumerate(story_meta["steps"]):
+                if "durationMs" in step:
+                    step_events.append({
+                        "index": i,
+                        "title": step["text"],
+                        "durationMs": step["durationMs"],
+                    })
+        if step_events:
+            test_case["stepEvents"] = step_events
+        dropped = story._get_dropped_doc_bytes()
+        if dropped:
+            test_case.setdefault("meta", {})["droppedDocBytes"] = dropped
+
+    background_ids = story._get_background_ids(_fixture_keys(item))
+    if background_ids:
+        test_case.setdefault("meta", {})["backgrounds"] = background_ids
+
+    # Attachments
+    attachments = story._get_attachments()
+    if attachments:
+        test_case["attachments"] = attachments
 
-    # Build the test case dict
-    start_ms = _test_start_times.pop(item.nodeid, 0.0)
-    now_ms = time.time() * 1000
-    duration_ms = now_ms - start_ms if start_ms else 0.0
+    callspec = getattr(item, "callspec", None)
+    outline_row = _outlines and callspec is not None and "story" in test_case
+    if outline_row:
+        suffix = f"[{callspec.id}]"
+        outline_id = item.nodeid[: -len(suffix)] if item.nodeid.endswith(suffix) else item.nodeid
+        title = getattr(item, "originalname", item.name)
+        _collector.record_example(outline_id, title, test_case, callspec.id, callspec.params)
+    else:
+        _collector.record(test_case)
+
+    attempt = _Attempt(test_case, story._get_metric_samples(), failure, stream=not outline_row)
+    if _rerun_hooks is not None:
+        _pending[item.nodeid] = attempt
+    else:
+        _publish(attempt)
+
+    # Close the test's spans, then clear story context for next test
+    story._finish_spans("failed" if report.outcome == "rerun" else report.outcome)
+    story._clear()
 
+
+def _base_case(
+    item: pytest.Item,
+    report: pytest.TestReport,
+    excinfo: pytest.ExceptionInfo[BaseException] | None,
+    retry: int,
+) -> tuple[dict[str, Any], dict[str, Any] | None]:
+    """Build the RawTestCase fields every test has: status, timing, source and error.
+
+    Also returns the failure to file in the failure index, if the caller
+    knows this attempt is the test's final one.
+    """
     # Status mapping
     if hasattr(report, "wasxfail"):
         status = "skip"
     else:
         status = _STATUS_MAP.get(report.outcome, "unknown")
 
-    # Retry info from pytest-rerunfailures (if available)
-    rerun = getattr(item, "execution_count", None)
-    retry = (rerun - 1) if rerun is not None and rerun > 0 else 0
-    reruns_count = getattr(item.session.config, "_rerun_count", None)
-    retries = reruns_count if reruns_count is not None else 0
-
     test_case: dict[str, Any] = {
         "status": status,
         "externalId": item.nodeid,
         "title": item.name,
-        "durationMs": round(duration_ms, 2),
+        "durationMs": round(report.duration * 1000, 2),
         "retry": retry,
-        "retries": retries,
+        "retries": _configured_reruns(item),
     }
 
     # Source file info
@@ -151,70 +1035,334 @@ def pytest_runtest_makereport(item: pytest.Item, call: pytest.CallInfo[None]) ->
         pass
 
     # Error info
+    failure = None
     if report.failed and report.longrepr:
-        error: dict[str, str] = {}
         if isinstance(report.longrepr, tuple):
-            error["message"] = str(report.longrepr[2])
-            error["stack"] = f"{report.longrepr[0]}:{report.longrepr[1]}"
+            test_case["error"] = {
+                "message": str(report.longrepr[2]),
+                "stack": f"{report.longrepr[0]}:{report.longrepr[1]}",
+            }
         else:
-            repr_str = str(report.longrepr)
-            error["message"] = repr_str
-            error["stack"] = repr_str
-        test_case["error"] = error
+            failure = _capture_failure(item, excinfo, report, test_case)
+    return test_case, failure
 
-    # Story metadata
-    story_meta = story._get_meta()
-    if story_meta is not None:
-        test_case["story"] = story_meta
-        # Build stepEvents from steps with durationMs
-        step_events: list[dict[str, Any]] = []
-        if "steps" in story_meta:
-            for i, step in enumerate(story_meta["steps"]):
-                if "durationMs" in step:
-                    step_events.append({
-                        "index": i,
-                        "title": step["text"],
-                        "durationMs": step["durationMs"],
-                    })
-        if step_events:
-            test_case["stepEvents"] = step_events
 
-    # Attachments
-    attachments = story._get_attachments()
-    if attachments:
-        test_case["attachments"] = attachments
+def _capture_failure(
+    item: pytest.Item,
+    excinfo: pytest.ExceptionInfo[BaseException] | None,
+    report: pytest.TestReport,
+    test_case: dict[str, Any],
+) -> dict[str, Any]:
+    """Record a bounded crash message and stack, and return the failure index entry.
 
-    _collector.record(test_case)
+    ``excinfo`` is None for tests recorded from their report at session end.
+    """
+    longrepr = report.longrepr
+    crash = getattr(longrepr, "reprcrash", None)
+    if crash is not None:
+        message = crash.message
+        path = crash.path
+        try:
+            path = os.path.relpath(path, str(item.config.rootdir))
+        except ValueError:
+            pass
+        location = f"{path}:{crash.lineno}"
+    else:
+        message = str(longrepr).strip().split("\n")[-1]
+        location = ""
 
-    # Clear story context for next test
-    story._clear()
+    if excinfo is not None:
+        exception_type = excinfo.typename
+    else:
+        exception_type = message.split(":", 1)[0]
+
+    if _tb_style != "auto" and excinfo is not None:
+        stack = str(excinfo.getrepr(style=_tb_style, funcargs=False))  # type: ignore[arg-type]
+    else:
+        stack = str(longrepr)
+    stack = bound_text(stack, _max_error_bytes)
+    message = bound_text(message, _max_error_bytes)
+
+    fp = fingerprint(exception_type, location, message)
+    error: dict[str, str] = {"message": message}
+    if not _shared_stacks:
+        error["stack"] = stack
+    test_case["error"] = error
+    test_case.setdefault("meta", {})["errorFingerprint"] = fp
+    return {
+        "fp": fp,
+        "external_id": item.nodeid,
+        "exception_type": exception_type,
+        "location": location,
+        "message": message,
+        "stack": stack,
+    }
+
+
+def pytest_runtest_logreport(report: pytest.TestReport) -> None:
+    """Note the outcome of plain tests that finish before the first story."""
+    if story._active or report.when != "call":
+        return
+    longrepr = report.longrepr if report.failed else None
+    _plain_results.append((report.nodeid, report.outcome, report.duration, longrepr, hasattr(report, "wasxfail")))
+
+
+def _plain_cases_before_first_story(session: pytest.Session) -> list[dict[str, Any]]:
+    """Build the cases of tests that finished before the first story.init().
+
+    Until then only their outcome is noted (see pytest_runtest_logreport),
+    so tests in a session cost next to nothing until a story shows up.
+    """
+    results = [result for result in _plain_results if result[0] not in _recorded]
+    if not results:
+        return []
+
+    items = {item.nodeid: item for item in session.items}
+    attempts: dict[str, int] = {}
+    plain = _Collector()
+    for nodeid, outcome, duration, longrepr, xfail in results:
+        item = items.get(nodeid)
+        if item is None:
+            continue
+        report = pytest.TestReport(nodeid, item.location, {}, outcome, longrepr, "call", duration=duration)
+        if xfail:
+            report.wasxfail = ""
+        retry = attempts.get(nodeid, 0)
+        attempts[nodeid] = retry + 1
+        test_case, failure = _base_case(item, report, None, retry)
+        # Attempts pytest-rerunfailures retried are reported as "rerun".
+        if failure is not None and report.outcome != "rerun":
+            _failures.record(**failure)
+        background_ids = story._get_background_ids(_fixture_keys(item))
+        if background_ids:
+            test_case.setdefault("meta", {})["backgrounds"] = background_ids
+        plain.record(test_case)
+    return plain.get_all()
 
 
 # ── Session finish — write output ──────────────────────────────────
 
 
 def pytest_sessionfinish(session: pytest.Session, exitstatus: int) -> None:
-    test_cases = _collector.get_all()
-    if not test_cases:
+    global _impact_tracer, _junit_writer, _span_summary, _trace_writer, _rerun_hooks
+    # A pytest-xdist worker hands its results to the controller, which
+    # writes the shared files once; concurrent writes would drop entries.
+    workeroutput = getattr(session.config, "workeroutput", None)
+    cache = getattr(session.config, "cache", None)
+    if _tag_index is not None and _tag_index.changed:
+        if workeroutput is not None:
+            workeroutput[_TAG_INDEX_OUTPUT_KEY] = _tag_index.updates()
+        elif cache is not None:
+            from executable_stories._tag_index import CACHE_KEY
+
+            cache.set(CACHE_KEY, _tag_index.to_dict())
+
+    impact_tests = _worker_impact
+    if _impact_tracer is not None:
+        session.config.pluginmanager.unregister(name=_IMPACT_HOOKS)
+        _impact_tracer.stop()
+        impact_tests = _impact_tracer.tests
+        _impact_tracer = None
+    if impact_tests:
+        if workeroutput is not None:
+            workeroutput[_IMPACT_OUTPUT_KEY] = {
+                external_id: [sorted(files), sorted(functions)]
+                for external_id, (files, functions) in impact_tests.items()
+            }
+        else:
+            from executable_stories._impact import load_map, write_map
+
+            # Keep entries of tests that did not run this time.
+            map_path = _impact_map_path(session.config)
+            impact = load_map(map_path)
+            impact.update(impact_tests)
+            write_map(map_path, impact)
+
+    spans = story._spans
+    if spans is not None:
+        spans.shutdown()
+        story._set_spans(None)
+
+    if _span_summary is not None:
+        _span_summary.enabled = False
+        _span_summary = None
+
+    if _rerun_hooks is not None:
+        session.config.pluginmanager.unregister(name=_RERUN_HOOKS)
+        _rerun_hooks = None
+
+    if _trace_writer is not None:
+        session.config.pluginmanager.unregister(name=_TRACE_HOOKS)
+        _trace_writer.close()
+        _trace_writer = None
+    elif session.config.pluginmanager.hasplugin("dsession"):
+        trace_path = _str_option(session.config, "stories_chrome_trace", "EXECUTABLE_STORIES_CHROME_TRACE", "")
+        if trace_path:
+            from executable_stories._trace_events import combine_parts
+
+            combine_parts(trace_path)
+
+    collection_profile: dict[str, Any] | None = None
+    if _collection_profiler is not None:
+        session.config.pluginmanager.unregister(name=_COLLECTION_HOOKS)
+        collection_profile = _collection_profiler.summary()
+
+    # No story and no report asked for: nothing to write.
+    if not story._active:
         return
 
     finished_at_ms = time.time() * 1000
+    if _junit_writer is not None:
+        if workeroutput is not None:
+            _junit_writer.close_part()
+        else:
+            _junit_writer.close(_started_at_ms, finished_at_ms)
+        _junit_writer = None
+    elif session.config.pluginmanager.hasplugin("dsession"):
+        junit_path = _str_option(session.config, "stories_junit", "EXECUTABLE_STORIES_JUNIT", "")
+        if junit_path:
+            from executable_stories._junit import combine_parts as combine_junit_parts
 
-    raw_run: dict[str, Any] = {
-        "schemaVersion": 1,
-        "testCases": test_cases,
-        "projectRoot": str(session.config.rootdir),
-        "startedAtMs": round(_started_at_ms, 2),
-        "finishedAtMs": round(finished_at_ms, 2),
-    }
+            combine_junit_parts(junit_path, _started_at_ms, finished_at_ms)
 
-    ci = _detect_ci()
-    if ci is not None:
-        raw_run["ci"] = ci
+    test_cases = _collector.get_all()
+    test_cases[:0] = _plain_cases_before_first_story(session)
+    # A collection profile is worth a run without test cases (e.g. --collect-only).
+    has_content = bool(test_cases) or collection_profile is not None
+    if not has_content and _formatter_pipe is None:
+        return
 
-    output_path = os.environ.get(
-        "EXECUTABLE_STORIES_OUTPUT",
-        os.path.join(str(session.config.rootdir), ".executable-stories", "raw-run.json"),
+    raw_run: dict[str, Any] = {"schemaVersion": 1, "testCases": test_cases, **_run_header(session.config)}
+    raw_run["finishedAtMs"] = round(finished_at_ms, 2)
+
+    budget_summary = story._budget.summary()
+    if budget_summary is not None:
+        raw_run.setdefault("meta", {})["docBudget"] = budget_summary
+
+    failure_groups = _failures.summary()
+    if failure_groups:
+        raw_run.setdefault("meta", {})["failures"] = failure_groups
+
+    backgrounds = story._backgrounds.summary()
+    if backgrounds:
+        raw_run.setdefault("meta", {})["backgrounds"] = backgrounds
+
+    metrics = story._metrics.summary()
+    if metrics:
+        raw_run.setdefault("meta", {})["metrics"] = metrics
+
+    if _static_stats is not None:
+        raw_run.setdefault("meta", {})["staticExtraction"] = _static_stats
+
+    if collection_profile is not None:
+        raw_run.setdefault("meta", {})["collectionProfile"] = collection_profile
+
+    from executable_stories._content_hash import MANIFEST_NAME, build_manifest, write_manifest
+
+    manifest = build_manifest(test_cases)
+
+    if metrics:
+        from executable_stories._metrics import write_openmetrics
+
+        write_openmetrics(metrics, _openmetrics_path(session.config))
+
+    if _formatter_pipe is not None:
+        _finish_pipe(_formatter_pipe, raw_run)
+    if not has_content or _flag_option(session.config, "stories_no_raw_run", "EXECUTABLE_STORIES_NO_RAW_RUN"):
+        return
+
+    from executable_stories._json_writer import write_raw_run, write_raw_run_ndjson
+
+    output_path = _output_path(session.config)
+    write_manifest(manifest, os.path.join(os.path.dirname(output_path), MANIFEST_NAME))
+
+    if _flag_option(session.config, "stories_ndjson", "EXECUTABLE_STORIES_NDJSON"):
+        write_raw_run_ndjson(raw_run, os.path.splitext(output_path)[0] + ".ndjson")
+    else:
+        compact = _flag_option(session.config, "stories_compact", "EXECUTABLE_STORIES_COMPACT")
+        write_raw_run(raw_run, output_path, compact=compact)
+
+    markdown_dir = _str_option(session.config, "stories_markdown", "EXECUTABLE_STORIES_MARKDOWN", "")
+    if markdown_dir:
+        from executable_stories._markdown import _MarkdownWriter
+
+        _MarkdownWriter(markdown_dir, project_root=raw_run["projectRoot"]).render(raw_run, test_cases)
+
+
+def _finish_pipe(pipe: _FormatterPipe, raw_run: dict[str, Any]) -> None:
+    """Stream the cases not sent yet (outlines, static cases), then the closing fields."""
+    for test_case in raw_run["testCases"]:
+        if not pipe.was_sent(test_case.get("externalId")):
+            pipe.send(test_case)
+    sent_at_start = {"schemaVersion", "projectRoot", "startedAtMs", "packageVersion", "gitSha", "ci", "testCases"}
+    pipe.finish({k: v for k, v in raw_run.items() if k not in sent_at_start})
+
+
+def pytest_terminal_summary(terminalreporter: Any, exitstatus: int, config: pytest.Config) -> None:
+    budget_summary = story._budget.summary()
+    if budget_summary is not None:
+        terminalreporter.write_line(
+            f"executable-stories: truncated {budget_summary['truncatedEntries']} doc entries, "
+            f"dropped {budget_summary['droppedBytes']} bytes"
+        )
+
+    failure_groups = _failures.summary()
+    if failure_groups:
+        total = sum(g["count"] for g in failure_groups)
+        terminalreporter.write_line(
+            f"executable-stories: {total} failures in {len(failure_groups)} groups"
+        )
+        for group in failure_groups[:5]:
+            first_line = group["message"].split("\n", 1)[0]
+            terminalreporter.write_line(
+                f"  {group['count']:>5} x [{group['fingerprint']}] {group['location']}: {first_line}"
+            )
+
+    if _collection_profiler is not None:
+        _write_collection_profile(terminalreporter, _collection_profiler.summary())
+
+    pipe = _formatter_pipe
+    if pipe is not None:
+        if pipe.error is not None:
+            terminalreporter.write_line(f"executable-stories: pipe failed: {pipe.error}", red=True)
+        elif pipe.returncode:
+            terminalreporter.write_line(f"executable-stories: formatter exited with {pipe.returncode}", red=True)
+        for line in pipe.output.splitlines():
+            terminalreporter.write_line(f"  {line}")
+
+
+def _write_collection_profile(terminalreporter: Any, profile: dict[str, Any]) -> None:
+    terminalreporter.write_line(
+        f"executable-stories: collection took {profile['totalMs']:.0f} ms "
+        f"({profile['moduleCount']} modules, {profile['otherMs']:.0f} ms outside them)"
     )
+    for module in profile["modules"][:5]:
+        terminalreporter.write_line(
+            f"  {module['durationMs']:>9.1f} ms  {module['path']} ({module['items']} items)"
+        )
+    imports = profile.get("imports")
+    if imports and imports["packages"]:
+        terminalreporter.write_line("  import time by package (self):")
+        for package in imports["packages"][:5]:
+            terminalreporter.write_line(f"  {package['selfMs']:>9.1f} ms  {package['name']}")
 
-    write_raw_run(raw_run, output_path)
+
+def pytest_unconfigure(config: pytest.Config) -> None:
+    """Drop the session's module-level state.
+
+    A session run in-process inside another one (pytester's ``runpytest``)
+    shares these globals; without this its cases and aggregates would end
+    up in the enclosing session's output.
+    """
+    global _collection_profiler, _formatter_pipe
+    story._active = False
+    story._clear()
+    story._backgrounds.clear()
+    story._metrics.clear()
+    _collector.clear()
+    _failures.clear()
+    _pending.clear()
+    _recorded.clear()
+    _plain_results.clear()
+    _collection_profiler = None
+    _formatter_pipe = None
@@ -0,0 +1,193 @@
+"""Slotted records for the steps, docs and timers of a running story.
+
+A test that logs thousands of steps and kv docs would otherwise hold a
+fresh dict (plus a ``"step-N"`` string) for each of them. The records
+below store the same data in fixed slots and are turned into schema
+dicts only when the run is serialized (``resolve()``, via
+``resolve_meta`` / ``json_default``).
+
+Steps and docs support read-only mapping access (``record["text"]``,
+``"durationMs" in record``, ``dict(record)``), so code that inspects a
+story before serialization — outline folding, step events, the doc
+budget — works on records and dicts alike.
+"""
+
+from __future__ import annotations
+
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from typing import Any
+
+# Marks an optional doc field that was not given (``None`` is a valid kv value).
+_MISSING: Any = object()
+
+# Field names per doc kind, in schema key order. ``phase`` follows them.
+_DOC_FIELDS: dict[str, tuple[str, ...]] = {
+    "note": ("text",),
+    "tag": ("names",),
+    "kv": ("label", "value"),
+    "code": ("label", "content", "lang"),
+    "table": ("label", "columns", "rows"),
+    "link": ("label", "url"),
+    "section": ("title", "markdown"),
+    "mermaid": ("code", "title"),
+    "screenshot": ("path", "alt"),
+    "custom": ("type", "data"),
+}
+
+
+class _Record(ABC):
+    """Read-only mapping access over ``_items()``."""
+
+    __slots__ = ()
+
+    @abstractmethod
+    def _items(self) -> Iterator[tuple[str, Any]]:
+        """Yield the record's schema fields in key order."""
+
+    def keys(self) -> list[str]:
+        return [key for key, _ in self._items()]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __getitem__(self, key: str) -> Any:
+        for name, value in self._items():
+            if name == key:
+                return value
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return any(name == key for name, _ in self._items())
+
+    def get(self, key: str, default: Any = None) -> Any:
+        for name, value in self._items():
+            if name == key:
+                return value
+        return default
+
+
+class _Doc(_Record):
+    """A runtime doc entry; slot meaning follows ``_DOC_FIELDS[kind]``."""
+
+    __slots__ = ("kind", "a", "b", "c")
+
+    def __init__(self, kind: str, a: Any = _MISSING, b: Any = _MISSING, c: Any = _MISSING) -> None:
+        self.kind = kind
+        self.a = a
+        self.b = b
+        self.c = c
+
+    def _items(self) -> Iterator[tuple[str, Any]]:
+        yield "kind", self.kind
+        for name, value in zip(_DOC_FIELDS[self.kind], (self.a, self.b, self.c)):
+            if value is not _MISSING:
+                yield name, value
+        yield "phase", "runtime"
+
+    def _field(self, key: str) -> Any:
+        # Direct slot lookup; the doc budget reads every entry's content field.
+        if key == "kind":
+            return self.kind
+        if key == "phase":
+            return "runtime"
+        try:
+            index = _DOC_FIELDS[self.kind].index(key)
+        except ValueError:
+            return _MISSING
+        return (self.a, self.b, self.c)[index]
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._field(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self._field(key) is not _MISSING
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._field(key)
+        return default if value is _MISSING else value
+
+    def resolve(self) -> dict[str, Any]:
+        entry: dict[str, Any] = {"kind": self.kind}
+        a, b, c = self.a, self.b, self.c
+        fields = _DOC_FIELDS[self.kind]
+        if a is not _MISSING:
+            entry[fields[0]] = a
+        if b is not _MISSING:
+            entry[fields[1]] = b
+        if c is not _MISSING:
+            entry[fields[2]] = c
+        entry["phase"] = "runtime"
+        return entry
+
+
+def _resolve_doc(entry: Any) -> dict[str, Any]:
+    return entry if isinstance(entry, dict) else entry.resolve()
+
+
+class _Step(_Record):
+    """A story step. ``id`` is derived from the step's index."""
+
+    __slots__ = ("keyword", "text", "index", "mode", "wrapped", "duration_ms", "started", "docs")
+
+    def __init__(self, keyword: str, text: str, index: int, mode: str | None = None) -> None:
+        self.keyword = keyword
+        self.text = text
+        self.index = index
+        self.mode = mode
+        self.wrapped = False
+        self.duration_ms: float | None = None
+        # perf_counter() when the step was declared, or when its timing began;
+        # not serialized, it places the step on the --stories-chrome-trace timeline.
+        self.started = time.perf_counter()
+        self.docs: list[Any] | None = None
+
+    @property
+    def id(self) -> str:
+        return f"step-{self.index}"
+
+    def _items(self) -> Iterator[tuple[str, Any]]:
+        yield "keyword", self.keyword
+        yield "text", self.text
+        yield "id", self.id
+        if self.mode is not None:
+            yield "mode", self.mode
+        if self.wrapped:
+            yield "wrapped", True
+        if self.duration_ms is not None:
+            yield "durationMs", self.duration_ms
+        if self.docs:
+            yield "docs", self.docs
+
+    def resolve(self) -> dict[str, Any]:
+        """Build the StoryStep dict, resolving its docs."""
+        step: dict[str, Any] = {"keyword": self.keyword, "text": self.text, "id": f"step-{self.index}"}
+        if self.mode is not None:
+            step["mode"] = self.mode
+        if self.wrapped:
+            step["wrapped"] = True
+        if self.duration_ms is not None:
+            step["durationMs"] = self.duration_ms
+        if self.docs:
+            step["docs"] = [_resolve_doc(d) for d in self.docs]
+        return step
+
+
+class _Timer:
+    """An active ``story.start_timer()`` token, bound to the step it times."""
+
+    __slots__ = ("start", "step", "consumed", "span")
+
+    def __init__(self, start: float, step: _Step | None) -> None:
+        self.start = start
+        self.step = step
+        self.consumed = False
+        # The step's span, with --stories-otel-steps.
+        self.span: Any = None
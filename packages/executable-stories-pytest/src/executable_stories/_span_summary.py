@@ -0,0 +1,225 @@
+"""Per-step summaries of the spans the code under test produces.
+
+With ``--stories-span-summary`` an in-memory span processor is added to
+the global OpenTelemetry tracer provider (an SDK provider is installed
+first when the application did not configure one, so instrumented code
+records spans without any exporter). A span belongs to the story running
+on the thread that started it, or else to the story of its parent span,
+so work handed to other threads with the OpenTelemetry context still
+counts; a span started outside both is attributed to the story running
+on the thread that ends it, if any, and dropped otherwise. It is counted
+against the step that was current when it ended — the story's last step,
+or the story itself before its first step.
+
+When the test finishes, each step with spans gets a ``custom`` doc::
+
+    {"kind": "custom", "type": "otel-spans", "phase": "runtime",
+     "data": {"spans": 14, "totalMs": 182.4,
+              "byName": [{"name": "SELECT orders", "count": 9, "totalMs": 120.3}, ...],
+              "slowest": [{"name": "POST /charge", "durationMs": 48.1,
+                           "traceId": "…", "spanId": "…"}, ...]}}
+
+Memory per step is bounded: at most ``MAX_NAMES`` distinct span names
+(later names are counted under ``"(other)"``) and the ``top`` slowest
+spans. Nothing is kept of the spans themselves.
+
+It needs ``opentelemetry-sdk`` (the ``otel-export`` extra); the module
+imports without it and ``install()`` raises ImportError instead.
+"""
+
+from __future__ import annotations
+
+import heapq
+import threading
+from typing import Any
+
+try:
+    from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
+except ImportError:  # opentelemetry-sdk is optional
+    SpanProcessor = object
+    TracerProvider = None
+
+from executable_stories._otel import TRACER_NAME, trace_api
+from executable_stories._records import _Doc
+
+DEFAULT_TOP = 5
+MAX_NAMES = 50
+SUMMARY_TYPE = "otel-spans"
+OTHER_NAME = "(other)"
+
+# Names listed per step in the summary; the rest still count in "spans" and "totalMs".
+_MAX_LISTED_NAMES = 10
+
+# Spans that end before the story's first step.
+_STORY_LEVEL = -1
+
+# Open spans remembered with their story; the oldest are forgotten beyond this.
+_MAX_OPEN_SPANS = 10_000
+
+
+class _Bucket:
+    """Span statistics for one step."""
+
+    __slots__ = ("count", "total_ns", "by_name", "slowest", "seq")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ns = 0
+        self.by_name: dict[str, list[int]] = {}
+        # Min-heap of (duration ns, seq, name, trace id, span id).
+        self.slowest: list[tuple[int, int, str, int, int]] = []
+        self.seq = 0
+
+    def add(self, name: str, duration_ns: int, trace_id: int, span_id: int, top: int) -> None:
+        self.count += 1
+        self.total_ns += duration_ns
+        entry = self.by_name.get(name)
+        if entry is None:
+            if len(self.by_name) >= MAX_NAMES:
+                entry = self.by_name.setdefault(OTHER_NAME, [0, 0])
+            else:
+                entry = self.by_name[name] = [0, 0]
+        entry[0] += 1
+        entry[1] += duration_ns
+        if top > 0:
+            self.seq += 1
+            item = (duration_ns, self.seq, name, trace_id, span_id)
+            if len(self.slowest) < top:
+                heapq.heappush(self.slowest, item)
+            elif duration_ns > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, item)
+
+    def summary(self) -> dict[str, Any]:
+        names = sorted(self.by_name.items(), key=lambda kv: kv[1][1], reverse=True)
+        return {
+            "spans": self.count,
+            "totalMs": _ms(self.total_ns),
+            "byName": [
+                {"name": name, "count": count, "totalMs": _ms(total)}
+                for name, (count, total) in names[:_MAX_LISTED_NAMES]
+            ],
+            "slowest": [
+                {
+                    "name": name,
+                    "durationMs": _ms(duration),
+                    "traceId": format(trace_id, "032x"),
+                    "spanId": format(span_id, "016x"),
+                }
+                for duration, _, name, trace_id, span_id in sorted(self.slowest, key=lambda e: (-e[0], e[1]))
+            ],
+        }
+
+
+def _ms(ns: int) -> float:
+    return round(ns / 1e6, 2)
+
+
+class _SpanSummaryProcessor(SpanProcessor):
+    """Buckets finished spans by the running story's current step."""
+
+    def __init__(self, story: Any, top: int = DEFAULT_TOP) -> None:
+        self.story = story
+        self.top = top
+        self.enabled = True
+        self._lock = threading.Lock()
+        # Span id -> story context of the open spans started for a story.
+        self._owners: dict[int, Any] = {}
+
+    def on_start(self, span: Any, parent_context: Any = None) -> None:
+        # Our own spans are remembered too, so spans below a step inherit its story.
+        if not self.enabled:
+            return
+        ctx = self.story._ctx
+        if ctx is None:
+            parent = trace_api().get_current_span(parent_context).get_span_context()
+            if not parent.is_valid:
+                return
+            ctx = self._owners.get(parent.span_id)
+            if ctx is None:
+                return
+        with self._lock:
+            owners = self._owners
+            owners[span.context.span_id] = ctx
+            if len(owners) > _MAX_OPEN_SPANS:
+                del owners[next(iter(owners))]
+
+    def on_end(self, span: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            ctx = self._owners.pop(span.context.span_id, None)
+        if ctx is None:
+            ctx = self.story._ctx
+        if ctx is None or _own_span(span):
+            return
+        if span.start_time is None or span.end_time is None:
+            return
+        step = ctx._current_step
+        key = step.index if step is not None else _STORY_LEVEL
+        span_ctx = span.context
+        with self._lock:
+            buckets = ctx.span_buckets
+            if buckets is None:
+                buckets = ctx.span_buckets = {}
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = _Bucket()
+            bucket.add(span.name, span.end_time - span.start_time, span_ctx.trace_id, span_ctx.span_id, self.top)
+
+    def shutdown(self) -> None:
+        self.enabled = False
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+
+def _own_span(span: Any) -> bool:
+    """Whether *span* is one of our scenario and step spans."""
+    scope = span.instrumentation_scope
+    return scope is not None and scope.name == TRACER_NAME
+
+
+# The processor added to the global provider, reused by later sessions
+# in the same process (SDK providers cannot remove a processor).
+_installed: tuple[Any, _SpanSummaryProcessor] | None = None
+
+
+def install(story: Any, top: int = DEFAULT_TOP) -> _SpanSummaryProcessor:
+    """Add the processor to the global tracer provider, installing an SDK provider if needed."""
+    global _installed
+    if TracerProvider is None:
+        raise ImportError("opentelemetry-sdk is not installed")
+    trace = trace_api()
+    provider = trace.get_tracer_provider()
+    if not isinstance(provider, TracerProvider):
+        trace.set_tracer_provider(TracerProvider())
+        provider = trace.get_tracer_provider()
+    if _installed is not None and _installed[0] is provider:
+        processor = _installed[1]
+        processor.story = story
+        processor.top = top
+        processor.enabled = True
+        return processor
+    processor = _SpanSummaryProcessor(story, top)
+    provider.add_span_processor(processor)
+    _installed = (provider, processor)
+    return processor
+
+
+def attach_summaries(story: Any) -> None:
+    """Turn the current test's buckets into ``otel-spans`` docs on its steps."""
+    ctx = story._ctx
+    if ctx is None or not ctx.span_buckets:
+        return
+    buckets = ctx.span_buckets
+    ctx.span_buckets = None
+    steps = {step.index: step for step in ctx.steps}
+    for key in sorted(buckets):
+        doc = story._fit_doc(ctx, _Doc("custom", SUMMARY_TYPE, buckets[key].summary()))
+        step = steps.get(key)
+        if step is None:
+            ctx.docs.append(doc)
+            continue
+        if step.docs is None:
+            step.docs = []
+        step.docs.append(doc)
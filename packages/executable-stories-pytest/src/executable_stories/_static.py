@@ -0,0 +1,319 @@
+"""Collection-time story extraction from test module source.
+
+Parses a test module with ``ast`` and resolves the ``story.*`` calls in
+each test function into a ``StoryMeta`` without running anything. String
+arguments that are not literals are kept as ``<expression>`` placeholders
+(f-string fields become ``<name>``, matching Scenario Outline templates);
+doc entries whose values are not literals are skipped. Docs are marked
+``phase: "static"``.
+
+Results are cached by the SHA-256 of the module source, so unchanged
+modules are never parsed again.
+"""
+
+from __future__ import annotations
+
+import ast
+import hashlib
+import json
+from typing import Any
+
+# Bump when the extracted shape changes, to invalidate cached results.
+EXTRACTOR_VERSION = 1
+
+_KEYWORDS = {
+    "given": "Given",
+    "arrange": "Given",
+    "setup": "Given",
+    "context": "Given",
+    "when": "When",
+    "act": "When",
+    "execute": "When",
+    "action": "When",
+    "then": "Then",
+    "assert_": "Then",
+    "verify": "Then",
+    "and_": "And",
+    "but": "But",
+}
+
+
+class _Unresolved(Exception):
+    pass
+
+
+def _render_fstring(node: ast.JoinedStr) -> str:
+    parts: list[str] = []
+    for value in node.values:
+        if isinstance(value, ast.Constant):
+            parts.append(str(value.value))
+        elif isinstance(value, ast.FormattedValue):
+            inner = value.value
+            parts.append(f"<{inner.id}>" if isinstance(inner, ast.Name) else f"<{ast.unparse(inner)}>")
+    return "".join(parts)
+
+
+def _literal(node: ast.expr) -> Any:
+    """Return the literal value of *node* or raise ``_Unresolved``."""
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        raise _Unresolved from None
+
+
+def _text(node: ast.expr) -> str:
+    """Resolve a string argument, falling back to a placeholder."""
+    if isinstance(node, ast.JoinedStr):
+        return _render_fstring(node)
+    try:
+        value = _literal(node)
+    except _Unresolved:
+        return f"<{ast.unparse(node)}>"
+    return str(value)
+
+
+def _arg(call: ast.Call, index: int, name: str) -> ast.expr | None:
+    if len(call.args) > index:
+        return call.args[index]
+    for kw in call.keywords:
+        if kw.arg == name:
+            return kw.value
+    return None
+
+
+def _story_receivers(tree: ast.Module) -> tuple[set[str], set[str]]:
+    """Return (names bound to the story singleton, names bound to the package)."""
+    story_names: set[str] = set()
+    package_names: set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module == "executable_stories":
+            for alias in node.names:
+                if alias.name == "story":
+                    story_names.add(alias.asname or "story")
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name == "executable_stories":
+                    package_names.add(alias.asname or "executable_stories")
+    return story_names, package_names
+
+
+class _StoryCalls(ast.NodeVisitor):
+    """Collect ``story.<method>(...)`` calls of one function in source order."""
+
+    def __init__(self, story_names: set[str], package_names: set[str]) -> None:
+        self.story_names = story_names
+        self.package_names = package_names
+        self.calls: list[tuple[str, ast.Call]] = []
+
+    def _is_story(self, node: ast.expr) -> bool:
+        if isinstance(node, ast.Name):
+            return node.id in self.story_names
+        return (
+            isinstance(node, ast.Attribute)
+            and node.attr == "story"
+            and isinstance(node.value, ast.Name)
+            and node.value.id in self.package_names
+        )
+
+    def visit_Call(self, node: ast.Call) -> None:
+        # Visit arguments first: their calls are evaluated before this one.
+        self.generic_visit(node)
+        func = node.func
+        if isinstance(func, ast.Attribute) and self._is_story(func.value):
+            self.calls.append((func.attr, node))
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        # Nested helpers are not executed by the test itself.
+        return None
+
+    visit_AsyncFunctionDef = visit_FunctionDef  # type: ignore[assignment]
+
+
+def _doc_entry(method: str, call: ast.Call) -> dict[str, Any] | None:
+    """Build a static doc entry, or None if its arguments are not literals."""
+    try:
+        if method == "note":
+            return {"kind": "note", "text": _literal(call.args[0]), "phase": "static"}
+        if method == "tag":
+            value = _literal(call.args[0])
+            names = [value] if isinstance(value, str) else list(value)
+            return {"kind": "tag", "names": names, "phase": "static"}
+        if method == "kv":
+            return {"kind": "kv", "label": _literal(call.args[0]), "value": _literal(call.args[1]), "phase": "static"}
+        if method == "json":
+            content = json.dumps(_literal(call.args[1]), indent=2)
+            return {"kind": "code", "label": _literal(call.args[0]), "content": content, "lang": "json", "phase": "static"}
+        if method == "code":
+            entry = {"kind": "code", "label": _literal(call.args[0]), "content": _literal(call.args[1]), "phase": "static"}
+            lang = _arg(call, 2, "lang")
+            if lang is not None:
+                entry["lang"] = _literal(lang)
+            return entry
+        if method == "table":
+            return {
+                "kind": "table",
+                "label": _literal(call.args[0]),
+                "columns": _literal(call.args[1]),
+                "rows": _literal(call.args[2]),
+                "phase": "static",
+            }
+        if method == "link":
+            return {"kind": "link", "label": _literal(call.args[0]), "url": _literal(call.args[1]), "phase": "static"}
+        if method == "section":
+            return {"kind": "section", "title": _literal(call.args[0]), "markdown": _literal(call.args[1]), "phase": "static"}
+        if method == "mermaid":
+            entry = {"kind": "mermaid", "code": _literal(call.args[0]), "phase": "static"}
+            title = _arg(call, 1, "title")
+            if title is not None:
+                entry["title"] = _literal(title)
+            return entry
+        if method == "screenshot":
+            entry = {"kind": "screenshot", "path": _literal(call.args[0]), "phase": "static"}
+            alt = _arg(call, 1, "alt")
+            if alt is not None:
+                entry["alt"] = _literal(alt)
+            return entry
+        if method == "custom":
+            return {"kind": "custom", "type": _literal(call.args[0]), "data": _literal(call.args[1]), "phase": "static"}
+    except (_Unresolved, IndexError, TypeError):
+        return None
+    return None
+
+
+def _build_story(calls: list[tuple[str, ast.Call]]) -> dict[str, Any] | None:
+    """Replay story calls into a StoryMeta; None if there is no story.init()."""
+    meta: dict[str, Any] | None = None
+    steps: list[dict[str, Any]] = []
+    docs: list[dict[str, Any]] = []
+    seen: set[str] = set()
+
+    for method, call in calls:
+        if method == "init":
+            scenario = _arg(call, 0, "scenario")
+            if scenario is None:
+                continue
+            meta = {"scenario": _text(scenario)}
+            steps, docs, seen = [], [], set()
+            for kw in call.keywords:
+                try:
+                    if kw.arg == "tags":
+                        meta["tags"] = list(_literal(kw.value))
+                    elif kw.arg == "ticket":
+                        ticket = _literal(kw.value)
+                        meta["tickets"] = [ticket] if isinstance(ticket, str) else list(ticket)
+                    elif kw.arg == "meta":
+                        meta["meta"] = dict(_literal(kw.value))
+                except (_Unresolved, TypeError):
+                    pass
+            continue
+        if meta is None:
+            continue
+
+        keyword: str | None = None
+        text_node: ast.expr | None = None
+        if method in _KEYWORDS:
+            keyword, text_node = _KEYWORDS[method], _arg(call, 0, "text")
+        elif method == "fn":
+            kw_node = _arg(call, 0, "keyword")
+            try:
+                keyword = str(_literal(kw_node)) if kw_node is not None else None
+            except _Unresolved:
+                keyword = None
+            text_node = _arg(call, 1, "text")
+        elif method == "expect":
+            keyword, text_node = "Then", _arg(call, 0, "text")
+
+        if keyword is not None and text_node is not None:
+            if keyword in ("Given", "When", "Then"):
+                if keyword in seen:
+                    keyword = "And"
+                else:
+                    seen.add(keyword)
+            step: dict[str, Any] = {"keyword": keyword, "text": _text(text_node), "id": f"step-{len(steps)}"}
+            if method in ("fn", "expect"):
+                step["wrapped"] = True
+            steps.append(step)
+            continue
+
+        entry = _doc_entry(method, call)
+        if entry is not None:
+            if steps:
+                steps[-1].setdefault("docs", []).append(entry)
+            else:
+                docs.append(entry)
+
+    if meta is None:
+        return None
+    if steps:
+        meta["steps"] = steps
+    if docs:
+        meta["docs"] = docs
+    return meta
+
+
+def extract_stories(source: str, filename: str = "<test>") -> dict[str, dict[str, Any]]:
+    """Return static StoryMeta dicts keyed by test path (``Class::func`` or ``func``)."""
+    tree = ast.parse(source, filename=filename)
+    story_names, package_names = _story_receivers(tree)
+    if not story_names and not package_names:
+        return {}
+
+    stories: dict[str, dict[str, Any]] = {}
+
+    def visit(body: list[ast.stmt], prefix: str) -> None:
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith("test"):
+                collector = _StoryCalls(story_names, package_names)
+                for stmt in node.body:
+                    collector.visit(stmt)
+                story_meta = _build_story(collector.calls)
+                if story_meta is not None:
+                    stories[prefix + node.name] = story_meta
+            elif isinstance(node, ast.ClassDef) and node.name.startswith("Test"):
+                visit(node.body, f"{prefix}{node.name}::")
+
+    visit(tree.body, "")
+    return stories
+
+
+def source_hash(data: bytes) -> str:
+    """Return the cache key component for a module's source bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class _StaticExtractor:
+    """Extracts static stories per module, backed by an optional pytest cache."""
+
+    def __init__(self, cache: Any = None) -> None:
+        self._cache = cache
+        self._modules: dict[str, dict[str, dict[str, Any]]] = {}
+        self.parsed = 0
+        self.cached = 0
+
+    def stories_for(self, path: str) -> dict[str, dict[str, Any]]:
+        """Return the static stories of the module at *path*."""
+        stories = self._modules.get(path)
+        if stories is not None:
+            return stories
+
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            self._modules[path] = {}
+            return {}
+
+        key = f"executable-stories/static/v{EXTRACTOR_VERSION}/{source_hash(data)}"
+        stories = self._cache.get(key, None) if self._cache is not None else None
+        if stories is None:
+            try:
+                stories = extract_stories(data.decode("utf-8"), path)
+            except (SyntaxError, UnicodeDecodeError, ValueError):
+                stories = {}
+            self.parsed += 1
+            if self._cache is not None:
+                self._cache.set(key, stories)
+        else:
+            self.cached += 1
+        self._modules[path] = stories
+        return stories
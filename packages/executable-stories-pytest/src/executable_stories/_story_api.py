@@ -13,17 +13,39 @@ Usage in tests::
 
 from __future__ import annotations
 
-import json
+import math
 import os
+import sys
 import threading
 import time
 from typing import Any, Callable, TypeVar
 
+from executable_stories._background import _Background, _BackgroundRegistry
+from executable_stories._budget import _DocBudget
+from executable_stories._lazy import _SCALARS, _LazyDoc, lazy_json, resolve_meta, snapshot_value
+from executable_stories._metrics import METRIC_DOC_TYPE, _MetricAggregator
+from executable_stories._otel import _StepSpans, trace_api
+from executable_stories._records import _MISSING, _Doc, _Step, _Timer
+
 _T = TypeVar("_T")
 
 
+def _fixture_in_setup() -> Any:
+    """Return the FixtureDef pytest is setting up on this thread, or None."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_code.co_name == "pytest_fixture_setup" and "fixturedef" in frame.f_locals:
+            return frame.f_locals["fixturedef"]
+        frame = frame.f_back
+    return None
+
+
 class _StoryContext:
-    """Per-test story context stored in thread-local storage."""
+    """Per-test story context stored in thread-local storage.
+
+    Steps, runtime docs and timers are slotted records (see ``_records``);
+    they become schema dicts only when the run is serialized.
+    """
 
     __slots__ = (
         "scenario",
@@ -39,6 +61,12 @@ class _StoryContext:
         "_current_step",
         "active_timers",
         "timer_counter",
+        "doc_bytes",
+        "dropped_doc_bytes",
+        "background_ids",
+        "span",
+        "span_buckets",
+        "metric_samples",
     )
 
     def __init__(
@@ -50,18 +78,28 @@ class _StoryContext:
         meta: dict[str, Any] | None = None,
     ) -> None:
         self.scenario = scenario
-        self.steps: list[dict[str, Any]] = []
-        self.tags = tags or []
-        self.tickets = tickets or []
-        self.meta = meta or {}
+        self.steps: list[_Step] = []
+        # Copied once here, so the lists can later be handed over as they are.
+        self.tags = list(tags) if tags else []
+        self.tickets = list(tickets) if tickets else []
+        self.meta = dict(meta) if meta else {}
         self.suite_path: list[str] = []
-        self.docs: list[dict[str, Any]] = []
+        self.docs: list[Any] = []
         self.seen_primary_keywords: set[str] = set()
         self.step_counter: int = 0
         self.attachments: list[dict[str, Any]] = []
-        self._current_step: dict[str, Any] | None = None
-        self.active_timers: dict[int, dict[str, Any]] = {}
+        self._current_step: _Step | None = None
+        self.active_timers: dict[int, _Timer] = {}
         self.timer_counter: int = 0
+        self.doc_bytes: int = 0
+        self.dropped_doc_bytes: int = 0
+        self.background_ids: list[str] = []
+        # Scenario span, with --stories-otel-steps.
+        self.span: Any = None
+        # Step index -> span statistics, with --stories-span-summary.
+        self.span_buckets: dict[int, Any] | None = None
+        # story.metric() values, aggregated only if this attempt is the test's last.
+        self.metric_samples: list[tuple[str, float, str | None, dict[str, str]]] = []
 
 
 class Story:
@@ -72,6 +110,22 @@ class Story:
 
     def __init__(self) -> None:
         self._local = threading.local()
+        self._budget = _DocBudget()
+        self._backgrounds = _BackgroundRegistry()
+        self._metrics = _MetricAggregator()
+        # Set by the first init() or background(); until then the plugin skips its per-test work.
+        self._active = False
+        self._spans: _StepSpans | None = None
+        # The most recently started story, for spans that end on other threads.
+        self._last_ctx: _StoryContext | None = None
+
+    def _set_budget(self, budget: _DocBudget) -> None:
+        """Replace the doc byte budget (configured by the plugin per session)."""
+        self._budget = budget
+
+    def _set_spans(self, spans: _StepSpans | None) -> None:
+        """Turn step spans on or off (configured by the plugin per session)."""
+        self._spans = spans
 
     # ── context management ─────────────────────────────────────────
 
@@ -92,15 +146,16 @@ class Story:
         tickets: list[str] | None = None
         if ticket is not None:
             tickets = [ticket] if isinstance(ticket, str) else list(ticket)
-        self._local.ctx = _StoryContext(
+        self._active = True
+        ctx = self._local.ctx = self._last_ctx = _StoryContext(
             scenario, tags=tags, tickets=tickets, meta=meta
         )
 
         # OTel bridge: detect active span, flow data bidirectionally
-        ctx = self._local.ctx
+        otel_trace = trace_api()
+        if otel_trace is None:
+            return  # opentelemetry not installed
         try:
-            from opentelemetry import trace as otel_trace
-
             span = otel_trace.get_current_span()
             span_ctx = span.get_span_context()
             if span_ctx and span_ctx.trace_id and span_ctx.trace_id != 0:
@@ -125,38 +180,89 @@ class Story:
                 if ticket:
                     ticket_list = [ticket] if isinstance(ticket, str) else ticket
                     span.set_attribute("story.tickets", ticket_list)
-        except ImportError:
-            pass  # opentelemetry not installed
         except Exception:
             pass  # OTel not available or no active span
 
-    def _get_meta(self) -> dict[str, Any] | None:
-        """Return the StoryMeta dict for the current test, or None."""
+        spans = self._spans
+        if spans is not None:
+            ctx.span = spans.start_scenario(scenario, ctx.tags, ctx.tickets)
+            if "otel" not in ctx.meta:
+                span_ctx = ctx.span.get_span_context()
+                ctx.meta["otel"] = {
+                    "traceId": format(span_ctx.trace_id, "032x"),
+                    "spanId": format(span_ctx.span_id, "016x"),
+                }
+
+    def _finish_spans(self, status: str) -> None:
+        """End the test's open timer spans and its scenario span (called by the plugin)."""
+        spans = self._spans
+        ctx = self._ctx
+        if spans is None or ctx is None or ctx.span is None:
+            return
+        for timer in ctx.active_timers.values():
+            if timer.span is not None and not timer.consumed:
+                spans.end(timer.span, "unfinished")
+                timer.span = None
+        spans.end(ctx.span, status, prefix="story")
+        ctx.span = None
+
+    def _get_meta(self, *, resolve: bool = True) -> dict[str, Any] | None:
+        """Return the StoryMeta dict for the current test, or None.
+
+        With ``resolve=False`` step and doc records and lazy entries are left
+        unformatted so the writer can format them after the test has
+        finished, and the context's lists are handed over without a copy:
+        the caller owns them, and the context must be cleared afterwards.
+        """
         ctx = self._ctx
         if ctx is None:
             return None
 
         result: dict[str, Any] = {"scenario": ctx.scenario}
         if ctx.steps:
-            result["steps"] = list(ctx.steps)
+            result["steps"] = ctx.steps
         if ctx.tags:
-            result["tags"] = list(ctx.tags)
+            result["tags"] = ctx.tags
         if ctx.tickets:
-            result["tickets"] = list(ctx.tickets)
+            result["tickets"] = ctx.tickets
         if ctx.meta:
-            result["meta"] = dict(ctx.meta)
+            result["meta"] = ctx.meta
         if ctx.suite_path:
-            result["suitePath"] = list(ctx.suite_path)
+            result["suitePath"] = ctx.suite_path
         if ctx.docs:
-            result["docs"] = list(ctx.docs)
+            result["docs"] = ctx.docs
+        if resolve:
+            return resolve_meta(result)
         return result
 
+    def _get_dropped_doc_bytes(self) -> int:
+        """Return the doc bytes the budget cut from the current test."""
+        ctx = self._ctx
+        if ctx is None:
+            return 0
+        return ctx.dropped_doc_bytes
+
+    def _get_background_ids(self, fixture_keys: list[Any]) -> list[str]:
+        """Return ids of Backgrounds from the given fixtures and the test body."""
+        ids = [bg.id for key in fixture_keys for bg in self._backgrounds.for_fixture(key)]
+        ctx = self._ctx
+        if ctx is not None:
+            ids.extend(ctx.background_ids)
+        return ids
+
     def _get_attachments(self) -> list[dict[str, Any]]:
-        """Return the attachments list for the current test."""
+        """Hand over the attachments list of the current test (not a copy)."""
+        ctx = self._ctx
+        if ctx is None:
+            return []
+        return ctx.attachments
+
+    def _get_metric_samples(self) -> list[tuple[str, float, str | None, dict[str, str]]]:
+        """Hand over the ``story.metric()`` samples of the current test (not a copy)."""
         ctx = self._ctx
         if ctx is None:
             return []
-        return list(ctx.attachments)
+        return ctx.metric_samples
 
     def _require_context(self) -> _StoryContext:
         """Return the current context or raise."""
@@ -167,8 +273,65 @@ class Story:
 
     def _clear(self) -> None:
         """Clear the current test's story context."""
+        if self._last_ctx is not None and self._last_ctx is self._ctx:
+            self._last_ctx = None
         self._local.ctx = None
 
+    # ── Background ─────────────────────────────────────────────────
+
+    def background(self, name: str) -> _Background:
+        """Start a Background shared by every test that uses the calling fixture.
+
+        Call it from a fixture (any scope) and add steps to the returned
+        object; its steps are recorded once, and the fixture's setup time
+        becomes the Background's ``durationMs``. Called from a test body
+        after ``story.init()``, the Background belongs to that test only.
+        """
+        self._active = True
+        stack: list[list[Any]] | None = getattr(self._local, "fixtures", None)
+        ctx = self._ctx
+        if not stack and ctx is None:
+            # The plugin tracks fixtures only while stories are active, so a
+            # fixture set up before is found on the call stack and timed from
+            # here; the plugin closes it when the fixture's setup returns.
+            fixturedef = _fixture_in_setup()
+            if fixturedef is None:
+                raise RuntimeError("story.background() called outside a fixture and before story.init()")
+            self._enter_fixture(fixturedef, fixturedef.argname, fixturedef.scope)
+            stack = self._local.fixtures
+        if stack:
+            key, fixture, scope = stack[-1][:3]
+            return self._backgrounds.create(name, fixture_key=key, fixture=fixture, scope=scope, budget=self._budget)
+        assert ctx is not None
+        bg = self._backgrounds.create(name, budget=self._budget)
+        ctx.background_ids.append(bg.id)
+        return bg
+
+    def _enter_fixture(self, key: Any, name: str, scope: str) -> None:
+        """Mark a fixture as being set up on this thread (called by the plugin)."""
+        stack: list[list[Any]] | None = getattr(self._local, "fixtures", None)
+        if stack is None:
+            stack = self._local.fixtures = []
+        self._backgrounds.reset_fixture(key)
+        # [key, name, scope, start, time spent in nested fixtures]
+        stack.append([key, name, scope, time.perf_counter(), 0.0])
+
+    def _exit_fixture(self, key: Any = None) -> None:
+        """Finish the innermost fixture and time its Backgrounds (setup only).
+
+        With *key*, only if that fixture is the innermost one tracked.
+        """
+        stack: list[list[Any]] | None = getattr(self._local, "fixtures", None)
+        if key is not None and (not stack or stack[-1][0] is not key):
+            return
+        assert stack
+        key, _, _, start, nested_ms = stack.pop()
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        if stack:
+            stack[-1][4] += elapsed_ms
+        for bg in self._backgrounds.for_fixture(key):
+            bg.duration_ms = elapsed_ms - nested_ms
+
     # ── BDD steps ──────────────────────────────────────────────────
 
     def _add_step(
@@ -190,13 +353,10 @@ class Story:
                 keyword = "And"
             else:
                 ctx.seen_primary_keywords.add(keyword)
-        step: dict[str, Any] = {"keyword": keyword, "text": text}
-        step["id"] = f"step-{ctx.step_counter}"
+        step = _Step(keyword, text, ctx.step_counter, mode)
         ctx.step_counter += 1
-        if mode is not None:
-            step["mode"] = mode
         if docs:
-            step["docs"] = list(docs)
+            step.docs = [self._fit_doc(ctx, d) for d in docs]
         ctx.steps.append(step)
         ctx._current_step = step
 
@@ -263,14 +423,29 @@ class Story:
         ctx = self._require_context()
         step = ctx._current_step
         assert step is not None
-        step["wrapped"] = True
-
-        start = time.perf_counter()
+        step.wrapped = True
+
+        spans = self._spans
+        if spans is None or ctx.span is None:
+            start = step.started = time.perf_counter()
+            try:
+                result = body()
+                return result
+            finally:
+                step.duration_ms = (time.perf_counter() - start) * 1000.0
+
+        span = spans.start_step(ctx.span, step.keyword, step.text, step.index, wrapped=True)
+        error: BaseException | None = None
+        start = step.started = time.perf_counter()
         try:
-            result = body()
-            return result
+            with spans.current(span):
+                return body()
+        except BaseException as exc:
+            error = exc
+            raise
         finally:
-            step["durationMs"] = (time.perf_counter() - start) * 1000.0
+            step.duration_ms = (time.perf_counter() - start) * 1000.0
+            spans.end(span, "failed" if error is not None else "passed", error)
 
     def expect(self, text: str, body: Callable[[], _T]) -> _T:
         """Shorthand for ``fn("Then", text, body)``."""
@@ -285,16 +460,12 @@ class Story:
         ctx = self._require_context()
         token = ctx.timer_counter
         ctx.timer_counter += 1
-
-        entry: dict[str, Any] = {
-            "start": time.perf_counter(),
-            "consumed": False,
-        }
-        if ctx._current_step is not None:
-            entry["step_index"] = len(ctx.steps) - 1
-            entry["step_id"] = ctx._current_step.get("id")
-
-        ctx.active_timers[token] = entry
+        step = ctx._current_step
+        timer = _Timer(time.perf_counter(), step)
+        spans = self._spans
+        if spans is not None and ctx.span is not None and step is not None:
+            timer.span = spans.start_step(ctx.span, step.keyword, step.text, step.index, wrapped=False)
+        ctx.active_timers[token] = timer
         return token
 
     def end_timer(self, token: int) -> None:
@@ -302,27 +473,16 @@ class Story:
         when start_timer() was called. Double-end is a no-op.
         """
         ctx = self._require_context()
-        entry = ctx.active_timers.get(token)
-        if entry is None or entry["consumed"]:
+        timer = ctx.active_timers.get(token)
+        if timer is None or timer.consumed:
             return
-        entry["consumed"] = True
-
-        duration_ms = (time.perf_counter() - entry["start"]) * 1000.0
-
-        step = None
-        step_id = entry.get("step_id")
-        if step_id is not None:
-            for s in ctx.steps:
-                if s.get("id") == step_id:
-                    step = s
-                    break
-        if step is None:
-            step_index = entry.get("step_index")
-            if step_index is not None and step_index < len(ctx.steps):
-                step = ctx.steps[step_index]
-
-        if step is not None:
-            step["durationMs"] = duration_ms
+        timer.consumed = True
+        if timer.step is not None:
+            timer.step.started = timer.start
+            timer.step.duration_ms = (time.perf_counter() - timer.start) * 1000.0
+        if timer.span is not None and self._spans is not None:
+            self._spans.end(timer.span, "passed")
+            timer.span = None
 
     # ── attachments ───────────────────────────────────────────────
 
@@ -351,110 +511,115 @@ class Story:
         if file_name is not None:
             a["fileName"] = file_name
         if ctx._current_step is not None:
-            steps = ctx.steps
-            idx = len(steps) - 1
-            a["stepIndex"] = idx
-            a["stepId"] = ctx._current_step.get("id")
+            a["stepIndex"] = len(ctx.steps) - 1
+            a["stepId"] = ctx._current_step.id
         ctx.attachments.append(a)
         return self
 
     # ── doc helpers ────────────────────────────────────────────────
 
-    def _attach_doc(self, entry: dict[str, Any]) -> None:
+    def _fit_doc(
+        self, ctx: _StoryContext, entry: dict[str, Any] | _Doc | _LazyDoc
+    ) -> dict[str, Any] | _Doc | _LazyDoc:
+        """Charge *entry* against the byte budget, truncating it if needed."""
+        entry, charged, dropped = self._budget.apply(entry, ctx.doc_bytes)
+        ctx.doc_bytes += charged
+        ctx.dropped_doc_bytes += dropped
+        return entry
+
+    def _attach_doc(self, entry: dict[str, Any] | _Doc | _LazyDoc) -> None:
         """Attach a doc entry to the current step or story-level docs."""
         ctx = self._ctx
         if ctx is None:
             raise RuntimeError("Doc method called before story.init()")
+        entry = self._fit_doc(ctx, entry)
         if ctx.steps:
             # Attach to last step
             last = ctx.steps[-1]
-            if "docs" not in last:
-                last["docs"] = []
-            last["docs"].append(entry)
+            if last.docs is None:
+                last.docs = []
+            last.docs.append(entry)
         else:
             # Attach to story-level docs
             ctx.docs.append(entry)
 
     def note(self, text: str) -> None:
         """Add a free-text note."""
-        self._attach_doc({"kind": "note", "text": text, "phase": "runtime"})
+        self._attach_doc(_Doc("note", text))
 
     def tag(self, name_or_names: str | list[str]) -> None:
         """Add tag(s) as a doc entry."""
         names = [name_or_names] if isinstance(name_or_names, str) else list(name_or_names)
-        self._attach_doc({"kind": "tag", "names": names, "phase": "runtime"})
+        self._attach_doc(_Doc("tag", names))
 
     def kv(self, label: str, value: Any) -> None:
-        """Add a key-value pair."""
-        self._attach_doc({"kind": "kv", "label": label, "value": value, "phase": "runtime"})
+        """Add a key-value pair. Container values are snapshotted immediately."""
+        if isinstance(value, _SCALARS):
+            self._attach_doc(_Doc("kv", label, value))
+        else:
+            self._attach_doc(snapshot_value({"kind": "kv", "label": label, "value": None, "phase": "runtime"}, "value", value))
+
+    def metric(
+        self,
+        name: str,
+        value: float,
+        *,
+        unit: str | None = None,
+        labels: dict[str, Any] | None = None,
+    ) -> None:
+        """Record a numeric measurement; the session aggregates it by name, unit and labels."""
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise TypeError(f"story.metric({name!r}) value must be a number, got {type(value).__name__}")
+        value = float(value)
+        if not math.isfinite(value):
+            raise ValueError(f"story.metric({name!r}) value must be finite, got {value}")
+        label_values = {str(k): str(v) for k, v in labels.items()} if labels else {}
+        data: dict[str, Any] = {"name": name, "value": value}
+        if unit:
+            data["unit"] = unit
+        if label_values:
+            data["labels"] = label_values
+        self._attach_doc(_Doc("custom", METRIC_DOC_TYPE, data))
+        self._require_context().metric_samples.append((name, value, unit, label_values))
 
     def json(self, label: str, value: Any) -> None:
-        """Add a JSON code block (serialized with indent=2)."""
-        self._attach_doc({
-            "kind": "code",
-            "label": label,
-            "content": json.dumps(value, indent=2),
-            "lang": "json",
-            "phase": "runtime",
-        })
+        """Add a JSON code block (pretty-printed with indent=2 when the run is written)."""
+        self._attach_doc(lazy_json(
+            {"kind": "code", "label": label, "content": None, "lang": "json", "phase": "runtime"},
+            "content",
+            value,
+        ))
 
     def code(self, label: str, content: str, *, lang: str | None = None) -> None:
         """Add a code block."""
-        entry: dict[str, Any] = {
-            "kind": "code",
-            "label": label,
-            "content": content,
-            "phase": "runtime",
-        }
-        if lang is not None:
-            entry["lang"] = lang
-        self._attach_doc(entry)
+        self._attach_doc(_Doc("code", label, content, lang if lang is not None else _MISSING))
 
     def table(self, label: str, columns: list[str], rows: list[list[str]]) -> None:
         """Add a table."""
-        self._attach_doc({
-            "kind": "table",
-            "label": label,
-            "columns": columns,
-            "rows": rows,
-            "phase": "runtime",
-        })
+        self._attach_doc(_Doc("table", label, columns, rows))
 
     def link(self, label: str, url: str) -> None:
         """Add a hyperlink."""
-        self._attach_doc({"kind": "link", "label": label, "url": url, "phase": "runtime"})
+        self._attach_doc(_Doc("link", label, url))
 
     def section(self, title: str, markdown: str) -> None:
         """Add a titled markdown section."""
-        self._attach_doc({
-            "kind": "section",
-            "title": title,
-            "markdown": markdown,
-            "phase": "runtime",
-        })
+        self._attach_doc(_Doc("section", title, markdown))
 
     def mermaid(self, code: str, *, title: str | None = None) -> None:
         """Add a Mermaid diagram."""
-        entry: dict[str, Any] = {"kind": "mermaid", "code": code, "phase": "runtime"}
-        if title is not None:
-            entry["title"] = title
-        self._attach_doc(entry)
+        self._attach_doc(_Doc("mermaid", code, title if title is not None else _MISSING))
 
     def screenshot(self, path: str, *, alt: str | None = None) -> None:
         """Add a screenshot reference."""
-        entry: dict[str, Any] = {"kind": "screenshot", "path": path, "phase": "runtime"}
-        if alt is not None:
-            entry["alt"] = alt
-        self._attach_doc(entry)
+        self._attach_doc(_Doc("screenshot", path, alt if alt is not None else _MISSING))
 
     def custom(self, type: str, data: Any) -> None:
-        """Add a custom doc entry."""
-        self._attach_doc({
-            "kind": "custom",
-            "type": type,
-            "data": data,
-            "phase": "runtime",
-        })
+        """Add a custom doc entry. Container data is snapshotted immediately."""
+        if isinstance(data, _SCALARS):
+            self._attach_doc(_Doc("custom", type, data))
+        else:
+            self._attach_doc(snapshot_value({"kind": "custom", "type": type, "data": None, "phase": "runtime"}, "data", data))
 
 
 # Module-level singleton
@@ -0,0 +1,152 @@
+"""Incremental reading of raw-run JSON documents.
+
+``iter_raw_run`` walks a raw-run file in fixed-size chunks and yields its
+top-level fields and its test cases one at a time, decoding each value
+with ``json.JSONDecoder.raw_decode``. Only the current chunk and the value
+being decoded are held in memory, so a run with any number of test cases
+can be read with flat memory. Fields may appear in any order, including
+after ``testCases`` (as in pipe-mode output).
+
+NDJSON runs (``*.ndjson``) are read line by line. Compact (string-table)
+runs cannot be expanded without the whole table and are decoded in one
+piece.
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Iterator
+from typing import Any
+
+from executable_stories._compact import decode_run, is_compact
+from executable_stories._json_writer import read_raw_run_ndjson
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+
+
+class _Reader:
+    """A growable text buffer over a file, consumed from the front."""
+
+    def __init__(self, path: str, chunk_size: int) -> None:
+        self._f = open(path, encoding="utf-8")
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def close(self) -> None:
+        self._f.close()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self._f.read(self._chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("unexpected end of raw-run JSON")
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"expected {char!r} at offset {self.pos}, found {found!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next JSON value, reading more chunks until it is complete."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number or literal that ends the buffer may continue in the next chunk.
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_raw_run(path: str, *, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[tuple[str, Any]]:
+    """Yield ``("field", (name, value))`` and ``("case", test_case)`` events in file order."""
+    if path.endswith(".ndjson"):
+        yield from _iter_ndjson(path)
+        return
+    reader = _Reader(path, chunk_size)
+    try:
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        first = True
+        while True:
+            if not first:
+                sep = reader.peek()
+                reader.pos += 1
+                if sep == "}":
+                    return
+                if sep != ",":
+                    raise ValueError(f"expected ',' or '}}' at offset {reader.pos - 1}, found {sep!r}")
+            first = False
+            key = reader.value()
+            reader.expect(":")
+            if key == "testCases":
+                reader.expect("[")
+                if reader.peek() == "]":
+                    reader.pos += 1
+                    continue
+                while True:
+                    yield "case", reader.value()
+                    sep = reader.peek()
+                    reader.pos += 1
+                    if sep == "]":
+                        break
+                    if sep != ",":
+                        raise ValueError(f"expected ',' or ']' at offset {reader.pos - 1}, found {sep!r}")
+            elif key == "encoding":
+                # Compact envelope: fall back to decoding the whole document.
+                reader.close()
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                if not is_compact(data):
+                    raise ValueError("unsupported raw-run encoding")
+                run = decode_run(data)
+                for name, value in run.items():
+                    if name != "testCases":
+                        yield "field", (name, value)
+                for test_case in run.get("testCases", []):
+                    yield "case", test_case
+                return
+            else:
+                yield "field", (key, reader.value())
+    finally:
+        reader.close()
+
+
+def _iter_ndjson(path: str) -> Iterator[tuple[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        header, test_cases = read_raw_run_ndjson(f)
+        seen = dict(header)
+        for name, value in header.items():
+            yield "field", (name, value)
+        for test_case in test_cases:
+            yield "case", test_case
+        for name, value in header.items():
+            if name not in seen or seen[name] != value:
+                yield "field", (name, value)
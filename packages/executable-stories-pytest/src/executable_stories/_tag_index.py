@@ -0,0 +1,88 @@
+"""Persistent tag/ticket index for story-based test selection.
+
+Maps each test's externalId to the tags and tickets its story declared,
+grouped by source file together with the file's content hash. Entries for
+a file are dropped as soon as its hash changes. The index is filled in
+incrementally from every run that records stories, and from static
+extraction for tests it has not seen yet. Under pytest-xdist each worker
+hands its ``updates()`` to the controller, which merges them and is the
+only process writing the index back.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any
+
+INDEX_VERSION = 1
+CACHE_KEY = "executable-stories/tag-index"
+
+
+class _TagIndex:
+    """Thread-safe externalId -> (tags, tickets) index with file-hash invalidation."""
+
+    def __init__(self, data: dict[str, Any] | None = None) -> None:
+        self._lock = threading.Lock()
+        self._files: dict[str, dict[str, Any]] = {}
+        if data and data.get("version") == INDEX_VERSION:
+            self._files = data.get("files", {})
+        self.changed = False
+        # Entries added or changed in this process, keyed like ``_files``.
+        self._updates: dict[str, dict[str, Any]] = {}
+
+    def lookup(self, file: str, file_hash: str, external_id: str) -> tuple[list[str], list[str]] | None:
+        """Return the indexed (tags, tickets), or None if unknown or stale."""
+        with self._lock:
+            entry = self._files.get(file)
+            if entry is None or entry["hash"] != file_hash:
+                return None
+            test = entry["tests"].get(external_id)
+            if test is None:
+                return None
+            return test.get("tags", []), test.get("tickets", [])
+
+    def update(self, file: str, file_hash: str, external_id: str, tags: list[str], tickets: list[str]) -> None:
+        """Record a test's tags and tickets, resetting the file's entry if it changed."""
+        with self._lock:
+            entry = self._files.get(file)
+            if entry is None or entry["hash"] != file_hash:
+                entry = self._files[file] = {"hash": file_hash, "tests": {}}
+            test: dict[str, list[str]] = {"tags": list(tags), "tickets": list(tickets)}
+            if entry["tests"].get(external_id) != test:
+                entry["tests"][external_id] = test
+                self.changed = True
+                self._updates.setdefault(file, {"hash": file_hash, "tests": {}})["tests"][external_id] = test
+
+    def updates(self) -> dict[str, dict[str, Any]]:
+        """Return the entries this process added or changed, as ``merge`` takes them."""
+        with self._lock:
+            return {file: {"hash": u["hash"], "tests": dict(u["tests"])} for file, u in self._updates.items()}
+
+    def merge(self, updates: dict[str, dict[str, Any]]) -> None:
+        """Fold in another process's ``updates()``."""
+        for file, update in updates.items():
+            for external_id, test in update["tests"].items():
+                self.update(file, update["hash"], external_id, test["tags"], test["tickets"])
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {"version": INDEX_VERSION, "files": self._files}
+
+
+def parse_filter(value: str | None) -> set[str]:
+    """Split a comma-separated ``--story-tags`` style value."""
+    if not value:
+        return set()
+    return {part.strip() for part in value.split(",") if part.strip()}
+
+
+def matches(tags: list[str], tickets: list[str], want_tags: set[str], want_tickets: set[str]) -> bool:
+    """Return True if the test carries any wanted tag and any wanted ticket.
+
+    An empty filter places no constraint.
+    """
+    if want_tags and want_tags.isdisjoint(tags):
+        return False
+    if want_tickets and want_tickets.isdisjoint(tickets):
+        return False
+    return True
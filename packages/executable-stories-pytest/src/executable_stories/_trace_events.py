@@ -0,0 +1,180 @@
+"""Chrome Trace Event Format timeline of tests, their phases and story steps.
+
+With ``--stories-chrome-trace PATH`` every test becomes a complete
+(``"ph": "X"``) event spanning setup to teardown, with one child event
+per phase and, below ``call``, one per story step. Steps timed by
+``fn``/``expect`` or ``start_timer``/``end_timer`` get their real start
+and duration; other steps are instant (``"ph": "i"``) markers at the
+moment they were declared. Events carry the process id and native thread
+id, and ``process_name``/``thread_name`` metadata events label each
+track, so the file opens in Perfetto or ``chrome://tracing`` with one
+track per worker process and thread.
+
+Events are streamed to disk as they happen, in the JSON array form
+(one event per line) and flushed after every test, so an interrupted
+run still leaves a readable file. Under pytest-xdist each worker
+streams to ``PATH.<worker id>.part`` and the controller concatenates the
+parts into ``PATH`` at the end of the session.
+
+Timestamps are wall-clock microseconds; step times, measured with
+``time.perf_counter()``, are shifted onto the same clock.
+"""
+
+from __future__ import annotations
+
+import glob
+import json
+import os
+import threading
+import time
+from typing import IO, Any
+
+PART_SUFFIX = ".part"
+
+
+class _TraceEventWriter:
+    """Streams trace events of one process to a JSON array file."""
+
+    def __init__(self, path: str, process_name: str) -> None:
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.path = path
+        self.pid = os.getpid()
+        self._file: IO[str] | None = open(path, "w", encoding="utf-8")
+        self._file.write("[")
+        self._count = 0
+        self._lock = threading.Lock()
+        self._threads: set[int] = set()
+        # Test start (setup phase) per node id, for the enclosing test event.
+        self._test_starts: dict[str, float] = {}
+        # perf_counter() seconds + offset = time.time() seconds.
+        self._perf_offset = time.time() - time.perf_counter()
+        self._emit({"name": "process_name", "ph": "M", "pid": self.pid, "tid": 0, "args": {"name": process_name}})
+
+    # ── Events ─────────────────────────────────────────────────────
+
+    def _emit(self, event: dict[str, Any]) -> None:
+        line = json.dumps(event, separators=(",", ":"))
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(("\n" if self._count == 0 else ",\n") + line)
+            self._count += 1
+
+    def _tid(self) -> int:
+        tid = threading.get_native_id()
+        if tid not in self._threads:
+            self._threads.add(tid)
+            name = threading.current_thread().name
+            self._emit({"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}})
+        return tid
+
+    def _complete(self, name: str, cat: str, start_s: float, duration_s: float, tid: int, args: dict[str, Any]) -> None:
+        self._emit({
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": round(start_s * 1e6, 3),
+            "dur": round(max(duration_s, 0.0) * 1e6, 3),
+            "pid": self.pid,
+            "tid": tid,
+            "args": args,
+        })
+
+    def phase(self, report: Any) -> None:
+        """Record a setup/call/teardown report; teardown also closes the test event."""
+        tid = self._tid()
+        stop = getattr(report, "stop", None)
+        if stop is None:
+            stop = time.time()
+        start = getattr(report, "start", None)
+        if start is None:
+            start = stop - report.duration
+        nodeid = report.nodeid
+        self._complete(report.when, "phase", start, stop - start, tid, {"nodeid": nodeid, "outcome": report.outcome})
+        if report.when == "setup":
+            self._test_starts[nodeid] = start
+        elif report.when == "teardown":
+            test_start = self._test_starts.pop(nodeid, start)
+            self._complete(nodeid, "test", test_start, stop - test_start, tid, {"nodeid": nodeid})
+            self.flush()
+
+    def steps(self, nodeid: str, steps: list[Any]) -> None:
+        """Record the story steps of a test that just finished its call phase."""
+        tid = self._tid()
+        for step in steps:
+            name = f"{step.keyword} {step.text}"
+            args = {"nodeid": nodeid, "index": step.index}
+            start = step.started + self._perf_offset
+            if step.duration_ms is None:
+                self._emit({
+                    "name": name,
+                    "cat": "step",
+                    "ph": "i",
+                    "s": "t",
+                    "ts": round(start * 1e6, 3),
+                    "pid": self.pid,
+                    "tid": tid,
+                    "args": args,
+                })
+            else:
+                self._complete(name, "step", start, step.duration_ms / 1000.0, tid, args)
+
+    # ── File ───────────────────────────────────────────────────────
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write("\n]\n")
+            self._file.close()
+            self._file = None
+
+
+def part_path(path: str, worker_id: str) -> str:
+    """The file a pytest-xdist worker streams to."""
+    return f"{path}.{worker_id}{PART_SUFFIX}"
+
+
+def _parts(path: str) -> list[str]:
+    return sorted(glob.glob(glob.escape(path) + ".*" + PART_SUFFIX))
+
+
+def clear_parts(path: str) -> None:
+    """Remove part files left behind by an interrupted run."""
+    for part in _parts(path):
+        os.remove(part)
+
+
+def combine_parts(path: str) -> int:
+    """Concatenate the workers' part files into *path* and remove them.
+
+    Returns the number of parts combined. Parts are read line by line, so
+    memory does not grow with their size.
+    """
+    parts = _parts(path)
+    if not parts:
+        return 0
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    written = 0
+    with open(path, "w", encoding="utf-8") as out:
+        out.write("[")
+        for part in parts:
+            with open(part, encoding="utf-8") as f:
+                for line in f:
+                    event = line.strip().rstrip(",")
+                    if not event or event in ("[", "]"):
+                        continue
+                    out.write(("\n" if written == 0 else ",\n") + event)
+                    written += 1
+            os.remove(part)
+        out.write("\n]\n")
+    return len(parts)
@@ -158,6 +158,13 @@ class ErrorInfo(TypedDict, total=False):
     stack: str
 
 
+class RawAttempt(TypedDict):
+    attempt: int  # 0-based
+    status: str
+    durationMs: float
+    errorMessage: NotRequired[str]
+
+
 class RawTestCase(TypedDict):
     status: str  # "pass" | "fail" | "skip" | ...
     externalId: NotRequired[str]
@@ -174,6 +181,7 @@ class RawTestCase(TypedDict):
     attachments: NotRequired[list[Attachment]]
     stepEvents: NotRequired[list[RawStepEvent]]
     projectName: NotRequired[str]
+    attempts: NotRequired[list[RawAttempt]]  # reruns collapsed into this case
 
 
 # ── RawCIInfo ──────────────────────────────────────────────────────
@@ -0,0 +1,58 @@
+"""Tests for shared Background steps."""
+
+import time
+
+import pytest
+
+from executable_stories._story_api import Story
+
+
+class TestBackgroundApi:
+    def test_fixture_background_registered_once(self, fresh_story: Story):
+        key = object()
+        fresh_story._enter_fixture(key, "shop", "module")
+        bg = fresh_story.background("A stocked shop")
+        bg.given("a shop").given("three products")
+        fresh_story._exit_fixture()
+
+        summary = fresh_story._backgrounds.summary()
+        assert len(summary) == 1
+        assert summary[0]["name"] == "A stocked shop"
+        assert summary[0]["fixture"] == "shop"
+        assert summary[0]["scope"] == "module"
+        assert [s["keyword"] for s in summary[0]["steps"]] == ["Given", "And"]
+        assert fresh_story._get_background_ids([key]) == [bg.id]
+
+    def test_setup_time_attributed_exclusive_of_nested_fixtures(self, fresh_story: Story):
+        outer, inner = object(), object()
+        fresh_story._enter_fixture(outer, "outer", "session")
+        bg = fresh_story.background("Outer")
+        fresh_story._enter_fixture(inner, "inner", "session")
+        time.sleep(0.03)
+        fresh_story._exit_fixture()
+        fresh_story._exit_fixture()
+        assert bg.duration_ms is not None
+        assert bg.duration_ms < 25
+
+    def test_fixture_setup_again_replaces_background(self, fresh_story: Story):
+        key = object()
+        for _ in range(2):
+            fresh_story._enter_fixture(key, "db", "module")
+            fresh_story.background("Database")
+            fresh_story._exit_fixture()
+        assert fresh_story._get_background_ids([key]) == ["bg-1"]
+
+    def test_background_in_test_body(self, fresh_story: Story):
+        fresh_story.init("Test")
+        bg = fresh_story.background("Inline")
+        assert fresh_story._get_background_ids([]) == [bg.id]
+
+    def test_background_outside_fixture_without_init_raises(self, fresh_story: Story):
+        with pytest.raises(RuntimeError, match="story.background"):
+            fresh_story.background("Nowhere")
+
+    def test_context_manager(self, fresh_story: Story):
+        fresh_story.init("Test")
+        with fresh_story.background("Block") as bg:
+            bg.when("something happens")
+        assert bg.steps[0]["text"] == "something happens"
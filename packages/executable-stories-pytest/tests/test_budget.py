@@ -0,0 +1,139 @@
+"""Tests for doc entry byte budgets."""
+
+import json
+
+from executable_stories._budget import _DocBudget, omitted_placeholder
+from executable_stories._story_api import Story
+
+
+class TestDocBudget:
+    def test_small_entry_untouched(self):
+        budget = _DocBudget(max_entry_bytes=100, max_test_bytes=0, max_run_bytes=0)
+        entry = {"kind": "note", "text": "hello", "phase": "runtime"}
+        result, charged, dropped = budget.apply(entry, 0)
+        assert result is entry
+        assert charged == 5
+        assert dropped == 0
+        assert budget.summary() is None
+
+    def test_entry_limit_truncates_string(self):
+        budget = _DocBudget(max_entry_bytes=10, max_test_bytes=0, max_run_bytes=0)
+        entry = {"kind": "code", "label": "big", "content": "x" * 50, "phase": "runtime"}
+        result, charged, dropped = budget.apply(entry, 0)
+        assert result["content"] == "x" * 10
+        # DocEntry allows no extra properties; the cut shows in the counters.
+        assert set(result) == set(entry)
+        assert charged == 10
+        assert dropped == 40
+        assert entry["content"] == "x" * 50  # original entry not mutated
+
+    def test_truncation_respects_utf8_boundaries(self):
+        budget = _DocBudget(max_entry_bytes=5, max_test_bytes=0, max_run_bytes=0)
+        entry = {"kind": "note", "text": "ééé", "phase": "runtime"}  # 6 bytes
+        result, charged, _ = budget.apply(entry, 0)
+        assert result["text"] == "éé"
+        assert charged == 4
+
+    def test_test_limit_uses_remaining_bytes(self):
+        budget = _DocBudget(max_entry_bytes=0, max_test_bytes=20, max_run_bytes=0)
+        entry = {"kind": "note", "text": "y" * 15, "phase": "runtime"}
+        result, charged, dropped = budget.apply(entry, 10)
+        assert result["text"] == "y" * 10
+        assert dropped == 5
+
+    def test_run_limit_is_shared(self):
+        budget = _DocBudget(max_entry_bytes=0, max_test_bytes=0, max_run_bytes=8)
+        budget.apply({"kind": "note", "text": "abcdef", "phase": "runtime"}, 0)
+        result, _, dropped = budget.apply({"kind": "note", "text": "ghijkl", "phase": "runtime"}, 0)
+        assert result["text"] == "gh"
+        assert dropped == 4
+        summary = budget.summary()
+        assert summary["truncatedEntries"] == 1
+        assert summary["droppedBytes"] == 4
+        assert summary["keptBytes"] == 8
+
+    def test_table_keeps_whole_rows(self):
+        budget = _DocBudget(max_entry_bytes=30, max_test_bytes=0, max_run_bytes=0)
+        rows = [["row", str(i)] for i in range(10)]
+        entry = {"kind": "table", "label": "t", "columns": ["a", "b"], "rows": rows, "phase": "runtime"}
+        result, _, dropped = budget.apply(entry, 0)
+        assert dropped > 0
+        assert 0 < len(result["rows"]) < 10
+        assert result["rows"] == rows[: len(result["rows"])]
+
+    def test_structured_values_replaced_by_placeholder(self):
+        budget = _DocBudget(max_entry_bytes=12, max_test_bytes=0, max_run_bytes=0)
+        value = {"items": list(range(100))}
+        size = len(json.dumps(value))
+        for kind, field in (("kv", "value"), ("custom", "data")):
+            entry = {"kind": kind, "label": "payload", "type": "t", field: value, "phase": "runtime"}
+            result, charged, dropped = budget.apply(entry, 0)
+            assert result[field] == omitted_placeholder(size)
+            assert (charged, dropped) == (0, size)
+            assert entry[field] is value
+        assert budget.summary()["droppedBytes"] == 2 * size
+
+    def test_label_only_kinds_not_charged(self):
+        budget = _DocBudget(max_entry_bytes=1, max_test_bytes=0, max_run_bytes=0)
+        entry = {"kind": "link", "label": "Docs", "url": "https://example.com", "phase": "runtime"}
+        result, charged, _ = budget.apply(entry, 0)
+        assert result is entry
+        assert charged == 0
+
+    def test_zero_disables_limits(self):
+        budget = _DocBudget(max_entry_bytes=0, max_test_bytes=0, max_run_bytes=0)
+        entry = {"kind": "note", "text": "z" * 10_000, "phase": "runtime"}
+        result, _, dropped = budget.apply(entry, 0)
+        assert result is entry
+        assert dropped == 0
+
+
+class TestStoryBudget:
+    def test_story_doc_truncated_and_counted(self, fresh_story: Story):
+        fresh_story._set_budget(_DocBudget(max_entry_bytes=16, max_test_bytes=0, max_run_bytes=0))
+        fresh_story.init("Budget")
+        fresh_story.code("body", "a" * 100)
+        meta = fresh_story._get_meta()
+        doc = meta["docs"][0]
+        assert doc["content"] == "a" * 16
+        assert "truncated" not in doc
+        assert fresh_story._get_dropped_doc_bytes() == 84
+
+    def test_oversized_structured_kv_is_dropped_and_counted(self, fresh_story: Story):
+        fresh_story._set_budget(_DocBudget(max_entry_bytes=16, max_test_bytes=0, max_run_bytes=0))
+        fresh_story.init("Budget")
+        payload = {"rows": ["x" * 10] * 10}
+        fresh_story.kv("payload", payload)
+        size = len(json.dumps(payload))
+        (doc,) = fresh_story._get_meta()["docs"]
+        assert doc["value"] == omitted_placeholder(size)
+        assert fresh_story._get_dropped_doc_bytes() == size
+
+    def test_per_test_budget_spans_steps(self, fresh_story: Story):
+        fresh_story._set_budget(_DocBudget(max_entry_bytes=0, max_test_bytes=10, max_run_bytes=0))
+        fresh_story.init("Budget")
+        fresh_story.given("first")
+        fresh_story.note("12345678")
+        fresh_story.when("second", docs=[{"kind": "note", "text": "abcdef", "phase": "runtime"}])
+        meta = fresh_story._get_meta()
+        assert meta["steps"][0]["docs"][0]["text"] == "12345678"
+        assert meta["steps"][1]["docs"][0]["text"] == "ab"
+        assert fresh_story._get_dropped_doc_bytes() == 4
+
+    def test_per_test_usage_resets_on_init(self, fresh_story: Story):
+        fresh_story._set_budget(_DocBudget(max_entry_bytes=0, max_test_bytes=10, max_run_bytes=0))
+        fresh_story.init("First")
+        fresh_story.note("1234567890")
+        fresh_story.init("Second")
+        fresh_story.note("1234567890")
+        assert fresh_story._get_meta()["docs"][0]["text"] == "1234567890"
+        assert fresh_story._get_dropped_doc_bytes() == 0
+
+    def test_background_step_docs_are_charged(self, fresh_story: Story):
+        budget = _DocBudget(max_entry_bytes=4, max_test_bytes=0, max_run_bytes=0)
+        fresh_story._set_budget(budget)
+        fresh_story.init("Budget")
+        bg = fresh_story.background("Shared data")
+        bg.given("a payload", docs=[{"kind": "note", "text": "abcdefgh", "phase": "runtime"}])
+        assert bg.steps[0]["docs"][0]["text"] == "abcd"
+        assert budget.summary()["droppedBytes"] == 4
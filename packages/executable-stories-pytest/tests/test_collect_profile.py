@@ -0,0 +1,58 @@
+"""Tests for the collection profiler."""
+
+from __future__ import annotations
+
+import builtins
+import sys
+from pathlib import Path
+
+from executable_stories._collect_profile import _CollectionProfiler
+
+
+def _make_package(root: Path, name: str, body: str) -> None:
+    (root / name).mkdir()
+    (root / name / "__init__.py").write_text(body)
+
+
+class TestCollectionProfiler:
+    def test_module_timings_sorted_and_capped(self, tmp_path: Path):
+        profiler = _CollectionProfiler(str(tmp_path), top=2)
+        profiler.start()
+        for name, items in (("test_a.py", 3), ("test_b.py", 1), ("test_c.py", 2)):
+            started = profiler.begin_module(str(tmp_path / name))
+            profiler.end_module(started - (10_000_000 if name == "test_b.py" else 0), items)
+        profiler.stop()
+
+        summary = profiler.summary()
+        assert summary["moduleCount"] == 3
+        assert [m["path"] for m in summary["modules"]][0] == "test_b.py"
+        assert len(summary["modules"]) == 2
+        assert summary["modules"][0]["items"] == 1
+        assert "imports" not in summary
+
+    def test_import_attribution(self, tmp_path: Path, monkeypatch):
+        monkeypatch.syspath_prepend(str(tmp_path))
+        _make_package(tmp_path, "slowdep_xyz", "import time\ntime.sleep(0.03)\nimport fastdep_xyz\n")
+        _make_package(tmp_path, "fastdep_xyz", "")
+        original = builtins.__import__
+
+        profiler = _CollectionProfiler(str(tmp_path), imports=True)
+        profiler.start()
+        try:
+            started = profiler.begin_module(str(tmp_path / "test_x.py"))
+            import slowdep_xyz  # noqa: F401
+
+            profiler.end_module(started, 0)
+        finally:
+            profiler.stop()
+            sys.modules.pop("slowdep_xyz", None)
+            sys.modules.pop("fastdep_xyz", None)
+
+        assert builtins.__import__ is original
+        imports = profiler.summary()["imports"]
+        packages = {p["name"]: p["selfMs"] for p in imports["packages"]}
+        assert packages["slowdep_xyz"] >= 25
+        assert packages["fastdep_xyz"] < packages["slowdep_xyz"]
+        slowest = {s["module"]: s for s in imports["slowest"]}
+        assert slowest["slowdep_xyz"]["collectedBy"] == "test_x.py"
+        assert slowest["slowdep_xyz"]["cumulativeMs"] >= slowest["fastdep_xyz"]["cumulativeMs"]
@@ -0,0 +1,146 @@
+"""Tests for the test case collector."""
+
+import threading
+
+import pytest
+
+from executable_stories._collector import _BufferedCollector, _Collector
+
+
+@pytest.fixture(params=[_Collector, _BufferedCollector])
+def collector_cls(request):
+    return request.param
+
+
+class TestRecord:
+    def test_preserves_order(self, collector_cls):
+        c = collector_cls()
+        c.record({"status": "pass", "externalId": "a"})
+        c.record({"status": "fail", "externalId": "b"})
+        assert [tc["externalId"] for tc in c.get_all()] == ["a", "b"]
+
+    def test_cases_without_external_id_never_merge(self, collector_cls):
+        c = collector_cls()
+        c.record({"status": "pass"})
+        c.record({"status": "pass"})
+        assert len(c.get_all()) == 2
+
+    def test_clear_resets_index(self, collector_cls):
+        c = collector_cls()
+        c.record({"status": "fail", "externalId": "a"})
+        c.clear()
+        c.record({"status": "pass", "externalId": "a"})
+        assert "meta" not in c.get_all()[0]
+
+
+class TestRerunMerge:
+    def test_reruns_collapse_into_one_case(self, collector_cls):
+        c = collector_cls()
+        c.record({
+            "status": "fail",
+            "externalId": "t::flaky",
+            "durationMs": 5.0,
+            "retries": 2,
+            "error": {"message": "boom", "stack": "long traceback"},
+            "story": {"scenario": "first attempt"},
+        })
+        c.record({
+            "status": "pass",
+            "externalId": "t::flaky",
+            "durationMs": 3.0,
+            "retries": 2,
+            "story": {"scenario": "second attempt"},
+        })
+        cases = c.get_all()
+        assert len(cases) == 1
+        tc = cases[0]
+        assert tc["status"] == "pass"
+        assert tc["retry"] == 1
+        assert tc["retries"] == 2
+        assert tc["story"]["scenario"] == "second attempt"
+        assert "error" not in tc
+        assert tc["meta"]["attempts"] == [
+            {"attempt": 0, "status": "fail", "durationMs": 5.0, "errorMessage": "boom"},
+            {"attempt": 1, "status": "pass", "durationMs": 3.0},
+        ]
+
+    def test_attempt_history_accumulates(self, collector_cls):
+        c = collector_cls()
+        for status in ("fail", "fail", "fail"):
+            c.record({"status": status, "externalId": "t::broken", "durationMs": 1.0})
+        tc = c.get_all()[0]
+        assert tc["retry"] == 2
+        assert tc["retries"] == 2
+        assert [a["attempt"] for a in tc["meta"]["attempts"]] == [0, 1, 2]
+
+    def test_recorded_rerun_carries_history_before_drain(self, collector_cls):
+        # The plugin publishes (JUnit, pipe) the dict it just recorded.
+        c = collector_cls()
+        c.record({"status": "fail", "externalId": "t::flaky"})
+        rerun = {"status": "pass", "externalId": "t::flaky"}
+        c.record(rerun)
+        assert rerun["retry"] == 1
+        assert [a["status"] for a in rerun["meta"]["attempts"]] == ["fail", "pass"]
+        assert c.get_all() == [rerun]
+
+    def test_merge_keeps_original_position(self, collector_cls):
+        c = collector_cls()
+        c.record({"status": "fail", "externalId": "a"})
+        c.record({"status": "pass", "externalId": "b"})
+        c.record({"status": "pass", "externalId": "a"})
+        assert [tc["externalId"] for tc in c.get_all()] == ["a", "b"]
+
+
+class TestBufferedCollector:
+    def test_get_all_drains_incrementally(self):
+        c = _BufferedCollector()
+        c.record({"status": "fail", "externalId": "a"})
+        assert len(c.get_all()) == 1
+        c.record({"status": "pass", "externalId": "a"})
+        (tc,) = c.get_all()
+        assert [a["status"] for a in tc["meta"]["attempts"]] == ["fail", "pass"]
+        assert c.get_all() == [tc]
+
+    def test_outline_rows_fold_at_drain(self):
+        c = _BufferedCollector()
+        for n in (1, 2):
+            c.record_example(
+                "t::test_add",
+                "test_add",
+                {"status": "pass", "externalId": f"t::test_add[{n}]", "story": {"scenario": f"add {n}"}},
+                str(n),
+                {"n": n},
+            )
+        (tc,) = c.get_all()
+        assert tc["externalId"] == "t::test_add"
+
+    def test_concurrent_threads_lose_nothing(self):
+        threads, per_thread = 8, 400
+        c = _BufferedCollector()
+        barrier = threading.Barrier(threads)
+
+        def worker(t: int) -> None:
+            barrier.wait()
+            for i in range(per_thread):
+                external_id = f"t{t}::{i}"
+                c.record({"status": "fail", "externalId": external_id})
+                if i % 4 == 0:
+                    c.record({"status": "pass", "externalId": external_id})
+
+        pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+
+        cases = c.get_all()
+        assert len(cases) == threads * per_thread
+        by_id = {tc["externalId"]: tc for tc in cases}
+        for t in range(threads):
+            # Each thread's cases keep their relative order.
+            mine = [tc["externalId"] for tc in cases if tc["externalId"].startswith(f"t{t}::")]
+            assert mine == [f"t{t}::{i}" for i in range(per_thread)]
+            rerun = by_id[f"t{t}::0"]
+            assert rerun["status"] == "pass"
+            assert [a["status"] for a in rerun["meta"]["attempts"]] == ["fail", "pass"]
+            assert "meta" not in by_id[f"t{t}::1"]
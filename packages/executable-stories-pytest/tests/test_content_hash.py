@@ -0,0 +1,92 @@
+"""Tests for story and step content hashes."""
+
+from __future__ import annotations
+
+from executable_stories._content_hash import build_manifest, step_hash, story_hashes
+from executable_stories._lazy import lazy_json
+
+
+def _story(**extra) -> dict:
+    return {
+        "scenario": "Checkout",
+        "tags": ["e2e"],
+        "steps": [
+            {"id": "step-1", "keyword": "Given", "text": "a cart", "durationMs": 1.0},
+            {"id": "step-2", "keyword": "When", "text": "the user pays", "durationMs": 2.0},
+        ],
+        **extra,
+    }
+
+
+class TestStoryHashes:
+    def test_timings_and_source_order_are_ignored(self):
+        fast = _story(sourceOrder=1)
+        slow = _story(sourceOrder=7)
+        for step in slow["steps"]:
+            step["durationMs"] *= 100
+        assert story_hashes(fast) == story_hashes(slow)
+
+    def test_step_text_changes_story_and_step_hash(self):
+        base_story, base_steps = story_hashes(_story())
+        changed = _story()
+        changed["steps"][1]["text"] = "the user pays by card"
+        story, steps = story_hashes(changed)
+        assert story != base_story
+        assert steps[0] == base_steps[0]
+        assert steps[1] != base_steps[1]
+
+    def test_key_order_does_not_matter(self):
+        step = {"keyword": "Given", "text": "x", "docs": [{"kind": "note", "text": "n"}]}
+        reordered = {"docs": [{"text": "n", "kind": "note"}], "text": "x", "keyword": "Given"}
+        assert step_hash(step) == step_hash(reordered)
+
+    def test_lazy_docs_hash_like_resolved_ones(self):
+        entry = {"kind": "code", "label": "Payload", "content": None, "lang": "json"}
+        lazy = _story(docs=[lazy_json(entry, "content", {"a": 1})])
+        resolved = _story(docs=[{"kind": "code", "label": "Payload", "content": '{\n  "a": 1\n}', "lang": "json"}])
+        assert story_hashes(lazy) == story_hashes(resolved)
+
+    def test_per_run_values_are_ignored(self):
+        def run(trace_id, latency, status, duration):
+            story = _story(
+                meta={"otel": {"traceId": trace_id, "spanId": trace_id[:16]}, "owner": "payments"},
+                docs=[
+                    {"kind": "kv", "label": "Trace ID", "value": trace_id, "phase": "runtime"},
+                    {"kind": "table", "label": "Examples", "columns": ["amount", "status", "durationMs"],
+                     "rows": [["10", status, str(duration)]], "phase": "runtime"},
+                ],
+            )
+            story["steps"][1]["docs"] = [
+                {"kind": "custom", "type": "metric", "phase": "runtime", "data": {"name": "latency", "value": latency}},
+                {"kind": "custom", "type": "otel-spans", "phase": "runtime", "data": {"spans": int(latency)}},
+            ]
+            return story
+
+        first = run("a" * 32, 12.0, "pass", 1.5)
+        second = run("b" * 32, 30.0, "fail", 9.0)
+        assert story_hashes(first) == story_hashes(second)
+
+        second["meta"]["owner"] = "checkout"
+        assert story_hashes(first)[0] != story_hashes(second)[0]
+
+    def test_examples_table_params_are_content(self):
+        def examples(amount):
+            return _story(docs=[{"kind": "table", "label": "Examples", "columns": ["amount", "status", "durationMs"],
+                                 "rows": [[amount, "pass", "1.0"]]}])
+
+        assert story_hashes(examples("10"))[0] != story_hashes(examples("20"))[0]
+
+
+class TestBuildManifest:
+    def test_ordered_by_source_order(self):
+        cases = [
+            {"externalId": "b", "story": _story(sourceOrder=2)},
+            {"externalId": "plain"},
+            {"externalId": "a", "story": _story(sourceOrder=1)},
+            {"externalId": "c", "story": _story()},
+        ]
+        manifest = build_manifest(cases)
+        assert list(manifest["stories"]) == ["a", "b", "c"]
+        assert manifest["stories"]["a"]["sourceOrder"] == 1
+        assert "sourceOrder" not in manifest["stories"]["c"]
+        assert manifest["stories"]["a"]["hash"] == story_hashes(_story())[0]
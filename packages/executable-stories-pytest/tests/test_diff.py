@@ -0,0 +1,112 @@
+"""Tests for the run-to-run diff."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from executable_stories._cli import main
+from executable_stories._diff import diff_runs
+from executable_stories._json_writer import write_raw_run
+
+
+def _step(n: int, keyword: str, text: str, duration_ms: float) -> dict:
+    return {"id": f"step-{n}", "keyword": keyword, "text": text, "durationMs": duration_ms}
+
+
+def _case(external_id: str, status: str = "pass", duration_ms: float = 10.0, steps: list | None = None) -> dict:
+    case = {"externalId": external_id, "title": external_id, "status": status, "durationMs": duration_ms}
+    if steps is not None:
+        case["story"] = {"scenario": external_id, "steps": steps}
+    return case
+
+
+def _write(path: Path, cases: list[dict]) -> str:
+    write_raw_run({"schemaVersion": 1, "projectRoot": "/proj", "testCases": cases}, str(path))
+    return str(path)
+
+
+def _runs(tmp_path: Path) -> tuple[str, str]:
+    old = _write(tmp_path / "old.json", [
+        _case("t::ok"),
+        _case("t::breaks", "pass"),
+        _case("t::heals", "fail"),
+        _case("t::gone"),
+        _case("t::slow", duration_ms=10.0, steps=[
+            _step(1, "Given", "a user", 1.0),
+            _step(2, "When", "they log in", 5.0),
+            _step(3, "Then", "they see a banner", 1.0),
+        ]),
+    ])
+    new = _write(tmp_path / "new.json", [
+        _case("t::ok", "passed"),
+        _case("t::breaks", "fail"),
+        _case("t::heals", "pass"),
+        _case("t::new", "skip"),
+        _case("t::slow", duration_ms=510.0, steps=[
+            _step(1, "Given", "a user", 1.0),
+            _step(2, "When", "they log in with SSO", 405.0),
+        ]),
+    ])
+    return old, new
+
+
+class TestDiffRuns:
+    def test_status_transitions_sorted_by_impact(self, tmp_path: Path):
+        report = diff_runs(*_runs(tmp_path))
+        assert [(c["externalId"], c["kind"]) for c in report["statusChanges"]] == [
+            ("t::breaks", "regressed"),
+            ("t::heals", "fixed"),
+        ]
+        assert report["summary"]["regressed"] == 1
+        assert report["summary"]["fixed"] == 1
+
+    def test_added_and_removed(self, tmp_path: Path):
+        report = diff_runs(*_runs(tmp_path))
+        assert report["added"] == [{"externalId": "t::new", "title": "t::new", "status": "skipped"}]
+        assert [c["externalId"] for c in report["removed"]] == ["t::gone"]
+
+    def test_step_changes_include_old_text(self, tmp_path: Path):
+        report = diff_runs(*_runs(tmp_path))
+        assert report["stepChanges"] == [
+            {
+                "externalId": "t::slow",
+                "stepId": "step-2",
+                "change": "changed",
+                "to": "When they log in with SSO",
+                "from": "When they log in",
+            },
+            {"externalId": "t::slow", "stepId": "step-3", "change": "removed", "from": "Then they see a banner"},
+        ]
+
+    def test_duration_deltas(self, tmp_path: Path):
+        report = diff_runs(*_runs(tmp_path))
+        assert [(c["externalId"], c["deltaMs"]) for c in report["durations"]] == [("t::slow", 500.0)]
+        assert [(c["stepId"], c["deltaMs"]) for c in report["stepDurations"]] == [("step-2", 400.0)]
+
+    def test_top_keeps_largest_changes(self, tmp_path: Path):
+        old = _write(tmp_path / "old.json", [_case(f"t::{i}", duration_ms=0.0) for i in range(10)])
+        new = _write(tmp_path / "new.json", [_case(f"t::{i}", duration_ms=float(i)) for i in range(10)])
+        report = diff_runs(old, new, top=3)
+        assert [c["externalId"] for c in report["durations"]] == ["t::9", "t::8", "t::7"]
+        report = diff_runs(old, new, top=0, min_delta_ms=5)
+        assert len(report["durations"]) == 5
+
+
+class TestDiffCli:
+    def test_text_output(self, tmp_path: Path, capsys):
+        assert main(["diff", *_runs(tmp_path)]) == 0
+        out = capsys.readouterr().out
+        assert "1 regressed, 1 fixed, 1 added, 1 removed, 2 step changes" in out
+        assert "regressed  t::breaks  passed -> failed" in out
+        assert "      - When they log in\n      + When they log in with SSO" in out
+        assert "+500.0 ms  t::slow  (10.0 ms -> 510.0 ms)" in out
+
+    def test_json_output_to_file(self, tmp_path: Path):
+        out = tmp_path / "diff.json"
+        assert main(["diff", *_runs(tmp_path), "--format", "json", "-o", str(out)]) == 0
+        report = json.loads(out.read_text(encoding="utf-8"))
+        assert report["summary"]["added"] == 1
+
+    def test_missing_input(self, tmp_path: Path):
+        assert main(["diff", str(tmp_path / "a.json"), str(tmp_path / "b.json")]) == 4
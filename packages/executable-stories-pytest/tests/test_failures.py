@@ -0,0 +1,75 @@
+"""Tests for bounded, fingerprinted failure capture."""
+
+from executable_stories._failures import (
+    _FailureIndex,
+    bound_text,
+    fingerprint,
+    normalize_message,
+)
+
+
+class TestBoundText:
+    def test_short_text_untouched(self):
+        assert bound_text("short", 100) == "short"
+
+    def test_zero_disables(self):
+        assert bound_text("x" * 1000, 0) == "x" * 1000
+
+    def test_keeps_head_and_tail(self):
+        text = "HEAD" + "m" * 1000 + "TAIL"
+        bounded = bound_text(text, 100)
+        assert bounded.startswith("HEAD")
+        assert bounded.endswith("TAIL")
+        assert "bytes truncated" in bounded
+        assert len(bounded) < 200
+
+
+class TestFingerprint:
+    def test_numbers_and_addresses_normalized(self):
+        assert normalize_message("assert 3 == 4 at 0xdeadbeef") == "assert N == N at <addr>"
+
+    def test_only_first_line_counts(self):
+        a = fingerprint("AssertionError", "t.py:3", "assert x\n- diff one")
+        b = fingerprint("AssertionError", "t.py:3", "assert x\n- diff two")
+        assert a == b
+
+    def test_location_and_type_distinguish(self):
+        base = fingerprint("AssertionError", "t.py:3", "boom")
+        assert fingerprint("ValueError", "t.py:3", "boom") != base
+        assert fingerprint("AssertionError", "t.py:4", "boom") != base
+
+
+class TestFailureIndex:
+    def test_groups_by_fingerprint_and_keeps_first_stack(self):
+        index = _FailureIndex()
+        for i in range(3):
+            index.record("fp1", f"t::a{i}", exception_type="E", location="t.py:1", message="m", stack=f"stack {i}")
+        index.record("fp2", "t::b", exception_type="E", location="t.py:2", message="m", stack="other")
+        groups = index.summary()
+        assert [g["fingerprint"] for g in groups] == ["fp1", "fp2"]
+        assert groups[0]["count"] == 3
+        assert groups[0]["stack"] == "stack 0"
+        assert groups[0]["externalIds"] == ["t::a0", "t::a1", "t::a2"]
+
+    def test_same_test_counted_once(self):
+        index = _FailureIndex()
+        for _ in range(2):
+            index.record("fp", "t::a", exception_type="E", location="", message="m", stack="s")
+        (group,) = index.summary()
+        assert (group["count"], group["externalIds"]) == (1, ["t::a"])
+
+    def test_merge_summary_sums_counts_and_unions_ids(self):
+        shard = _FailureIndex()
+        for name in ("a", "b"):
+            shard.record("fp", f"t::{name}", exception_type="E", location="", message="m", stack="shard stack")
+        index = _FailureIndex()
+        index.record("fp", "t::a", exception_type="E", location="", message="m", stack="s")
+        index.merge_summary(shard.summary())
+        (group,) = index.summary()
+        assert (group["count"], group["externalIds"], group["stack"]) == (2, ["t::a", "t::b"], "s")
+
+    def test_clear(self):
+        index = _FailureIndex()
+        index.record("fp", "t::a", exception_type="E", location="", message="m", stack="s")
+        index.clear()
+        assert index.summary() == []
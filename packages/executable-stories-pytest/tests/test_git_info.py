@@ -0,0 +1,117 @@
+"""Tests for reading the git SHA and package version without subprocesses."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from executable_stories import _plugin
+from executable_stories._git_info import find_git_dir, read_git_sha
+from executable_stories._metadata import project_fields, read_package_version
+
+SHA_MAIN = "1" * 40
+SHA_FEATURE = "2" * 40
+SHA_TAG = "3" * 40
+
+
+@pytest.fixture(autouse=True)
+def _no_ci_sha(monkeypatch):
+    for name in ("GITHUB_SHA", "GIT_COMMIT", "CI_COMMIT_SHA"):
+        monkeypatch.delenv(name, raising=False)
+
+
+def _repo(root: Path, head: str = "ref: refs/heads/main") -> Path:
+    git_dir = root / ".git"
+    (git_dir / "refs" / "heads").mkdir(parents=True)
+    (git_dir / "HEAD").write_text(head + "\n")
+    return git_dir
+
+
+class TestReadGitSha:
+    def test_loose_ref(self, tmp_path: Path):
+        git_dir = _repo(tmp_path)
+        (git_dir / "refs" / "heads" / "main").write_text(SHA_MAIN + "\n")
+        (tmp_path / "src" / "pkg").mkdir(parents=True)
+        assert read_git_sha(str(tmp_path / "src" / "pkg")) == SHA_MAIN
+
+    def test_packed_ref(self, tmp_path: Path):
+        git_dir = _repo(tmp_path, "ref: refs/heads/feature/x")
+        (git_dir / "packed-refs").write_text(
+            "# pack-refs with: peeled fully-peeled sorted \n"
+            f"{SHA_MAIN} refs/heads/main\n"
+            f"{SHA_FEATURE} refs/heads/feature/x\n"
+            f"{SHA_TAG} refs/tags/v1\n"
+            f"^{SHA_MAIN}\n"
+        )
+        assert read_git_sha(str(tmp_path)) == SHA_FEATURE
+
+    def test_loose_ref_wins_over_packed(self, tmp_path: Path):
+        git_dir = _repo(tmp_path)
+        (git_dir / "packed-refs").write_text(f"{SHA_MAIN} refs/heads/main\n")
+        (git_dir / "refs" / "heads" / "main").write_text(SHA_FEATURE + "\n")
+        assert read_git_sha(str(tmp_path)) == SHA_FEATURE
+
+    def test_detached_head(self, tmp_path: Path):
+        _repo(tmp_path, SHA_TAG)
+        assert read_git_sha(str(tmp_path)) == SHA_TAG
+
+    def test_linked_worktree(self, tmp_path: Path):
+        main_git = _repo(tmp_path / "main")
+        (main_git / "refs" / "heads" / "main").write_text(SHA_MAIN + "\n")
+        (main_git / "packed-refs").write_text(f"{SHA_FEATURE} refs/heads/feature\n")
+        wt_git = main_git / "worktrees" / "wt"
+        wt_git.mkdir(parents=True)
+        (wt_git / "HEAD").write_text("ref: refs/heads/feature\n")
+        (wt_git / "commondir").write_text("../..\n")
+        worktree = tmp_path / "wt"
+        worktree.mkdir()
+        (worktree / ".git").write_text(f"gitdir: {wt_git}\n")
+
+        assert find_git_dir(str(worktree)) == str(wt_git)
+        assert read_git_sha(str(worktree)) == SHA_FEATURE
+
+    def test_unborn_branch_and_no_repo(self, tmp_path: Path):
+        assert read_git_sha(str(tmp_path)) is None
+        _repo(tmp_path)
+        assert read_git_sha(str(tmp_path)) is None
+
+    def test_ci_variable_wins(self, tmp_path: Path, monkeypatch):
+        _repo(tmp_path, SHA_TAG)
+        monkeypatch.setenv("GITHUB_SHA", SHA_MAIN)
+        assert read_git_sha(str(tmp_path)) == SHA_MAIN
+
+
+class TestPackageVersion:
+    def test_installed_distribution(self, tmp_path: Path):
+        (tmp_path / "pyproject.toml").write_text('[project]\nname = "executable-stories-pytest"\nversion = "9.9"\n')
+        from importlib.metadata import version
+
+        assert read_package_version(str(tmp_path)) == version("executable-stories-pytest")
+
+    def test_static_version_when_not_installed(self, tmp_path: Path):
+        (tmp_path / "pyproject.toml").write_text('[project]\nname = "not-installed-xyz"\nversion = "1.2.3"\n')
+        (tmp_path / "tests").mkdir()
+        assert read_package_version(str(tmp_path / "tests")) == "1.2.3"
+
+    def test_project_fields(self, tmp_path: Path):
+        (tmp_path / "pyproject.toml").write_text('[project]\nname = "not-installed-xyz"\ndynamic = ["version"]\n')
+        git_dir = _repo(tmp_path)
+        (git_dir / "refs" / "heads" / "main").write_text(SHA_MAIN + "\n")
+        assert project_fields(str(tmp_path)) == {"gitSha": SHA_MAIN}
+
+
+class TestWorkerHandOff:
+    def test_controller_resolves_once_and_workers_reuse(self, tmp_path: Path, monkeypatch):
+        git_dir = _repo(tmp_path)
+        (git_dir / "refs" / "heads" / "main").write_text(SHA_MAIN + "\n")
+        monkeypatch.setattr(_plugin, "_project", None)
+        node = SimpleNamespace(config=SimpleNamespace(rootdir=tmp_path), workerinput={})
+        _plugin.pytest_configure_node(node)
+        assert node.workerinput[_plugin._WORKER_INPUT_KEY] == {"gitSha": SHA_MAIN}
+
+        # A worker never looks at .git itself.
+        monkeypatch.setattr(_plugin, "_project", None)
+        worker = SimpleNamespace(rootdir=tmp_path / "elsewhere", workerinput=node.workerinput)
+        assert _plugin._project_fields(worker) == {"gitSha": SHA_MAIN}
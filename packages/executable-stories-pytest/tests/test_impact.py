@@ -0,0 +1,110 @@
+"""Tests for per-test impact maps and change-based selection."""
+
+from __future__ import annotations
+
+import os
+import sys
+
+import pytest
+
+from executable_stories._impact import _ImpactTracer, is_affected, load_map, read_changed_files, write_map
+
+
+def _helper() -> int:
+    return 1
+
+
+class TestImpactTracer:
+    def test_records_functions_entered_per_test(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        tracer = _ImpactTracer(root)
+        assert tracer.start()
+        try:
+            tracer.begin_test()
+            _helper()
+            tracer.end_test("a")
+            tracer.begin_test()
+            tracer.end_test("b")
+            tracer.begin_test()
+            _helper()
+            tracer.end_test("c")
+        finally:
+            tracer.stop()
+
+        assert "tests/test_impact.py::_helper" in tracer.tests["a"][1]
+        assert "tests/test_impact.py::_helper" not in tracer.tests["b"][1]
+        # Disabled locations are re-armed for every test.
+        assert "tests/test_impact.py::_helper" in tracer.tests["c"][1]
+        assert "tests/test_impact.py" in tracer.tests["c"][0]
+
+    def test_ignores_code_outside_root(self, tmp_path):
+        tracer = _ImpactTracer(str(tmp_path))
+        assert tracer.start()
+        try:
+            tracer.begin_test()
+            _helper()
+            tracer.end_test("a")
+        finally:
+            tracer.stop()
+        assert tracer.tests["a"] == (set(), set())
+
+    def test_refuses_to_share_sys_monitoring(self, tmp_path):
+        sys.monitoring.use_tool_id(5, "other-tool")
+        try:
+            with pytest.raises(RuntimeError, match="other-tool"):
+                _ImpactTracer(str(tmp_path)).start()
+        finally:
+            sys.monitoring.free_tool_id(5)
+
+
+class TestImpactMap:
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / "impact-map.json")
+        tests = {
+            "t.py::a": ({"src/x.py"}, {"src/x.py::f"}),
+            "t.py::b": ({"src/x.py", "src/y.py"}, {"src/x.py::f", "src/y.py::g"}),
+        }
+        write_map(path, tests)
+        assert load_map(path) == tests
+
+    def test_missing_or_foreign_map_is_empty(self, tmp_path):
+        assert load_map(str(tmp_path / "nope.json")) == {}
+        path = tmp_path / "old.json"
+        path.write_text('{"version": 0}')
+        assert load_map(str(path)) == {}
+
+    def test_read_changed_files(self, tmp_path):
+        path = tmp_path / "changed.txt"
+        path.write_text("./src/x.py\n\n  docs/a.md \n")
+        assert read_changed_files(str(path), str(tmp_path)) == {"src/x.py", "docs/a.md"}
+
+    def test_changed_files_rebased_from_git_root(self, tmp_path):
+        (tmp_path / ".git").mkdir()
+        root = tmp_path / "packages" / "app"
+        root.mkdir(parents=True)
+        path = tmp_path / "changed.txt"
+        path.write_text(f"packages/app/src/x.py\nREADME.md\n{root / 'src' / 'y.py'}\n")
+        assert read_changed_files(str(path), str(root)) == {"src/x.py", "src/y.py"}
+
+
+class TestIsAffected:
+    impact = {
+        "tests/test_a.py::test_x": ({"src/x.py", "tests/test_a.py"}, set()),
+        "tests/unit/test_b.py::test_y": ({"src/y.py", "tests/unit/test_b.py"}, set()),
+    }
+
+    def test_touched_file_selects(self):
+        assert is_affected("tests/test_a.py::test_x", self.impact, {"src/x.py"})
+        assert not is_affected("tests/unit/test_b.py::test_y", self.impact, {"src/x.py"})
+
+    def test_unknown_test_always_runs(self):
+        assert is_affected("tests/test_new.py::test_z", self.impact, set())
+
+    def test_non_python_changes_are_ignored(self):
+        assert not is_affected("tests/test_a.py::test_x", self.impact, {"README.md"})
+
+    def test_conftest_selects_its_directory(self):
+        changed = {"tests/unit/conftest.py"}
+        assert is_affected("tests/unit/test_b.py::test_y", self.impact, changed)
+        assert not is_affected("tests/test_a.py::test_x", self.impact, changed)
+        assert is_affected("tests/test_a.py::test_x", self.impact, {"conftest.py"})
@@ -4,7 +4,8 @@ import json
 import os
 import tempfile
 
-from executable_stories._json_writer import write_raw_run
+from executable_stories._compact import decode_run, encode_run, is_compact
+from executable_stories._json_writer import read_raw_run, read_raw_run_ndjson, write_raw_run, write_raw_run_ndjson
 
 
 class TestWriteRawRun:
@@ -126,3 +127,98 @@ class TestOutputSchema:
         assert loaded == raw_run
         assert loaded["testCases"][0]["story"]["steps"][1]["docs"][0]["kind"] == "note"
         assert loaded["testCases"][1]["error"]["message"] == "AssertionError"
+
+
+def _repetitive_run(n: int) -> dict:
+    return {
+        "schemaVersion": 1,
+        "projectRoot": "/home/user/project",
+        "testCases": [
+            {
+                "status": "pass",
+                "externalId": f"tests/test_cart.py::test_add[{i}]",
+                "title": f"test_add[{i}]",
+                "titlePath": ["tests", "test_cart.py"],
+                "sourceFile": "/home/user/project/tests/test_cart.py",
+                "story": {
+                    "scenario": "User adds item to cart",
+                    "tags": ["e2e", "cart"],
+                    "steps": [
+                        {"keyword": "Given", "text": "a logged-in user", "id": "step-0"},
+                        {
+                            "keyword": "When",
+                            "text": "they add a product",
+                            "id": "step-1",
+                            "docs": [{"kind": "kv", "label": "text", "value": i, "phase": "runtime"}],
+                        },
+                    ],
+                },
+                "meta": {"text": i, "status": 7},
+            }
+            for i in range(n)
+        ],
+    }
+
+
+class TestCompactEncoding:
+    def test_round_trip(self):
+        raw_run = _repetitive_run(5)
+        encoded = encode_run(raw_run)
+        assert is_compact(encoded)
+        assert not is_compact(raw_run)
+        assert decode_run(encoded) == raw_run
+
+    def test_repeated_strings_stored_once(self):
+        encoded = encode_run(_repetitive_run(50))
+        strings = encoded["strings"]
+        assert strings.count("a logged-in user") == 1
+        assert strings.count("/home/user/project/tests/test_cart.py") == 1
+        step = encoded["run"]["testCases"][0]["story"]["steps"][0]
+        assert strings[step["text"]] == "a logged-in user"
+
+    def test_user_payloads_untouched(self):
+        encoded = encode_run(_repetitive_run(2))
+        tc = encoded["run"]["testCases"][1]
+        assert tc["meta"] == {"text": 1, "status": 7}
+        assert tc["story"]["steps"][1]["docs"][0]["value"] == 1
+
+    def test_unsupported_version_rejected(self):
+        encoded = encode_run(_repetitive_run(1))
+        encoded["version"] = 99
+        try:
+            decode_run(encoded)
+        except ValueError as err:
+            assert "Unsupported compact encoding version" in str(err)
+        else:
+            raise AssertionError("expected ValueError")
+
+    def test_compact_file_smaller_and_readable(self, tmp_path):
+        raw_run = _repetitive_run(200)
+        plain = tmp_path / "plain.json"
+        compact = tmp_path / "compact.json"
+        write_raw_run(raw_run, str(plain))
+        write_raw_run(raw_run, str(compact), compact=True)
+        assert compact.stat().st_size * 2 < plain.stat().st_size
+        assert read_raw_run(str(compact)) == raw_run
+        assert read_raw_run(str(plain)) == raw_run
+
+
+class TestNdjson:
+    def test_round_trip(self, tmp_path):
+        raw_run = {
+            "schemaVersion": 1,
+            "testCases": [{"status": "pass", "title": "a"}, {"status": "fail", "title": "b"}],
+            "projectRoot": "/tmp/project",
+        }
+        output = str(tmp_path / "raw-run.ndjson")
+        write_raw_run_ndjson(raw_run, output)
+
+        with open(output) as f:
+            lines = f.read().splitlines()
+        assert len(lines) == 3
+        assert json.loads(lines[0]) == {"schemaVersion": 1, "projectRoot": "/tmp/project"}
+
+        with open(output) as f:
+            header, cases = read_raw_run_ndjson(f)
+            assert header == {"schemaVersion": 1, "projectRoot": "/tmp/project"}
+            assert list(cases) == raw_run["testCases"]
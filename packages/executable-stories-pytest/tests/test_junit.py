@@ -0,0 +1,100 @@
+"""Tests for the incremental JUnit XML writer."""
+
+from __future__ import annotations
+
+import xml.etree.ElementTree as ET
+
+from executable_stories._junit import _JUnitWriter, combine_parts, escape_xml, part_path
+
+
+def _case(title: str, source: str = "/proj/tests/test_a.py", **extra) -> dict:
+    case = {"status": "pass", "title": title, "sourceFile": source, "durationMs": 1500.0}
+    case.update(extra)
+    return case
+
+
+class TestEscapeXml:
+    def test_escapes_markup_and_drops_illegal_characters(self):
+        assert escape_xml("<a href=\"x\">'&'</a>\x00\x1b") == "&lt;a href=&quot;x&quot;&gt;&apos;&amp;&apos;&lt;/a&gt;"
+
+
+class TestJUnitWriter:
+    def test_matches_junit_xml_ts(self, tmp_path):
+        path = tmp_path / "junit.xml"
+        writer = _JUnitWriter(str(path))
+        writer.add(_case("t1", story={
+            "scenario": "Add item",
+            "docs": [{"kind": "note", "text": "Intro", "phase": "runtime"}],
+            "steps": [
+                {"keyword": "Given", "text": "a cart", "docs": [
+                    {"kind": "code", "label": "Cart", "content": "[]", "lang": "json", "phase": "runtime"},
+                ]},
+            ],
+        }))
+        writer.add(_case("t2", status="fail", error={"message": "boom\nmore", "stack": "Trace"},
+                         story={"scenario": "Broken", "suitePath": ["Cart", "Add"], "steps": []}))
+        assert writer.close(0, 4000) == str(path)
+
+        assert path.read_text() == "\n".join([
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<testsuites name="Test Suite" tests="2" failures="1" errors="0" skipped="0" time="4.000">',
+            '  <testsuite name="/proj/tests/test_a.py" tests="2" failures="1" errors="0" skipped="0" time="3.000">',
+            '    <testcase classname=".proj.tests.test_a" name="Add item" time="1.500">',
+            "        <system-out>&gt; Intro",
+            "",
+            "Given a cart",
+            "  Cart (json):",
+            "    []</system-out>",
+            "    </testcase>",
+            '    <testcase classname="Cart.Add" name="Broken" time="1.500">',
+            '        <failure message="boom">',
+            "boom",
+            "more",
+            "",
+            "Trace",
+            "        </failure>",
+            "        <system-out>Then Broken</system-out>",
+            "    </testcase>",
+            "  </testsuite>",
+            "</testsuites>",
+        ])
+
+    def test_suite_per_file_skips_and_properties(self, tmp_path):
+        path = tmp_path / "junit.xml"
+        writer = _JUnitWriter(str(path), include_output=False)
+        writer.add(_case("t1", status="skip"))
+        writer.add(_case("t2", "/proj/tests/test_b.py", status="pending",
+                         story={"scenario": "Later", "tags": ["wip"], "tickets": ["T-1"]}))
+        writer.add(_case("t3", "/proj/tests/test_b.py"))
+        writer.close(0, 1000)
+
+        root = ET.parse(path).getroot()
+        assert root.attrib["tests"] == "3"
+        assert root.attrib["skipped"] == "2"
+        suites = root.findall("testsuite")
+        assert [s.attrib["tests"] for s in suites] == ["1", "2"]
+        later = suites[1].find("testcase")
+        assert later.find("skipped").attrib["message"] == "Test pending"
+        assert [(p.attrib["name"], p.attrib["value"]) for p in later.iter("property")] == [("tag", "wip"), ("ticket", "T-1")]
+        assert not (tmp_path / "junit.xml.part").exists()
+
+    def test_empty_run(self, tmp_path):
+        path = tmp_path / "junit.xml"
+        _JUnitWriter(str(path)).close(0, 0)
+        assert ET.parse(path).getroot().attrib["tests"] == "0"
+
+
+def test_combine_worker_parts(tmp_path):
+    path = tmp_path / "junit.xml"
+    for worker, status in (("gw0", "fail"), ("gw1", "skip")):
+        writer = _JUnitWriter(part_path(str(path), worker))
+        writer.add(_case(f"t-{worker}", f"/proj/tests/test_{worker}.py", status=status))
+        writer.add(_case(f"u-{worker}", f"/proj/tests/test_{worker}.py"))
+        writer.close_part()
+
+    assert combine_parts(str(path), 0, 2000) == 2
+    root = ET.parse(path).getroot()
+    assert (root.attrib["tests"], root.attrib["failures"], root.attrib["skipped"]) == ("4", "1", "1")
+    assert root.attrib["time"] == "2.000"
+    assert [s.attrib["tests"] for s in root.iter("testsuite")] == ["2", "2"]
+    assert list(tmp_path.iterdir()) == [path]
@@ -0,0 +1,91 @@
+"""Tests for lazily formatted doc entries."""
+
+import json
+
+import pytest
+
+from executable_stories._budget import _DocBudget
+from executable_stories._json_writer import write_raw_run
+from executable_stories._lazy import _LazyDoc
+from executable_stories._story_api import Story
+
+
+class TestSnapshots:
+    def test_json_is_detached_from_later_mutation(self, fresh_story: Story):
+        payload = {"items": [1, 2]}
+        fresh_story.init("Test")
+        fresh_story.json("payload", payload)
+        payload["items"].append(3)
+        doc = fresh_story._get_meta()["docs"][0]
+        assert json.loads(doc["content"]) == {"items": [1, 2]}
+        assert doc["content"] == json.dumps({"items": [1, 2]}, indent=2)
+
+    def test_kv_container_is_detached(self, fresh_story: Story):
+        value = ["a"]
+        fresh_story.init("Test")
+        fresh_story.kv("list", value)
+        value.append("b")
+        assert fresh_story._get_meta()["docs"][0]["value"] == ["a"]
+
+    def test_kv_scalar_stays_eager(self, fresh_story: Story):
+        fresh_story.init("Test")
+        fresh_story.kv("n", 3)
+        doc = fresh_story._get_meta(resolve=False)["docs"][0]
+        assert not isinstance(doc, _LazyDoc)
+        assert doc["value"] == 3
+
+    def test_kv_unserializable_leaf_stored_as_str(self, fresh_story: Story):
+        fresh_story.init("Test")
+        fresh_story.kv("things", {"when": object})
+        assert fresh_story._get_meta()["docs"][0]["value"] == {"when": str(object)}
+
+    def test_json_unserializable_raises_at_call(self, fresh_story: Story):
+        fresh_story.init("Test")
+        with pytest.raises(TypeError):
+            fresh_story.json("bad", {"x": object()})
+
+    def test_unresolved_meta_keeps_lazy_entries(self, fresh_story: Story):
+        fresh_story.init("Test")
+        fresh_story.given("a step")
+        fresh_story.json("payload", [1])
+        meta = fresh_story._get_meta(resolve=False)
+        assert isinstance(meta["steps"][0]["docs"][0], _LazyDoc)
+
+    def test_resolved_entry_keeps_key_order(self, fresh_story: Story):
+        fresh_story.init("Test")
+        fresh_story.json("payload", [1])
+        doc = fresh_story._get_meta()["docs"][0]
+        assert list(doc) == ["kind", "label", "content", "lang", "phase"]
+
+
+class TestLazyBudget:
+    def test_lazy_entry_charged_by_snapshot_size(self, fresh_story: Story):
+        fresh_story._set_budget(_DocBudget(max_entry_bytes=100, max_test_bytes=0, max_run_bytes=0))
+        fresh_story.init("Test")
+        fresh_story.json("payload", {"a": 1})
+        assert isinstance(fresh_story._get_meta(resolve=False)["docs"][0], _LazyDoc)
+
+    def test_oversized_lazy_entry_truncated_eagerly(self, fresh_story: Story):
+        fresh_story._set_budget(_DocBudget(max_entry_bytes=20, max_test_bytes=0, max_run_bytes=0))
+        fresh_story.init("Test")
+        fresh_story.json("payload", list(range(100)))
+        doc = fresh_story._get_meta(resolve=False)["docs"][0]
+        assert isinstance(doc, dict)
+        assert len(doc["content"]) == 20
+        assert fresh_story._get_dropped_doc_bytes() > 0
+
+
+class TestWriter:
+    def test_writer_formats_lazy_entries(self, tmp_path, fresh_story: Story):
+        fresh_story.init("Test")
+        fresh_story.json("payload", {"ok": True})
+        raw_run = {
+            "schemaVersion": 1,
+            "testCases": [{"status": "pass", "story": fresh_story._get_meta(resolve=False)}],
+            "projectRoot": "/",
+        }
+        output = tmp_path / "out.json"
+        write_raw_run(raw_run, str(output))
+        doc = json.loads(output.read_text())["testCases"][0]["story"]["docs"][0]
+        assert json.loads(doc["content"]) == {"ok": True}
+        assert doc["lang"] == "json"
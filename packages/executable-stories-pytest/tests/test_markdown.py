@@ -0,0 +1,181 @@
+"""Tests for the streaming Markdown renderer and the format CLI."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from executable_stories._cli import main
+from executable_stories._canonical import iso_timestamp
+from executable_stories._markdown import _MarkdownWriter
+
+RUN = {"schemaVersion": 1, "projectRoot": "/proj", "startedAtMs": 1700000000123.7, "gitSha": "abcdef1234567"}
+
+
+def _case(title: str, source: str = "/proj/tests/test_a.py", **extra) -> dict:
+    case = {"status": "pass", "externalId": f"{source}::{title}", "title": title, "sourceFile": source}
+    case.update(extra)
+    return case
+
+
+class TestIsoTimestamp:
+    def test_matches_to_iso_string(self):
+        assert iso_timestamp(1700000000123.7) == "2023-11-14T22:13:20.123Z"
+        assert iso_timestamp(0) == "1970-01-01T00:00:00.000Z"
+
+
+class TestMarkdownWriter:
+    def test_renders_like_markdown_ts(self, tmp_path):
+        story = {
+            "scenario": "Add item",
+            "tags": ["e2e", "cart", "e2e"],
+            "tickets": ["JIRA-1"],
+            "docs": [{"kind": "note", "text": "Intro", "phase": "runtime"}],
+            "steps": [
+                {"keyword": "Given", "text": "an empty cart", "docs": [
+                    {"kind": "kv", "label": "Items", "value": {"count": 1.0}, "phase": "runtime"},
+                ]},
+                {"keyword": "When", "text": "I add an item", "mode": "todo"},
+                {"keyword": "Then", "text": "the cart has 1 item", "docs": [
+                    {"kind": "code", "label": "Cart", "content": "a\nb", "lang": "json", "phase": "runtime"},
+                ]},
+            ],
+        }
+        failing = _case("test_b", status="fail", error={"message": "boom", "stack": "Trace"},
+                        story={"scenario": "Broken", "steps": [{"keyword": "Given", "text": "x"}]})
+        writer = _MarkdownWriter(str(tmp_path))
+        written = writer.render(RUN, [_case("test_a", story=story), failing, _case("test_plain")])
+
+        assert written == [str(tmp_path / "tests" / "test_a.py.test-results.md")]
+        assert Path(written[0]).read_text() == "\n".join([
+            "# User Stories",
+            "",
+            "| Key | Value |",
+            "| --- | --- |",
+            "| Date | 2023-11-14T22:13:20.123Z |",
+            "| Git SHA | abcdef1 |",
+            "",
+            "## /proj/tests/test_a.py",
+            "",
+            "### ✅ Add item",
+            "Tags: `cart`, `e2e` | Tickets: `JIRA-1`",
+            "",
+            "> Intro",
+            "- **Given** an empty cart",
+            '    - **Items:** {"count":1}',
+            "- **When** I add an item _(todo)_",
+            "- **Then** the cart has 1 item",
+            "    **Cart**",
+            "    ",
+            "    ```json",
+            "    a",
+            "    b",
+            "    ```",
+            "    ",
+            "",
+            "### ❌ Broken",
+            "",
+            "- **Given** x",
+            "**Failure**",
+            "",
+            "```text",
+            "boom",
+            "",
+            "Trace",
+            "```",
+            "",
+            "",
+            "### ✅ test_plain",
+            "",
+            "- **Then** test_plain",
+        ])
+
+    def test_one_file_per_feature_and_suite_groups(self, tmp_path):
+        cases = [
+            _case("t1", story={"scenario": "One", "suitePath": ["Cart"], "sourceOrder": 2}),
+            _case("t2", story={"scenario": "Two", "suitePath": ["Auth"], "sourceOrder": 1}),
+            _case("t3", "/proj/tests/test_b.py", status="skip"),
+        ]
+        written = _MarkdownWriter(str(tmp_path)).render(RUN, cases)
+        assert len(written) == 2
+
+        text_a = Path(written[0]).read_text()
+        assert text_a.index("### Auth") < text_a.index("### Cart")
+        assert "#### " not in text_a
+        assert "### ⏩ t3" in Path(written[1]).read_text()
+
+    def test_aggregated_streams_features_into_one_file(self, tmp_path):
+        cases = [_case("t1"), _case("t2", "/proj/tests/test_b.py")]
+        writer = _MarkdownWriter(str(tmp_path), mode="aggregated", include_metadata=False)
+        written = writer.render(RUN, cases)
+        assert written == [str(tmp_path / "test-results.md")]
+        assert Path(written[0]).read_text() == "\n".join([
+            "# User Stories",
+            "",
+            "## /proj/tests/test_a.py",
+            "",
+            "### ✅ t1",
+            "",
+            "- **Then** t1",
+            "",
+            "## /proj/tests/test_b.py",
+            "",
+            "### ✅ t2",
+            "",
+            "- **Then** t2",
+        ])
+
+    def test_returning_feature_is_appended(self, tmp_path):
+        cases = [_case("t1"), _case("t2", "/proj/tests/test_b.py"), _case("t3")]
+        written = _MarkdownWriter(str(tmp_path)).render(RUN, cases)
+        text = Path(written[0]).read_text()
+        assert text.index("### ✅ t1") < text.index("### ✅ t3")
+        assert not text.endswith("\n")
+
+    def test_without_synthesis_skips_plain_tests(self, tmp_path):
+        writer = _MarkdownWriter(str(tmp_path), synthesize_stories=False)
+        assert writer.render(RUN, [_case("plain")]) == []
+        assert writer.scenarios == 0
+
+
+class TestFormatCli:
+    def test_formats_raw_run_file(self, tmp_path, capsys):
+        raw = tmp_path / "raw-run.json"
+        raw.write_text(json.dumps({**RUN, "testCases": [_case("t1")]}))
+        out = tmp_path / "reports"
+        assert main(["format", str(raw), "--output-dir", str(out), "--output-mode", "aggregated"]) == 0
+        assert capsys.readouterr().out.strip() == str(out / "test-results.md")
+        assert "### ✅ t1" in (out / "test-results.md").read_text()
+
+    def test_formats_ndjson_from_stdin(self, tmp_path, monkeypatch, capsys):
+        import io
+
+        lines = [json.dumps(RUN), json.dumps(_case("t1", status="fail"))]
+        monkeypatch.setattr("sys.stdin", io.StringIO("\n".join(lines) + "\n"))
+        out = tmp_path / "reports"
+        assert main(["format", "--stdin", "--input-type", "ndjson", "--output-dir", str(out)]) == 0
+        assert "### ❌ t1" in (out / "tests" / "test_a.py.test-results.md").read_text()
+
+    def test_formats_markdown_and_junit_in_one_pass(self, tmp_path, capsys):
+        raw = tmp_path / "raw-run.ndjson"
+        raw.write_text("\n".join([json.dumps(RUN), json.dumps(_case("t1"))]) + "\n")
+        out = tmp_path / "reports"
+        assert main(["format", str(raw), "--format", "markdown,junit", "--output-dir", str(out)]) == 0
+        assert capsys.readouterr().out.split() == [
+            str(out / "tests" / "test_a.py.test-results.md"),
+            str(out / "test-results.junit.xml"),
+        ]
+        assert 'name="t1"' in (out / "test-results.junit.xml").read_text()
+
+    def test_junit_takes_shared_stacks_from_failure_index(self, tmp_path, capsys):
+        failures = [{"fingerprint": "fp1", "count": 1, "stack": "tests/test_a.py:3: in test_t1"}]
+        case = _case("t1", status="fail", error={"message": "boom"}, meta={"errorFingerprint": "fp1"})
+        raw = tmp_path / "raw-run.json"
+        raw.write_text(json.dumps({**RUN, "meta": {"failures": failures}, "testCases": [case]}))
+        out = tmp_path / "reports"
+        assert main(["format", str(raw), "--format", "junit", "--output-dir", str(out)]) == 0
+        assert "tests/test_a.py:3: in test_t1" in (out / "test-results.junit.xml").read_text()
+
+    def test_unsupported_format_is_usage_error(self, tmp_path, capsys):
+        assert main(["format", "x.json", "--format", "html"]) == 4
+        assert "Unsupported format" in capsys.readouterr().err
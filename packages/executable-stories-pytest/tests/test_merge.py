@@ -0,0 +1,207 @@
+"""Tests for the incremental raw-run reader and shard merging."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from executable_stories._cli import main
+from executable_stories._json_writer import write_raw_run, write_raw_run_ndjson
+from executable_stories._stream import iter_raw_run
+
+
+def _case(external_id: str, status: str = "pass", **extra) -> dict:
+    return {
+        "externalId": external_id,
+        "title": external_id.rsplit("::", 1)[-1],
+        "status": status,
+        "durationMs": 1.5,
+        "sourceFile": "tests/test_a.py",
+        **extra,
+    }
+
+
+def _run(cases: list[dict], started: float, finished: float, **fields) -> dict:
+    return {
+        "schemaVersion": 1,
+        "projectRoot": "/proj",
+        "startedAtMs": started,
+        "finishedAtMs": finished,
+        "testCases": cases,
+        **fields,
+    }
+
+
+def _write(path: Path, run: dict) -> str:
+    write_raw_run(run, str(path))
+    return str(path)
+
+
+class TestIterRawRun:
+    def test_yields_fields_and_cases_in_order(self, tmp_path: Path):
+        path = _write(tmp_path / "run.json", _run([_case("a::t1"), _case("a::t2")], 10, 20))
+        events = list(iter_raw_run(path))
+        assert [e for e, _ in events] == ["field", "field", "field", "field", "case", "case"]
+        assert [c["externalId"] for e, c in events if e == "case"] == ["a::t1", "a::t2"]
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 64])
+    def test_small_chunks_split_values(self, tmp_path: Path, chunk_size: int):
+        run = _run([_case(f"a::t{i}", note="é" * i) for i in range(5)], 1234567, 7654321, meta={"x": [1, 2]})
+        path = tmp_path / "run.json"
+        path.write_text(json.dumps(run), encoding="utf-8")
+        events = list(iter_raw_run(str(path), chunk_size=chunk_size))
+        fields = dict(p for e, p in events if e == "field")
+        assert fields["startedAtMs"] == 1234567
+        assert fields["finishedAtMs"] == 7654321
+        assert fields["meta"] == {"x": [1, 2]}
+        assert [p for e, p in events if e == "case"] == run["testCases"]
+
+    def test_fields_after_test_cases(self, tmp_path: Path):
+        path = tmp_path / "run.json"
+        path.write_text('{"schemaVersion":1,"testCases":[{"externalId":"x"}],"finishedAtMs":5}', encoding="utf-8")
+        assert list(iter_raw_run(str(path))) == [
+            ("field", ("schemaVersion", 1)),
+            ("case", {"externalId": "x"}),
+            ("field", ("finishedAtMs", 5)),
+        ]
+
+    def test_compact_and_ndjson(self, tmp_path: Path):
+        run = _run([_case("a::t1")], 1, 2)
+        compact = tmp_path / "run.compact.json"
+        write_raw_run(run, str(compact), compact=True)
+        ndjson = tmp_path / "run.ndjson"
+        write_raw_run_ndjson(run, str(ndjson))
+        for path in (compact, ndjson):
+            cases = [p for e, p in iter_raw_run(str(path)) if e == "case"]
+            assert cases == run["testCases"]
+
+    def test_truncated_input_raises(self, tmp_path: Path):
+        path = tmp_path / "run.json"
+        path.write_text('{"schemaVersion":1,"testCases":[{"externalId":', encoding="utf-8")
+        with pytest.raises(ValueError):
+            list(iter_raw_run(str(path)))
+
+
+class TestMergeCli:
+    def test_merges_shards_and_recomputes_bounds(self, tmp_path: Path, capsys):
+        ci = {"name": "github", "buildNumber": "7", "url": "https://ci/7"}
+        a = _write(tmp_path / "shard-1.json", _run([_case("a::t1"), _case("a::t2")], 100, 300, ci=ci))
+        b = _write(tmp_path / "shard-2.json", _run([_case("b::t1")], 50, 250, ci={**ci, "url": "https://ci/7/2"}))
+        out = tmp_path / "merged.json"
+
+        assert main(["merge", a, b, "-o", str(out)]) == 0
+        merged = json.loads(out.read_text(encoding="utf-8"))
+        assert [c["externalId"] for c in merged["testCases"]] == ["a::t1", "a::t2", "b::t1"]
+        assert merged["startedAtMs"] == 50
+        assert merged["finishedAtMs"] == 300
+        assert merged["ci"] == {"name": "github", "buildNumber": "7"}
+        assert merged["projectRoot"] == "/proj"
+        assert merged["meta"]["merge"]["duplicates"] == 0
+        assert "3 test cases from 2 shards" in capsys.readouterr().out
+
+    def test_metric_aggregates_are_merged(self, tmp_path: Path):
+        from executable_stories._metrics import _MetricAggregator
+
+        shards = []
+        for i, values in enumerate([[1.0, 2.0], [3.0, 40.0]]):
+            metrics = _MetricAggregator()
+            for value in values:
+                metrics.add("latency_ms", value, "ms", {})
+            run = _run([_case(f"s{i}::t")], 100, 200, meta={"metrics": metrics.summary()})
+            shards.append(_write(tmp_path / f"shard-{i}.json", run))
+        out = tmp_path / "merged.json"
+
+        assert main(["merge", *shards, "-o", str(out)]) == 0
+        (series,) = json.loads(out.read_text(encoding="utf-8"))["meta"]["metrics"]
+        assert (series["count"], series["min"], series["max"], series["sum"]) == (4, 1.0, 40.0, 46.0)
+        assert series["p90"] == pytest.approx(3.0, rel=0.02)
+
+    def test_later_attempt_wins_and_keeps_history(self, tmp_path: Path):
+        first = _write(tmp_path / "shard-1.json", _run([_case("a::t1", "fail", error={"message": "boom"})], 100, 200))
+        rerun = _write(tmp_path / "shard-1-rerun.json", _run([_case("a::t1", "pass")], 500, 600))
+        out = tmp_path / "merged.json"
+
+        # Shard order on the command line does not matter; start time does.
+        assert main(["merge", rerun, first, "-o", str(out)]) == 0
+        (case,) = json.loads(out.read_text(encoding="utf-8"))["testCases"]
+        assert case["status"] == "pass"
+        assert case["retry"] == 1
+        assert [(a["attempt"], a["status"]) for a in case["meta"]["attempts"]] == [(0, "fail"), (1, "pass")]
+        assert case["meta"]["attempts"][0]["errorMessage"] == "boom"
+
+    def test_real_result_beats_placeholder(self, tmp_path: Path):
+        real = _write(tmp_path / "shard-1.json", _run([_case("a::t1", "fail")], 100, 200))
+        listing = _write(tmp_path / "shard-2.json", _run([_case("a::t1", "pending")], 900, 901))
+        out = tmp_path / "merged.json"
+
+        assert main(["merge", real, listing, "-o", str(out)]) == 0
+        (case,) = json.loads(out.read_text(encoding="utf-8"))["testCases"]
+        assert case["status"] == "fail"
+        assert [a["status"] for a in case["meta"]["attempts"]] == ["fail"]
+
+    def test_within_shard_attempts_are_preserved(self, tmp_path: Path):
+        attempts = [{"attempt": 0, "status": "fail", "durationMs": 1.0}, {"attempt": 1, "status": "pass", "durationMs": 1.0}]
+        a = _write(tmp_path / "shard-1.json", _run([_case("a::t1", "pass", retry=1, meta={"attempts": attempts})], 100, 200))
+        b = _write(tmp_path / "shard-2.json", _run([_case("a::t1", "fail")], 300, 400))
+        out = tmp_path / "merged.json"
+
+        assert main(["merge", a, b, "-o", str(out)]) == 0
+        (case,) = json.loads(out.read_text(encoding="utf-8"))["testCases"]
+        assert [a["status"] for a in case["meta"]["attempts"]] == ["fail", "pass", "fail"]
+        assert case["retry"] == 2
+
+    def test_conflicting_shared_fields_are_dropped(self, tmp_path: Path):
+        a = _write(tmp_path / "shard-1.json", _run([_case("a::t1")], 1, 2, gitSha="abc"))
+        b = _write(tmp_path / "shard-2.json", _run([_case("b::t1")], 1, 2, gitSha="def"))
+        out = tmp_path / "merged.json"
+
+        assert main(["merge", a, b, "-o", str(out)]) == 0
+        assert "gitSha" not in json.loads(out.read_text(encoding="utf-8"))
+
+    def test_differing_project_roots_keep_their_common_path(self, tmp_path: Path):
+        a = _write(tmp_path / "shard-1.json", _run([_case("a::t1")], 1, 2, projectRoot="/ci/job-1/proj"))
+        b = _write(tmp_path / "shard-2.json", _run([_case("b::t1")], 1, 2, projectRoot="/ci/job-2/proj"))
+        out = tmp_path / "merged.json"
+
+        assert main(["merge", a, b, "-o", str(out)]) == 0
+        assert json.loads(out.read_text(encoding="utf-8"))["projectRoot"] == "/ci"
+
+    def test_failures_and_backgrounds_are_merged(self, tmp_path: Path):
+        def failure(external_id: str) -> dict:
+            return {"fingerprint": "f1", "count": 1, "exceptionType": "AssertionError", "location": "t.py:3",
+                    "message": "boom", "stack": "...", "externalIds": [external_id]}
+
+        def background(name: str) -> dict:
+            return {"id": "bg-0", "name": name, "steps": [{"keyword": "Given", "text": name}], "durationMs": 1.0}
+
+        shards = []
+        for i, name in enumerate(["a logged-in user", "an empty cart"]):
+            cases = [_case(f"s{i}::t", "fail", meta={"backgrounds": ["bg-0"]})]
+            meta = {"failures": [failure(f"s{i}::t")], "backgrounds": [background(name)], "docBudget": {"shard": i}}
+            shards.append(_write(tmp_path / f"shard-{i}.json", _run(cases, 100, 200, meta=meta)))
+        out = tmp_path / "merged.json"
+
+        assert main(["merge", *shards, "-o", str(out)]) == 0
+        merged = json.loads(out.read_text(encoding="utf-8"))
+        (group,) = merged["meta"]["failures"]
+        assert (group["count"], group["externalIds"]) == (2, ["s0::t", "s1::t"])
+
+        backgrounds = {bg["id"]: bg["name"] for bg in merged["meta"]["backgrounds"]}
+        assert len(backgrounds) == 2
+        for case, name in zip(merged["testCases"], ["a logged-in user", "an empty cart"]):
+            (bg_id,) = case["meta"]["backgrounds"]
+            assert backgrounds[bg_id] == name
+        assert [s["meta"] for s in merged["meta"]["merge"]["shards"]] == [{"docBudget": {"shard": 0}}, {"docBudget": {"shard": 1}}]
+
+    def test_writes_to_stdout(self, tmp_path: Path, capsys):
+        a = _write(tmp_path / "shard-1.json", _run([_case("a::t1")], 1, 2))
+        assert main(["merge", a]) == 0
+        assert json.loads(capsys.readouterr().out)["testCases"][0]["externalId"] == "a::t1"
+
+    def test_missing_and_invalid_inputs(self, tmp_path: Path):
+        assert main(["merge", str(tmp_path / "nope.json")]) == 4
+        bad = tmp_path / "bad.json"
+        bad.write_text("[1, 2]", encoding="utf-8")
+        assert main(["merge", str(bad), "-o", str(tmp_path / "out.json")]) == 1
@@ -0,0 +1,160 @@
+"""Tests for story.metric() and the session metric aggregates."""
+
+from __future__ import annotations
+
+import json
+import random
+
+import pytest
+
+from executable_stories._metrics import (
+    MAX_BUCKETS,
+    RELATIVE_ACCURACY,
+    _MetricAggregator,
+    _Sketch,
+    render_openmetrics,
+)
+from executable_stories._story_api import Story
+
+pytest_plugins = ["pytester"]
+
+
+class TestSketch:
+    def test_quantiles_within_relative_accuracy(self):
+        rng = random.Random(7)
+        values = sorted(rng.lognormvariate(3, 1) for _ in range(10_000))
+        sketch = _Sketch()
+        for value in values:
+            sketch.add(value)
+        for q in (0.5, 0.9, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            assert sketch.quantile(q) == pytest.approx(exact, rel=RELATIVE_ACCURACY * 1.01)
+        assert len(sketch.positive) < 1000
+
+    def test_negative_and_zero_values(self):
+        sketch = _Sketch()
+        for value in (-10.0, 0.0, 0.0, 5.0):
+            sketch.add(value)
+        assert sketch.quantile(0) == pytest.approx(-10.0, rel=RELATIVE_ACCURACY)
+        assert sketch.quantile(0.5) == 0.0
+        assert sketch.quantile(1) == pytest.approx(5.0, rel=RELATIVE_ACCURACY)
+        assert _Sketch().quantile(0.5) is None
+
+    def test_round_trip_and_merge(self):
+        a, b = _Sketch(), _Sketch()
+        a.add(1.0)
+        b.add(100.0)
+        a.merge(_Sketch.from_dict(json.loads(json.dumps(b.to_dict()))))
+        assert a.quantile(1) == pytest.approx(100.0, rel=RELATIVE_ACCURACY)
+
+    def test_bucket_count_is_bounded(self):
+        sketch = _Sketch()
+        for exponent in range(-300, 300):
+            for step in range(10):
+                sketch.add(10.0**exponent * (1 + step / 10))
+        assert len(sketch.positive) == MAX_BUCKETS
+        assert sketch.quantile(1) == pytest.approx(1.9e299, rel=RELATIVE_ACCURACY)
+
+
+class TestAggregator:
+    def test_series_keyed_by_name_unit_and_labels(self):
+        metrics = _MetricAggregator()
+        for value in (10.0, 20.0, 30.0):
+            metrics.add("latency_ms", value, "ms", {"route": "/pay"})
+        metrics.add("latency_ms", 5.0, "ms", {"route": "/cart"})
+        cart, pay = metrics.summary()
+        assert cart["labels"] == {"route": "/cart"}
+        assert pay["count"] == 3
+        assert (pay["min"], pay["max"], pay["mean"]) == (10.0, 30.0, 20.0)
+        assert pay["p50"] == pytest.approx(20.0, rel=RELATIVE_ACCURACY)
+        # Quantiles never leave the observed range.
+        assert pay["p99"] <= 30.0
+
+    def test_openmetrics_text(self):
+        metrics = _MetricAggregator()
+        metrics.add("latency_ms", 12.0, "ms", {"route": '/pay "v2"'})
+        metrics.add("rows", 3, None, {})
+        text = render_openmetrics(metrics.summary())
+        assert text.splitlines()[:3] == [
+            "# TYPE latency_ms summary",
+            "# UNIT latency_ms ms",
+            'latency_ms{route="/pay \\"v2\\"",quantile="0.5"} 12.0',
+        ]
+        assert 'latency_ms_count{route="/pay \\"v2\\""} 1' in text
+        assert "# TYPE rows summary\n" in text and "# UNIT rows" not in text
+        assert "rows_max 3.0" in text
+        assert text.endswith("# EOF\n")
+
+    def test_openmetrics_family_per_unit(self):
+        metrics = _MetricAggregator()
+        metrics.add("latency", 12.0, "ms", {})
+        metrics.add("latency", 0.5, "s", {})
+        text = render_openmetrics(metrics.summary())
+        assert "# UNIT latency_ms ms" in text and "# UNIT latency_s s" in text
+        assert "latency_ms_sum 12.0" in text and "latency_s_sum 0.5" in text
+        series = [line.split(" ")[0] for line in text.splitlines() if not line.startswith("#")]
+        assert len(series) == len(set(series))
+
+
+class TestStoryMetric:
+    def test_metric_doc_and_sample(self, fresh_story: Story):
+        fresh_story.init("Test")
+        fresh_story.when("the page loads")
+        fresh_story.metric("latency_ms", 12, unit="ms", labels={"attempt": 1})
+        step = fresh_story._get_meta()["steps"][0]
+        assert step["docs"] == [{
+            "kind": "custom",
+            "type": "metric",
+            "data": {"name": "latency_ms", "value": 12.0, "unit": "ms", "labels": {"attempt": "1"}},
+            "phase": "runtime",
+        }]
+        # Aggregated by the plugin once the attempt is known to be final.
+        assert fresh_story._metrics.summary() == []
+        assert fresh_story._get_metric_samples() == [("latency_ms", 12.0, "ms", {"attempt": "1"})]
+
+    @pytest.mark.parametrize("value, error", [("12", TypeError), (True, TypeError), (float("nan"), ValueError)])
+    def test_rejects_non_numbers(self, fresh_story: Story, value, error):
+        fresh_story.init("Test")
+        with pytest.raises(error):
+            fresh_story.metric("latency_ms", value)
+        assert fresh_story._get_metric_samples() == []
+
+
+def test_plugin_writes_meta_and_openmetrics(pytester):
+    pytester.makepyfile(test_perf="""
+import pytest
+from executable_stories import story
+
+@pytest.mark.parametrize("ms", [10, 20, 30])
+def test_latency(ms):
+    story.init("Latency")
+    story.metric("latency_ms", ms, unit="ms")
+""")
+    result = pytester.runpytest_subprocess()
+    result.assert_outcomes(passed=3)
+    out_dir = pytester.path / ".executable-stories"
+    run = json.loads((out_dir / "raw-run.json").read_text())
+    (series,) = run["meta"]["metrics"]
+    assert (series["count"], series["min"], series["max"]) == (3, 10.0, 30.0)
+    text = (out_dir / "metrics.prom").read_text()
+    assert "latency_ms_count 3" in text
+
+
+def test_superseded_attempts_are_not_aggregated(pytester):
+    pytest.importorskip("pytest_rerunfailures")
+    pytester.makepyfile(test_flaky="""
+from executable_stories import story
+
+calls = []
+
+def test_latency():
+    story.init("Latency")
+    calls.append(1)
+    story.metric("latency_ms", len(calls), unit="ms")
+    assert len(calls) == 3
+""")
+    result = pytester.runpytest_subprocess("-p", "rerunfailures", "--reruns=3")
+    result.assert_outcomes(passed=1)
+    run = json.loads((pytester.path / ".executable-stories" / "raw-run.json").read_text())
+    (series,) = run["meta"]["metrics"]
+    assert (series["count"], series["min"]) == (1, 3.0)
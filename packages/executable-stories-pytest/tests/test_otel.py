@@ -0,0 +1,131 @@
+"""Tests for the OpenTelemetry step spans."""
+
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("opentelemetry.sdk")
+
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter  # noqa: E402
+from opentelemetry.trace import StatusCode  # noqa: E402
+
+from executable_stories import _otel  # noqa: E402
+from executable_stories._otel import _StepSpans, trace_api  # noqa: E402
+
+
+pytest_plugins = ["pytester"]
+
+
+@pytest.fixture()
+def exporter():
+    return InMemorySpanExporter()
+
+
+@pytest.fixture()
+def traced_story(fresh_story, exporter):
+    spans = _StepSpans(exporter)
+    fresh_story._set_spans(spans)
+    yield fresh_story
+    spans.shutdown()
+
+
+def _finished(story, exporter) -> dict:
+    story._spans.shutdown()
+    return {span.name: span for span in exporter.get_finished_spans()}
+
+
+class TestStepSpans:
+    def test_fn_and_expect_steps_are_children_of_the_scenario(self, traced_story, exporter):
+        traced_story.init("Checkout", tags=["shop"], ticket="SHOP-1")
+        traced_story.given("a cart")
+        assert traced_story.fn("When", "the user pays", lambda: 42) == 42
+        with pytest.raises(ValueError):
+            traced_story.expect("the receipt is sent", lambda: (_ for _ in ()).throw(ValueError("smtp down")))
+        traced_story._finish_spans("failed")
+
+        spans = _finished(traced_story, exporter)
+        assert set(spans) == {"Checkout", "When the user pays", "Then the receipt is sent"}
+        scenario = spans["Checkout"]
+        assert scenario.parent is None
+        assert scenario.attributes["story.tags"] == ("shop",)
+        assert scenario.attributes["story.tickets"] == ("SHOP-1",)
+        assert scenario.attributes["story.status"] == "failed"
+
+        paid = spans["When the user pays"]
+        assert paid.parent.span_id == scenario.context.span_id
+        assert paid.attributes["story.step.keyword"] == "When"
+        assert paid.attributes["story.step.text"] == "the user pays"
+        assert paid.attributes["story.step.index"] == 1
+        assert paid.attributes["story.step.status"] == "passed"
+        assert paid.status.status_code == StatusCode.UNSET
+
+        receipt = spans["Then the receipt is sent"]
+        assert receipt.attributes["story.step.status"] == "failed"
+        assert receipt.status.status_code == StatusCode.ERROR
+        assert receipt.events[0].name == "exception"
+
+    def test_step_span_is_current_in_the_body(self, traced_story, exporter):
+        traced_story.init("Nested")
+        seen = traced_story.fn("Given", "a body", lambda: trace_api().get_current_span().get_span_context())
+        traced_story._finish_spans("passed")
+
+        spans = _finished(traced_story, exporter)
+        assert seen.span_id == spans["Given a body"].context.span_id
+
+    def test_timer_spans(self, traced_story, exporter):
+        traced_story.init("Timed")
+        traced_story.when("a slow call")
+        token = traced_story.start_timer()
+        traced_story.end_timer(token)
+        traced_story.then("a call that never ends")
+        traced_story.start_timer()
+        traced_story._finish_spans("passed")
+
+        spans = _finished(traced_story, exporter)
+        assert spans["When a slow call"].attributes["story.step.status"] == "passed"
+        assert spans["When a slow call"].attributes["story.step.wrapped"] is False
+        assert spans["Then a call that never ends"].attributes["story.step.status"] == "unfinished"
+
+    def test_scenario_trace_id_recorded_in_meta(self, traced_story, exporter):
+        traced_story.init("Linked")
+        meta = traced_story._get_meta()
+        traced_story._finish_spans("passed")
+
+        scenario = _finished(traced_story, exporter)["Linked"]
+        assert meta["meta"]["otel"]["traceId"] == format(scenario.context.trace_id, "032x")
+
+    def test_no_spans_without_configuration(self, fresh_story, exporter):
+        fresh_story.init("Plain")
+        fresh_story.fn("Given", "a step", lambda: None)
+        fresh_story._finish_spans("passed")
+        assert "otel" not in (fresh_story._get_meta().get("meta") or {})
+
+
+class TestTraceApi:
+    def test_import_resolved_once(self, monkeypatch):
+        monkeypatch.setattr(_otel, "_trace_api", _otel._UNRESOLVED)
+        first = trace_api()
+        assert first is not None
+        assert _otel._trace_api is first
+        assert trace_api() is first
+
+    def test_missing_api_disables_the_bridge(self, fresh_story, monkeypatch):
+        monkeypatch.setattr(_otel, "_trace_api", None)
+        monkeypatch.setattr("executable_stories._story_api.trace_api", lambda: None)
+        fresh_story.init("No OTel")
+        assert fresh_story._get_meta()["scenario"] == "No OTel"
+
+
+def test_plugin_exports_step_spans(pytester):
+    pytester.makepyfile(test_spans="""
+from executable_stories import story
+
+def test_checkout():
+    story.init("Checkout")
+    story.fn("When", "the user pays", lambda: None)
+""")
+    result = pytester.runpytest_subprocess(
+        "-p", "no:logfire", "-p", "no:langsmith_plugin", "-p", "no:anyio", "-s", "--stories-otel-steps=console"
+    )
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(['*"name": "When the user pays"*', '*"name": "Checkout"*'])
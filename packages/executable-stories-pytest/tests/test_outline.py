@@ -0,0 +1,110 @@
+"""Tests for Scenario Outline collapsing."""
+
+from executable_stories._collector import _Collector
+from executable_stories._outline import display_value, template_story
+
+
+def _row(status: str, amount: int, currency: str) -> dict:
+    return {
+        "status": status,
+        "externalId": f"t.py::test_pay[{amount}-{currency}]",
+        "durationMs": 1.5,
+        "story": {
+            "scenario": "Pay an invoice",
+            "tags": ["billing"],
+            "steps": [
+                {"keyword": "Given", "text": f"an invoice of {amount} {currency}", "id": "step-0"},
+                {
+                    "keyword": "When",
+                    "text": "the customer pays",
+                    "id": "step-1",
+                    "docs": [{"kind": "kv", "label": "amount", "value": amount, "phase": "runtime"}],
+                },
+                {"keyword": "Then", "text": "the balance is 0", "id": "step-2"},
+            ],
+        },
+    }
+
+
+class TestTemplateStory:
+    def test_values_become_placeholders(self):
+        template, _ = template_story(_row("pass", 10, "EUR")["story"], {"amount": 10, "currency": "EUR"})
+        assert template["steps"][0]["text"] == "an invoice of <amount> <currency>"
+        assert template["steps"][2]["text"] == "the balance is 0"
+        assert "docs" not in template["steps"][1]
+        assert template["tags"] == ["billing"]
+
+    def test_only_whole_words_replaced(self):
+        story_meta = {"scenario": "s", "steps": [{"keyword": "Given", "text": "item 1 of 10"}]}
+        template, _ = template_story(story_meta, {"n": 1})
+        assert template["steps"][0]["text"] == "item <n> of 10"
+
+    def test_rows_share_signature(self):
+        _, sig_a = template_story(_row("pass", 10, "EUR")["story"], {"amount": 10, "currency": "EUR"})
+        _, sig_b = template_story(_row("pass", 25, "USD")["story"], {"amount": 25, "currency": "USD"})
+        assert sig_a == sig_b
+
+    def test_explicit_placeholders_kept(self):
+        story_meta = {"scenario": "s", "steps": [{"keyword": "Given", "text": "a <role> user"}]}
+        template, _ = template_story(story_meta, {"role": "admin"})
+        assert template["steps"][0]["text"] == "a <role> user"
+
+    def test_display_value(self):
+        assert display_value("x") == "x"
+        assert display_value(3) == "3"
+        assert display_value(None) == "None"
+        assert display_value([1]) == "[1]"
+
+
+class TestCollectorOutlines:
+    def test_rows_fold_into_one_case(self):
+        c = _Collector()
+        c.record_example("t.py::test_pay", "test_pay", _row("pass", 10, "EUR"), "10-EUR", {"amount": 10, "currency": "EUR"})
+        c.record_example("t.py::test_pay", "test_pay", _row("fail", 25, "USD"), "25-USD", {"amount": 25, "currency": "USD"})
+        cases = c.get_all()
+        assert len(cases) == 1
+        case = cases[0]
+        assert case["externalId"] == "t.py::test_pay"
+        assert case["status"] == "fail"
+        assert case["durationMs"] == 3.0
+        assert case["story"]["steps"][0]["text"] == "an invoice of <amount> <currency>"
+        table = case["story"]["docs"][0]
+        assert table["label"] == "Examples"
+        assert table["columns"] == ["amount", "currency", "status", "durationMs"]
+        assert table["rows"] == [["10", "EUR", "pass", "1.5"], ["25", "USD", "fail", "1.5"]]
+        examples = case["meta"]["outline"]["examples"]
+        assert [e["id"] for e in examples] == ["10-EUR", "25-USD"]
+
+    def test_divergent_row_kept_as_own_case(self):
+        c = _Collector()
+        c.record_example("t.py::test_pay", "test_pay", _row("pass", 10, "EUR"), "10-EUR", {"amount": 10, "currency": "EUR"})
+        odd = _row("pass", 5, "GBP")
+        odd["story"]["steps"].append({"keyword": "And", "text": "a receipt is mailed"})
+        c.record_example("t.py::test_pay", "test_pay", odd, "5-GBP", {"amount": 5, "currency": "GBP"})
+        cases = c.get_all()
+        assert len(cases) == 2
+        assert cases[1]["externalId"] == "t.py::test_pay[5-GBP]"
+        assert cases[1]["story"]["steps"][0]["text"] == "an invoice of 5 GBP"
+
+    def test_rerun_replaces_row(self):
+        c = _Collector()
+        params = {"amount": 10, "currency": "EUR"}
+        c.record_example("t.py::test_pay", "test_pay", _row("fail", 10, "EUR"), "10-EUR", params)
+        c.record_example("t.py::test_pay", "test_pay", _row("pass", 10, "EUR"), "10-EUR", params)
+        case = c.get_all()[0]
+        examples = case["meta"]["outline"]["examples"]
+        assert len(examples) == 1
+        assert examples[0]["status"] == "pass"
+        assert examples[0]["retry"] == 1
+        assert case["retry"] == 1
+
+    def test_outline_keeps_earliest_source_order(self):
+        c = _Collector()
+        later, earlier = _row("pass", 10, "EUR"), _row("pass", 25, "USD")
+        later["story"]["sourceOrder"] = 7
+        earlier["story"]["sourceOrder"] = 4
+        c.record_example("t.py::test_pay", "test_pay", later, "10-EUR", {"amount": 10, "currency": "EUR"})
+        c.record_example("t.py::test_pay", "test_pay", earlier, "25-USD", {"amount": 25, "currency": "USD"})
+        case = c.get_all()[0]
+        assert case["story"]["sourceOrder"] == 4
+        assert case["retry"] == 0
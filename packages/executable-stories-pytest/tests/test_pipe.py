@@ -0,0 +1,80 @@
+"""Tests for streaming the run into a formatter subprocess."""
+
+from __future__ import annotations
+
+import io
+import json
+import sys
+import time
+
+from executable_stories._json_writer import read_raw_run_ndjson
+from executable_stories._pipe import _FormatterPipe
+
+
+def _copy_stdin_to(path) -> list[str]:
+    return [sys.executable, "-c", f"import shutil, sys; shutil.copyfileobj(sys.stdin, open({str(path)!r}, 'w'))"]
+
+
+class TestFormatterPipe:
+    def test_json_stream_is_a_raw_run_document(self, tmp_path):
+        out = tmp_path / "run.json"
+        pipe = _FormatterPipe(_copy_stdin_to(out))
+        pipe.start({"schemaVersion": 1, "projectRoot": "/p", "startedAtMs": 1.0})
+        pipe.send({"status": "pass", "externalId": "a"})
+        pipe.send({"status": "fail", "externalId": "b"})
+        assert pipe.finish({"finishedAtMs": 2.0, "meta": {"x": 1}}) == 0
+
+        assert json.loads(out.read_text()) == {
+            "schemaVersion": 1,
+            "projectRoot": "/p",
+            "startedAtMs": 1.0,
+            "testCases": [{"status": "pass", "externalId": "a"}, {"status": "fail", "externalId": "b"}],
+            "finishedAtMs": 2.0,
+            "meta": {"x": 1},
+        }
+        assert pipe.was_sent("a") and not pipe.was_sent("c")
+
+    def test_ndjson_stream_round_trips(self, tmp_path):
+        out = tmp_path / "run.ndjson"
+        pipe = _FormatterPipe(_copy_stdin_to(out), stream_format="ndjson")
+        pipe.start({"schemaVersion": 1, "startedAtMs": 1.0})
+        pipe.send({"status": "pass", "externalId": "a"})
+        pipe.finish({"finishedAtMs": 2.0})
+
+        header, cases = read_raw_run_ndjson(io.StringIO(out.read_text()))
+        assert list(cases) == [{"status": "pass", "externalId": "a"}]
+        assert header == {"schemaVersion": 1, "startedAtMs": 1.0, "finishedAtMs": 2.0}
+
+    def test_slow_formatter_does_not_block_send(self, tmp_path):
+        out = tmp_path / "run.ndjson"
+        command = [sys.executable, "-c", f"import shutil, sys, time; time.sleep(1); shutil.copyfileobj(sys.stdin, open({str(out)!r}, 'w'))"]
+        pipe = _FormatterPipe(command, stream_format="ndjson")
+        pipe.start({})
+        started = time.perf_counter()
+        for i in range(50):
+            pipe.send({"status": "pass", "externalId": f"{i}", "title": "x" * 10_000})
+        assert time.perf_counter() - started < 0.5
+        assert pipe.finish({}) == 0
+        assert len(out.read_text().splitlines()) == 52
+
+    def test_formatter_output_and_exit_code_are_captured(self):
+        pipe = _FormatterPipe([sys.executable, "-c", "import sys; sys.stdin.read(); print('done'); sys.exit(3)"])
+        pipe.start({})
+        assert pipe.finish({}) == 3
+        assert pipe.output.strip() == "done"
+
+    def test_formatter_that_exits_early_breaks_the_pipe(self):
+        pipe = _FormatterPipe([sys.executable, "-c", "pass"])
+        pipe.start({})
+        pipe._proc.wait()
+        for _ in range(100):
+            pipe.send({"status": "pass", "externalId": "x" * 10_000})
+        pipe.finish({})
+        assert pipe.broken
+
+    def test_missing_command(self):
+        pipe = _FormatterPipe(["/nonexistent/formatter"])
+        pipe.start({})
+        pipe.send({"status": "pass"})
+        assert pipe.finish({}) is None
+        assert "could not start" in pipe.error
@@ -3,6 +3,8 @@
 import json
 import os
 import pathlib
+import sys
+import xml.etree.ElementTree as ET
 
 import pytest
 
@@ -133,6 +135,48 @@ def test_pass():
         raw_run = json.loads(pathlib.Path(custom_path).read_text())
         assert raw_run["schemaVersion"] == 1
 
+    def test_package_version_and_git_sha(self, pytester, monkeypatch):
+        monkeypatch.setenv("GITHUB_SHA", "a" * 40)
+        pytester.makepyprojecttoml('[project]\nname = "not-installed-xyz"\nversion = "2.0.1"\n')
+        pytester.makepyfile(test_simple="""
+from executable_stories import story
+
+def test_pass():
+    story.init("Versioned")
+""")
+        pytester.runpytest_subprocess(*_DISABLE_PLUGINS)
+
+        output_path = pytester.path / ".executable-stories" / "raw-run.json"
+        raw_run = json.loads(output_path.read_text())
+        assert raw_run["packageVersion"] == "2.0.1"
+        assert raw_run["gitSha"] == "a" * 40
+
+    def test_collection_profile(self, pytester):
+        pytester.mkpydir("heavydep").joinpath("__init__.py").write_text("import time\ntime.sleep(0.05)\n")
+        pytester.makepyfile(test_heavy="""
+import heavydep
+
+def test_one():
+    pass
+
+def test_two():
+    pass
+""")
+        result = pytester.runpytest_subprocess(*_DISABLE_PLUGINS, "--stories-profile-imports")
+        result.stdout.fnmatch_lines([
+            "*executable-stories: collection took * ms (1 modules*",
+            "*ms  test_heavy.py (2 items)",
+            "*import time by package (self):",
+            "*ms  heavydep",
+        ])
+
+        output_path = pytester.path / ".executable-stories" / "raw-run.json"
+        profile = json.loads(output_path.read_text())["meta"]["collectionProfile"]
+        assert profile["modules"][0]["path"] == "test_heavy.py"
+        assert profile["modules"][0]["durationMs"] >= 45
+        slowest = {s["module"]: s for s in profile["imports"]["slowest"]}
+        assert slowest["heavydep"]["collectedBy"] == "test_heavy.py"
+
     def test_no_output_when_no_tests(self, pytester):
         pytester.makepyfile(test_empty="# no tests here")
 
@@ -141,6 +185,53 @@ def test_pass():
         output_path = pytester.path / ".executable-stories" / "raw-run.json"
         assert not output_path.exists()
 
+    def test_no_output_when_no_story_is_used(self, pytester):
+        pytester.makepyfile(test_plain="""
+def test_one():
+    assert True
+
+def test_two():
+    assert False
+""")
+
+        result = pytester.runpytest_subprocess(*_DISABLE_PLUGINS)
+        result.assert_outcomes(passed=1, failed=1)
+
+        assert not (pytester.path / ".executable-stories").exists()
+        result.stdout.no_fnmatch_line("*executable-stories:*")
+
+    @pytest.mark.parametrize("extra", [(), ("-p", "no:terminal")])
+    def test_plain_tests_before_first_story_are_recorded(self, pytester, extra):
+        pytester.makepyfile(test_order="""
+from executable_stories import story
+
+def test_plain_pass():
+    assert True
+
+def test_plain_fail():
+    raise ValueError("early")
+
+def test_story():
+    story.init("First story")
+    story.given("a story")
+
+def test_plain_after():
+    assert True
+""")
+        pytester.runpytest_subprocess(*_DISABLE_PLUGINS, *extra)
+
+        output_path = pytester.path / ".executable-stories" / "raw-run.json"
+        raw_run = json.loads(output_path.read_text())
+        cases = raw_run["testCases"]
+        assert [tc["title"] for tc in cases] == ["test_plain_pass", "test_plain_fail", "test_story", "test_plain_after"]
+        early = cases[1]
+        assert early["status"] == "fail"
+        assert early["sourceLine"] == 6
+        assert early["error"]["message"].startswith("ValueError: early")
+        assert raw_run["meta"]["failures"][0]["exceptionType"] == "ValueError"
+        assert early["meta"]["errorFingerprint"] == raw_run["meta"]["failures"][0]["fingerprint"]
+        assert all(tc["durationMs"] >= 0 for tc in cases)
+
     def test_step_events_in_output_when_steps_have_duration(self, pytester):
         """When a test uses start_timer/end_timer, stepEvents appears in the test case."""
         pytester.makepyfile(test_timed="""
@@ -166,3 +257,559 @@ def test_with_timed_step():
         assert tc["stepEvents"][0]["index"] == 0
         assert tc["stepEvents"][0]["title"] == "first step"
         assert tc["stepEvents"][0]["durationMs"] >= 15
+
+    def test_doc_budget_truncates_and_reports(self, pytester):
+        pytester.makepyfile(test_big="""
+from executable_stories import story
+
+def test_big_payload():
+    story.init("Big payload")
+    story.given("a huge response")
+    story.code("response", "x" * 5000)
+""")
+        pytester.runpytest_subprocess(*_DISABLE_PLUGINS, "--stories-max-doc-bytes=1000")
+
+        output_path = pytester.path / ".executable-stories" / "raw-run.json"
+        raw_run = json.loads(output_path.read_text())
+        tc = raw_run["testCases"][0]
+        doc = tc["story"]["steps"][0]["docs"][0]
+        assert len(doc["content"]) == 1000
+        assert "truncated" not in doc
+        assert tc["meta"]["droppedDocBytes"] == 4000
+        assert raw_run["meta"]["docBudget"]["droppedBytes"] == 4000
+        assert raw_run["meta"]["docBudget"]["truncatedEntries"] == 1
+
+    def test_compact_output(self, pytester, sample_test_file):
+        pytester.makepyfile(test_sample=sample_test_file)
+        pytester.runpytest_subprocess(*_DISABLE_PLUGINS, "--stories-compact")
+
+        from executable_stories import read_raw_run
+
+        output_path = pytester.path / ".executable-stories" / "raw-run.json"
+        assert json.loads(output_path.read_text())["encoding"] == "string-table"
+        raw_run = read_raw_run(str(output_path))
+        assert raw_run["schemaVersion"] == 1
+        story_test = next(tc for tc in raw_run["testCases"] if tc["title"] == "test_with_story")
+        assert story_test["story"]["steps"][0]["text"] == "a logged-in user"
+
+    def test_reruns_collapse_into_single_case(self, pytester):
+        pytest.importorskip("pytest_rerunfailures")
+        pytester.makepyfile(test_flaky="""
+from executable_stories import story
+
+def test_flaky(tmp_path_factory):
+    marker = tmp_path_factory.getbasetemp().parent / "flaky-attempts"
+    attempts = int(marker.read_text()) if marker.exists() else 0
+    marker.write_text(str(attempts + 1))
+    story.init("Flaky scenario")
+    story.given(f"attempt {attempts}")
+    assert attempts >= 2
+""")
+        pytester.runpytest_subprocess(*_DISABLE_PLUGINS, "-p", "rerunfailures", "--reruns=3")
+
+        output_path = pytester.path / ".executable-stories" / "raw-run.json"
+        raw_run = json.loads(output_path.read_text())
+        assert len(raw_run["testCases"]) == 1
+        tc = raw_run["testCases"][0]
+        assert tc["status"] == "pass"
+        assert tc["retry"] == 2
+        assert tc["retries"] == 3
+        assert [a["status"] for a in tc["meta"]["attempts"]] == ["fail", "fail", "pass"]
+        assert tc["story"]["steps"][0]["text"] == "attempt 2"
+
+    def test_failures_grouped_by_fingerprint(self, pytester):
+        pytester.makepyfile(test_many_failures="""
+import pytest
+from executable_stories import story
+
+def check(value):
+    assert value == 0, f"value was {value}"
+
+@pytest.mark.parametrize("n", [1, 2, 3])
+def test_same_reason(n):
+    story.init("Checking values")
+    check(n)
+
+def test_other_reason():
+    story.init("Other failure")
+    raise ValueError("different")
+""")
+        result = pytester.runpytest_subprocess(*_DISABLE_PLUGINS)
+        result.stdout.fnmatch_lines(["*executable-stories: 4 failures in 2 groups*"])
+
+        output_path = pytester.path / ".executable-stories" / "raw-run.json"
+        raw_run = json.loads(output_path.read_text())
+        groups = raw_run["meta"]["failures"]
+        assert [g["count"] for g in groups] == [3, 1]
+        assert groups[0]["exceptionType"] == "AssertionError"
+        assert "check" in groups[0]["stack"]
+
+        same = [tc for tc in raw_run["testCases"] if tc["title"].startswith("test_same_reason")]
+        assert {tc["meta"]["errorFingerprint"] for tc in same} == {groups[0]["fingerprint"]}
+        assert all("check" in tc["error"]["stack"] for tc in same)
+        assert same[0]["error"]["message"].startswith("AssertionError: value was 1")
+
+    def test_shared_stacks_only_in_failure_index(self, pytester):
+        pytester.makepyfile(test_fail="""
+from executable_stories import story
+
+def test_fail():
+    story.init("Failure")
+    assert 1 == 2
+""")
+        pytester.runpytest_subprocess(*_DISABLE_PLUGINS, "--stories-shared-stacks")
+
+        raw_run = json.loads((pytester.path / ".executable-stories" / "raw-run.json").read_text())
+        (tc,) = raw_run["testCases"]
+        assert "stack" not in tc["error"]
+        (group,) = raw_run["meta"]["failures"]
+        assert group["fingerprint"] == tc["meta"]["errorFingerprint"]
+        assert "assert 1 == 2" in group["stack"]
+
+    def test_only_final_attempt_is_a_failure(self, pytester):
+        pytest.importorskip("pytest_rerunfailures")
+        pytester.makepyfile(test_flaky="""
+from executable_stories import story
+
+calls = []
+
+def test_flaky():
+    story.init("Flaky")
+    calls.append(1)
+    assert len(calls) == 2
+
+def test_broken():
+    story.init("Broken")
+    assert False, "always"
+""")
+        result = pytester.runpytest_subprocess(*_DISABLE_PLUGINS, "-p", "rerunfailures", "--reruns=2")
+        result.stdout.fnmatch_lines(["*executable-stories: 1 failures in 1 groups*"])
+
+        raw_run = json.loads((pytester.path / ".executable-stories" / "raw-run.json").read_text())
+        (group,) = raw_run["meta"]["failures"]
+        assert (group["count"], group["externalIds"]) == (1, ["test_flaky.py::test_broken"])
+
+    def test_failure_stack_style_and_limit(self, pytester):
+        pytester.makepyfile(test_fail="""
+from executable_stories import story
+
+def test_fail():
+    story.init("Long failure")
+    assert "x" * 5000 == "y"
+""")
+        pytester.runpytest_subprocess(
+            *_DISABLE_PLUGINS,
+            "--stories-tb-style=native",
+            "--stories-max-error-bytes=500",
+        )
+
+        output_path = pytester.path / ".executable-stories" / "raw-run.json"
+        tc = json.loads(output_path.read_text())["testCases"][0]
+        assert "Traceback (most recent call last)" in tc["error"]["stack"]
+        assert len(tc["error"]["stack"]) < 600
+        assert len(tc["error"]["message"]) < 600
+
+    def test_parametrized_story_collapses_to_outline(self, pytester):
+        pytester.makepyfile(test_outline="""
+import pytest
+from executable_stories import story
+
+@pytest.mark.parametrize("a,b,total", [(1, 2, 3), (2, 3, 5), (10, 5, 15)])
+def test_add(a, b, total):
+    story.init("Adding numbers")
+    story.given(f"the numbers {a} and {b}")
+    story.when("they are added")
+    story.then(f"the result is {total}")
+    assert a + b == total
+""")
+        pytester.runpytest_subprocess(*_DISABLE_PLUGINS, "--stories-outlines")
+
+        output_path = pytester.path / ".executable-stories" / "raw-run.json"
+        raw_run = json.loads(output_path.read_text())
+        assert len(raw_run["testCases"]) == 1
+        tc = raw_run["testCases"][0]
+        assert tc["externalId"] == "test_outline.py::test_add"
+        assert tc["title"] == "test_add"
+        assert tc["status"] == "pass"
+        steps = tc["story"]["steps"]
+        assert steps[0]["text"] == "the numbers <a> and <b>"
+        assert steps[2]["text"] == "the result is <total>"
+        assert len(tc["meta"]["outline"]["examples"]) == 3
+        assert tc["story"]["docs"][0]["rows"][2][:3] == ["10", "5", "15"]
+
+    def test_background_recorded_once_per_fixture(self, pytester):
+        pytester.makepyfile(test_bg="""
+import time
+import pytest
+from executable_stories import story
+
+@pytest.fixture(scope="module")
+def shop():
+    bg = story.background("A stocked shop")
+    bg.given("a shop with 3 products")
+    time.sleep(0.02)
+    return "shop"
+
+def test_browse(shop):
+    story.init("Browse")
+    story.when("the user browses")
+
+def test_buy(shop):
+    story.init("Buy")
+    story.when("the user buys")
+
+def test_unrelated():
+    story.init("Unrelated")
+""")
+        pytester.runpytest_subprocess(*_DISABLE_PLUGINS)
+
+        output_path = pytester.path / ".executable-stories" / "raw-run.json"
+        raw_run = json.loads(output_path.read_text())
+        backgrounds = raw_run["meta"]["backgrounds"]
+        assert len(backgrounds) == 1
+        assert backgrounds[0]["steps"][0]["text"] == "a shop with 3 products"
+        assert backgrounds[0]["durationMs"] >= 15
+        by_title = {tc["title"]: tc for tc in raw_run["testCases"]}
+        assert by_title["test_browse"]["meta"]["backgrounds"] == [backgrounds[0]["id"]]
+        assert by_title["test_buy"]["meta"]["backgrounds"] == [backgrounds[0]["id"]]
+        assert "meta" not in by_title["test_unrelated"]
+
+    def test_background_of_fixture_set_up_before_first_story(self, pytester):
+        pytester.makepyfile(test_bg="""
+import time
+import pytest
+from executable_stories import story
+
+@pytest.fixture
+def catalogue():
+    return ["tea"]
+
+@pytest.fixture
+def shop(catalogue):
+    bg = story.background("A stocked shop")
+    bg.given("a shop selling tea")
+    time.sleep(0.02)
+    return "shop"
+
+@pytest.fixture
+def outer(shop):
+    bg = story.background("A customer")
+    bg.given("a customer in the shop")
+    return "customer"
+
+def test_plain():
+    pass
+
+def test_buy(outer):
+    story.init("Buy")
+""")
+        pytester.runpytest_subprocess(*_DISABLE_PLUGINS)
+
+        raw_run = json.loads((pytester.path / ".executable-stories" / "raw-run.json").read_text())
+        backgrounds = {bg["fixture"]: bg for bg in raw_run["meta"]["backgrounds"]}
+        assert set(backgrounds) == {"shop", "outer"}
+        assert backgrounds["shop"]["durationMs"] >= 15
+        assert backgrounds["outer"]["durationMs"] < 15
+        (case,) = [tc for tc in raw_run["testCases"] if tc["title"] == "test_buy"]
+        assert sorted(case["meta"]["backgrounds"]) == sorted(bg["id"] for bg in backgrounds.values())
+
+    def test_collect_only_extracts_static_stories(self, pytester, sample_test_file):
+        pytester.makepyfile(test_sample=sample_test_file)
+        result = pytester.runpytest_subprocess(*_DISABLE_PLUGINS, "--stories-collect-only")
+        result.assert_outcomes()
+
+        output_path = pytester.path / ".executable-stories" / "raw-run.json"
+        raw_run = json.loads(output_path.read_text())
+        assert len(raw_run["testCases"]) == 4
+        assert {tc["status"] for tc in raw_run["testCases"]} == {"pending"}
+        story_test = next(tc for tc in raw_run["testCases"] if tc["title"] == "test_with_story")
+        assert story_test["story"]["scenario"] == "User adds item to cart"
+        assert story_test["story"]["tags"] == ["e2e"]
+        assert len(story_test["story"]["steps"]) == 3
+        assert raw_run["meta"]["staticExtraction"] == {"modulesParsed": 1, "modulesCached": 0}
+
+        pytester.runpytest_subprocess(*_DISABLE_PLUGINS, "--stories-collect-only")
+        raw_run = json.loads(output_path.read_text())
+        assert raw_run["meta"]["staticExtraction"] == {"modulesParsed": 0, "modulesCached": 1}
+
+    def test_story_tags_select_from_static_and_runtime_index(self, pytester):
+        pytester.makepyfile(test_tags="""
+from executable_stories import story
+
+DYNAMIC = ["auth"]
+
+def test_smoke():
+    story.init("Smoke", tags=["smoke"])
+
+def test_dynamic_auth():
+    story.init("Dynamic", tags=list(DYNAMIC))
+
+def test_plain():
+    pass
+""")
+        # First run: static extraction only knows the literal tags.
+        result = pytester.runpytest_subprocess(*_DISABLE_PLUGINS, "--story-tags=smoke,auth")
+        result.assert_outcomes(passed=1, deselected=2)
+
+        # A full run records the dynamic tags in the index ...
+        pytester.runpytest_subprocess(*_DISABLE_PLUGINS)
+
+        # ... so the next selection finds them without running anything else.
+        result = pytester.runpytest_subprocess(*_DISABLE_PLUGINS, "--story-tags=auth")
+        result.assert_outcomes(passed=1, deselected=2)
+        result.stdout.fnmatch_lines(["*1 passed, 2 deselected*"])
+
+    def test_story_tags_index_gathered_from_xdist_workers(self, pytester):
+        pytest.importorskip("xdist")
+        for name in ("test_one", "test_two"):
+            pytester.makepyfile(**{name: f"""
+from executable_stories import story
+
+DYNAMIC = ["auth"]
+
+def test_dynamic():
+    story.init("{name}", tags=list(DYNAMIC))
+
+def test_other():
+    story.init("Other")
+"""})
+        pytester.runpytest_subprocess(*_DISABLE_PLUGINS, "-n", "2")
+
+        # Runtime tags from both workers made it into the index.
+        result = pytester.runpytest_subprocess(*_DISABLE_PLUGINS, "--story-tags=auth")
+        result.assert_outcomes(passed=2, deselected=2)
+
+    def test_impact_map_selects_affected_tests(self, pytester):
+        pytester.makepyfile(
+            pricing="""
+def total(items):
+    return sum(items)
+""",
+            shipping="""
+def cost(weight):
+    return weight * 2
+""",
+            test_shop="""
+import pricing
+import shipping
+
+def test_total():
+    assert pricing.total([1, 2]) == 3
+
+def test_cost():
+    assert shipping.cost(2) == 4
+
+def test_nothing():
+    pass
+""",
+        )
+        pytester.syspathinsert()
+        pytester.runpytest_subprocess(*_DISABLE_PLUGINS, "--stories-impact-map")
+
+        impact = json.loads((pytester.path / ".executable-stories" / "impact-map.json").read_text())
+        total_index = impact["tests"].index("test_shop.py::test_total")
+        assert impact["files"]["pricing.py"] == [total_index]
+        assert "pricing.py::total" in impact["functions"]
+
+        changed = pytester.path / "changed.txt"
+        changed.write_text("pricing.py\nREADME.md\n")
+        result = pytester.runpytest_subprocess(*_DISABLE_PLUGINS, f"--stories-affected-by={changed}")
+        result.assert_outcomes(passed=1, deselected=2)
+
+        changed.write_text("test_shop.py\n")
+        result = pytester.runpytest_subprocess(*_DISABLE_PLUGINS, f"--stories-affected-by={changed}")
+        result.assert_outcomes(passed=3)
+
+    def test_impact_map_gathered_from_xdist_workers(self, pytester):
+        pytest.importorskip("xdist")
+        for name in ("test_one", "test_two"):
+            pytester.makepyfile(**{name: """
+def test_a():
+    pass
+
+def test_b():
+    pass
+"""})
+        pytester.runpytest_subprocess(*_DISABLE_PLUGINS, "-n", "2", "--stories-impact-map")
+
+        impact = json.loads((pytester.path / ".executable-stories" / "impact-map.json").read_text())
+        assert impact["tests"] == [f"{f}.py::test_{t}" for f in ("test_one", "test_two") for t in "ab"]
+        assert impact["files"]["test_one.py"] == [0, 1]
+
+    def test_markdown_and_ndjson_output(self, pytester, sample_test_file):
+        pytester.makepyfile(test_sample=sample_test_file)
+        pytester.runpytest_subprocess(*_DISABLE_PLUGINS, "--stories-ndjson", "--stories-markdown=docs")
+
+        ndjson = pytester.path / ".executable-stories" / "raw-run.ndjson"
+        lines = ndjson.read_text().splitlines()
+        assert "testCases" not in json.loads(lines[0])
+        assert len(lines) == 5
+        assert not (pytester.path / ".executable-stories" / "raw-run.json").exists()
+
+        markdown = (pytester.path / "docs" / "test_sample.py.test-results.md").read_text()
+        assert markdown.startswith("# User Stories\n")
+        assert "User adds item to cart" in markdown
+
+    def test_junit_report(self, pytester, sample_test_file):
+        pytester.makepyfile(test_sample=sample_test_file)
+        pytester.runpytest_subprocess(*_DISABLE_PLUGINS, "--stories-junit=reports/junit.xml")
+
+        root = ET.parse(pytester.path / "reports" / "junit.xml").getroot()
+        assert root.attrib["tests"] == "4"
+        assert root.attrib["failures"] == "1"
+        names = [tc.attrib["name"] for tc in root.iter("testcase")]
+        assert "User adds item to cart" in names
+        assert not (pytester.path / "reports" / "junit.xml.part").exists()
+
+    def test_junit_has_final_attempts_only(self, pytester):
+        pytest.importorskip("pytest_rerunfailures")
+        pytester.makepyfile(test_flaky="""
+from executable_stories import story
+
+calls = []
+
+def test_flaky():
+    story.init("Flaky")
+    calls.append(1)
+    assert len(calls) == 2
+
+def test_broken():
+    story.init("Broken")
+    assert 1 == 2
+""")
+        pytester.runpytest_subprocess(
+            *_DISABLE_PLUGINS,
+            "-p",
+            "rerunfailures",
+            "--reruns=1",
+            "--stories-shared-stacks",
+            "--stories-junit=junit.xml",
+        )
+
+        root = ET.parse(pytester.path / "junit.xml").getroot()
+        assert (root.attrib["tests"], root.attrib["failures"]) == ("2", "1")
+        (failure,) = root.iter("failure")
+        # The case itself carries no stack with --stories-shared-stacks.
+        assert 'story.init("Broken")' in failure.text
+
+    def test_pipe_streams_run_into_formatter(self, pytester, sample_test_file):
+        pytester.makepyfile(test_sample=sample_test_file)
+        command = f"{sys.executable} -m executable_stories format --stdin --input-type ndjson --output-dir reports"
+        result = pytester.runpytest_subprocess(
+            *_DISABLE_PLUGINS,
+            f"--stories-pipe={command}",
+            "--stories-pipe-format=ndjson",
+            "--stories-no-raw-run",
+        )
+        result.stdout.fnmatch_lines(["*reports/test_sample.py.test-results.md"])
+
+        assert not (pytester.path / ".executable-stories" / "raw-run.json").exists()
+        markdown = (pytester.path / "reports" / "test_sample.py.test-results.md").read_text()
+        assert "User adds item to cart" in markdown
+
+    def test_junit_combines_xdist_worker_parts(self, pytester):
+        pytest.importorskip("xdist")
+        for name in ("test_one", "test_two"):
+            pytester.makepyfile(**{name: """
+from executable_stories import story
+
+def test_pass():
+    story.init("Passes")
+
+def test_fail():
+    story.init("Fails")
+    assert False
+"""})
+        pytester.runpytest_subprocess(*_DISABLE_PLUGINS, "-n", "2", "--stories-junit=reports/junit.xml")
+
+        root = ET.parse(pytester.path / "reports" / "junit.xml").getroot()
+        assert (root.attrib["tests"], root.attrib["failures"]) == ("4", "2")
+        assert sorted(s.attrib["name"].rsplit("/", 1)[-1] for s in root.iter("testsuite")) == ["test_one.py", "test_two.py"]
+        assert [p.name for p in (pytester.path / "reports").iterdir()] == ["junit.xml"]
+
+    def test_pipe_rejected_under_xdist(self, pytester):
+        pytest.importorskip("xdist")
+        pytester.makepyfile(test_one="def test_pass():\n    pass\n")
+        result = pytester.runpytest_subprocess(*_DISABLE_PLUGINS, "-n", "2", f"--stories-pipe={sys.executable} -c pass")
+
+        assert result.ret == pytest.ExitCode.USAGE_ERROR
+        result.stderr.fnmatch_lines(["*--stories-pipe cannot be combined with pytest-xdist*"])
+
+    def test_pipe_streams_final_attempts_only(self, pytester):
+        pytest.importorskip("pytest_rerunfailures")
+        pytester.makepyfile(test_flaky="""
+from executable_stories import story
+
+calls = []
+
+def test_flaky():
+    story.init("Flaky")
+    calls.append(1)
+    assert len(calls) == 3
+""")
+        command = f"{sys.executable} -c 'import sys; open(\"stream.ndjson\", \"w\").write(sys.stdin.read())'"
+        pytester.runpytest_subprocess(
+            *_DISABLE_PLUGINS,
+            "-p",
+            "rerunfailures",
+            "--reruns=2",
+            f"--stories-pipe={command}",
+            "--stories-pipe-format=ndjson",
+        )
+
+        lines = [json.loads(line) for line in (pytester.path / "stream.ndjson").read_text().splitlines()]
+        (case,) = [line for line in lines if "externalId" in line]
+        assert (case["status"], case["retry"]) == ("pass", 2)
+        assert [a["status"] for a in case["meta"]["attempts"]] == ["fail", "fail", "pass"]
+
+    def test_source_order_and_story_manifest(self, pytester, sample_test_file):
+        pytester.makepyfile(test_sample=sample_test_file)
+        pytester.runpytest_subprocess(*_DISABLE_PLUGINS)
+
+        out_dir = pytester.path / ".executable-stories"
+        raw_run = json.loads((out_dir / "raw-run.json").read_text())
+        orders = {tc["title"]: tc["story"]["sourceOrder"] for tc in raw_run["testCases"] if "story" in tc}
+        assert orders == {"test_with_story": 0, "test_failing": 2}
+
+        manifest = json.loads((out_dir / "story-manifest.json").read_text())
+        assert list(manifest["stories"]) == ["test_sample.py::test_with_story", "test_sample.py::test_failing"]
+        entry = manifest["stories"]["test_sample.py::test_with_story"]
+        assert entry["sourceOrder"] == 0
+        assert len(entry["steps"]) == 3
+
+        # Timings differ between runs; the hashes do not.
+        pytester.runpytest_subprocess(*_DISABLE_PLUGINS)
+        assert json.loads((out_dir / "story-manifest.json").read_text()) == manifest
+
+    def test_story_manifest_stable_across_runs_with_per_run_values(self, pytester):
+        pytest.importorskip("opentelemetry.sdk")
+        pytester.makepyfile(test_run_values="""
+import random
+
+import pytest
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+
+from executable_stories import story
+
+trace.set_tracer_provider(TracerProvider())
+
+def test_traced():
+    with trace.get_tracer("t").start_as_current_span("test"):
+        story.init("Traced", tags=["otel"])
+    story.given("a request")
+    story.metric("latency", random.random(), unit="ms")
+
+@pytest.mark.parametrize("amount", [1, 2])
+def test_amounts(amount):
+    story.init("Amounts")
+    story.given("an amount")
+    assert random.random() < 2
+""")
+        out_dir = pytester.path / ".executable-stories"
+        pytester.runpytest_subprocess(*_DISABLE_PLUGINS, "--stories-outlines")
+        first = json.loads((out_dir / "story-manifest.json").read_text())
+        pytester.runpytest_subprocess(*_DISABLE_PLUGINS, "--stories-outlines")
+
+        assert len(first["stories"]) == 2
+        assert json.loads((out_dir / "story-manifest.json").read_text()) == first
@@ -0,0 +1,86 @@
+"""Tests for the slotted step, doc and timer records."""
+
+from __future__ import annotations
+
+import json
+
+from executable_stories._lazy import json_default, resolve_meta
+from executable_stories._records import _MISSING, _Doc, _Step
+from executable_stories._story_api import Story
+
+
+class TestDoc:
+    def test_resolves_in_schema_order(self):
+        assert _Doc("kv", "n", None).resolve() == {"kind": "kv", "label": "n", "value": None, "phase": "runtime"}
+        assert list(_Doc("code", "c", "x = 1", "py").resolve()) == ["kind", "label", "content", "lang", "phase"]
+
+    def test_missing_optional_fields_are_omitted(self):
+        doc = _Doc("screenshot", "shot.png", _MISSING)
+        assert doc.resolve() == {"kind": "screenshot", "path": "shot.png", "phase": "runtime"}
+        assert "alt" not in doc
+        assert doc.get("alt", "none") == "none"
+
+    def test_mapping_access(self):
+        doc = _Doc("note", "hello")
+        assert doc["kind"] == "note"
+        assert doc["text"] == "hello"
+        assert dict(doc) == doc.resolve()
+
+
+class TestStep:
+    def test_resolves_with_derived_id_and_docs(self):
+        step = _Step("Given", "a user", 3, "async")
+        step.wrapped = True
+        step.duration_ms = 1.5
+        step.docs = [_Doc("note", "n")]
+        assert step.resolve() == {
+            "keyword": "Given",
+            "text": "a user",
+            "id": "step-3",
+            "mode": "async",
+            "wrapped": True,
+            "durationMs": 1.5,
+            "docs": [{"kind": "note", "text": "n", "phase": "runtime"}],
+        }
+        assert step["id"] == "step-3"
+        assert "durationMs" in step
+
+    def test_plain_step_has_only_required_keys(self):
+        assert list(_Step("When", "it runs", 0)) == ["keyword", "text", "id"]
+
+
+class TestStoryRecords:
+    def test_meta_serializes_like_dicts(self, fresh_story: Story):
+        fresh_story.init("Test")
+        fresh_story.given("a cart")
+        fresh_story.kv("items", 2)
+        fresh_story.note("ok")
+        meta = fresh_story._get_meta(resolve=False)
+        assert isinstance(meta["steps"][0], _Step)
+        assert json.loads(json.dumps(meta, default=json_default)) == resolve_meta(meta)
+        assert resolve_meta(meta)["steps"][0]["docs"][1] == {"kind": "note", "text": "ok", "phase": "runtime"}
+
+    def test_unresolved_meta_hands_over_lists(self, fresh_story: Story):
+        fresh_story.init("Test")
+        fresh_story.given("a step")
+        ctx = fresh_story._ctx
+        assert fresh_story._get_meta(resolve=False)["steps"] is ctx.steps
+
+    def test_init_copies_caller_lists(self, fresh_story: Story):
+        tags = ["smoke"]
+        meta = {"owner": "team"}
+        fresh_story.init("Test", tags=tags, meta=meta)
+        fresh_story._ctx.tags.append("extra")
+        fresh_story._ctx.meta["otel"] = {}
+        assert tags == ["smoke"]
+        assert meta == {"owner": "team"}
+
+    def test_timer_records_on_its_step_after_later_steps(self, fresh_story: Story):
+        fresh_story.init("Test")
+        fresh_story.given("first")
+        token = fresh_story.start_timer()
+        fresh_story.when("second")
+        fresh_story.end_timer(token)
+        steps = fresh_story._get_meta()["steps"]
+        assert "durationMs" in steps[0]
+        assert "durationMs" not in steps[1]
@@ -0,0 +1,174 @@
+"""Tests for the per-step summaries of application spans."""
+
+from __future__ import annotations
+
+import json
+import threading
+
+import pytest
+
+pytest.importorskip("opentelemetry.sdk")
+
+from opentelemetry.sdk.trace import TracerProvider  # noqa: E402
+
+from executable_stories._span_summary import (  # noqa: E402
+    MAX_NAMES,
+    OTHER_NAME,
+    SUMMARY_TYPE,
+    _Bucket,
+    _SpanSummaryProcessor,
+    attach_summaries,
+)
+
+pytest_plugins = ["pytester"]
+
+
+@pytest.fixture()
+def tracer(fresh_story):
+    provider = TracerProvider()
+    provider.add_span_processor(_SpanSummaryProcessor(fresh_story, top=2))
+    yield provider.get_tracer("app")
+    provider.shutdown()
+
+
+def _span(tracer, name: str, duration_ms: float) -> None:
+    span = tracer.start_span(name, start_time=0)
+    span.end(end_time=int(duration_ms * 1e6))
+
+
+def _summaries(docs) -> list[dict]:
+    return [doc["data"] for doc in docs or [] if doc["kind"] == "custom" and doc["type"] == SUMMARY_TYPE]
+
+
+class TestBucket:
+    def test_totals_by_name_and_slowest(self):
+        bucket = _Bucket()
+        for name, ms in [("db", 3), ("http", 10), ("db", 5), ("cache", 1)]:
+            bucket.add(name, int(ms * 1e6), 1, 2, top=2)
+        summary = bucket.summary()
+        assert summary["spans"] == 4
+        assert summary["totalMs"] == 19.0
+        assert summary["byName"] == [
+            {"name": "http", "count": 1, "totalMs": 10.0},
+            {"name": "db", "count": 2, "totalMs": 8.0},
+            {"name": "cache", "count": 1, "totalMs": 1.0},
+        ]
+        assert [(s["name"], s["durationMs"]) for s in summary["slowest"]] == [("http", 10.0), ("db", 5.0)]
+        assert summary["slowest"][0]["traceId"] == "0" * 31 + "1"
+
+    def test_names_are_capped(self):
+        bucket = _Bucket()
+        for i in range(MAX_NAMES + 5):
+            bucket.add(f"span-{i}", 1, 1, 1, top=0)
+        assert len(bucket.by_name) == MAX_NAMES + 1
+        assert bucket.by_name[OTHER_NAME] == [5, 5]
+        assert bucket.slowest == []
+
+
+class TestProcessor:
+    def test_spans_bucketed_by_current_step(self, fresh_story, tracer):
+        fresh_story.init("Checkout")
+        _span(tracer, "load config", 1)
+        fresh_story.given("a cart")
+        _span(tracer, "SELECT cart", 2)
+        fresh_story.when("the user pays")
+        _span(tracer, "POST /charge", 30)
+        _span(tracer, "SELECT cart", 4)
+        _span(tracer, "INSERT order", 3)
+        attach_summaries(fresh_story)
+
+        meta = fresh_story._get_meta()
+        assert _summaries(meta["docs"])[0]["byName"] == [{"name": "load config", "count": 1, "totalMs": 1.0}]
+        given, when = meta["steps"]
+        assert _summaries(given.get("docs"))[0]["spans"] == 1
+        paid = _summaries(when.get("docs"))[0]
+        assert paid["spans"] == 3
+        assert [s["name"] for s in paid["slowest"]] == ["POST /charge", "SELECT cart"]
+
+    def test_spans_on_other_threads_follow_their_parent(self, fresh_story, tracer):
+        from opentelemetry import context
+
+        fresh_story.init("Worker")
+        fresh_story.when("a job runs")
+
+        def job(parent) -> None:
+            token = context.attach(parent)
+            try:
+                _span(tracer, "job", 2)
+            finally:
+                context.detach(token)
+
+        with tracer.start_as_current_span("dispatch"):
+            orphan = threading.Thread(target=_span, args=(tracer, "unrelated", 2))
+            worker = threading.Thread(target=job, args=(context.get_current(),))
+            for thread in (orphan, worker):
+                thread.start()
+                thread.join()
+        attach_summaries(fresh_story)
+
+        (summary,) = _summaries(fresh_story._get_meta()["steps"][0]["docs"])
+        assert summary["spans"] == 2
+        assert sorted(entry["name"] for entry in summary["byName"]) == ["dispatch", "job"]
+
+    def test_spans_follow_the_story_that_started_them(self, fresh_story, tracer):
+        fresh_story.init("Starts the span")
+        span = tracer.start_span("long poll")
+        first = fresh_story._ctx
+        fresh_story._clear()
+
+        def other_story() -> None:
+            fresh_story.init("Ends the span")
+            span.end()
+            attach_summaries(fresh_story)
+            assert "docs" not in fresh_story._get_meta()
+
+        thread = threading.Thread(target=other_story)
+        thread.start()
+        thread.join()
+        assert first.span_buckets[-1].count == 1
+
+    def test_spans_outside_a_story_are_ignored(self, fresh_story, tracer):
+        _span(tracer, "startup", 1)
+        fresh_story.init("Later")
+        fresh_story._clear()
+        _span(tracer, "teardown", 1)
+        fresh_story.init("Quiet")
+        attach_summaries(fresh_story)
+        assert "docs" not in fresh_story._get_meta()
+
+
+def test_plugin_attaches_step_summaries(pytester):
+    pytester.makepyfile(test_traced="""
+from opentelemetry import trace
+from executable_stories import story
+
+def test_checkout():
+    story.init("Checkout")
+    story.when("the user pays")
+    with trace.get_tracer("shop").start_as_current_span("POST /charge"):
+        pass
+
+def test_plain():
+    with trace.get_tracer("shop").start_as_current_span("orphan"):
+        pass
+""")
+    result = pytester.runpytest_subprocess("--stories-span-summary", "--stories-span-summary-top=1")
+    result.assert_outcomes(passed=2)
+    run = json.loads((pytester.path / ".executable-stories" / "raw-run.json").read_text())
+    cases = {case["title"]: case for case in run["testCases"]}
+    (summary,) = _summaries(cases["test_checkout"]["story"]["steps"][0]["docs"])
+    assert summary["spans"] == 1
+    assert summary["slowest"][0]["name"] == "POST /charge"
+    assert "story" not in cases["test_plain"]
+
+
+def test_missing_sdk_is_a_usage_error(pytester):
+    pytester.makeconftest("""
+import sys
+
+sys.modules["opentelemetry.sdk"] = None
+""")
+    pytester.makepyfile(test_one="def test_one():\n    pass\n")
+    result = pytester.runpytest_subprocess("--stories-span-summary")
+    assert result.ret == pytest.ExitCode.USAGE_ERROR
+    result.stderr.fnmatch_lines(["*--stories-span-summary needs opentelemetry-sdk*otel-export*not installed*"])
@@ -0,0 +1,127 @@
+"""Tests for collection-time static story extraction."""
+
+import textwrap
+
+from executable_stories._static import _StaticExtractor, extract_stories
+
+SOURCE = textwrap.dedent('''
+    import pytest
+    from executable_stories import story
+
+    def helper():
+        story.given("never seen")
+
+    def test_login():
+        story.init("User logs in", tags=["auth", "smoke"], ticket="JIRA-1")
+        story.note("before steps")
+        story.given("a registered user")
+        story.kv("user", "alice")
+        story.when("they submit credentials")
+        story.given("another precondition")
+        story.expect("the dashboard shows", lambda: None)
+
+    @pytest.mark.parametrize("n", [1, 2])
+    def test_outline(n):
+        story.init(f"Adding {n}")
+        story.given(f"the number {n}")
+        story.then(some_text)
+        story.kv("dynamic", compute())
+
+    class TestCart:
+        def test_add(self):
+            story.init("Add to cart")
+            story.when("adding an item")
+
+    def test_plain():
+        assert True
+''')
+
+
+class TestExtractStories:
+    def test_literal_story_resolved(self):
+        stories = extract_stories(SOURCE)
+        meta = stories["test_login"]
+        assert meta["scenario"] == "User logs in"
+        assert meta["tags"] == ["auth", "smoke"]
+        assert meta["tickets"] == ["JIRA-1"]
+        assert meta["docs"] == [{"kind": "note", "text": "before steps", "phase": "static"}]
+        assert [(s["keyword"], s["text"]) for s in meta["steps"]] == [
+            ("Given", "a registered user"),
+            ("When", "they submit credentials"),
+            ("And", "another precondition"),
+            ("Then", "the dashboard shows"),
+        ]
+        assert meta["steps"][0]["docs"][0] == {"kind": "kv", "label": "user", "value": "alice", "phase": "static"}
+        assert meta["steps"][3]["wrapped"] is True
+
+    def test_non_literals_become_placeholders_or_skipped(self):
+        meta = extract_stories(SOURCE)["test_outline"]
+        assert meta["scenario"] == "Adding <n>"
+        assert meta["steps"][0]["text"] == "the number <n>"
+        assert meta["steps"][1]["text"] == "<some_text>"
+        assert "docs" not in meta["steps"][1]
+
+    def test_class_methods_keyed_by_class(self):
+        stories = extract_stories(SOURCE)
+        assert stories["TestCart::test_add"]["scenario"] == "Add to cart"
+
+    def test_tests_without_story_and_helpers_ignored(self):
+        stories = extract_stories(SOURCE)
+        assert "test_plain" not in stories
+        assert "helper" not in stories
+
+    def test_aliased_imports(self):
+        source = textwrap.dedent('''
+            import executable_stories as es
+            from executable_stories import story as s
+
+            def test_a():
+                s.init("Alias")
+                es.story.given("via package")
+        ''')
+        meta = extract_stories(source)["test_a"]
+        assert meta["scenario"] == "Alias"
+        assert meta["steps"][0]["text"] == "via package"
+
+    def test_module_without_story_import(self):
+        assert extract_stories("def test_x():\n    story.init('x')\n") == {}
+
+
+class _DictCache:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key, default):
+        return self.data.get(key, default)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+
+class TestStaticExtractor:
+    def test_cache_hit_skips_parsing(self, tmp_path):
+        module = tmp_path / "test_mod.py"
+        module.write_text(SOURCE)
+        cache = _DictCache()
+
+        first = _StaticExtractor(cache)
+        stories = first.stories_for(str(module))
+        assert first.parsed == 1
+
+        second = _StaticExtractor(cache)
+        assert second.stories_for(str(module)) == stories
+        assert second.parsed == 0
+        assert second.cached == 1
+
+    def test_changed_source_reparsed(self, tmp_path):
+        module = tmp_path / "test_mod.py"
+        module.write_text(SOURCE)
+        cache = _DictCache()
+        _StaticExtractor(cache).stories_for(str(module))
+        module.write_text(SOURCE.replace("User logs in", "User signs in"))
+        extractor = _StaticExtractor(cache)
+        assert extractor.stories_for(str(module))["test_login"]["scenario"] == "User signs in"
+        assert extractor.parsed == 1
+
+    def test_missing_file(self, tmp_path):
+        assert _StaticExtractor().stories_for(str(tmp_path / "nope.py")) == {}
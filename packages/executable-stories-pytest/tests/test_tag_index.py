@@ -0,0 +1,63 @@
+"""Tests for the persistent tag/ticket index."""
+
+import json
+
+from executable_stories._tag_index import INDEX_VERSION, _TagIndex, matches, parse_filter
+
+
+class TestTagIndex:
+    def test_lookup_after_update(self):
+        index = _TagIndex()
+        index.update("t.py", "h1", "t.py::test_a", ["smoke"], ["JIRA-1"])
+        assert index.lookup("t.py", "h1", "t.py::test_a") == (["smoke"], ["JIRA-1"])
+        assert index.changed
+
+    def test_stale_hash_is_unknown(self):
+        index = _TagIndex()
+        index.update("t.py", "h1", "t.py::test_a", ["smoke"], [])
+        assert index.lookup("t.py", "h2", "t.py::test_a") is None
+
+    def test_changed_file_drops_old_entries(self):
+        index = _TagIndex()
+        index.update("t.py", "h1", "t.py::test_a", ["smoke"], [])
+        index.update("t.py", "h2", "t.py::test_b", ["auth"], [])
+        assert index.lookup("t.py", "h2", "t.py::test_a") is None
+        assert index.lookup("t.py", "h2", "t.py::test_b") == (["auth"], [])
+
+    def test_round_trip_and_unchanged_update(self):
+        index = _TagIndex()
+        index.update("t.py", "h1", "t.py::test_a", ["smoke"], [])
+        restored = _TagIndex(index.to_dict())
+        assert not restored.changed
+        restored.update("t.py", "h1", "t.py::test_a", ["smoke"], [])
+        assert not restored.changed
+
+    def test_worker_updates_merge_into_loaded_index(self):
+        controller = _TagIndex()
+        controller.update("a.py", "h1", "a.py::test_a", ["old"], [])
+        controller.update("b.py", "h1", "b.py::test_b", ["kept"], [])
+        worker = _TagIndex(json.loads(json.dumps(controller.to_dict())))
+        worker.update("a.py", "h1", "a.py::test_a", ["new"], [])
+        worker.update("b.py", "h1", "b.py::test_b", ["kept"], [])
+        assert worker.updates() == {"a.py": {"hash": "h1", "tests": {"a.py::test_a": {"tags": ["new"], "tickets": []}}}}
+
+        controller.merge(worker.updates())
+        assert controller.lookup("a.py", "h1", "a.py::test_a") == (["new"], [])
+        assert controller.lookup("b.py", "h1", "b.py::test_b") == (["kept"], [])
+
+    def test_other_version_ignored(self):
+        index = _TagIndex({"version": INDEX_VERSION + 1, "files": {"t.py": {}}})
+        assert index.to_dict()["files"] == {}
+
+
+class TestFilters:
+    def test_parse_filter(self):
+        assert parse_filter("smoke, auth,,") == {"smoke", "auth"}
+        assert parse_filter(None) == set()
+
+    def test_matches_any_tag_and_any_ticket(self):
+        assert matches(["smoke"], [], {"smoke", "auth"}, set())
+        assert not matches(["slow"], [], {"smoke"}, set())
+        assert matches(["smoke"], ["J-1"], {"smoke"}, {"J-1"})
+        assert not matches(["smoke"], [], {"smoke"}, {"J-1"})
+        assert matches([], [], set(), set())
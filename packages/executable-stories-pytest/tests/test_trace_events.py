@@ -0,0 +1,116 @@
+"""Tests for the Trace Event Format timeline."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+from executable_stories._story_api import Story
+from executable_stories._trace_events import _TraceEventWriter, combine_parts, part_path
+
+pytest_plugins = ["pytester"]
+
+
+def _report(when: str, start: float, stop: float, outcome: str = "passed") -> SimpleNamespace:
+    return SimpleNamespace(
+        nodeid="tests/test_a.py::test_one",
+        when=when,
+        start=start,
+        stop=stop,
+        duration=stop - start,
+        outcome=outcome,
+    )
+
+
+def _events(path: Path) -> list[dict]:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+class TestTraceEventWriter:
+    def test_phases_nest_inside_the_test_event(self, tmp_path: Path):
+        path = tmp_path / "trace.json"
+        writer = _TraceEventWriter(str(path), "pytest")
+        writer.phase(_report("setup", 100.0, 100.5))
+        writer.phase(_report("call", 100.5, 102.0, "failed"))
+        writer.phase(_report("teardown", 102.0, 102.25))
+        writer.close()
+
+        events = _events(path)
+        meta = [e for e in events if e["ph"] == "M"]
+        assert {e["name"] for e in meta} == {"process_name", "thread_name"}
+        complete = {e["name"]: e for e in events if e["ph"] == "X"}
+        test = complete["tests/test_a.py::test_one"]
+        assert (test["ts"], test["dur"]) == (100_000_000.0, 2_250_000.0)
+        assert complete["call"]["args"] == {"nodeid": "tests/test_a.py::test_one", "outcome": "failed"}
+        assert complete["call"]["dur"] == 1_500_000.0
+        assert len({(e["pid"], e["tid"]) for e in complete.values()}) == 1
+
+    def test_timed_steps_are_complete_events(self, tmp_path: Path, fresh_story: Story):
+        fresh_story.init("Checkout")
+        fresh_story.given("a cart")
+        fresh_story.fn("When", "the user pays", lambda: None)
+        token = fresh_story.start_timer()
+        fresh_story.end_timer(token)
+
+        path = tmp_path / "trace.json"
+        writer = _TraceEventWriter(str(path), "pytest")
+        writer.steps("t::one", fresh_story._ctx.steps)
+        writer.close()
+
+        steps = [e for e in _events(path) if e.get("cat") == "step"]
+        assert [(e["name"], e["ph"]) for e in steps] == [("Given a cart", "i"), ("When the user pays", "X")]
+        given, paid = steps
+        assert paid["ts"] >= given["ts"]
+        assert paid["args"] == {"nodeid": "t::one", "index": 1}
+
+    def test_unclosed_stream_is_still_line_per_event(self, tmp_path: Path):
+        path = tmp_path / "trace.json"
+        writer = _TraceEventWriter(str(path), "pytest")
+        writer.phase(_report("setup", 1.0, 2.0))
+        writer.phase(_report("teardown", 2.0, 3.0))
+        # Flushed after teardown, before close.
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert lines[0] == "["
+        assert all(json.loads(line.rstrip(",")) for line in lines[1:])
+        writer.close()
+
+
+def test_combine_worker_parts(tmp_path: Path):
+    path = tmp_path / "trace.json"
+    for worker in ("gw0", "gw1"):
+        writer = _TraceEventWriter(part_path(str(path), worker), f"pytest {worker}")
+        writer.phase(_report("setup", 1.0, 2.0))
+        writer.close()
+
+    assert combine_parts(str(path)) == 2
+    names = [e["args"]["name"] for e in _events(path) if e["name"] == "process_name"]
+    assert names == ["pytest gw0", "pytest gw1"]
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_plugin_streams_trace(pytester):
+    pytester.makepyfile(test_timeline="""
+from executable_stories import story
+
+def test_checkout():
+    story.init("Checkout")
+    story.fn("When", "the user pays", lambda: None)
+
+def test_plain():
+    pass
+""")
+    result = pytester.runpytest_subprocess("--stories-chrome-trace=out/trace.json")
+    result.assert_outcomes(passed=2)
+
+    events = _events(pytester.path / "out" / "trace.json")
+    complete = [e for e in events if e["ph"] == "X"]
+    tests = {e["name"] for e in complete if e["cat"] == "test"}
+    assert tests == {"test_timeline.py::test_checkout", "test_timeline.py::test_plain"}
+    assert sum(1 for e in complete if e["cat"] == "phase") == 6
+    (step,) = [e for e in complete if e["cat"] == "step"]
+    call = next(
+        e for e in complete
+        if e["cat"] == "phase" and e["name"] == "call" and e["args"]["nodeid"].endswith("test_checkout")
+    )
+    assert call["ts"] <= step["ts"] <= step["ts"] + step["dur"] <= call["ts"] + call["dur"] + 1000